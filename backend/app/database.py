@@ -1,13 +1,21 @@
 """
 Database Configuration
 SQLite database for local development with async SQLAlchemy.
+Tenants are routed to database shards (SQLite files or Postgres DSNs);
+the built-in database below is the "default" shard.
 """
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
 import os
 
+from .config import settings
+
 # Get the directory where this file is located
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "bike_service.db")
@@ -19,6 +27,9 @@ SQLITE_URL_SYNC = f"sqlite:///{DB_PATH}"
 # Debug mode from environment
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
 
+# Name of the built-in shard
+DEFAULT_SHARD = "default"
+
 # Async engine for SQLite
 async_engine = create_async_engine(
     SQLITE_URL,
@@ -49,16 +60,117 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
+
+def set_journal_mode(engine: AsyncEngine):
+    """Put SQLite shard files in SQLITE_JOURNAL_MODE (persistent; checked on each new connection)."""
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_journal_mode(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.close()
+
+
+set_journal_mode(async_engine)
+
 # Base class for all models
 Base = declarative_base()
 
+# Tenant of the current request, set by TenantMiddleware
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+
+class ShardRouter:
+    """
+    Maps tenants to database shards.
+    Shard URLs come from settings.DATABASE_SHARDS and tenant placement from
+    settings.TENANT_SHARDS; tenants without an entry live on the default shard.
+    Engines are created lazily, one pool per shard.
+    """
+
+    def __init__(self, default_engine: AsyncEngine, default_sessionmaker: async_sessionmaker):
+        self._engines: Dict[str, AsyncEngine] = {DEFAULT_SHARD: default_engine}
+        self._sessionmakers: Dict[str, async_sessionmaker] = {DEFAULT_SHARD: default_sessionmaker}
+
+    @staticmethod
+    def shard_names() -> List[str]:
+        """All configured shards, default first."""
+        return [DEFAULT_SHARD] + [name for name in settings.DATABASE_SHARDS if name != DEFAULT_SHARD]
+
+    @staticmethod
+    def is_known_tenant(tenant_id: str) -> bool:
+        """Tenants are the default tenant plus every tenant with a shard assignment."""
+        return tenant_id == settings.DEFAULT_TENANT_ID or tenant_id in settings.TENANT_SHARDS
+
+    @staticmethod
+    def shard_for(tenant_id: Optional[str]) -> str:
+        """Name of the shard holding a tenant's data."""
+        return settings.TENANT_SHARDS.get(tenant_id, DEFAULT_SHARD)
+
+    @staticmethod
+    def url(shard: str) -> str:
+        """Async database URL of a shard."""
+        if shard == DEFAULT_SHARD:
+            return SQLITE_URL
+        return settings.DATABASE_SHARDS[shard]
+
+    def engine(self, shard: str) -> AsyncEngine:
+        """Engine for a shard, created on first use."""
+        if shard not in self._engines:
+            url = self.url(shard)
+            connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+            self._engines[shard] = create_async_engine(url, echo=DEBUG, connect_args=connect_args)
+            if url.startswith("sqlite"):
+                set_journal_mode(self._engines[shard])
+        return self._engines[shard]
+
+    def sessionmaker(self, shard: str) -> async_sessionmaker:
+        """Session factory for a shard."""
+        if shard not in self._sessionmakers:
+            self._sessionmakers[shard] = async_sessionmaker(
+                bind=self.engine(shard),
+                class_=AsyncSession,
+                expire_on_commit=False,
+                autocommit=False,
+                autoflush=False
+            )
+        return self._sessionmakers[shard]
+
+    def engines(self) -> List[AsyncEngine]:
+        """Engines for every configured shard."""
+        return [self.engine(name) for name in self.shard_names()]
+
+    async def dispose(self):
+        """Close every shard's connection pool."""
+        for engine in self._engines.values():
+            await engine.dispose()
+
+
+shard_router = ShardRouter(async_engine, AsyncSessionLocal)
+
+
+def dialect_insert(db: AsyncSession):
+    """insert() of the session's dialect, for INSERT ... ON CONFLICT upserts."""
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+def tenant_session(tenant_id: Optional[str] = None) -> AsyncSession:
+    """
+    Open a session on the tenant's shard, scoped to the tenant's rows.
+    Defaults to the tenant of the current request.
+    """
+    tenant_id = tenant_id or current_tenant.get() or settings.DEFAULT_TENANT_ID
+    session = shard_router.sessionmaker(shard_router.shard_for(tenant_id))()
+    session.info["tenant_id"] = tenant_id
+    return session
+
 
 async def get_db() -> AsyncSession:
     """
     Dependency that provides a database session.
     Used with FastAPI's Depends() for automatic session management.
+    The session is bound to the current tenant's shard.
     """
-    async with AsyncSessionLocal() as session:
+    async with tenant_session() as session:
         try:
             yield session
             await session.commit()
@@ -70,12 +182,27 @@ async def get_db() -> AsyncSession:
 
 
 async def init_db():
-    """Initialize database tables."""
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print(f"Database created at: {DB_PATH}")
+    """
+    Check the schema version on every shard and migrate shards that are behind.
+    An up-to-date shard costs one small query instead of a full create_all.
+    """
+    from .migrations import ensure_schema
+
+    for name in shard_router.shard_names():
+        async with shard_router.engine(name).begin() as conn:
+            outcome = await conn.run_sync(ensure_schema)
+        print(f"Database shard '{name}': {outcome}")
+
+
+async def warm_pool(connections: int):
+    """Open pooled connections on every shard ahead of the first requests."""
+    for engine in shard_router.engines():
+        conns = [await engine.connect() for _ in range(connections)]
+        for conn in conns:
+            await conn.execute(text("SELECT 1"))
+            await conn.close()
 
 
 async def close_db():
-    """Close database connection pool."""
-    await async_engine.dispose()
+    """Close database connection pools."""
+    await shard_router.dispose()
@@ -0,0 +1,9 @@
+# Middleware package
+from .compression import CompressionMiddleware
+from .tenant import TenantMiddleware
+from .deadline import DeadlineMiddleware
+from .admission import AdmissionMiddleware
+from .profiling import ProfilingMiddleware
+from .capture import CaptureMiddleware
+
+__all__ = ["CompressionMiddleware", "TenantMiddleware", "DeadlineMiddleware", "AdmissionMiddleware", "ProfilingMiddleware", "CaptureMiddleware"]
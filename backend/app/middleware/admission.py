@@ -0,0 +1,53 @@
+"""
+Admission Middleware
+Classifies each request into a route class (ADMISSION_ROUTES) and holds
+one of the class's slots for the whole request. Requests that are shed
+get HTTP 503 with Retry-After before any work is done for them.
+Unclassified routes (health checks, metrics, docs) are always admitted.
+"""
+
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config import settings
+from ..services.admission import Shed, admission
+from .deadline import match_route
+
+
+class AdmissionMiddleware:
+    """Per-route-class concurrency limits with load shedding."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = admission.limiter(match_route(settings.ADMISSION_ROUTES, scope["method"], scope["path"]))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Shed as shed:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy. Please try again shortly."},
+                headers={"Retry-After": str(shed.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.monotonic() - started
+        finally:
+            # Failed and cancelled requests free their slot without skewing the p99
+            limiter.release(latency)
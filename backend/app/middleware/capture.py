@@ -0,0 +1,78 @@
+"""
+Capture Middleware
+Records the sanitized shape of API requests (app/services/capture.py)
+when CAPTURE_ENABLED is set, a CAPTURE_SAMPLE_RATE share of them. It is
+the outermost middleware, so a request's time includes the queueing and
+work of every other middleware, as a client sees it.
+"""
+
+import random
+import time
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+from ..services.capture import capture_log, sanitize_query, user_key
+from .tenant import request_claims
+
+
+# Only API requests are captured (not health checks, metrics or docs)
+CAPTURED_PREFIX = "/api/"
+
+
+class CaptureMiddleware:
+    """Records the route, parameters, sizes, timing and caller role of requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not settings.CAPTURE_ENABLED
+            or not scope["path"].startswith(CAPTURED_PREFIX)
+            or (settings.CAPTURE_SAMPLE_RATE < 1 and random.random() >= settings.CAPTURE_SAMPLE_RATE)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        received_at = time.time()
+        started = time.perf_counter()
+        sizes = {"body": 0, "response": 0}
+        status_code = 500
+
+        async def counting_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["body"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            headers = Headers(scope=scope)
+            claims = request_claims(scope) or {}  # decoded by TenantMiddleware
+            route = scope.get("route")
+            capture_log.record({
+                "t": round(received_at, 3),
+                "method": scope["method"],
+                "route": route.path if route is not None else None,
+                "query": sanitize_query(QueryParams(scope["query_string"])),
+                "body_bytes": sizes["body"],
+                "content_type": headers.get("content-type", "").split(";")[0] or None,
+                "tenant": scope.get("state", {}).get("tenant_id"),
+                "role": claims.get("role", "anonymous"),
+                "user": user_key(claims.get("sub")),
+                "status": status_code,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "response_bytes": sizes["response"],
+            })
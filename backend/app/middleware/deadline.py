@@ -0,0 +1,154 @@
+"""
+Deadline Middleware
+Gives every request a deadline (REQUEST_DEADLINE_SECONDS, or the longest
+matching ROUTE_DEADLINES prefix) and cancels the request's work when the
+deadline passes before the response starts, or when the client
+disconnects before the response is complete. The deadline is exposed to
+the database layer through current_deadline (app/services/deadline.py),
+so a cancelled request also stops its running statement and frees its
+connection. Once the last body message is sent the deadline is lifted
+and the request's background tasks run to completion.
+"""
+
+import asyncio
+import re
+from functools import lru_cache
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+from ..services.deadline import Deadline, current_deadline
+from ..services.metrics import metrics
+
+
+metrics.describe("http_deadline_exceeded_total", "Requests stopped by their deadline, by route")
+metrics.describe("http_client_disconnects_total", "Requests cancelled because the client disconnected, by route")
+
+
+@lru_cache(maxsize=None)
+def _prefix_pattern(prefix: str) -> re.Pattern:
+    """Regex of a route prefix whose {param} segments match any one path segment."""
+    return re.compile("[^/]+".join(re.escape(part) for part in re.split(r"\{[^/}]*\}", prefix)))
+
+
+def match_route(table: dict, method: str, path: str, default=None):
+    """
+    Value of the longest matching key of a route table. Keys are path
+    prefixes, optionally preceded by a method ("GET /api/v1/bookings");
+    a {param} segment matches any one segment ("POST /api/v1/bookings/{id}/photos").
+    """
+    best, best_length = default, -1
+    for key, value in table.items():
+        key_method, _, prefix = key.rpartition(" ")
+        if key_method and key_method.upper() != method:
+            continue
+        if "{" in prefix:
+            matched = _prefix_pattern(prefix).match(path) is not None
+        else:
+            matched = path.startswith(prefix)
+        if matched and len(prefix) > best_length:
+            best, best_length = value, len(prefix)
+    return best
+
+
+def deadline_for(method: str, path: str) -> float:
+    """Deadline in seconds for a request."""
+    return match_route(settings.ROUTE_DEADLINES, method, path, settings.REQUEST_DEADLINE_SECONDS)
+
+
+def route_label(scope: Scope) -> str:
+    """Route template of the request once routing has run (bounded metric labels)."""
+    route = scope.get("route")
+    return f"{scope['method']} {route.path}" if route is not None else f"{scope['method']} unmatched"
+
+
+class DeadlineMiddleware:
+    """Runs each request under a deadline and cancels it on client disconnect."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(deadline_for(scope["method"], scope["path"]))
+        disconnected = asyncio.Event()  # the client left before the response was complete
+        completed = asyncio.Event()  # the last body message has been sent
+        response_started = False
+        closed = False
+
+        # One reader owns the client channel, a message ahead of the app at most,
+        # so a disconnect is noticed even while the app is not reading
+        inbox: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        async def pump():
+            nonlocal closed
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    closed = True
+                    if not completed.is_set():
+                        disconnected.set()
+                await inbox.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def app_receive() -> Message:
+            if closed and inbox.empty():
+                return {"type": "http.disconnect"}
+            return await inbox.get()
+
+        async def app_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if message["status"] == 504 and deadline.expired:
+                    metrics.increment("http_deadline_exceeded_total", route=route_label(scope))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                deadline.lift()
+                completed.set()
+
+        token = current_deadline.set(deadline)
+        try:
+            task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        finally:
+            current_deadline.reset(token)
+        reader = asyncio.ensure_future(pump())
+        gone = asyncio.ensure_future(disconnected.wait())
+        sent = asyncio.ensure_future(completed.wait())
+        watched = {task, gone, sent}
+
+        try:
+            await asyncio.wait(watched, timeout=max(deadline.remaining(), 0), return_when=asyncio.FIRST_COMPLETED)
+            if not task.done() and not disconnected.is_set() and response_started and not completed.is_set():
+                # The deadline covers producing the response, not streaming it
+                await asyncio.wait(watched, return_when=asyncio.FIRST_COMPLETED)
+
+            if completed.is_set() and not disconnected.is_set():
+                # The response is out: background tasks finish even if the client leaves now
+                await task
+                return
+
+            if task.done():
+                task.result()
+                return
+
+            deadline.cancelled = True  # interrupts a running SQLite statement
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+            if disconnected.is_set():
+                metrics.increment("http_client_disconnects_total", route=route_label(scope))
+            else:
+                metrics.increment("http_deadline_exceeded_total", route=route_label(scope))
+                if not response_started:
+                    response = JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+                    await response(scope, receive, send)
+        finally:
+            for helper in (reader, gone, sent):
+                helper.cancel()
+            await asyncio.gather(reader, gone, sent, return_exceptions=True)
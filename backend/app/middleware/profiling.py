@@ -0,0 +1,98 @@
+"""
+Profiling Middleware
+Profiles a request (app/services/profiling.py) when an owner asks for it
+with the PROFILE_HEADER header, or when it is sampled at
+PROFILE_SAMPLE_RATE. The response of a profiled request carries the
+profile id in the PROFILE_HEADER header; the profile is written once the
+response has been sent and is downloaded from GET /api/v1/profiles.
+"""
+
+import asyncio
+import random
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+from ..models.user import UserRole
+from ..services.metrics import metrics
+from ..services.profiling import RequestProfile, current_profile, save_profile
+from .deadline import route_label
+from .tenant import request_claims
+
+
+metrics.describe("profiles_captured_total", "Requests profiled, by trigger")
+metrics.describe("profiles_skipped_total", "Profiles not taken because another profile was running")
+
+
+def profile_trigger(scope: Scope) -> Optional[str]:
+    """Why a request is profiled: "header" (owners only), "sample", or None."""
+    headers = Headers(scope=scope)
+    if headers.get(settings.PROFILE_HEADER):
+        claims = request_claims(scope)
+        if claims and claims.get("role") == UserRole.OWNER.value:
+            return "header"
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    """Takes on-demand and sampled request profiles, one at a time per worker."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.in_flight = 0
+        self.active: Optional[RequestProfile] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            if self.active is not None:
+                self.active.concurrent_requests += 1
+            trigger = profile_trigger(scope)
+            if trigger is None:
+                await self.app(scope, receive, send)
+            elif self.active is not None:
+                # cProfile traces the whole thread; a second profile would mix with the first
+                metrics.increment("profiles_skipped_total")
+                await self.app(scope, receive, send)
+            else:
+                await self._profile(scope, receive, send, trigger)
+        finally:
+            self.in_flight -= 1
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, trigger: str):
+        profile = RequestProfile(
+            scope["method"], scope["path"], scope.get("state", {}).get("tenant_id"), trigger
+        )
+        profile.concurrent_requests = self.in_flight - 1
+
+        async def profiled_send(message: Message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                MutableHeaders(scope=message)[settings.PROFILE_HEADER] = profile.id
+            await send(message)
+
+        self.active = profile
+        token = current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            profile.stop()
+            current_profile.reset(token)
+            self.active = None
+            profile.route = route_label(scope)
+            if profile.status_code is None:
+                profile.status_code = 500
+            metrics.increment("profiles_captured_total", trigger=trigger)
+            try:
+                await asyncio.to_thread(save_profile, profile)
+            except Exception as e:
+                print(f"[PROFILING] Could not save profile {profile.id}: {str(e)}")
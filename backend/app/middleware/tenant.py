@@ -0,0 +1,81 @@
+"""
+Tenant Middleware
+Resolves the station (tenant) of each request and exposes it to the
+database layer through the current_tenant context variable.
+The bearer token is decoded once per request; the claims are kept in the
+request state for get_current_user and the other middlewares.
+"""
+
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config import settings
+from ..database import current_tenant, shard_router
+
+
+def token_claims(authorization: Optional[str]) -> Optional[dict]:
+    """Claims of a bearer token, if the token is valid."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    from jose import JWTError, jwt
+    try:
+        return jwt.decode(
+            authorization[7:],
+            settings.JWT_SECRET,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        return None  # get_current_user rejects the token later
+
+
+# Request state key of the decoded bearer token claims (None: no valid token)
+CLAIMS_KEY = "token_claims"
+
+
+def request_claims(scope: Scope) -> Optional[dict]:
+    """Claims of the request's bearer token, decoded on first use and kept in the request state."""
+    state = scope.setdefault("state", {})
+    if CLAIMS_KEY not in state:
+        state[CLAIMS_KEY] = token_claims(Headers(scope=scope).get("authorization"))
+    return state[CLAIMS_KEY]
+
+
+def resolve_tenant(scope: Scope) -> str:
+    """
+    Tenant of a request: the token's tenant claim for authenticated requests,
+    else the tenant header (login, register, public catalog), else the default tenant.
+    """
+    claims = request_claims(scope)
+    return (
+        (claims.get("tid") if claims else None)
+        or Headers(scope=scope).get(settings.TENANT_HEADER)
+        or settings.DEFAULT_TENANT_ID
+    )
+
+
+class TenantMiddleware:
+    """Sets current_tenant for the request and rejects unknown tenants."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tenant_id = resolve_tenant(scope)
+        if not shard_router.is_known_tenant(tenant_id):
+            response = JSONResponse(status_code=400, content={"detail": "Unknown station"})
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["tenant_id"] = tenant_id
+        token = current_tenant.set(tenant_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
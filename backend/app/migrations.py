@@ -0,0 +1,251 @@
+"""
+Schema Versioning
+Startup checks one stored schema version instead of running create_all on
+every boot. When the stored version is behind SCHEMA_VERSION, the pending
+migration steps run, then missing tables and indexes are created.
+
+Adding a schema change: write a step function, register it in MIGRATIONS
+under the next version number, and bump SCHEMA_VERSION.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import Column, Integer, DateTime, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from .database import Base
+
+
+SCHEMA_VERSION = 14
+
+schema_version_table = Table(
+    "schema_version",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> bool:
+    """
+    ALTER TABLE ... ADD COLUMN unless the column already exists.
+    Tables that do not exist yet are skipped; create_all adds them complete.
+    Returns True if the column was added.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return False
+    existing = {c["name"] for c in inspector.get_columns(table)}
+    if column in existing:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+# Tenant-owned tables that can predate tenancy, each with the statement
+# copying the tenant from the row it belongs to (parents first)
+TENANT_BACKFILLS = {
+    "users": None,
+    "services": None,
+    "bookings": None,
+    "booking_services": None,
+    "bookings_archive": (
+        "UPDATE bookings_archive SET tenant_id = COALESCE(("
+        "SELECT users.tenant_id FROM users WHERE users.id = bookings_archive.customer_id), tenant_id)"
+    ),
+    "booking_services_archive": (
+        "UPDATE booking_services_archive SET tenant_id = COALESCE(("
+        "SELECT bookings_archive.tenant_id FROM bookings_archive "
+        "WHERE bookings_archive.id = booking_services_archive.booking_id), tenant_id)"
+    ),
+    "idempotency_keys": (
+        "UPDATE idempotency_keys SET tenant_id = COALESCE(("
+        "SELECT users.tenant_id FROM users WHERE users.id = idempotency_keys.user_id), tenant_id)"
+    ),
+}
+
+
+def add_tenant_columns(conn: Connection):
+    """tenant_id on every tenant-owned table that lacks it, filled from the row's owner."""
+    for table, backfill in TENANT_BACKFILLS.items():
+        added = add_column(conn, table, "tenant_id", "VARCHAR(36) NOT NULL DEFAULT 'default'")
+        if added and backfill:
+            conn.execute(text(backfill))
+
+
+def _v2_tenancy(conn: Connection):
+    """Station tenancy: tenant_id on every tenant-owned table, email unique per tenant."""
+    add_tenant_columns(conn)
+    conn.execute(text("DROP INDEX IF EXISTS ix_users_email"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_users_tenant_email ON users (tenant_id, email)"
+    ))
+
+
+def _v3_cache_versions(conn: Connection):
+    """Version stamps for the cache invalidation bus."""
+    Base.metadata.tables["cache_versions"].create(conn, checkfirst=True)
+
+
+def _v4_booking_version(conn: Connection):
+    """Compare-and-swap version stamp on live and archived bookings."""
+    for table in ("bookings", "bookings_archive"):
+        add_column(conn, table, "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _v5_change_seq(conn: Connection):
+    """Delta sync sequence on bookings (booking_tombstones is created by create_all)."""
+    for table in ("bookings", "bookings_archive"):
+        add_column(conn, table, "change_seq", "BIGINT NOT NULL DEFAULT 0")
+
+
+def _v6_counters(conn: Connection):
+    """previous_status on bookings; list counters, seeded from the existing rows."""
+    for table in ("bookings", "bookings_archive"):
+        add_column(conn, table, "previous_status", "VARCHAR(30)")
+
+    from .services.counters import booking_groups, expected_counters, rebuild_statements, service_groups
+    for table in ("counters", "booking_day_counts"):
+        Base.metadata.tables[table].create(conn, checkfirst=True)
+    inspector = inspect(conn)
+    if not (inspector.has_table("bookings") and inspector.has_table("services")):
+        return  # create_all makes them empty: nothing to count
+    expected = expected_counters(conn.execute(booking_groups()).all(), conn.execute(service_groups()).all())
+    for stmt, params in rebuild_statements(expected):
+        conn.execute(stmt, params)
+
+
+def _v7_scheduled_jobs(conn: Connection):
+    """Reminder stamp on bookings (job_leases and the job index come from create_all)."""
+    for table in ("bookings", "bookings_archive"):
+        add_column(conn, table, "reminder_sent_at", "TIMESTAMP")
+
+
+def _v8_binary_ids(conn: Connection):
+    """uuid columns as 16-byte BLOBs on SQLite, native uuid on Postgres (services/id_migration.py)."""
+    from .services.id_migration import convert
+    convert(conn)
+
+
+def _v9_workqueue(conn: Connection):
+    """Workshop queue columns on bookings; estimated_minutes filled from the booked services."""
+    uuid_ddl = "UUID" if conn.dialect.name == "postgresql" else "BLOB"
+    for table in ("bookings", "bookings_archive"):
+        add_column(conn, table, "estimated_minutes", "INTEGER NOT NULL DEFAULT 0")
+        add_column(conn, table, "claimed_by", uuid_ddl)
+        add_column(conn, table, "claimed_at", "TIMESTAMP")
+    inspector = inspect(conn)
+    if not all(inspector.has_table(table) for table in ("bookings", "booking_services", "services")):
+        return  # create_all makes them empty: nothing to fill
+    conn.execute(text(
+        "UPDATE bookings SET estimated_minutes = COALESCE(("
+        "SELECT SUM(services.estimated_time) FROM booking_services "
+        "JOIN services ON services.id = booking_services.service_id "
+        "WHERE booking_services.booking_id = bookings.id), 0)"
+    ))
+
+
+def _v10_status_history(conn: Connection):
+    """booking_status_events, seeded with what the existing bookings tell about their history."""
+    from .services.status_history import seed_history
+    Base.metadata.tables["booking_status_events"].create(conn, checkfirst=True)
+    seed_history(conn)
+
+
+def _v11_booking_photos(conn: Connection):
+    """Booking photos."""
+    Base.metadata.tables["booking_photos"].create(conn, checkfirst=True)
+
+
+def _v12_invoices(conn: Connection):
+    """Invoices (python -m app.services.invoices backfill issues the missing ones)."""
+    Base.metadata.tables["invoices"].create(conn, checkfirst=True)
+
+
+def _v13_change_sequences(conn: Connection):
+    """Delta sync sequences in change_sequences, moved from their "<tenant>:bookings" rows in cache_versions."""
+    Base.metadata.tables["change_sequences"].create(conn, checkfirst=True)
+    if not inspect(conn).has_table("cache_versions"):
+        return
+    channels = {"pattern": "%:bookings"}
+    rows = conn.execute(text("SELECT name, version FROM cache_versions WHERE name LIKE :pattern"), channels).all()
+    for name, version in rows:
+        conn.execute(
+            text("INSERT INTO change_sequences (tenant_id, name, value) VALUES (:tenant_id, 'bookings', :value)"),
+            {"tenant_id": name.rsplit(":", 1)[0], "value": version}
+        )
+    conn.execute(text("DELETE FROM cache_versions WHERE name LIKE :pattern"), channels)
+
+
+def _v14_tenant_columns(conn: Connection):
+    """tenant_id on the archive and idempotency tables of databases whose v2 step skipped them."""
+    add_tenant_columns(conn)
+
+
+# version -> step that upgrades a database from version - 1
+MIGRATIONS: Dict[int, Callable[[Connection], None]] = {
+    2: _v2_tenancy,
+    3: _v3_cache_versions,
+    4: _v4_booking_version,
+    5: _v5_change_seq,
+    6: _v6_counters,
+    7: _v7_scheduled_jobs,
+    8: _v8_binary_ids,
+    9: _v9_workqueue,
+    10: _v10_status_history,
+    11: _v11_booking_photos,
+    12: _v12_invoices,
+    13: _v13_change_sequences,
+    14: _v14_tenant_columns,
+}
+
+
+def get_stored_version(conn: Connection) -> Optional[int]:
+    """Stored schema version; None for an empty database, 1 for a pre-versioning one."""
+    tables = set(inspect(conn).get_table_names())
+    if "schema_version" in tables:
+        return conn.execute(select(schema_version_table.c.version)).scalar()
+    if "users" in tables:
+        return 1
+    return None
+
+
+def create_missing_indexes(conn: Connection):
+    """create_all only indexes new tables; add indexes declared on existing ones."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def ensure_schema(conn: Connection) -> str:
+    """
+    Bring a database up to SCHEMA_VERSION.
+    Returns a short description of what was done.
+    """
+    stored = get_stored_version(conn)
+
+    if stored == SCHEMA_VERSION:
+        return f"schema v{SCHEMA_VERSION} up to date"
+
+    if stored is not None and stored > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema v{stored} is newer than this application (v{SCHEMA_VERSION})"
+        )
+
+    if stored is not None:
+        for version in range(stored + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[version](conn)
+
+    Base.metadata.create_all(conn)
+    create_missing_indexes(conn)
+
+    conn.execute(schema_version_table.delete())
+    conn.execute(schema_version_table.insert().values(
+        id=1, version=SCHEMA_VERSION, applied_at=datetime.utcnow()
+    ))
+
+    if stored is None:
+        return f"created schema v{SCHEMA_VERSION}"
+    return f"migrated schema v{stored} -> v{SCHEMA_VERSION}"
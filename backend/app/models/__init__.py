@@ -1,6 +1,24 @@
 # Models package
+from .tenant import TenantMixin
 from .user import User, UserRole
 from .service import Service
 from .booking import Booking, BookingStatus, BookingService
+from .rate_limit import RateLimitCounter
+from .idempotency import IdempotencyRecord
+from .archive import ArchivedBooking, ArchivedBookingService
+from .cache_version import CacheVersion
+from .change_sequence import ChangeSequence
+from .tombstone import BookingTombstone
+from .counter import Counter, BookingDayCount
+from .job_lease import JobLease
+from .status_event import BookingStatusEvent
+from .booking_photo import BookingPhoto, PhotoStatus
+from .invoice import Invoice
 
-__all__ = ["User", "UserRole", "Service", "Booking", "BookingStatus", "BookingService"]
+__all__ = [
+    "TenantMixin",
+    "User", "UserRole", "Service", "Booking", "BookingStatus", "BookingService",
+    "RateLimitCounter", "IdempotencyRecord", "ArchivedBooking", "ArchivedBookingService",
+    "CacheVersion", "ChangeSequence", "BookingTombstone", "Counter", "BookingDayCount", "JobLease",
+    "BookingStatusEvent", "BookingPhoto", "PhotoStatus", "Invoice"
+]
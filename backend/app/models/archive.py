@@ -0,0 +1,70 @@
+"""
+Archive Models
+Cold storage for completed and cancelled bookings moved out of the live tables.
+Rows keep their original ids, so archived bookings resolve by the same id.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Float, Integer, BigInteger, Date, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey
+from .booking import Booking
+
+
+class ArchivedBooking(TenantMixin, Base):
+    """Archived copy of a finished booking."""
+
+    __tablename__ = "bookings_archive"
+
+    id = Column(UUIDKey, primary_key=True)
+    customer_id = Column(UUIDKey, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    booking_date = Column(Date, nullable=False)
+    status = Column(String(30), nullable=False)
+    previous_status = Column(String(30), nullable=True)
+    total_price = Column(Float, nullable=False)
+    notes = Column(Text, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+    reminder_sent_at = Column(DateTime, nullable=True)
+    estimated_minutes = Column(Integer, nullable=False, default=0, server_default="0")
+    claimed_by = Column(UUIDKey, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    customer = relationship("User", viewonly=True)
+    booking_services = relationship("ArchivedBookingService", back_populates="booking", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_bookings_archive_tenant_customer_created", "tenant_id", "customer_id", "created_at"),
+        Index("ix_bookings_archive_tenant_created", "tenant_id", "created_at"),
+    )
+
+    # Same read API as a live booking, so responses are built the same way
+    services = Booking.services
+    status_display = Booking.status_display
+
+    def __repr__(self):
+        return f"<ArchivedBooking(id={self.id}, customer_id={self.customer_id}, status={self.status})>"
+
+
+class ArchivedBookingService(TenantMixin, Base):
+    """Archived booking-service row."""
+
+    __tablename__ = "booking_services_archive"
+
+    id = Column(UUIDKey, primary_key=True)
+    booking_id = Column(UUIDKey, ForeignKey("bookings_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+    service_id = Column(UUIDKey, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    service_price = Column(Float, nullable=False)
+
+    # Relationships
+    booking = relationship("ArchivedBooking", back_populates="booking_services")
+    service = relationship("Service", viewonly=True)
+
+    def __repr__(self):
+        return f"<ArchivedBookingService(booking_id={self.booking_id}, service_id={self.service_id})>"
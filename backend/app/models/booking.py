@@ -3,12 +3,14 @@ Booking Model
 Represents service bookings made by customers.
 """
 
-import uuid
 from datetime import datetime, date
 from enum import Enum as PyEnum
-from sqlalchemy import Column, String, Text, Float, Date, DateTime, ForeignKey
+from typing import Dict, FrozenSet
+from sqlalchemy import Column, String, Text, Float, Integer, BigInteger, Date, DateTime, ForeignKey, Index, and_, literal_column
 from sqlalchemy.orm import relationship
 from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
 
 
 class BookingStatus(str, PyEnum):
@@ -21,17 +23,64 @@ class BookingStatus(str, PyEnum):
     CANCELLED = "cancelled"
 
 
-class Booking(Base):
+# Allowed status changes: current status -> statuses it may move to
+BOOKING_TRANSITIONS: Dict[BookingStatus, FrozenSet[BookingStatus]] = {
+    BookingStatus.PENDING: frozenset({BookingStatus.CONFIRMED, BookingStatus.CANCELLED}),
+    BookingStatus.CONFIRMED: frozenset({BookingStatus.IN_PROGRESS, BookingStatus.CANCELLED}),
+    BookingStatus.IN_PROGRESS: frozenset({BookingStatus.READY_FOR_DELIVERY, BookingStatus.CANCELLED}),
+    BookingStatus.READY_FOR_DELIVERY: frozenset({BookingStatus.COMPLETED, BookingStatus.IN_PROGRESS}),
+    BookingStatus.COMPLETED: frozenset(),
+    BookingStatus.CANCELLED: frozenset(),
+}
+
+
+# Owners may cancel a booking in any status but cancelled, outside the state machine above
+OWNER_CANCEL_SOURCES: FrozenSet[BookingStatus] = frozenset(BookingStatus) - {BookingStatus.CANCELLED}
+
+
+def can_transition(current: BookingStatus, target: BookingStatus) -> bool:
+    """Whether a booking may move from current to target status."""
+    return BookingStatus(target) in BOOKING_TRANSITIONS[BookingStatus(current)]
+
+
+def predecessors(target: BookingStatus) -> FrozenSet[BookingStatus]:
+    """Statuses a booking may move to target from."""
+    return frozenset(s for s, targets in BOOKING_TRANSITIONS.items() if BookingStatus(target) in targets)
+
+
+# Statuses of bookings waiting in the workshop queue (services/workqueue.py)
+WORKQUEUE_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS)
+
+
+def workqueue_predicate(status_column, claimed_by_column):
+    """
+    Unclaimed bookings in the workshop queue. The statuses are rendered as
+    literals, so SQLite can match the query to the partial index.
+    """
+    return and_(
+        status_column.in_([literal_column(f"'{s.value}'") for s in WORKQUEUE_STATUSES]),
+        claimed_by_column.is_(None)
+    )
+
+
+class Booking(TenantMixin, Base):
     """Booking model for service appointments."""
     
     __tablename__ = "bookings"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    customer_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    customer_id = Column(UUIDKey, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     booking_date = Column(Date, nullable=False)
     status = Column(String(30), nullable=False, default=BookingStatus.PENDING.value)
+    previous_status = Column(String(30), nullable=True)  # status before the last transition
     total_price = Column(Float, nullable=False)
     notes = Column(Text, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped by every status change
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")  # tenant-wide sync sequence
+    reminder_sent_at = Column(DateTime, nullable=True)  # set by the reminder job
+    estimated_minutes = Column(Integer, nullable=False, default=0, server_default="0")  # sum of the services' estimated_time
+    claimed_by = Column(UUIDKey, nullable=True)  # mechanic working on the booking (workshop queue)
+    claimed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -39,6 +88,25 @@ class Booking(Base):
     customer = relationship("User", back_populates="bookings")
     booking_services = relationship("BookingService", back_populates="booking", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index("ix_bookings_tenant_customer_created", "tenant_id", "customer_id", "created_at"),
+        Index("ix_bookings_tenant_created", "tenant_id", "created_at"),
+        Index("ix_bookings_tenant_status_date", "tenant_id", "status", "booking_date"),
+        # Archival batches scan finished bookings of all tenants by age
+        Index("ix_bookings_status_updated", "status", "updated_at"),
+        # Scheduled jobs scan bookings of all tenants by status and date (reminders, expiry)
+        Index("ix_bookings_status_date_id", "status", "booking_date", "id"),
+        # Delta sync keyset (GET /bookings/changes)
+        Index("ix_bookings_tenant_change_seq", "tenant_id", "change_seq", "id"),
+        # Workshop queue in priority order, unclaimed jobs only (GET /workqueue/next)
+        Index(
+            "ix_bookings_workqueue",
+            "tenant_id", "booking_date", "created_at", "estimated_minutes", "id",
+            sqlite_where=workqueue_predicate(status, claimed_by),
+            postgresql_where=workqueue_predicate(status, claimed_by),
+        ),
+    )
+    
     def __repr__(self):
         return f"<Booking(id={self.id}, customer_id={self.customer_id}, status={self.status})>"
     
@@ -62,14 +130,14 @@ class Booking(Base):
         return status_map.get(status_val, status_val)
 
 
-class BookingService(Base):
+class BookingService(TenantMixin, Base):
     """Association table for booking-service relationship."""
     
     __tablename__ = "booking_services"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    booking_id = Column(String(36), ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False)
-    service_id = Column(String(36), ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    booking_id = Column(UUIDKey, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False, index=True)
+    service_id = Column(UUIDKey, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
     service_price = Column(Float, nullable=False)  # Price at time of booking
     
     # Relationships
@@ -0,0 +1,48 @@
+"""
+Booking Photo Model
+Photos of a bike's damage attached to a booking (services/photos.py).
+The files live in PHOTO_DIR; photos outlive archival: they reference the
+booking by id only.
+"""
+
+from datetime import datetime
+from enum import Enum as PyEnum
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
+
+
+class PhotoStatus(str, PyEnum):
+    """Processing state of a photo's resized variants."""
+    UPLOADING = "uploading"  # slot claimed, the file is still arriving; not listed
+    PROCESSING = "processing"  # display and thumbnail variants being made
+    READY = "ready"
+    FAILED = "failed"  # not a decodable image; only the original is kept
+    ORIGINAL_ONLY = "original_only"  # no image library installed
+
+
+class BookingPhoto(TenantMixin, Base):
+    """One uploaded photo of a booking."""
+
+    __tablename__ = "booking_photos"
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    booking_id = Column(UUIDKey, nullable=False)
+    uploaded_by = Column(UUIDKey, nullable=False)
+    filename = Column(String(255), nullable=False)  # as sent by the client
+    content_type = Column(String(30), nullable=False)  # detected from the file
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    width = Column(Integer, nullable=True)  # known once processed
+    height = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default=PhotoStatus.PROCESSING.value)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Photos of one booking (GET /bookings/{id}/photos)
+        Index("ix_booking_photos_booking_created", "booking_id", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<BookingPhoto(id={self.id}, booking_id={self.booking_id}, status={self.status})>"
@@ -0,0 +1,19 @@
+"""
+Cache Version Model
+Version stamps of cache invalidation channels, shared by all workers.
+"""
+
+from sqlalchemy import Column, String, BigInteger
+from ..database import Base
+
+
+class CacheVersion(Base):
+    """Current version of one invalidation channel (e.g. "<tenant>:services")."""
+
+    __tablename__ = "cache_versions"
+
+    name = Column(String(255), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion(name={self.name}, version={self.version})>"
@@ -0,0 +1,21 @@
+"""
+Change Sequence Model
+Per-tenant delta sync sequence of bookings (GET /bookings/changes).
+"""
+
+from sqlalchemy import Column, String, BigInteger
+from ..database import Base
+from .tenant import TenantMixin
+
+
+class ChangeSequence(TenantMixin, Base):
+    """Last change sequence number allocated to a tenant's bookings."""
+
+    __tablename__ = "change_sequences"
+
+    tenant_id = Column(String(36), primary_key=True)
+    name = Column(String(100), primary_key=True)  # "bookings"
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ChangeSequence(tenant_id={self.tenant_id}, name={self.name}, value={self.value})>"
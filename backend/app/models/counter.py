@@ -0,0 +1,39 @@
+"""
+Counter Models
+Incrementally maintained totals for list endpoints, so a page request
+reads its total with a keyed lookup instead of a COUNT(*) scan.
+"""
+
+from sqlalchemy import Column, String, Date, BigInteger
+from ..database import Base
+from .tenant import TenantMixin
+
+
+class Counter(TenantMixin, Base):
+    """
+    A named total for one tenant, e.g. "bookings", "bookings:pending",
+    "bookings:customer:<id>", "bookings:customer:<id>:<status>", "services:active".
+    """
+
+    __tablename__ = "counters"
+
+    tenant_id = Column(String(36), primary_key=True)
+    name = Column(String(255), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Counter(tenant_id={self.tenant_id}, name={self.name}, count={self.count})>"
+
+
+class BookingDayCount(TenantMixin, Base):
+    """Live bookings per booking date and status, for date-range totals."""
+
+    __tablename__ = "booking_day_counts"
+
+    tenant_id = Column(String(36), primary_key=True)
+    booking_date = Column(Date, primary_key=True)
+    status = Column(String(30), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<BookingDayCount(booking_date={self.booking_date}, status={self.status}, count={self.count})>"
@@ -0,0 +1,41 @@
+"""
+Idempotency Model
+Stores responses of mutating requests sent with an Idempotency-Key header.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, Index, UniqueConstraint
+from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
+
+
+class IdempotencyRecord(TenantMixin, Base):
+    """A claimed or completed idempotent request."""
+
+    __tablename__ = "idempotency_keys"
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    key = Column(String(255), nullable=False)
+    user_id = Column(UUIDKey, nullable=False)
+    method = Column(String(10), nullable=False)
+    path = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is in flight
+    response_body = Column(Text, nullable=True)
+    locked_until = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_user_key"),
+        Index("ix_idempotency_expires", "expires_at"),
+    )
+
+    @property
+    def is_complete(self) -> bool:
+        """Check if the original request finished and its response is stored."""
+        return self.status_code is not None
+
+    def __repr__(self):
+        return f"<IdempotencyRecord(key={self.key}, user_id={self.user_id}, status_code={self.status_code})>"
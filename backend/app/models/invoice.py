@@ -0,0 +1,37 @@
+"""
+Invoice Model
+The invoice of a completed booking (services/invoices.py). The rendered
+documents live in INVOICE_DIR under their content hash; invoices outlive
+archival: they reference the booking by id only.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Float, DateTime, Index, UniqueConstraint
+from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
+
+
+class Invoice(TenantMixin, Base):
+    """One issued invoice; a booking has at most one."""
+
+    __tablename__ = "invoices"
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    booking_id = Column(UUIDKey, nullable=False)
+    customer_id = Column(UUIDKey, nullable=False)
+    number = Column(String(40), nullable=False)
+    issued_at = Column(DateTime, nullable=False)  # when the booking was completed
+    total = Column(Float, nullable=False)
+    html_sha256 = Column(String(64), nullable=False)
+    text_sha256 = Column(String(64), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "booking_id", name="uq_invoices_tenant_booking"),
+        # Monthly export (GET /invoices/export)
+        Index("ix_invoices_tenant_issued", "tenant_id", "issued_at"),
+    )
+
+    def __repr__(self):
+        return f"<Invoice(id={self.id}, booking_id={self.booking_id}, number={self.number})>"
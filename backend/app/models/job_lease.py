@@ -0,0 +1,26 @@
+"""
+Job Lease Model
+Per-shard state of a scheduled job: which worker holds it, until when,
+where an interrupted run stopped, and when the job is due next.
+"""
+
+from sqlalchemy import Column, String, Text, Integer, DateTime
+from ..database import Base
+
+
+class JobLease(Base):
+    """Lease and checkpoint of one scheduled job (rows span all tenants of a shard)."""
+
+    __tablename__ = "job_leases"
+
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(255), nullable=True)  # worker holding the lease, NULL when idle
+    leased_until = Column(DateTime, nullable=True)  # an expired lease may be taken over
+    checkpoint = Column(Text, nullable=True)  # resume position of an unfinished run
+    next_run_at = Column(DateTime, nullable=False)
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_processed = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<JobLease(name={self.name}, owner={self.owner}, leased_until={self.leased_until})>"
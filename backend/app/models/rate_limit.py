@@ -0,0 +1,20 @@
+"""
+Rate Limit Model
+Fixed-window hit counters shared by all workers when the database store is used.
+"""
+
+from sqlalchemy import Column, String, Integer
+from ..database import Base
+
+
+class RateLimitCounter(Base):
+    """Hit counter for one rate limit key in one time window."""
+
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    window_start = Column(Integer, primary_key=True)  # unix time, aligned to the window
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RateLimitCounter(key={self.key}, window_start={self.window_start}, count={self.count})>"
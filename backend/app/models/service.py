@@ -3,19 +3,20 @@ Service Model
 Represents bike services offered by the station.
 """
 
-import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Float, Integer, Boolean, DateTime
+from sqlalchemy import Column, String, Text, Float, Integer, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
 
 
-class Service(Base):
+class Service(TenantMixin, Base):
     """Service model for bike services."""
     
     __tablename__ = "services"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
@@ -27,6 +28,10 @@ class Service(Base):
     # Relationships
     booking_services = relationship("BookingService", back_populates="service")
     
+    __table_args__ = (
+        Index("ix_services_tenant_active_created", "tenant_id", "is_active", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<Service(id={self.id}, name={self.name}, price={self.price})>"
     
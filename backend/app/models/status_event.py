@@ -0,0 +1,33 @@
+"""
+Booking Status Event Model
+Append-only history of booking status changes (services/status_history.py).
+Events outlive archival: they reference the booking by id only.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
+
+
+class BookingStatusEvent(TenantMixin, Base):
+    """One status change of a booking."""
+
+    __tablename__ = "booking_status_events"
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    booking_id = Column(UUIDKey, nullable=False)
+    from_status = Column(String(30), nullable=True)  # None for the booking's creation
+    to_status = Column(String(30), nullable=False)
+    version = Column(Integer, nullable=False)  # booking version after the change
+    changed_by = Column(UUIDKey, nullable=True)  # None for scheduled jobs
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Timeline of one booking (GET /bookings/{id}/timeline)
+        Index("ix_booking_status_events_booking_changed", "booking_id", "changed_at"),
+    )
+
+    def __repr__(self):
+        return f"<BookingStatusEvent(booking_id={self.booking_id}, {self.from_status} -> {self.to_status})>"
@@ -0,0 +1,74 @@
+"""
+Tenant Scoping
+Every station's data carries a tenant_id. Sessions opened for a tenant
+(see database.tenant_session) only see and write that tenant's rows.
+
+Hot statements built once and reused across requests filter on tenant_id
+themselves (tenant_filtered) and skip the per-execution loader criteria,
+which would otherwise rebuild and re-key the statement on every call.
+"""
+
+from sqlalchemy import Column, String, bindparam, event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from ..config import settings
+
+
+class TenantMixin:
+    """Adds the tenant_id column to a model."""
+
+    tenant_id = Column(String(36), nullable=False, default=settings.DEFAULT_TENANT_ID)
+
+
+# Execution option of statements that restrict themselves to a tenant
+TENANT_FILTERED = "tenant_filtered"
+# Their tenant parameter ("tenant_id" itself is reserved in UPDATE statements)
+TENANT_PARAM = "current_tenant_id"
+
+
+def tenant_filtered(statement, *models):
+    """
+    Restrict a prebuilt statement to the tenant passed as its TENANT_PARAM
+    parameter (see tenant_params). Rows it eager-loads are reached through
+    foreign keys of the tenant's own rows.
+    """
+    tenant_id = bindparam(TENANT_PARAM)
+    return statement.where(
+        *[model.tenant_id == tenant_id for model in models]
+    ).execution_options(**{TENANT_FILTERED: True})
+
+
+def tenant_params(session, **params) -> dict:
+    """Parameters of a tenant_filtered statement run in a tenant's session."""
+    return {TENANT_PARAM: session.info.get("tenant_id"), **params}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_tenant(execute_state):
+    """Restrict ORM selects, updates and deletes to the session's tenant."""
+    tenant_id = execute_state.session.info.get("tenant_id")
+    if tenant_id is None:
+        return  # Unscoped maintenance session (archival, jobs)
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return  # Covered by the criteria of the parent statement
+    if execute_state.execution_options.get(TENANT_FILTERED):
+        return  # Filters on the tenant itself
+    if execute_state.is_select or execute_state.is_update or execute_state.is_delete:
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                TenantMixin,
+                lambda cls: cls.tenant_id == tenant_id,
+                include_aliases=True
+            )
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_tenant(session, flush_context, instances):
+    """Stamp new rows with the session's tenant."""
+    tenant_id = session.info.get("tenant_id")
+    if tenant_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TenantMixin) and obj.tenant_id is None:
+            obj.tenant_id = tenant_id
@@ -0,0 +1,30 @@
+"""
+Booking Tombstone Model
+Records bookings removed from the live table (archived), so delta-syncing
+clients can drop them from their local store.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime, Index
+from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey
+
+
+class BookingTombstone(TenantMixin, Base):
+    """Marker for a booking that left the live bookings table."""
+
+    __tablename__ = "booking_tombstones"
+
+    booking_id = Column(UUIDKey, primary_key=True)
+    customer_id = Column(UUIDKey, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    reason = Column(String(20), nullable=False, default="archived")
+    removed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_booking_tombstones_tenant_change_seq", "tenant_id", "change_seq", "booking_id"),
+    )
+
+    def __repr__(self):
+        return f"<BookingTombstone(booking_id={self.booking_id}, change_seq={self.change_seq})>"
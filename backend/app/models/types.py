@@ -0,0 +1,78 @@
+"""
+Column Types
+Primary and foreign keys are UUIDv7: the first 48 bits are a millisecond
+timestamp, so new rows land at the right edge of the primary key index
+instead of at random pages. They are stored compactly, 16 bytes on SQLite
+and the native uuid type on Postgres, and read back as the canonical
+36-character string, which is the form used everywhere in the application.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7). The 12 bits after the version
+    count up within a millisecond, so ids from one process are strictly
+    increasing; on overflow the timestamp borrows the next millisecond.
+    """
+    global _last_ms, _sequence
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            # Random start in the lower half leaves room for 2048+ ids in this millisecond
+            _last_ms, _sequence = now_ms, int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _sequence += 1
+            if _sequence > 0xFFF:
+                _last_ms, _sequence = _last_ms + 1, 0
+        ms, sequence = _last_ms, _sequence
+    tail = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return uuid.UUID(int=(ms << 80) | (0x7 << 76) | (sequence << 64) | (0b10 << 62) | tail)
+
+
+def new_id() -> str:
+    """Column default for primary keys."""
+    return str(uuid7())
+
+
+class UUIDKey(TypeDecorator):
+    """
+    UUID column: BLOB(16) on SQLite, uuid on Postgres, str in Python.
+    Accepts str or uuid.UUID values; text ids left from before schema v8
+    are read as they are.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(value)
+        return str(value) if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
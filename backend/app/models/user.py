@@ -3,12 +3,13 @@ User Model
 Represents both owners and customers in the system.
 """
 
-import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, String, Boolean, DateTime, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from ..database import Base
+from .tenant import TenantMixin
+from .types import UUIDKey, new_id
 
 
 class UserRole(str, PyEnum):
@@ -17,13 +18,13 @@ class UserRole(str, PyEnum):
     CUSTOMER = "customer"
 
 
-class User(Base):
+class User(TenantMixin, Base):
     """User model for authentication and authorization."""
     
     __tablename__ = "users"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    email = Column(String(255), unique=True, nullable=False, index=True)
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    email = Column(String(255), nullable=False)
     password_hash = Column(String(255), nullable=False)
     name = Column(String(100), nullable=False)
     phone = Column(String(20), nullable=False)
@@ -36,6 +37,12 @@ class User(Base):
     # Relationships
     bookings = relationship("Booking", back_populates="customer", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Emails are unique per station
+        UniqueConstraint("tenant_id", "email", name="uq_users_tenant_email"),
+        Index("ix_users_tenant_role", "tenant_id", "role"),
+    )
+    
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, role={self.role})>"
     
@@ -2,5 +2,10 @@
 from .auth import router as auth_router
 from .services import router as services_router
 from .bookings import router as bookings_router
+from .workqueue import router as workqueue_router
+from .photos import router as photos_router
+from .backups import router as backups_router
+from .profiles import router as profiles_router
+from .invoices import router as invoices_router
 
-__all__ = ["auth_router", "services_router", "bookings_router"]
+__all__ = ["auth_router", "services_router", "bookings_router", "workqueue_router", "photos_router", "backups_router", "profiles_router", "invoices_router"]
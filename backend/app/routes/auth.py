@@ -3,15 +3,17 @@ Authentication Routes
 Handles user registration, login, and verification.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from ..database import get_db
-from ..models.user import User
+from ..models.user import User, UserRole
 from ..schemas.user import UserCreate, UserLogin, UserResponse, Token
 from ..services.auth_service import AuthService, get_current_user
 from ..services.email_service import EmailService
+from ..services.rate_limiter import auth_rate_limiter, hash_admission
+from ..services.cache_bus import owner_list_cache
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -20,13 +22,17 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
+    request: Request,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Register a new user (Owner or Customer).
     Sends verification email in background.
+    Rate limited per IP before any hashing or database work.
     """
+    await auth_rate_limiter.check_register(request)
+    
     # Check if email already exists
     existing_user = await AuthService.get_user_by_email(db, user_data.email)
     if existing_user:
@@ -35,13 +41,17 @@ async def register(
             detail="Email already registered"
         )
     
+    # The hashing slot is held for the hash alone, not the database work
+    async with hash_admission.slot():
+        password_hash = await AuthService.hash_password_async(user_data.password)
+    
     # Create verification token
     verification_token = AuthService.create_verification_token()
     
     # Create new user
     new_user = User(
         email=user_data.email,
-        password_hash=AuthService.hash_password(user_data.password),
+        password_hash=password_hash,
         name=user_data.name,
         phone=user_data.phone,
         role=user_data.role,
@@ -53,6 +63,9 @@ async def register(
     await db.flush()
     await db.refresh(new_user)
     
+    if new_user.role == UserRole.OWNER:
+        await owner_list_cache.invalidate(db)
+    
     # Send verification email in background
     background_tasks.add_task(
         EmailService.send_verification_email,
@@ -73,12 +86,16 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     credentials: UserLogin,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Login with email and password.
     Returns JWT access token.
+    Rate limited per IP and per email before any hashing or database work.
     """
+    await auth_rate_limiter.check_login(request, credentials.email)
+    
     # Find user by email
     user = await AuthService.get_user_by_email(db, credentials.email)
     if not user:
@@ -87,8 +104,10 @@ async def login(
             detail="Invalid email or password"
         )
     
-    # Verify password
-    if not AuthService.verify_password(credentials.password, user.password_hash):
+    # Verify password; the hashing slot is held for the hash alone
+    async with hash_admission.slot():
+        password_ok = await AuthService.verify_password_async(credentials.password, user.password_hash)
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -0,0 +1,59 @@
+"""
+Backup Routes
+Owner-triggered online snapshots of the station's SQLite database
+(services/backup.py).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from ..database import shard_router
+from ..models.user import User
+from ..schemas.backup import BackupStatusResponse
+from ..services.auth_service import get_current_owner
+from ..services.backup import backup_service, list_snapshots, shard_path
+
+
+router = APIRouter(prefix="/backups", tags=["Backups"])
+
+
+def owner_shard(owner: User) -> str:
+    """Shard holding the owner's station; only SQLite shards are snapshotted here."""
+    shard = shard_router.shard_for(owner.tenant_id)
+    if shard_path(shard) is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This station's database is backed up by its Postgres server"
+        )
+    return shard
+
+
+def backup_status(shard: str) -> BackupStatusResponse:
+    return BackupStatusResponse(
+        shard=shard,
+        running=backup_service.running(shard),
+        snapshots=list_snapshots(shard)
+    )
+
+
+@router.get("", response_model=BackupStatusResponse)
+async def list_backups(current_owner: User = Depends(get_current_owner)):
+    """
+    List the stored snapshots of the station's database, newest first.
+    Owner only.
+    """
+    return backup_status(owner_shard(current_owner))
+
+
+@router.post("", response_model=BackupStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_backup(response: Response, current_owner: User = Depends(get_current_owner)):
+    """
+    Start an online snapshot of the station's database.
+    Owner only.
+    The snapshot runs in the background while the station keeps serving;
+    poll GET /backups for the result. Returns 200 instead of 202 when a
+    snapshot is already running.
+    """
+    shard = owner_shard(current_owner)
+    if not backup_service.start(shard):
+        response.status_code = status.HTTP_200_OK
+    return backup_status(shard)
@@ -3,33 +3,46 @@ Bookings Routes
 Handles booking creation, listing, and status updates.
 """
 
+from functools import lru_cache
 from typing import Optional, List
 from uuid import UUID
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, union_all, literal, bindparam
 from sqlalchemy.orm import selectinload
 
 from ..database import get_db
 from ..models.user import User, UserRole
 from ..models.service import Service
-from ..models.booking import Booking, BookingStatus
-from ..models.booking_service import BookingService
+from ..models.booking import Booking, BookingStatus, BookingService, OWNER_CANCEL_SOURCES
+from ..models.archive import ArchivedBooking, ArchivedBookingService
+from ..models.status_event import BookingStatusEvent
+from ..models.tenant import tenant_filtered, tenant_params
 from ..schemas.booking import (
     BookingCreate, BookingUpdate, BookingResponse,
-    BookingStatusUpdate, BookingListResponse, BookingServiceInfo
+    BookingStatusUpdate, BookingListResponse, BookingServiceInfo,
+    BookingStatusBatchUpdate, BookingStatusBatchResult, BookingStatusBatchResponse,
+    BookingChangesResponse, BookingTombstoneResponse,
+    BookingTimelineResponse, BookingStatusEventResponse
 )
 from ..schemas.user import UserResponse
 from ..services.auth_service import get_current_user, get_current_owner, get_current_customer
 from ..services.email_service import EmailService
+from ..services.http_cache import weak_etag, etag_matches, cache_headers, not_modified
+from ..services.idempotency import IdempotencyGuard, idempotency_guard
+from ..services.cache_bus import owner_list_cache
+from ..services.booking_workflow import BookingWorkflow
+from ..services.booking_changes import BookingChanges, next_change_seq, current_change_seq
+from ..services.counters import CounterDeltas, Counters
+from ..services.status_history import status_event, status_history
 
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
 
 def build_booking_response(booking: Booking) -> BookingResponse:
-    """Build booking response with all related data."""
+    """Build booking response with all related data (live or archived booking)."""
     services_info = [
         BookingServiceInfo(
             service_id=bs.service_id,
@@ -49,15 +62,146 @@ def build_booking_response(booking: Booking) -> BookingResponse:
         notes=booking.notes,
         services=services_info,
         created_at=booking.created_at,
-        updated_at=booking.updated_at
+        updated_at=booking.updated_at,
+        version=booking.version,
+        archived=isinstance(booking, ArchivedBooking)
     )
 
 
+def booking_load_options(model=Booking) -> tuple:
+    """Eager-load options for building responses from a live or archived booking."""
+    link_model = ArchivedBookingService if model is ArchivedBooking else BookingService
+    return (
+        selectinload(model.customer),
+        selectinload(model.booking_services).selectinload(link_model.service)
+    )
+
+
+@lru_cache(maxsize=None)
+def booking_page_statement(by_customer: bool, by_status: bool, by_date_from: bool, by_date_to: bool):
+    """Live bookings page for one combination of list filters, built once per combination."""
+    query = select(Booking).options(*booking_load_options())
+    if by_customer:
+        query = query.where(Booking.customer_id == bindparam("customer_id"))
+    if by_status:
+        query = query.where(Booking.status == bindparam("status"))
+    if by_date_from:
+        query = query.where(Booking.booking_date >= bindparam("date_from"))
+    if by_date_to:
+        query = query.where(Booking.booking_date <= bindparam("date_to"))
+    query = query.order_by(Booking.created_at.desc()).offset(bindparam("skip")).limit(bindparam("limit"))
+    return tenant_filtered(query, Booking)
+
+
+# get_booking: access probe and full load, live and archived
+BOOKING_PROBE = {
+    model: tenant_filtered(
+        select(model.customer_id, model.updated_at).where(model.id == bindparam("booking_id")), model
+    )
+    for model in (Booking, ArchivedBooking)
+}
+BOOKING_BY_ID = {
+    model: tenant_filtered(
+        select(model).options(*booking_load_options(model)).where(model.id == bindparam("booking_id")), model
+    )
+    for model in (Booking, ArchivedBooking)
+}
+# Status history of a booking, oldest first (ix_booking_status_events_booking_changed)
+BOOKING_TIMELINE = tenant_filtered(
+    select(BookingStatusEvent)
+    .where(BookingStatusEvent.booking_id == bindparam("booking_id"))
+    .order_by(BookingStatusEvent.changed_at, BookingStatusEvent.version),
+    BookingStatusEvent
+)
+
+
+async def find_booking(db: AsyncSession, booking_id: UUID, current_user: User):
+    """
+    Model (live or archived) holding a booking the user may see.
+    Raises 404 when it does not exist, 403 for another customer's booking.
+    """
+    for model in (Booking, ArchivedBooking):
+        probe = await db.execute(BOOKING_PROBE[model], tenant_params(db, booking_id=booking_id))
+        row = probe.one_or_none()
+        if row:
+            break
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Booking not found"
+        )
+    
+    if current_user.role == UserRole.CUSTOMER and row.customer_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this booking"
+        )
+    return model
+
+
+def booking_filters(
+    model,
+    current_user: User,
+    status_filter: Optional[BookingStatus] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> list:
+    """Build the list filters for a live or archived booking model."""
+    filters = []
+    
+    # Role-based filtering
+    if current_user.role == UserRole.CUSTOMER:
+        filters.append(model.customer_id == current_user.id)
+    
+    # Apply filters
+    if status_filter:
+        filters.append(model.status == status_filter)
+    if date_from:
+        filters.append(model.booking_date >= date_from)
+    if date_to:
+        filters.append(model.booking_date <= date_to)
+    
+    return filters
+
+
+async def load_page_with_archive(
+    db: AsyncSession,
+    hot_filters: list,
+    cold_filters: list,
+    skip: int,
+    limit: int
+) -> list:
+    """Load one page ordered by created_at across the live and archive tables."""
+    page_ids = union_all(
+        select(Booking.id, Booking.created_at, literal(False).label("archived")).where(*hot_filters),
+        select(ArchivedBooking.id, ArchivedBooking.created_at, literal(True).label("archived")).where(*cold_filters)
+    ).subquery()
+    
+    result = await db.execute(
+        select(page_ids).order_by(page_ids.c.created_at.desc()).offset(skip).limit(limit)
+    )
+    rows = result.all()
+    
+    loaded = {}
+    for model, archived in ((Booking, False), (ArchivedBooking, True)):
+        ids = [row.id for row in rows if bool(row.archived) == archived]
+        if ids:
+            result = await db.execute(
+                select(model).options(*booking_load_options(model)).where(model.id.in_(ids))
+            )
+            loaded.update({b.id: b for b in result.scalars().all()})
+    
+    return [loaded[row.id] for row in rows if row.id in loaded]
+
+
 @router.get("", response_model=BookingListResponse)
 async def list_bookings(
+    request: Request,
+    response: Response,
     status_filter: Optional[BookingStatus] = Query(None, description="Filter by status"),
     date_from: Optional[date] = Query(None, description="Filter from date"),
     date_to: Optional[date] = Query(None, description="Filter to date"),
+    include_archived: bool = Query(False, description="Include archived (old finished) bookings"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_user),
@@ -67,45 +211,50 @@ async def list_bookings(
     List bookings.
     - Owners see all bookings
     - Customers see only their own bookings
+    Archived bookings are only searched when include_archived is set.
+    The live total comes from the maintained counters; the ETag is keyed
+    on the tenant's change sequence, which every booking write bumps, so a
+    matching If-None-Match returns 304 without scanning bookings.
     """
-    query = select(Booking).options(
-        selectinload(Booking.customer),
-        selectinload(Booking.booking_services).selectinload(BookingService.service)
-    )
-    
-    # Role-based filtering
-    if current_user.role == UserRole.CUSTOMER:
-        query = query.where(Booking.customer_id == current_user.id)
+    hot_filters = booking_filters(Booking, current_user, status_filter, date_from, date_to)
+    cold_filters = booking_filters(ArchivedBooking, current_user, status_filter, date_from, date_to)
     
-    # Apply filters
-    if status_filter:
-        query = query.where(Booking.status == status_filter)
-    if date_from:
-        query = query.where(Booking.booking_date >= date_from)
-    if date_to:
-        query = query.where(Booking.booking_date <= date_to)
+    change_seq = await current_change_seq(db)
+    etag = weak_etag(
+        "bookings", current_user.id, status_filter, date_from, date_to, include_archived,
+        page, page_size, change_seq
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    
+    total = await Counters.booking_total(db, current_user, status_filter, date_from, date_to)
+    if total is None:
+        total = (await db.execute(select(func.count()).select_from(Booking).where(*hot_filters))).scalar()
+    if include_archived:
+        # The archive is append-only cold storage and not counted incrementally
+        total += (await db.execute(
+            select(func.count()).select_from(ArchivedBooking).where(*cold_filters)
+        )).scalar()
     
     # Order and paginate
     skip = (page - 1) * page_size
-    query = query.order_by(Booking.created_at.desc()).offset(skip).limit(page_size)
-    
-    # Execute query
-    result = await db.execute(query)
-    bookings = result.scalars().all()
-    
-    # Get total count
-    count_query = select(func.count()).select_from(Booking)
-    if current_user.role == UserRole.CUSTOMER:
-        count_query = count_query.where(Booking.customer_id == current_user.id)
-    if status_filter:
-        count_query = count_query.where(Booking.status == status_filter)
-    if date_from:
-        count_query = count_query.where(Booking.booking_date >= date_from)
-    if date_to:
-        count_query = count_query.where(Booking.booking_date <= date_to)
-    
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    if include_archived:
+        bookings = await load_page_with_archive(db, hot_filters, cold_filters, skip, page_size)
+    else:
+        is_customer = current_user.role == UserRole.CUSTOMER
+        params = {"skip": skip, "limit": page_size}
+        if is_customer:
+            params["customer_id"] = current_user.id
+        if status_filter:
+            params["status"] = BookingStatus(status_filter).value
+        if date_from:
+            params["date_from"] = date_from
+        if date_to:
+            params["date_to"] = date_to
+        query = booking_page_statement(is_customer, bool(status_filter), bool(date_from), bool(date_to))
+        result = await db.execute(query, tenant_params(db, **params))
+        bookings = result.scalars().all()
     
     return BookingListResponse(
         bookings=[build_booking_response(b) for b in bookings],
@@ -115,9 +264,36 @@ async def list_bookings(
     )
 
 
+@router.get("/changes", response_model=BookingChangesResponse)
+async def booking_changes(
+    since: Optional[str] = Query(None, description="next_token of the previous sync; omit for a full sync"),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bookings created, updated or cancelled, and bookings removed (archived),
+    since a sync token.
+    - Owners get changes to all bookings
+    - Customers get changes to their own bookings
+    Call again with next_token while has_more is true.
+    """
+    changes = await BookingChanges.load(db, current_user, since, limit, booking_load_options())
+    
+    return BookingChangesResponse(
+        changed=[build_booking_response(b) for b in changes["changed"]],
+        removed=[BookingTombstoneResponse.model_validate(t) for t in changes["removed"]],
+        next_token=changes["next_token"],
+        has_more=changes["has_more"]
+    )
+
+
 @router.get("/{booking_id}", response_model=BookingResponse)
 async def get_booking(
     booking_id: UUID,
+    request: Request,
+    response: Response,
+    include_archived: bool = Query(False, description="Also look in archived bookings"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -125,42 +301,84 @@ async def get_booking(
     Get booking details by ID.
     - Owners can view any booking
     - Customers can only view their own bookings
+    Archived bookings are only found when include_archived is set.
+    Supports conditional GET via a weak ETag on id and updated_at.
     """
-    query = select(Booking).options(
-        selectinload(Booking.customer),
-        selectinload(Booking.booking_services).selectinload(BookingService.service)
-    ).where(Booking.id == booking_id)
-    
-    result = await db.execute(query)
-    booking = result.scalar_one_or_none()
-    
-    if not booking:
+    # Cheap column probe for access checks and the ETag
+    models = [Booking, ArchivedBooking] if include_archived else [Booking]
+    row = None
+    for model in models:
+        probe = await db.execute(BOOKING_PROBE[model], tenant_params(db, booking_id=booking_id))
+        row = probe.one_or_none()
+        if row:
+            break
+    
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Booking not found"
         )
     
     # Check access
-    if current_user.role == UserRole.CUSTOMER and booking.customer_id != current_user.id:
+    if current_user.role == UserRole.CUSTOMER and row.customer_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this booking"
         )
     
+    etag = weak_etag("booking", booking_id, row.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    
+    result = await db.execute(BOOKING_BY_ID[model], tenant_params(db, booking_id=booking_id))
+    booking = result.scalar_one()
+    
     return build_booking_response(booking)
 
 
+@router.get("/{booking_id}/timeline", response_model=BookingTimelineResponse)
+async def get_booking_timeline(
+    booking_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the status history of a booking, oldest change first.
+    - Owners can view any booking's timeline
+    - Customers can only view their own
+    Archived bookings keep their timeline. Changes made through this worker
+    are included as soon as they commit; changes made through another
+    worker may show up to STATUS_HISTORY_FLUSH_INTERVAL later.
+    """
+    await find_booking(db, booking_id, current_user)
+    
+    # Taken before the read: an event written in between is in both and kept once
+    unwritten = status_history.unwritten(str(booking_id))
+    result = await db.execute(BOOKING_TIMELINE, tenant_params(db, booking_id=booking_id))
+    events = [BookingStatusEventResponse.model_validate(e) for e in result.scalars()]
+    written = {e.version for e in events}
+    events += [BookingStatusEventResponse.model_validate(e) for e in unwritten if e["version"] not in written]
+    events.sort(key=lambda e: (e.changed_at, e.version))
+    return BookingTimelineResponse(booking_id=booking_id, events=events)
+
+
 @router.post("", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
 async def create_booking(
     booking_data: BookingCreate,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_customer),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new booking.
     Customer only.
+    Retries with the same Idempotency-Key return the original booking.
     """
+    if idempotency.replay:
+        return idempotency.replay
+    
     # Fetch all selected services
     result = await db.execute(
         select(Service).where(
@@ -185,7 +403,9 @@ async def create_booking(
         booking_date=booking_data.booking_date,
         status=BookingStatus.PENDING,
         total_price=total_price,
-        notes=booking_data.notes
+        notes=booking_data.notes,
+        estimated_minutes=sum(s.estimated_time for s in services),
+        change_seq=await next_change_seq(db)
     )
     
     db.add(new_booking)
@@ -202,6 +422,14 @@ async def create_booking(
     
     await db.flush()
     
+    deltas = CounterDeltas()
+    deltas.booking(current_user.id, booking_data.booking_date, BookingStatus.PENDING, 1)
+    await deltas.apply(db)
+    await status_history.record(db, [status_event(
+        new_booking.tenant_id, new_booking.id, None, BookingStatus.PENDING, 1, current_user.id,
+        changed_at=new_booking.created_at
+    )])
+    
     # Reload with relationships
     await db.refresh(new_booking)
     result = await db.execute(
@@ -227,15 +455,16 @@ async def create_booking(
     )
     
     # Notify all owners about new booking
-    owners_result = await db.execute(
-        select(User).where(User.role == UserRole.OWNER)
-    )
-    owners = owners_result.scalars().all()
+    async def load_owner_emails():
+        result = await db.execute(select(User.email).where(User.role == UserRole.OWNER))
+        return result.scalars().all()
+    
+    owner_emails = await owner_list_cache.get_or_load("emails", load_owner_emails)
     
-    for owner in owners:
+    for owner_email in owner_emails:
         background_tasks.add_task(
             EmailService.send_new_booking_to_owner,
-            owner_email=owner.email,
+            owner_email=owner_email,
             customer_name=current_user.name,
             customer_email=current_user.email,
             customer_phone=current_user.phone,
@@ -245,7 +474,63 @@ async def create_booking(
             total_price=float(total_price)
         )
     
-    return build_booking_response(new_booking)
+    response = build_booking_response(new_booking)
+    await idempotency.save(db, status.HTTP_201_CREATED, response)
+    return response
+
+
+@router.put("/status:batch", response_model=BookingStatusBatchResponse)
+async def update_booking_status_batch(
+    batch: BookingStatusBatchUpdate,
+    background_tasks: BackgroundTasks,
+    current_owner: User = Depends(get_current_owner),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Move many bookings to one status in a single UPDATE.
+    Owner only.
+    Returns a result per booking id; bookings whose current status does not
+    allow the change are left untouched (409), unknown ids get 404.
+    Ready-for-delivery notifications go out as one batched email job.
+    """
+    if idempotency.replay:
+        return idempotency.replay
+    
+    updated, rejected = await BookingWorkflow.transition_many(
+        db, batch.booking_ids, batch.status, changed_by=current_owner.id
+    )
+    
+    if batch.status == BookingStatus.READY_FOR_DELIVERY and updated:
+        result = await db.execute(
+            select(Booking.id, User.email, User.name)
+            .join(User, Booking.customer_id == User.id)
+            .where(Booking.id.in_(list(updated)))
+        )
+        background_tasks.add_task(
+            EmailService.send_ready_for_delivery_batch,
+            [
+                {"to_email": row.email, "customer_name": row.name, "booking_id": str(row.id)}
+                for row in result
+            ]
+        )
+    
+    results = []
+    for booking_id in dict.fromkeys(str(b) for b in batch.booking_ids):
+        if booking_id in updated:
+            results.append(BookingStatusBatchResult(
+                id=booking_id,
+                status_code=status.HTTP_200_OK,
+                status=batch.status,
+                version=updated[booking_id]
+            ))
+        else:
+            status_code, detail = rejected[booking_id]
+            results.append(BookingStatusBatchResult(id=booking_id, status_code=status_code, detail=detail))
+    
+    response = BookingStatusBatchResponse(results=results, updated=len(updated))
+    await idempotency.save(db, status.HTTP_200_OK, response)
+    return response
 
 
 @router.put("/{booking_id}/status", response_model=BookingResponse)
@@ -254,35 +539,31 @@ async def update_booking_status(
     status_update: BookingStatusUpdate,
     background_tasks: BackgroundTasks,
     current_owner: User = Depends(get_current_owner),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Update booking status.
     Owner only.
+    Only transitions allowed by BOOKING_TRANSITIONS are applied; with
+    expected_version the update also fails with 409 if the booking changed since.
     Sends notification when status changes to 'ready_for_delivery'.
     """
-    query = select(Booking).options(
-        selectinload(Booking.customer),
-        selectinload(Booking.booking_services).selectinload(BookingService.service)
-    ).where(Booking.id == booking_id)
-    
-    result = await db.execute(query)
-    booking = result.scalar_one_or_none()
-    
-    if not booking:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Booking not found"
-        )
-    
-    old_status = booking.status
-    booking.status = status_update.status
-    
-    await db.flush()
-    await db.refresh(booking)
+    if idempotency.replay:
+        return idempotency.replay
+    
+    booking = await BookingWorkflow.transition(
+        db,
+        booking_id,
+        status_update.status,
+        expected_version=status_update.expected_version,
+        load_options=booking_load_options(),
+        changed_by=current_owner.id
+    )
     
     # Send email notification when bike is ready for delivery
-    if status_update.status == BookingStatus.READY_FOR_DELIVERY and old_status != BookingStatus.READY_FOR_DELIVERY:
+    # (transitions never keep the status, so this fires once per arrival)
+    if status_update.status == BookingStatus.READY_FOR_DELIVERY:
         background_tasks.add_task(
             EmailService.send_ready_for_delivery,
             to_email=booking.customer.email,
@@ -290,44 +571,46 @@ async def update_booking_status(
             booking_id=str(booking.id)
         )
     
-    return build_booking_response(booking)
+    response = build_booking_response(booking)
+    await idempotency.save(db, status.HTTP_200_OK, response)
+    return response
 
 
 @router.delete("/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_booking(
     booking_id: UUID,
+    expected_version: Optional[int] = Query(None, description="Fail with 409 if the booking changed since this version"),
     current_user: User = Depends(get_current_user),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Cancel a booking.
-    - Customers can cancel their own pending bookings
-    - Owners can cancel any booking
+    - Customers can cancel their own pending or confirmed bookings
+    - Owners can cancel any booking that is not cancelled yet, whatever
+      BOOKING_TRANSITIONS allows for status updates
     """
-    result = await db.execute(select(Booking).where(Booking.id == booking_id))
-    booking = result.scalar_one_or_none()
-    
-    if not booking:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Booking not found"
-        )
+    if idempotency.replay:
+        return idempotency.replay
     
-    # Access control
+    # Access control is part of the UPDATE: customers only match their own pending/confirmed bookings
     if current_user.role == UserRole.CUSTOMER:
-        if booking.customer_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to cancel this booking"
-            )
-        if booking.status not in [BookingStatus.PENDING, BookingStatus.CONFIRMED]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot cancel booking in current status"
-            )
+        await BookingWorkflow.transition(
+            db,
+            booking_id,
+            BookingStatus.CANCELLED,
+            expected_version=expected_version,
+            customer_id=current_user.id,
+            allowed_from=[BookingStatus.PENDING, BookingStatus.CONFIRMED],
+            changed_by=current_user.id
+        )
+    else:
+        await BookingWorkflow.transition(
+            db, booking_id, BookingStatus.CANCELLED, expected_version=expected_version,
+            changed_by=current_user.id, sources=OWNER_CANCEL_SOURCES
+        )
     
-    # Cancel booking
-    booking.status = BookingStatus.CANCELLED
+    await idempotency.save(db, status.HTTP_204_NO_CONTENT)
     await db.commit()
     
     return None
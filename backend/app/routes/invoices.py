@@ -0,0 +1,113 @@
+"""
+Invoice Routes
+Invoices of completed bookings (services/invoices.py): customers download
+their own, owners any booking's and a monthly export of the station's.
+"""
+
+import os
+from datetime import datetime
+from typing import Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..models.archive import ArchivedBooking
+from ..models.booking import Booking, BookingStatus
+from ..models.tenant import tenant_filtered, tenant_params
+from ..models.user import User
+from ..services.auth_service import get_current_owner, get_current_user
+from ..services.http_cache import immutable_file_response
+from ..services.invoices import (
+    FORMATS, INVOICE_OF_BOOKING, document_path, export_month, invoice_renderer, issue_invoice
+)
+from .bookings import find_booking
+
+
+router = APIRouter(tags=["Invoices"])
+
+
+BOOKING_STATUS = {
+    model: tenant_filtered(select(model.status).where(model.id == bindparam("booking_id")), model)
+    for model in (Booking, ArchivedBooking)
+}
+
+# Seconds a client should wait before asking again for an invoice being rendered
+RENDER_RETRY_AFTER = 2
+
+
+@router.get("/bookings/{booking_id}/invoice")
+async def get_booking_invoice(
+    booking_id: UUID,
+    request: Request,
+    format: Literal["html", "text"] = Query("html"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Download the invoice of a completed booking as HTML or plain text.
+    - Customers can download the invoices of their own bookings, owners any
+    - 409 until the booking is completed; 202 with Retry-After while the
+      invoice is still being rendered (rendered right away when it cannot
+      be queued)
+    An invoice never changes, so responses may be cached for good.
+    """
+    model = await find_booking(db, booking_id, current_user)
+    result = await db.execute(INVOICE_OF_BOOKING, tenant_params(db, booking_id=booking_id))
+    invoice = result.scalar_one_or_none()
+    if invoice is None:
+        booking_status = await db.execute(BOOKING_STATUS[model], tenant_params(db, booking_id=booking_id))
+        if booking_status.scalar_one() != BookingStatus.COMPLETED.value:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Invoices are issued once a booking is completed"
+            )
+        if invoice_renderer.enqueue([(db.info["tenant_id"], str(booking_id))]):
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"detail": "The invoice is being prepared"},
+                headers={"Retry-After": str(RENDER_RETRY_AFTER)}
+            )
+        # Not queued (renderer stopped or its queue full): render it in this request
+        invoice = await issue_invoice(db.info["tenant_id"], str(booking_id))
+
+    sha256 = invoice.html_sha256 if format == "html" else invoice.text_sha256
+    response = immutable_file_response(
+        request,
+        document_path(sha256, format),
+        FORMATS[format][0],
+        etag=f'"{sha256[:32]}"',
+        last_modified=invoice.created_at
+    )
+    response.headers["Content-Disposition"] = f'inline; filename="{invoice.number}{FORMATS[format][1]}"'
+    return response
+
+
+@router.get("/invoices/export")
+async def export_invoices(
+    request: Request,
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM"),
+    current_owner: User = Depends(get_current_owner),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Download the invoices issued in a month as a zip: every invoice as
+    HTML and plain text, and a CSV listing them.
+    Owner only.
+    The archive is built once and served from disk until the month gains
+    an invoice.
+    """
+    path, key, _ = await export_month(db, month)
+    response = immutable_file_response(
+        request,
+        path,
+        "application/zip",
+        etag=f'"{key[:32]}"',
+        last_modified=datetime.utcfromtimestamp(int(os.path.getmtime(path))),
+        cache_control="private, no-cache"
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="invoices-{month}.zip"'
+    return response
@@ -0,0 +1,179 @@
+"""
+Booking Photo Routes
+Customers attach photos of the damage to their bookings; owners see the
+photos of every booking (services/photos.py).
+"""
+
+from typing import List, Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_db
+from ..models.archive import ArchivedBooking
+from ..models.booking_photo import BookingPhoto, PhotoStatus
+from ..models.tenant import tenant_filtered, tenant_params
+from ..models.types import UUIDKey, new_id
+from ..models.user import User
+from ..schemas.booking import BookingPhotoResponse
+from ..services.auth_service import get_current_user
+from ..services.http_cache import immutable_file_response
+from ..services.photos import (
+    claim_photo_slot, photo_path, photo_processor, receive_photo, release_photo_slot, remove_photo_files
+)
+from .bookings import find_booking
+
+
+router = APIRouter(prefix="/bookings", tags=["Booking Photos"])
+
+
+# Photos of a booking, oldest first (ix_booking_photos_booking_created); claimed uploads are not photos yet
+BOOKING_PHOTOS = tenant_filtered(
+    select(BookingPhoto)
+    .where(
+        BookingPhoto.booking_id == bindparam("booking_id", type_=UUIDKey),
+        BookingPhoto.status != PhotoStatus.UPLOADING.value
+    )
+    .order_by(BookingPhoto.created_at),
+    BookingPhoto
+)
+PHOTO_BY_ID = tenant_filtered(
+    select(BookingPhoto).where(
+        BookingPhoto.id == bindparam("photo_id", type_=UUIDKey),
+        BookingPhoto.booking_id == bindparam("booking_id", type_=UUIDKey),
+        BookingPhoto.status != PhotoStatus.UPLOADING.value
+    ),
+    BookingPhoto
+)
+
+# The body is read as a stream, so FastAPI cannot describe it on its own
+UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+
+@router.post(
+    "/{booking_id}/photos",
+    response_model=BookingPhotoResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=UPLOAD_BODY
+)
+async def upload_booking_photo(
+    booking_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Attach a photo (JPEG, PNG or WebP) to a booking, sent as the "file"
+    field of a multipart/form-data body.
+    - Customers can attach photos to their own bookings, owners to any booking
+    - Up to PHOTO_MAX_PER_BOOKING photos of PHOTO_MAX_BYTES each
+    The photo is "processing" until its display and thumbnail variants
+    are ready.
+    """
+    model = await find_booking(db, booking_id, current_user)
+    if model is ArchivedBooking:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Archived bookings cannot take new photos"
+        )
+    # The claim opens a transaction of its own and commits it, handing the
+    # connection back to the pool while the upload streams in
+    await db.commit()
+    tenant_id = db.info["tenant_id"]
+    photo_id = new_id()
+    if not await claim_photo_slot(db, booking_id, photo_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"A booking can have at most {settings.PHOTO_MAX_PER_BOOKING} photos"
+        )
+    try:
+        received = await receive_photo(request, tenant_id, photo_id)
+        result = await db.execute(
+            update(BookingPhoto)
+            .where(BookingPhoto.id == photo_id)
+            .values(status=photo_processor.initial_status().value, **received)
+            .returning(BookingPhoto)
+            .execution_options(synchronize_session=False)
+        )
+        photo = result.scalar_one()
+        await db.commit()
+    except BaseException:
+        # Failed, too large, or cancelled by the deadline or a disconnect
+        await db.rollback()
+        remove_photo_files(tenant_id, photo_id)
+        await release_photo_slot(tenant_id, photo_id)
+        raise
+
+    photo_processor.submit(tenant_id, photo_id)
+    return BookingPhotoResponse.model_validate(photo)
+
+
+@router.get("/{booking_id}/photos", response_model=List[BookingPhotoResponse])
+async def list_booking_photos(
+    booking_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List the photos of a booking, oldest first.
+    - Owners can view any booking's photos
+    - Customers can only view their own
+    """
+    await find_booking(db, booking_id, current_user)
+    result = await db.execute(BOOKING_PHOTOS, tenant_params(db, booking_id=booking_id))
+    return [BookingPhotoResponse.model_validate(p) for p in result.scalars()]
+
+
+@router.get("/{booking_id}/photos/{photo_id}")
+async def get_booking_photo(
+    booking_id: UUID,
+    photo_id: UUID,
+    request: Request,
+    variant: Literal["original", "display", "thumbnail"] = Query("display"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Download a photo: the original upload, or its "display" or
+    "thumbnail" JPEG once processed.
+    Photos never change, so responses may be cached for good; Range
+    requests are answered with 206.
+    """
+    await find_booking(db, booking_id, current_user)
+    result = await db.execute(PHOTO_BY_ID, tenant_params(db, booking_id=booking_id, photo_id=photo_id))
+    photo = result.scalar_one_or_none()
+    if photo is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Photo not found"
+        )
+
+    if variant != "original" and photo.status != PhotoStatus.READY.value:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"The {variant} variant of this photo is not available (photo {photo.status})"
+        )
+    media_type = photo.content_type if variant == "original" else "image/jpeg"
+    return immutable_file_response(
+        request,
+        photo_path(db.info["tenant_id"], photo.id, variant),
+        media_type,
+        etag=f'"{photo.sha256[:32]}-{variant}"',
+        last_modified=photo.created_at
+    )
@@ -0,0 +1,65 @@
+"""
+Profile Routes
+Download request profiles taken by ProfilingMiddleware
+(services/profiling.py). Owner only; an owner sees the profiles of their
+own station's requests.
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from ..models.user import User
+from ..schemas.profile import ProfileResponse, ProfileSummary
+from ..services.auth_service import get_current_owner
+from ..services.profiling import TRACE_SUFFIX, list_profiles, load_summary, profile_path
+
+
+router = APIRouter(prefix="/profiles", tags=["Profiles"])
+
+
+def owned_profile(profile_id: str, owner: User) -> dict:
+    """Summary of a profile of the owner's station; 404 otherwise."""
+    summary = load_summary(profile_id)
+    if summary is None or summary["tenant_id"] != owner.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return summary
+
+
+@router.get("", response_model=List[ProfileSummary])
+async def get_profiles(current_owner: User = Depends(get_current_owner)):
+    """
+    List the stored profiles of the station's requests, newest first.
+    Owner only.
+    """
+    return list_profiles(current_owner.tenant_id)
+
+
+@router.get("/{profile_id}", response_model=ProfileResponse)
+async def get_profile(profile_id: str, current_owner: User = Depends(get_current_owner)):
+    """
+    Get a profile: its SQL statements with their times, the slowest
+    functions and the time spent per package.
+    Owner only.
+    """
+    return owned_profile(profile_id, current_owner)
+
+
+@router.get("/{profile_id}/trace")
+async def download_trace(profile_id: str, current_owner: User = Depends(get_current_owner)):
+    """
+    Download the cProfile trace of a profile (python -m pstats, snakeviz).
+    Owner only.
+    """
+    owned_profile(profile_id, current_owner)
+    path = profile_path(profile_id, TRACE_SUFFIX)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, media_type="application/octet-stream", filename=profile_id + TRACE_SUFFIX)
@@ -7,19 +7,38 @@ from typing import Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, bindparam
 
 from ..database import get_db
 from ..models.service import Service
+from ..models.tenant import tenant_filtered, tenant_params
 from ..models.user import User
 from ..schemas.service import ServiceCreate, ServiceUpdate, ServiceResponse, ServiceListResponse
 from ..services.auth_service import get_current_user, get_current_owner
+from ..services.idempotency import IdempotencyGuard, idempotency_guard
+from ..services.cache_bus import service_catalog_cache
+from ..services.counters import CounterDeltas, Counters
+from ..services.single_flight import single_flight
 
 
 router = APIRouter(prefix="/services", tags=["Services"])
 
+# Catalog pages (all / active services), built once
+SERVICE_PAGE = {
+    active_only: tenant_filtered(
+        select(Service)
+        .where(*([Service.is_active == True] if active_only else []))
+        .order_by(Service.created_at.desc())
+        .offset(bindparam("skip"))
+        .limit(bindparam("limit")),
+        Service
+    )
+    for active_only in (True, False)
+}
+
 
 @router.get("", response_model=ServiceListResponse)
+@single_flight("services:list")
 async def list_services(
     active_only: bool = Query(True, description="Filter only active services"),
     skip: int = Query(0, ge=0),
@@ -29,60 +48,64 @@ async def list_services(
     """
     List all services.
     Publicly accessible for browsing.
+    Served from the per-worker catalog cache until a service changes;
+    concurrent identical requests share one execution.
     """
-    # Build query
-    query = select(Service)
-    if active_only:
-        query = query.where(Service.is_active == True)
-    query = query.order_by(Service.created_at.desc()).offset(skip).limit(limit)
-    
-    # Get services
-    result = await db.execute(query)
-    services = result.scalars().all()
-    
-    # Get total count
-    count_query = select(func.count()).select_from(Service)
-    if active_only:
-        count_query = count_query.where(Service.is_active == True)
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    async def load_page():
+        # Get services
+        result = await db.execute(SERVICE_PAGE[active_only], tenant_params(db, skip=skip, limit=limit))
+        services = result.scalars().all()
+        
+        # Maintained total, no COUNT(*) over the catalog
+        total = await Counters.service_total(db, active_only)
+        
+        return ServiceListResponse(
+            services=[ServiceResponse.model_validate(s) for s in services],
+            total=total
+        )
     
-    return ServiceListResponse(
-        services=[ServiceResponse.model_validate(s) for s in services],
-        total=total
-    )
+    return await service_catalog_cache.get_or_load(("list", active_only, skip, limit), load_page)
 
 
 @router.get("/{service_id}", response_model=ServiceResponse)
+@single_flight("services:get")
 async def get_service(
     service_id: UUID,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific service by ID.
+    Concurrent requests for the same service share one execution.
     """
-    result = await db.execute(select(Service).where(Service.id == service_id))
-    service = result.scalar_one_or_none()
+    async def load_service():
+        result = await db.execute(select(Service).where(Service.id == service_id))
+        service = result.scalar_one_or_none()
+        return ServiceResponse.model_validate(service) if service else None
     
+    service = await service_catalog_cache.get_or_load(("get", service_id), load_service)
     if not service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service not found"
         )
     
-    return ServiceResponse.model_validate(service)
+    return service
 
 
 @router.post("", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED)
 async def create_service(
     service_data: ServiceCreate,
     current_owner: User = Depends(get_current_owner),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new service.
     Owner only.
     """
+    if idempotency.replay:
+        return idempotency.replay
+    
     new_service = Service(
         name=service_data.name,
         description=service_data.description,
@@ -93,8 +116,15 @@ async def create_service(
     db.add(new_service)
     await db.flush()
     await db.refresh(new_service)
+    deltas = CounterDeltas()
+    deltas.add("services", 1)
+    deltas.add("services:active", 1)
+    await deltas.apply(db)
+    await service_catalog_cache.invalidate(db)
     
-    return ServiceResponse.model_validate(new_service)
+    response = ServiceResponse.model_validate(new_service)
+    await idempotency.save(db, status.HTTP_201_CREATED, response)
+    return response
 
 
 @router.put("/{service_id}", response_model=ServiceResponse)
@@ -118,12 +148,20 @@ async def update_service(
         )
     
     # Update fields if provided
+    was_active = bool(service.is_active)
     update_data = service_data.model_dump(exclude_unset=True)
+    changed = any(getattr(service, field) != value for field, value in update_data.items())
     for field, value in update_data.items():
         setattr(service, field, value)
     
     await db.flush()
     await db.refresh(service)
+    if bool(service.is_active) != was_active:
+        deltas = CounterDeltas()
+        deltas.add("services:active", 1 if service.is_active else -1)
+        await deltas.apply(db)
+    if changed:
+        await service_catalog_cache.invalidate(db)
     
     return ServiceResponse.model_validate(service)
 
@@ -148,7 +186,12 @@ async def delete_service(
         )
     
     # Soft delete - just deactivate
-    service.is_active = False
+    if service.is_active:
+        service.is_active = False
+        deltas = CounterDeltas()
+        deltas.add("services:active", -1)
+        await deltas.apply(db)
+        await service_catalog_cache.invalidate(db)
     await db.commit()
     
     return None
@@ -0,0 +1,107 @@
+"""
+Workshop Queue Routes
+Mechanics pull confirmed and in-progress bookings in priority order
+(services/workqueue.py). Owner only.
+"""
+
+from uuid import UUID
+from fastapi import APIRouter, Depends, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..models.booking import Booking
+from ..models.tenant import tenant_params
+from ..models.user import User
+from ..schemas.booking import WorkQueueJob
+from ..services.auth_service import get_current_owner
+from ..services.workqueue import WorkQueue
+from .bookings import BOOKING_BY_ID, build_booking_response
+
+
+router = APIRouter(prefix="/workqueue", tags=["Workshop Queue"])
+
+
+async def load_job(db: AsyncSession, booking_id: str) -> WorkQueueJob:
+    """Build the queue entry of a booking."""
+    result = await db.execute(BOOKING_BY_ID[Booking], tenant_params(db, booking_id=booking_id))
+    booking = result.scalar_one()
+    return WorkQueueJob(
+        booking=build_booking_response(booking),
+        estimated_minutes=booking.estimated_minutes,
+        claimed_by=booking.claimed_by,
+        claimed_at=booking.claimed_at
+    )
+
+
+@router.get(
+    "/next",
+    response_model=WorkQueueJob,
+    responses={status.HTTP_204_NO_CONTENT: {"description": "The queue is empty"}}
+)
+async def next_job(
+    current_owner: User = Depends(get_current_owner),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the booking at the head of the queue without claiming it.
+    Returns 204 when no unclaimed job is waiting.
+    """
+    booking_id = await WorkQueue.next_job(db)
+    if booking_id is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return await load_job(db, booking_id)
+
+
+@router.post(
+    "/claim",
+    response_model=WorkQueueJob,
+    responses={status.HTTP_204_NO_CONTENT: {"description": "The queue is empty"}}
+)
+async def claim_next_job(
+    current_owner: User = Depends(get_current_owner),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Claim the booking at the head of the queue for the current user.
+    Concurrent callers always get different bookings.
+    Returns 204 when no unclaimed job is waiting.
+    """
+    booking_id = await WorkQueue.claim_next(db, current_owner.id)
+    if booking_id is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    job = await load_job(db, booking_id)
+    await db.commit()
+    return job
+
+
+@router.post("/{booking_id}/claim", response_model=WorkQueueJob)
+async def claim_job(
+    booking_id: UUID,
+    current_owner: User = Depends(get_current_owner),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Claim a specific queued booking.
+    Fails with 409 if it is already claimed or not in the queue.
+    """
+    await WorkQueue.claim(db, booking_id, current_owner.id)
+    job = await load_job(db, str(booking_id))
+    await db.commit()
+    return job
+
+
+@router.post("/{booking_id}/release", response_model=WorkQueueJob)
+async def release_job(
+    booking_id: UUID,
+    force: bool = Query(False, description="Release a claim held by another mechanic"),
+    current_owner: User = Depends(get_current_owner),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Put a claimed booking back in the queue at its original position.
+    Only the claim holder may release it unless force is set.
+    """
+    await WorkQueue.release(db, booking_id, current_owner.id, force=force)
+    job = await load_job(db, str(booking_id))
+    await db.commit()
+    return job
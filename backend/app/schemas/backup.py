@@ -0,0 +1,29 @@
+"""
+Backup Schemas
+Pydantic models for the online snapshot endpoints.
+"""
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class BackupSnapshot(BaseModel):
+    """Schema for a stored snapshot's manifest."""
+    name: str
+    file: str
+    shard: str
+    created_at: str
+    schema_version: Optional[int]
+    pages: int
+    size: int
+    compressed_size: int
+    sha256: str
+    compressed_sha256: str
+    seconds: float
+
+
+class BackupStatusResponse(BaseModel):
+    """Schema for the snapshots of the owner's shard."""
+    shard: str
+    running: bool
+    snapshots: List[BackupSnapshot]
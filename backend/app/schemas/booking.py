@@ -9,6 +9,7 @@ from uuid import UUID
 from datetime import datetime, date
 from decimal import Decimal
 from ..models.booking import BookingStatus
+from ..models.booking_photo import PhotoStatus
 from .service import ServiceResponse
 from .user import UserResponse
 
@@ -53,6 +54,7 @@ class BookingUpdate(BaseModel):
 class BookingStatusUpdate(BaseModel):
     """Schema for updating booking status (Owner only)."""
     status: BookingStatus
+    expected_version: Optional[int] = Field(None, ge=1, description="Reject with 409 if the booking changed since")
     
     @field_validator('status')
     @classmethod
@@ -70,6 +72,32 @@ class BookingStatusUpdate(BaseModel):
         return v
 
 
+class BookingStatusBatchUpdate(BaseModel):
+    """Schema for moving many bookings to one status (Owner only)."""
+    booking_ids: List[UUID] = Field(..., min_length=1, max_length=100)
+    status: BookingStatus
+    
+    @field_validator('status')
+    @classmethod
+    def validate_status(cls, v):
+        return BookingStatusUpdate.validate_status(v)
+
+
+class BookingStatusBatchResult(BaseModel):
+    """Outcome of the batch update for one booking."""
+    id: UUID
+    status_code: int
+    detail: Optional[str] = None
+    status: Optional[BookingStatus] = None
+    version: Optional[int] = None
+
+
+class BookingStatusBatchResponse(BaseModel):
+    """Schema for batch status update response."""
+    results: List[BookingStatusBatchResult]
+    updated: int
+
+
 class BookingResponse(BaseModel):
     """Schema for booking response."""
     id: UUID
@@ -82,6 +110,8 @@ class BookingResponse(BaseModel):
     services: List[BookingServiceInfo]
     created_at: datetime
     updated_at: datetime
+    version: int = 1
+    archived: bool = False
     
     class Config:
         from_attributes = True
@@ -95,6 +125,66 @@ class BookingListResponse(BaseModel):
     page_size: int
 
 
+class BookingTombstoneResponse(BaseModel):
+    """Schema for a booking removed from the live list."""
+    booking_id: UUID
+    reason: str
+    removed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class BookingChangesResponse(BaseModel):
+    """Schema for a delta sync page."""
+    changed: List[BookingResponse]
+    removed: List[BookingTombstoneResponse]
+    next_token: str
+    has_more: bool
+
+
+class BookingStatusEventResponse(BaseModel):
+    """Schema for one status change of a booking."""
+    from_status: Optional[BookingStatus]
+    to_status: BookingStatus
+    version: int
+    changed_by: Optional[UUID]
+    changed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class BookingTimelineResponse(BaseModel):
+    """Schema for the status history of a booking."""
+    booking_id: UUID
+    events: List[BookingStatusEventResponse]
+
+
+class BookingPhotoResponse(BaseModel):
+    """Schema for a photo attached to a booking."""
+    id: UUID
+    booking_id: UUID
+    filename: str
+    content_type: str
+    size: int
+    width: Optional[int]
+    height: Optional[int]
+    status: PhotoStatus
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class WorkQueueJob(BaseModel):
+    """Schema for a booking in the workshop queue."""
+    booking: BookingResponse
+    estimated_minutes: int
+    claimed_by: Optional[UUID] = None
+    claimed_at: Optional[datetime] = None
+
+
 class BookingCustomerView(BaseModel):
     """Schema for customer's view of their booking."""
     id: UUID
@@ -0,0 +1,48 @@
+"""
+Profile Schemas
+Pydantic models for the request profile endpoints.
+"""
+
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class ProfileStatement(BaseModel):
+    """Schema for a SQL statement run by a profiled request."""
+    sql: str
+    ms: float
+    rows: int
+    cache: Optional[str]
+    executemany: bool
+
+
+class ProfileFunction(BaseModel):
+    """Schema for a function of a profile's trace."""
+    function: str
+    calls: int
+    own_ms: float
+    cumulative_ms: float
+
+
+class ProfileSummary(BaseModel):
+    """Schema for a stored profile in a listing."""
+    id: str
+    created_at: str
+    method: str
+    path: str
+    route: Optional[str]
+    status_code: Optional[int]
+    tenant_id: Optional[str]
+    trigger: str
+    duration_ms: float
+    sql_ms: float
+    sql_count: int
+    concurrent_requests: int
+    packages_ms: Dict[str, float]
+    statements_dropped: int
+
+
+class ProfileResponse(ProfileSummary):
+    """Schema for a stored profile with its statements and slowest functions."""
+    top_functions: List[ProfileFunction]
+    statements: List[ProfileStatement]
@@ -78,4 +78,5 @@ class TokenPayload(BaseModel):
     sub: str  # user id
     email: str
     role: str
+    tid: Optional[str] = None  # tenant (station) id
     exp: datetime
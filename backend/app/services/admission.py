@@ -0,0 +1,182 @@
+"""
+Admission Control
+Per-route-class concurrency limits with bounded wait queues, so cheap
+catalog reads, bcrypt-heavy auth calls and DB-heavy booking traffic do
+not starve each other under a spike.
+
+Each class has its own limiter. The limit adapts to the p99 latency of
+the class's recent requests: it shrinks multiplicatively while the p99
+is above the class's target and grows by one while requests had to queue
+and the p99 is within target. A request is shed with HTTP 503 when the
+queue is full, when its expected queue wait already exceeds max_wait, or
+when it actually waited max_wait without getting a slot.
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from ..config import settings
+from .metrics import metrics
+
+
+# Completed requests between two limit adjustments
+ADJUST_EVERY = 20
+
+metrics.describe("admission_shed_total", "Requests rejected by admission control, by route class and reason")
+metrics.describe("admission_limit", "Current concurrency limit of a route class")
+metrics.describe("admission_in_flight", "Admitted requests of a route class")
+metrics.describe("admission_queued", "Requests of a route class waiting for a slot")
+
+
+class Shed(Exception):
+    """A request was not admitted; retry_after is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+
+class AdaptiveLimiter:
+    """Concurrency limit and wait queue of one route class."""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        max_wait: float,
+        p99_target: float,
+        window: int = 200
+    ):
+        self.name = name
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.p99_target = p99_target
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._completed = 0
+        self._saturated = False
+        self._publish()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: about one p99 of this class."""
+        p99 = percentile(self._samples, 0.99) if self._samples else self.max_wait
+        return max(1, math.ceil(p99))
+
+    def _shed(self, reason: str):
+        metrics.increment("admission_shed_total", route_class=self.name, reason=reason)
+        raise Shed(reason, self.retry_after())
+
+    async def acquire(self):
+        """Wait for a slot; raises Shed instead of queueing past the class's limits."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._publish()
+            return
+
+        self._saturated = True
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+        if self._samples:
+            # Slots free up at about limit per median service time
+            expected_wait = (len(self._waiters) + 1) / max(int(self.limit), 1) * percentile(self._samples, 0.5)
+            if expected_wait > self.max_wait:
+                self._shed("expected_wait")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return  # the slot was handed over just as the wait ran out
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self._publish()
+            self._shed("wait_timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)  # pass the handed-over slot on
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self._publish()
+            raise
+
+    def release(self, latency: Optional[float]):
+        """Free a slot; latency (seconds) feeds the limit adaptation."""
+        self.in_flight -= 1
+        if latency is not None:
+            self._samples.append(latency)
+            self._completed += 1
+            if self._completed % ADJUST_EVERY == 0:
+                self._adjust()
+        # Hand freed slots straight to the oldest waiters
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+        self._publish()
+
+    def _adjust(self):
+        p99 = percentile(self._samples, 0.99)
+        if p99 > self.p99_target:
+            self.limit = max(float(self.min_limit), self.limit * 0.8)
+        elif self._saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+        self._saturated = False
+
+    def _publish(self):
+        metrics.set("admission_limit", int(self.limit), route_class=self.name)
+        metrics.set("admission_in_flight", self.in_flight, route_class=self.name)
+        metrics.set("admission_queued", len(self._waiters), route_class=self.name)
+
+
+def build_limiters() -> Dict[str, AdaptiveLimiter]:
+    """One limiter per class in settings.ADMISSION_CLASSES."""
+    return {
+        name: AdaptiveLimiter(
+            name,
+            limit=config["limit"],
+            min_limit=config["min"],
+            max_limit=config["max"],
+            max_queue=config["queue"],
+            max_wait=config["max_wait"],
+            p99_target=config["p99_target"],
+            window=settings.ADMISSION_WINDOW
+        )
+        for name, config in settings.ADMISSION_CLASSES.items()
+    }
+
+
+class Admission:
+    """The route-class limiters of this worker."""
+
+    def __init__(self):
+        self.limiters = build_limiters()
+
+    def limiter(self, route_class: Optional[str]) -> Optional[AdaptiveLimiter]:
+        return self.limiters.get(route_class) if route_class else None
+
+
+admission = Admission()
@@ -0,0 +1,149 @@
+"""
+Archive Service
+Moves completed and cancelled bookings older than a cutoff into the archive
+tables in small batches, keeping the live bookings table and its indexes small.
+The list counters only cover live bookings, so each batch decrements them.
+
+Run manually with:
+    python -m app.services.archive_service --days 90 --batch-size 200
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, insert, delete, literal, DateTime
+
+from ..config import settings
+from ..database import shard_router
+from ..models.booking import Booking, BookingStatus, BookingService
+from ..models.archive import ArchivedBooking, ArchivedBookingService
+from ..models.tombstone import BookingTombstone
+from .booking_changes import next_change_seq
+from .counters import CounterDeltas
+
+
+ARCHIVABLE_STATUSES = [BookingStatus.COMPLETED.value, BookingStatus.CANCELLED.value]
+
+
+class ArchiveService:
+    """Service class for moving finished bookings to cold storage."""
+
+    @staticmethod
+    async def archive_batch(shard: str, cutoff: datetime, batch_size: int) -> int:
+        """
+        Archive one batch of finished bookings (of any tenant) on a shard,
+        last updated before cutoff. Each batch is its own short transaction
+        and leaves a tombstone per booking for delta-syncing clients.
+        Returns the number of bookings moved.
+        """
+        async with shard_router.sessionmaker(shard)() as session:
+            result = await session.execute(
+                select(Booking.id, Booking.tenant_id, Booking.customer_id, Booking.booking_date, Booking.status)
+                .where(
+                    Booking.status.in_(ARCHIVABLE_STATUSES),
+                    Booking.updated_at < cutoff
+                )
+                .order_by(Booking.updated_at)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return 0
+            booking_ids = [row.id for row in rows]
+
+            now = datetime.utcnow()
+            booking_columns = [c.name for c in Booking.__table__.columns]
+            await session.execute(
+                insert(ArchivedBooking.__table__).from_select(
+                    booking_columns + ["archived_at"],
+                    select(
+                        *[Booking.__table__.c[name] for name in booking_columns],
+                        literal(now, DateTime)
+                    ).where(Booking.id.in_(booking_ids))
+                )
+            )
+
+            link_columns = [c.name for c in BookingService.__table__.columns]
+            await session.execute(
+                insert(ArchivedBookingService.__table__).from_select(
+                    link_columns,
+                    select(
+                        *[BookingService.__table__.c[name] for name in link_columns]
+                    ).where(BookingService.booking_id.in_(booking_ids))
+                )
+            )
+
+            tombstones = []
+            for tenant_id in sorted({row.tenant_id for row in rows}):
+                change_seq = await next_change_seq(session, tenant_id)
+                deltas = CounterDeltas()
+                for row in rows:
+                    if row.tenant_id == tenant_id:
+                        deltas.booking(row.customer_id, row.booking_date, row.status, -1)
+                await deltas.apply(session, tenant_id)
+                tombstones.extend(
+                    {
+                        "booking_id": row.id,
+                        "tenant_id": tenant_id,
+                        "customer_id": row.customer_id,
+                        "change_seq": change_seq,
+                        "reason": "archived",
+                        "removed_at": now
+                    }
+                    for row in rows if row.tenant_id == tenant_id
+                )
+            await session.execute(insert(BookingTombstone.__table__), tombstones)
+
+            await session.execute(
+                delete(BookingService).where(BookingService.booking_id.in_(booking_ids))
+            )
+            await session.execute(
+                delete(Booking).where(Booking.id.in_(booking_ids))
+            )
+            await session.commit()
+
+        return len(booking_ids)
+
+    @staticmethod
+    async def archive_bookings(
+        older_than_days: int = settings.ARCHIVE_AFTER_DAYS,
+        batch_size: int = settings.ARCHIVE_BATCH_SIZE,
+        max_batches: Optional[int] = None
+    ) -> int:
+        """
+        Archive finished bookings on every shard in batches until none are left
+        (or max_batches per shard is hit). Returns the total number of bookings moved.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        total = 0
+
+        for shard in shard_router.shard_names():
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                moved = await ArchiveService.archive_batch(shard, cutoff, batch_size)
+                total += moved
+                batches += 1
+                if moved < batch_size:
+                    break
+                # Let live requests get the database between batches
+                await asyncio.sleep(settings.ARCHIVE_BATCH_PAUSE_SECONDS)
+
+        return total
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Archive finished bookings")
+    parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                        help="Archive bookings finished more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    moved = await ArchiveService.archive_bookings(args.days, args.batch_size, args.max_batches)
+    print(f"Archived {moved} bookings")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -5,25 +5,36 @@ Handles JWT token generation, password hashing, and user authentication.
 
 import uuid
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Union
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
 from ..config import settings
 from ..database import get_db
+from ..middleware.tenant import request_claims
+from ..models.tenant import tenant_filtered, tenant_params
 from ..models.user import User, UserRole
 
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    Password hashing context, built on first use.
+    passlib (like jose below) is imported lazily to keep worker cold starts short.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # HTTP Bearer scheme for JWT
 security = HTTPBearer()
 
+# Runs on every authenticated request; built once
+USER_BY_ID = tenant_filtered(select(User).where(User.id == bindparam("user_id")), User)
+
 
 class AuthService:
     """Service class for authentication operations."""
@@ -31,21 +42,33 @@ class AuthService:
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt."""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
+    
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hash a password in the thread pool so bcrypt does not block the event loop."""
+        return await run_in_threadpool(get_pwd_context().hash, password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verify a password in the thread pool so bcrypt does not block the event loop."""
+        return await run_in_threadpool(get_pwd_context().verify, plain_password, hashed_password)
     
     @staticmethod
     def create_access_token(user: User) -> str:
         """Create a JWT access token for a user."""
+        from jose import jwt
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         payload = {
             "sub": str(user.id),
             "email": user.email,
-            "role": user.role.value,
+            "role": UserRole(user.role).value,
+            "tid": user.tenant_id,
             "exp": expire
         }
         return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
@@ -58,6 +81,7 @@ class AuthService:
     @staticmethod
     def decode_token(token: str) -> dict:
         """Decode and validate a JWT token."""
+        from jose import JWTError, jwt
         try:
             payload = jwt.decode(
                 token, 
@@ -81,20 +105,27 @@ class AuthService:
     @staticmethod
     async def get_user_by_id(db: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
         """Get a user by ID."""
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(USER_BY_ID, tenant_params(db, user_id=user_id))
         return result.scalar_one_or_none()
 
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),  # requires the Bearer header
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     Dependency to get the current authenticated user.
+    Uses the claims TenantMiddleware decoded from the same token.
     Raises HTTP 401 if token is invalid or user not found.
     """
-    token = credentials.credentials
-    payload = AuthService.decode_token(token)
+    payload = request_claims(request.scope)
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     
     user_id = payload.get("sub")
     if not user_id:
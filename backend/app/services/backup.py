@@ -0,0 +1,350 @@
+"""
+Online SQLite Backups
+Compressed, checksummed snapshots of SQLite shards, taken while the
+application keeps serving.
+
+A snapshot runs in a worker thread with a connection of its own:
+
+1. a passive WAL checkpoint folds committed pages into the database file
+   (it never waits for readers or writers)
+2. a read transaction pins the snapshot; in WAL mode writers carry on,
+   their commits go to the WAL
+3. the SQLite online backup API copies BACKUP_PAGES_PER_STEP pages per
+   step into a temporary file; every step reads the pinned snapshot, so
+   the copy is one consistent state of the database
+4. a second passive checkpoint lets the WAL that grew meanwhile shrink
+   again, and the copy is gzip-compressed into <shard>-<time>.db.gz next
+   to a <shard>-<time>.json manifest holding the SHA-256 of both the
+   compressed and the raw file
+
+Copy steps and compression chunks are followed by pauses that keep the
+snapshot under BACKUP_CPU_SHARE of a core, so requests keep their latency
+on small single-core hosts.
+
+Postgres shards are backed up with pg_dump and are skipped here.
+
+    python -m app.services.backup snapshot [--shard default]
+    python -m app.services.backup list
+    python -m app.services.backup verify backups/default-20240101-120000.db.gz
+    python -m app.services.backup restore backups/default-20240101-120000.db.gz bike_service.db --force
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..config import settings
+from ..database import BASE_DIR, shard_router
+
+
+MANIFEST_SUFFIX = ".json"
+SNAPSHOT_SUFFIX = ".db.gz"
+COPY_CHUNK = 256 * 1024
+
+
+class _Throttle:
+    """Sleeps after each unit of work so the work stays under a share of the CPU."""
+
+    def __init__(self, share: float):
+        self.share = min(max(share, 0.01), 1.0)
+        self.resumed = time.monotonic()
+
+    def pause(self):
+        worked = time.monotonic() - self.resumed
+        time.sleep(worked * (1 / self.share - 1))
+        self.resumed = time.monotonic()
+
+
+def backup_dir() -> str:
+    return settings.BACKUP_DIR or os.path.join(BASE_DIR, "backups")
+
+
+def shard_path(shard: str) -> Optional[str]:
+    """File of a SQLite shard; None for Postgres shards."""
+    engine = shard_router.engine(shard)
+    if engine.dialect.name != "sqlite":
+        return None
+    return engine.url.database
+
+
+def _sha256(path: str, throttle: Optional[_Throttle] = None) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            digest.update(chunk)
+            if throttle:
+                throttle.pause()
+    return digest.hexdigest()
+
+
+def _compress(raw_path: str, target_path: str, throttle: _Throttle) -> str:
+    """gzip a file; returns the SHA-256 of the raw bytes."""
+    digest = hashlib.sha256()
+    with open(raw_path, "rb") as raw, gzip.open(target_path, "wb", compresslevel=6) as compressed:
+        for chunk in iter(lambda: raw.read(COPY_CHUNK), b""):
+            digest.update(chunk)
+            compressed.write(chunk)
+            throttle.pause()
+    return digest.hexdigest()
+
+
+def _copy_pages(source_path: str, target_path: str, throttle: _Throttle) -> int:
+    """Copy one consistent state of a live database file; returns its page count."""
+    source = sqlite3.connect(source_path, isolation_level=None, timeout=30)
+    target = sqlite3.connect(target_path, isolation_level=None)
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if wal:
+            source.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            # Pin the snapshot: every backup step reads this state, writers go on in the WAL
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        def pause(status, remaining, total):
+            throttle.pause()
+
+        source.backup(target, pages=settings.BACKUP_PAGES_PER_STEP, progress=pause)
+        if wal:
+            source.execute("COMMIT")
+            source.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+        # A standalone file: no WAL to ship alongside it
+        target.execute("PRAGMA journal_mode=DELETE")
+        return target.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        source.close()
+        target.close()
+
+
+def _schema_version(path: str) -> Optional[int]:
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT version FROM schema_version").fetchone()
+        return row[0] if row else None
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
+
+
+def _prune(shard: str, keep: int) -> List[str]:
+    """Delete a shard's oldest snapshots beyond keep; returns the names removed."""
+    removed = []
+    for manifest in list_snapshots(shard)[keep:]:
+        for name in (manifest["file"], manifest["name"] + MANIFEST_SUFFIX):
+            path = os.path.join(backup_dir(), name)
+            if os.path.exists(path):
+                os.remove(path)
+        removed.append(manifest["name"])
+    return removed
+
+
+def take_snapshot(shard: str) -> dict:
+    """Snapshot one SQLite shard (blocking; see snapshot_shard); returns its manifest."""
+    source_path = shard_path(shard)
+    if source_path is None:
+        raise ValueError(f"Shard '{shard}' is not a SQLite database; back it up with pg_dump")
+
+    directory = backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    started = time.monotonic()
+    created_at = datetime.utcnow()
+    name = f"{shard}-{created_at:%Y%m%d-%H%M%S-%f}"
+    throttle = _Throttle(settings.BACKUP_CPU_SHARE)
+
+    with tempfile.TemporaryDirectory(dir=directory) as work:
+        raw_path = os.path.join(work, "snapshot.db")
+        pages = _copy_pages(source_path, raw_path, throttle)
+        part_path = os.path.join(work, "snapshot.db.gz")
+        raw_sha256 = _compress(raw_path, part_path, throttle)
+
+        manifest = {
+            "name": name,
+            "file": name + SNAPSHOT_SUFFIX,
+            "shard": shard,
+            "created_at": created_at.isoformat() + "Z",
+            "schema_version": _schema_version(raw_path),
+            "pages": pages,
+            "size": os.path.getsize(raw_path),
+            "compressed_size": os.path.getsize(part_path),
+            "sha256": raw_sha256,
+            "compressed_sha256": _sha256(part_path, throttle),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        # Snapshot first, manifest last: a listed manifest always has its file
+        os.replace(part_path, os.path.join(directory, manifest["file"]))
+    with open(os.path.join(directory, name + MANIFEST_SUFFIX), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    _prune(shard, settings.BACKUP_KEEP)
+    return manifest
+
+
+def list_snapshots(shard: Optional[str] = None) -> List[dict]:
+    """Manifests of the stored snapshots, newest first."""
+    directory = backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    manifests = []
+    for entry in os.listdir(directory):
+        if not entry.endswith(MANIFEST_SUFFIX):
+            continue
+        with open(os.path.join(directory, entry)) as f:
+            manifest = json.load(f)
+        if shard is None or manifest["shard"] == shard:
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m["created_at"], reverse=True)
+
+
+def _manifest_for(snapshot_path: str) -> dict:
+    if not snapshot_path.endswith(SNAPSHOT_SUFFIX):
+        raise ValueError(f"Not a snapshot file (*{SNAPSHOT_SUFFIX}): {snapshot_path}")
+    with open(snapshot_path[:-len(SNAPSHOT_SUFFIX)] + MANIFEST_SUFFIX) as f:
+        return json.load(f)
+
+
+def _decompress(snapshot_path: str, target_path: str):
+    with gzip.open(snapshot_path, "rb") as compressed, open(target_path, "wb") as raw:
+        shutil.copyfileobj(compressed, raw, COPY_CHUNK)
+
+
+def _check_database(path: str) -> List[str]:
+    """Problems SQLite finds in a database file (empty when it is sound)."""
+    conn = sqlite3.connect(path)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check") if row[0] != "ok"]
+        problems += [
+            f"foreign key: {table} row {rowid} -> {parent}"
+            for table, rowid, parent, _ in conn.execute("PRAGMA foreign_key_check")
+        ]
+        return problems
+    finally:
+        conn.close()
+
+
+def verify_snapshot(snapshot_path: str) -> List[str]:
+    """
+    Check a snapshot against its manifest: both checksums, then SQLite's
+    integrity and foreign key checks on the decompressed copy.
+    Returns the problems found (empty when the snapshot is good).
+    """
+    manifest = _manifest_for(snapshot_path)
+    if _sha256(snapshot_path) != manifest["compressed_sha256"]:
+        return ["compressed file does not match its checksum"]
+    with tempfile.TemporaryDirectory() as work:
+        raw_path = os.path.join(work, "verify.db")
+        try:
+            _decompress(snapshot_path, raw_path)
+        except (OSError, EOFError) as e:
+            return [f"cannot decompress: {str(e)}"]
+        if _sha256(raw_path) != manifest["sha256"]:
+            return ["database does not match its checksum"]
+        return _check_database(raw_path)
+
+
+def restore_snapshot(snapshot_path: str, target_path: str, force: bool = False):
+    """
+    Verify a snapshot and write it to target_path. Stop the application
+    first: the target file and its WAL are replaced.
+    """
+    if os.path.exists(target_path) and not force:
+        raise FileExistsError(f"{target_path} exists; pass force to replace it")
+    problems = verify_snapshot(snapshot_path)
+    if problems:
+        raise ValueError("Snapshot failed verification: " + "; ".join(problems))
+
+    part_path = target_path + ".restore"
+    _decompress(snapshot_path, part_path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(target_path + suffix):
+            os.remove(target_path + suffix)
+    os.replace(part_path, target_path)
+
+
+class BackupService:
+    """Runs at most one snapshot per shard at a time, off the event loop."""
+
+    def __init__(self):
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def running(self, shard: str) -> bool:
+        task = self._running.get(shard)
+        return task is not None and not task.done()
+
+    def start(self, shard: str) -> bool:
+        """Start a snapshot of a shard in the background; False if one is already running."""
+        if self.running(shard):
+            return False
+        task = asyncio.create_task(self._snapshot(shard))
+        self._running[shard] = task
+        return True
+
+    async def snapshot_shard(self, shard: str) -> dict:
+        """Snapshot a shard and wait for it (joins a snapshot already running)."""
+        if not self.running(shard):
+            self._running[shard] = asyncio.create_task(self._snapshot(shard))
+        return await asyncio.shield(self._running[shard])
+
+    async def _snapshot(self, shard: str) -> dict:
+        try:
+            manifest = await asyncio.to_thread(take_snapshot, shard)
+        except Exception as e:
+            print(f"[BACKUP] Snapshot of shard '{shard}' failed: {str(e)}")
+            raise
+        print(f"[BACKUP] Shard '{shard}': {manifest['file']} ({manifest['compressed_size']} bytes, {manifest['seconds']} s)")
+        return manifest
+
+
+backup_service = BackupService()
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Online snapshots of SQLite shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser("snapshot", help="Snapshot SQLite shards while the application runs")
+    snapshot.add_argument("--shard", help="Only this shard (default: every SQLite shard)")
+    listing = commands.add_parser("list", help="List stored snapshots")
+    listing.add_argument("--shard")
+    verify = commands.add_parser("verify", help="Check a snapshot's checksums and integrity")
+    verify.add_argument("snapshot")
+    restore = commands.add_parser("restore", help="Verify a snapshot and write it to a database file")
+    restore.add_argument("snapshot")
+    restore.add_argument("target")
+    restore.add_argument("--force", action="store_true", help="Replace an existing target file")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "snapshot":
+            shards = [args.shard] if args.shard else shard_router.shard_names()
+            for shard in shards:
+                if shard_path(shard) is None:
+                    print(f"Shard '{shard}': not SQLite, skipped (use pg_dump)")
+                    continue
+                manifest = await backup_service.snapshot_shard(shard)
+                print(f"Shard '{shard}': {os.path.join(backup_dir(), manifest['file'])}")
+        elif args.command == "list":
+            for manifest in list_snapshots(args.shard):
+                print(f"{manifest['file']}  v{manifest['schema_version']}  {manifest['compressed_size']} bytes  {manifest['created_at']}")
+        elif args.command == "verify":
+            problems = verify_snapshot(args.snapshot)
+            print("OK" if not problems else "\n".join(problems))
+            if problems:
+                raise SystemExit(1)
+        elif args.command == "restore":
+            restore_snapshot(args.snapshot, args.target, force=args.force)
+            print(f"Restored {args.snapshot} to {args.target}")
+    finally:
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,197 @@
+"""
+Booking Workflow Service
+Status changes enforced against BOOKING_TRANSITIONS.
+Each transition is one compare-and-swap UPDATE ... RETURNING (after the
+tenant's change sequence bump for delta sync), so two concurrent edits of
+the same booking resolve deterministically: the first wins, the second
+gets HTTP 409. The UPDATE records the status it replaced, which moves the
+booking between the list counters, and each applied change is appended to
+the status history. A booking reaching "completed" is queued for its
+invoice once the transaction commits.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.booking import Booking, BookingStatus, predecessors
+from .booking_changes import next_change_seq
+from .counters import CounterDeltas
+from .invoices import request_invoice
+from .status_history import status_event, status_history
+
+
+class BookingWorkflow:
+    """Service class for booking status transitions."""
+
+    @staticmethod
+    async def transition(
+        db: AsyncSession,
+        booking_id: UUID,
+        target: BookingStatus,
+        expected_version: Optional[int] = None,
+        customer_id: Optional[str] = None,
+        allowed_from: Optional[Iterable[BookingStatus]] = None,
+        load_options: tuple = (),
+        changed_by: Optional[str] = None,
+        sources: Optional[Iterable[BookingStatus]] = None
+    ) -> Booking:
+        """
+        Move a booking to target status in a single statement.
+        - expected_version: only apply if the booking is still at this version
+        - customer_id: only apply to this customer's booking
+        - allowed_from: further restrict the statuses the change may start from
+        - changed_by: user recorded in the status history (None for jobs)
+        - sources: statuses the change may start from instead of BOOKING_TRANSITIONS'
+          (owner overrides such as OWNER_CANCEL_SOURCES)
+        Raises 404, 403 or 409 when the update matched no row.
+        """
+        target = BookingStatus(target)
+        sources = predecessors(target) if sources is None else frozenset(BookingStatus(s) for s in sources)
+        if allowed_from is not None:
+            sources = sources & frozenset(BookingStatus(s) for s in allowed_from)
+
+        stmt = (
+            update(Booking)
+            .where(
+                Booking.id == booking_id,
+                Booking.status.in_([s.value for s in sources])
+            )
+            .values(
+                status=target.value,
+                previous_status=Booking.status,
+                version=Booking.version + 1,
+                change_seq=await next_change_seq(db)
+            )
+            .returning(Booking)
+            .options(*load_options)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        if expected_version is not None:
+            stmt = stmt.where(Booking.version == expected_version)
+        if customer_id is not None:
+            stmt = stmt.where(Booking.customer_id == customer_id)
+
+        booking = (await db.execute(stmt)).scalars().one_or_none()
+        if booking is None:
+            await BookingWorkflow._raise_rejected(db, booking_id, target, expected_version, customer_id, sources)
+
+        deltas = CounterDeltas()
+        deltas.booking_moved(booking.customer_id, booking.booking_date, booking.previous_status, booking.status)
+        await deltas.apply(db)
+        await status_history.record(db, [status_event(
+            booking.tenant_id, booking.id, booking.previous_status, booking.status, booking.version, changed_by
+        )])
+        if target == BookingStatus.COMPLETED:
+            request_invoice(db, booking.tenant_id, booking.id)
+        return booking
+
+    @staticmethod
+    async def transition_many(
+        db: AsyncSession,
+        booking_ids: List[UUID],
+        target: BookingStatus,
+        changed_by: Optional[str] = None
+    ) -> Tuple[Dict[str, int], Dict[str, Tuple[int, str]]]:
+        """
+        Move many bookings to target status with one set-based UPDATE.
+        changed_by is the user recorded in the status history (None for jobs).
+        Returns (updated: id -> new version, rejected: id -> (status code, detail)).
+        """
+        target = BookingStatus(target)
+        ids = list(dict.fromkeys(str(booking_id) for booking_id in booking_ids))
+
+        result = await db.execute(
+            update(Booking)
+            .where(
+                Booking.id.in_(ids),
+                Booking.status.in_([s.value for s in predecessors(target)])
+            )
+            .values(
+                status=target.value,
+                previous_status=Booking.status,
+                version=Booking.version + 1,
+                change_seq=await next_change_seq(db)
+            )
+            .returning(
+                Booking.id, Booking.tenant_id, Booking.version, Booking.customer_id,
+                Booking.booking_date, Booking.previous_status
+            )
+            .execution_options(synchronize_session=False)
+        )
+        updated = {}
+        deltas = CounterDeltas()
+        events = []
+        for row in result:
+            updated[row.id] = row.version
+            deltas.booking_moved(row.customer_id, row.booking_date, row.previous_status, target.value)
+            events.append(status_event(
+                row.tenant_id, row.id, row.previous_status, target, row.version, changed_by
+            ))
+            if target == BookingStatus.COMPLETED:
+                request_invoice(db, row.tenant_id, row.id)
+        await deltas.apply(db)
+        await status_history.record(db, events)
+
+        rejected = {}
+        missing = [booking_id for booking_id in ids if booking_id not in updated]
+        if missing:
+            result = await db.execute(
+                select(Booking.id, Booking.status).where(Booking.id.in_(missing))
+            )
+            current = {row.id: BookingStatus(row.status) for row in result}
+            for booking_id in missing:
+                if booking_id not in current:
+                    rejected[booking_id] = (status.HTTP_404_NOT_FOUND, "Booking not found")
+                else:
+                    rejected[booking_id] = (
+                        status.HTTP_409_CONFLICT,
+                        f"Cannot change booking status from '{current[booking_id].value}' to '{target.value}'"
+                    )
+
+        return updated, rejected
+
+    @staticmethod
+    async def _raise_rejected(
+        db: AsyncSession,
+        booking_id: UUID,
+        target: BookingStatus,
+        expected_version: Optional[int],
+        customer_id: Optional[str],
+        sources: frozenset
+    ):
+        """Explain why a transition matched no row (only runs on the failure path)."""
+        result = await db.execute(
+            select(Booking.status, Booking.version, Booking.customer_id).where(Booking.id == booking_id)
+        )
+        row = result.one_or_none()
+
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Booking not found"
+            )
+        if customer_id is not None and row.customer_id != customer_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to change this booking"
+            )
+        if expected_version is not None and row.version != expected_version:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Booking was modified by another request (current version {row.version})"
+            )
+        current = BookingStatus(row.status)
+        if current not in sources:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Cannot change booking status from '{current.value}' to '{target.value}'"
+            )
+        # The booking changed between the UPDATE and this check
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Booking was modified by another request"
+        )
@@ -0,0 +1,211 @@
+"""
+Cache Invalidation Bus
+Lets every worker keep aggressive in-process caches that stay consistent
+across `uvicorn --workers N`.
+
+Each cache listens on a channel ("<tenant>:<name>") with a version stamp
+in the cache_versions table. A write bumps the stamp in its own
+transaction; workers learn about new stamps:
+
+- on Postgres through LISTEN/NOTIFY (the NOTIFY is sent on commit)
+- on SQLite by polling PRAGMA data_version, re-reading cache_versions
+  only after another connection committed
+- in the publishing worker immediately after the commit
+
+A cached value is served only while its stamp is the current one.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from ..config import settings
+from ..database import current_tenant, dialect_insert, shard_router
+from ..models.cache_version import CacheVersion
+
+
+NOTIFY_CHANNEL = "cache_invalidation"
+
+# Pending stamps of a session, applied locally once its transaction commits
+PENDING_KEY = "cache_bus_pending"
+
+
+class CacheBus:
+    """Tracks the latest known version of every invalidation channel."""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._engines: List[AsyncEngine] = []
+        self._connected: Dict[str, bool] = {}
+
+    @property
+    def running(self) -> bool:
+        """True while every shard's listener is connected; caches are bypassed otherwise."""
+        return bool(self._connected) and all(self._connected.values())
+
+    def version(self, channel: str) -> int:
+        """Latest known version of a channel (0 if it was never published)."""
+        return self._versions.get(channel, 0)
+
+    def observe(self, channel: str, version: int):
+        """Record a version stamp; stamps only move forward."""
+        if version > self._versions.get(channel, 0):
+            self._versions[channel] = version
+
+    async def publish(self, db: AsyncSession, channel: str) -> int:
+        """
+        Bump a channel's version in the session's transaction.
+        Other workers see the new version once the transaction commits.
+        """
+        stmt = dialect_insert(db)(CacheVersion).values(name=channel, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheVersion.name],
+            set_={"version": CacheVersion.version + 1}
+        ).returning(CacheVersion.version)
+        version = (await db.execute(stmt)).scalar_one()
+
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(select(func.pg_notify(NOTIFY_CHANNEL, f"{version}:{channel}")))
+
+        db.sync_session.info.setdefault(PENDING_KEY, {})[channel] = version
+        return version
+
+    async def start(self):
+        """Start one listener per shard."""
+        if not settings.CACHE_BUS_ENABLED or self._tasks:
+            return
+        for shard in shard_router.shard_names():
+            url = shard_router.url(shard)
+            # A private connection per shard, outside the request pool and its echo logging
+            engine = create_async_engine(url, echo=False, poolclass=NullPool)
+            self._engines.append(engine)
+            self._connected[shard] = False
+            listen = self._listen_postgres if url.startswith("postgresql") else self._poll_sqlite
+            self._tasks.append(asyncio.create_task(listen(shard, engine)))
+
+    async def stop(self):
+        """Stop the listeners and close their connections."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for engine in self._engines:
+            await engine.dispose()
+        self._tasks.clear()
+        self._engines.clear()
+        self._connected.clear()
+
+    async def _load_all(self, conn):
+        result = await conn.execute(select(CacheVersion.name, CacheVersion.version))
+        for name, version in result:
+            self.observe(name, version)
+
+    async def _poll_sqlite(self, shard: str, engine: AsyncEngine):
+        last_data_version = None
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    await self._load_all(conn)
+                    await conn.rollback()
+                    self._connected[shard] = True
+                    while True:
+                        data_version = (await conn.execute(text("PRAGMA data_version"))).scalar()
+                        if data_version != last_data_version:
+                            last_data_version = data_version
+                            await self._load_all(conn)
+                        await conn.rollback()  # never hold a read snapshot between polls
+                        await asyncio.sleep(settings.CACHE_BUS_POLL_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._connected[shard] = False
+                print(f"[CACHE BUS] Lost shard '{shard}': {str(e)}")
+                await asyncio.sleep(1)
+
+    async def _listen_postgres(self, shard: str, engine: AsyncEngine):
+        def on_notify(connection, pid, channel, payload):
+            version, name = payload.split(":", 1)
+            self.observe(name, int(version))
+
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw = (await conn.get_raw_connection()).driver_connection
+                    await raw.add_listener(NOTIFY_CHANNEL, on_notify)
+                    # Listening before the full load, so no stamp falls in between
+                    await self._load_all(conn)
+                    await conn.rollback()
+                    self._connected[shard] = True
+                    while not raw.is_closed():
+                        await asyncio.sleep(1)
+                    raise ConnectionError("listener connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._connected[shard] = False
+                print(f"[CACHE BUS] Lost shard '{shard}': {str(e)}")
+                await asyncio.sleep(1)
+
+
+cache_bus = CacheBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_versions(session):
+    for channel, version in session.info.pop(PENDING_KEY, {}).items():
+        cache_bus.observe(channel, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_versions(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+class VersionedCache:
+    """
+    In-process LRU cache for one tenant-scoped invalidation channel.
+    Entries are stamped with the channel version seen before loading, so a
+    write that lands during a load makes the entry stale right away.
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries or settings.CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, Any]]" = OrderedDict()
+
+    def channel(self, tenant_id: Optional[str] = None) -> str:
+        tenant_id = tenant_id or current_tenant.get() or settings.DEFAULT_TENANT_ID
+        return f"{tenant_id}:{self.name}"
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, or load and cache it."""
+        if not cache_bus.running:
+            return await loader()
+
+        channel = self.channel()
+        version = cache_bus.version(channel)
+        entry = self._entries.get((channel, key))
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end((channel, key))
+            return entry[1]
+
+        value = await loader()
+        self._entries[(channel, key)] = (version, value)
+        self._entries.move_to_end((channel, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    async def invalidate(self, db: AsyncSession, tenant_id: Optional[str] = None) -> int:
+        """Invalidate the channel in every worker once db's transaction commits."""
+        return await cache_bus.publish(db, self.channel(tenant_id))
+
+
+# Caches shared by the routes
+service_catalog_cache = VersionedCache("services")
+owner_list_cache = VersionedCache("owners")
@@ -0,0 +1,144 @@
+"""
+Traffic Capture
+Sanitized shapes of the requests a worker serves, recorded by
+CaptureMiddleware (app/middleware/capture.py) when CAPTURE_ENABLED is
+set, for replay against a test instance (python -m app.services.replay).
+
+One NDJSON line per request:
+
+    {"t": 1717171717.123, "method": "GET", "route": "/api/v1/bookings/{booking_id}",
+     "query": {"page": "2"}, "body_bytes": 0, "content_type": null, "tenant": "default",
+     "role": "customer", "user": "5f1c0e9a2b7d", "status": 200, "ms": 12.4, "response_bytes": 812}
+
+Never recorded: path parameter values (ids), bodies (their size only),
+tokens and other headers, and query values of sensitive parameters
+(SENSITIVE_PARAMS). The user is an HMAC of the user id, so a replay can
+tell users apart without learning who they are.
+
+Records are buffered in memory and appended by a background task every
+CAPTURE_FLUSH_INTERVAL seconds to CAPTURE_DIR/capture-<time>-<pid>-<n>.ndjson;
+a file is rotated at CAPTURE_MAX_BYTES and only the newest CAPTURE_KEEP
+files are kept. Records beyond CAPTURE_BUFFER_MAX between flushes are
+dropped.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+from ..config import settings
+from ..database import BASE_DIR
+from .metrics import metrics
+
+
+# Query parameters whose values are never recorded
+SENSITIVE_PARAMS = ("password", "token", "secret", "key", "auth", "email", "phone")
+# Longest query value recorded
+MAX_QUERY_VALUE = 100
+FILE_PREFIX = "capture-"
+FILE_SUFFIX = ".ndjson"
+
+metrics.describe("capture_records_total", "Requests recorded by the traffic capture")
+metrics.describe("capture_dropped_total", "Captured requests dropped because the capture buffer was full")
+
+
+def capture_dir() -> str:
+    return settings.CAPTURE_DIR or os.path.join(BASE_DIR, "captures")
+
+
+def user_key(user_id: Optional[str]) -> Optional[str]:
+    """Stable pseudonym of a user: same user, same key; not reversible without the JWT secret."""
+    if not user_id:
+        return None
+    return hmac.new(settings.JWT_SECRET.encode(), str(user_id).encode(), hashlib.sha256).hexdigest()[:12]
+
+
+def sanitize_query(params) -> dict:
+    """Query parameters with sensitive values redacted and long values cut."""
+    query = {}
+    for name, value in params.items():
+        if any(word in name.lower() for word in SENSITIVE_PARAMS):
+            query[name] = "[redacted]"
+        else:
+            query[name] = value[:MAX_QUERY_VALUE]
+    return query
+
+
+class CaptureLog:
+    """Buffers capture records and appends them to the rotating NDJSON files."""
+
+    def __init__(self):
+        self._buffer: Deque[dict] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._path: Optional[str] = None
+        self._files = 0  # files opened by this worker; numbers files rotated within a second
+
+    def record(self, record: dict):
+        if len(self._buffer) >= settings.CAPTURE_BUFFER_MAX:
+            metrics.increment("capture_dropped_total")
+            return
+        self._buffer.append(record)
+        metrics.increment("capture_records_total")
+
+    async def start(self):
+        if not settings.CAPTURE_ENABLED or self._task:
+            return
+        self._task = asyncio.create_task(self._run())
+        print(f"[CAPTURE] Recording requests to {capture_dir()}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"[CAPTURE] Dropped {len(self._buffer)} records at shutdown: {str(e)}")
+
+    async def flush(self) -> int:
+        """Append the buffered records to the current file; returns how many were written."""
+        if not self._buffer:
+            return 0
+        lines = [json.dumps(self._buffer.popleft(), separators=(",", ":")) for _ in range(len(self._buffer))]
+        await asyncio.to_thread(self._write, lines)
+        return len(lines)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.CAPTURE_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[CAPTURE] Could not write capture records: {str(e)}")
+
+    def _write(self, lines: List[str]):
+        directory = capture_dir()
+        if self._path is None or not os.path.exists(self._path) or os.path.getsize(self._path) >= settings.CAPTURE_MAX_BYTES:
+            os.makedirs(directory, exist_ok=True)
+            self._files += 1
+            self._path = os.path.join(
+                directory, f"{FILE_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._files:04d}{FILE_SUFFIX}"
+            )
+            _prune(directory, settings.CAPTURE_KEEP - 1)
+        with open(self._path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _prune(directory: str, keep: int):
+    """Delete the oldest capture files beyond keep."""
+    files = sorted(
+        entry for entry in os.listdir(directory) if entry.startswith(FILE_PREFIX) and entry.endswith(FILE_SUFFIX)
+    )
+    for entry in files[:max(len(files) - keep, 0)]:
+        os.remove(os.path.join(directory, entry))
+
+
+capture_log = CaptureLog()
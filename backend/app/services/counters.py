@@ -0,0 +1,270 @@
+"""
+Counters Service
+Totals for the list endpoints, maintained incrementally by every write
+that adds, removes or re-statuses a live booking or (de)activates a service:
+
+- counters: "bookings", "bookings:<status>", "bookings:customer:<id>",
+  "bookings:customer:<id>:<status>", "services", "services:active"
+- booking_day_counts: live bookings per booking date and status, so a
+  date-range total sums a handful of index rows
+
+The consistency checker recomputes both tables from the source rows:
+    python -m app.services.counters            # report drift
+    python -m app.services.counters --repair   # rewrite drifted shards
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import current_tenant, dialect_insert, shard_router
+from ..models.booking import Booking, BookingStatus
+from ..models.counter import Counter, BookingDayCount
+from ..models.service import Service
+from ..models.tenant import tenant_filtered, tenant_params
+from ..models.user import User, UserRole
+
+
+COUNTER_VALUE = tenant_filtered(select(Counter.count).where(Counter.name == bindparam("name")), Counter)
+
+
+def booking_counter_names(customer_id: str, status: str) -> List[str]:
+    """Counters a live booking contributes to."""
+    status = BookingStatus(status).value
+    return [
+        "bookings",
+        f"bookings:{status}",
+        f"bookings:customer:{customer_id}",
+        f"bookings:customer:{customer_id}:{status}",
+    ]
+
+
+class CounterDeltas:
+    """Counter changes collected during a request, applied in two upserts."""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.days: Dict[Tuple[date, str], int] = defaultdict(int)
+
+    def add(self, name: str, delta: int):
+        self.counters[name] += delta
+
+    def booking(self, customer_id: str, booking_date: date, status: str, delta: int):
+        """A live booking appeared (delta=1) or left the live table (delta=-1)."""
+        for name in booking_counter_names(customer_id, status):
+            self.counters[name] += delta
+        self.days[(booking_date, BookingStatus(status).value)] += delta
+
+    def booking_moved(self, customer_id: str, booking_date: date, old_status: str, new_status: str):
+        """A live booking changed status."""
+        self.booking(customer_id, booking_date, old_status, -1)
+        self.booking(customer_id, booking_date, new_status, 1)
+
+    async def apply(self, db: AsyncSession, tenant_id: Optional[str] = None):
+        """Upsert the collected deltas in db's transaction."""
+        tenant_id = (
+            tenant_id
+            or db.sync_session.info.get("tenant_id")
+            or current_tenant.get()
+            or settings.DEFAULT_TENANT_ID
+        )
+        insert = dialect_insert(db)
+
+        counters = [
+            {"tenant_id": tenant_id, "name": name, "count": delta}
+            for name, delta in sorted(self.counters.items()) if delta
+        ]
+        if counters:
+            stmt = insert(Counter).values(counters)
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[Counter.tenant_id, Counter.name],
+                set_={"count": Counter.count + stmt.excluded.count}
+            ))
+
+        days = [
+            {"tenant_id": tenant_id, "booking_date": day, "status": status, "count": delta}
+            for (day, status), delta in sorted(self.days.items()) if delta
+        ]
+        if days:
+            stmt = insert(BookingDayCount).values(days)
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[BookingDayCount.tenant_id, BookingDayCount.booking_date, BookingDayCount.status],
+                set_={"count": BookingDayCount.count + stmt.excluded.count}
+            ))
+
+        self.counters.clear()
+        self.days.clear()
+
+
+class Counters:
+    """Service class for reading maintained totals."""
+
+    @staticmethod
+    async def get(db: AsyncSession, name: str) -> int:
+        """Current value of a counter in the session's tenant."""
+        result = await db.execute(COUNTER_VALUE, tenant_params(db, name=name))
+        return result.scalar() or 0
+
+    @staticmethod
+    async def booking_total(
+        db: AsyncSession,
+        current_user: User,
+        status_filter: Optional[BookingStatus] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Optional[int]:
+        """
+        Live booking total for a list filter, or None if no maintained
+        count covers it (a customer's date range; their sets are small).
+        """
+        is_customer = current_user.role == UserRole.CUSTOMER
+
+        if date_from or date_to:
+            if is_customer:
+                return None
+            query = select(func.coalesce(func.sum(BookingDayCount.count), 0))
+            if date_from:
+                query = query.where(BookingDayCount.booking_date >= date_from)
+            if date_to:
+                query = query.where(BookingDayCount.booking_date <= date_to)
+            if status_filter:
+                query = query.where(BookingDayCount.status == BookingStatus(status_filter).value)
+            return (await db.execute(query)).scalar()
+
+        name = f"bookings:customer:{current_user.id}" if is_customer else "bookings"
+        if status_filter:
+            name += f":{BookingStatus(status_filter).value}"
+        return await Counters.get(db, name)
+
+    @staticmethod
+    async def service_total(db: AsyncSession, active_only: bool) -> int:
+        """Number of services (or active services) in the session's tenant."""
+        return await Counters.get(db, "services:active" if active_only else "services")
+
+
+def booking_groups():
+    """Live bookings per (tenant_id, customer_id, status)."""
+    return (
+        select(Booking.tenant_id, Booking.customer_id, Booking.status, func.count())
+        .group_by(Booking.tenant_id, Booking.customer_id, Booking.status)
+    )
+
+
+def service_groups():
+    """Services per (tenant_id, is_active)."""
+    return select(Service.tenant_id, Service.is_active, func.count()).group_by(Service.tenant_id, Service.is_active)
+
+
+def expected_counters(booking_rows, service_rows) -> Dict[Tuple[str, str], int]:
+    """
+    {(tenant_id, name): count} recomputed from the rows of booking_groups()
+    and service_groups(). Names are composed here rather than in SQL, where
+    customer ids are binary.
+    """
+    expected: Dict[Tuple[str, str], int] = defaultdict(int)
+    for tenant_id, customer_id, status, count in booking_rows:
+        for name in booking_counter_names(customer_id, status):
+            expected[(tenant_id, name)] += count
+    for tenant_id, is_active, count in service_rows:
+        expected[(tenant_id, "services")] += count
+        if is_active:
+            expected[(tenant_id, "services:active")] += count
+    return dict(expected)
+
+
+def expected_day_counts():
+    """(tenant_id, booking_date, status, count) rows recomputed from bookings."""
+    return (
+        select(Booking.tenant_id, Booking.booking_date, Booking.status, func.count().label("count"))
+        .group_by(Booking.tenant_id, Booking.booking_date, Booking.status)
+    )
+
+
+def rebuild_statements(expected: Dict[Tuple[str, str], int]) -> list:
+    """
+    (statement, parameters) pairs that replace both counter tables with
+    recomputed values (all tenants); expected comes from expected_counters().
+    """
+    statements = [
+        (delete(Counter), None),
+        (delete(BookingDayCount), None),
+        (BookingDayCount.__table__.insert().from_select(
+            ["tenant_id", "booking_date", "status", "count"], expected_day_counts()
+        ), None),
+    ]
+    if expected:
+        statements.append((
+            Counter.__table__.insert(),
+            [{"tenant_id": tenant_id, "name": name, "count": count} for (tenant_id, name), count in expected.items()]
+        ))
+    return statements
+
+
+async def check_shard(shard: str, repair: bool = False) -> List[str]:
+    """
+    Compare a shard's counters with recomputed values.
+    Returns a description per drifted row; with repair, rewrites the tables.
+    """
+    async with shard_router.sessionmaker(shard)() as session:
+        if repair and session.bind.dialect.name == "postgresql":
+            # Writers that already changed bookings wait here and apply their delta after the rebuild
+            await session.execute(text("LOCK TABLE counters, booking_day_counts IN EXCLUSIVE MODE"))
+
+        expected = expected_counters(
+            (await session.execute(booking_groups())).all(),
+            (await session.execute(service_groups())).all()
+        )
+        actual = {(r.tenant_id, r.name): r.count for r in (await session.execute(select(Counter))).scalars()}
+        expected_days = {
+            (r[0], r[1], r[2]): r[3]
+            for r in (await session.execute(expected_day_counts())).all()
+        }
+        actual_days = {
+            (r.tenant_id, r.booking_date, r.status): r.count
+            for r in (await session.execute(select(BookingDayCount))).scalars()
+        }
+
+        drift = []
+        for label, want, have in (("counter", expected, actual), ("day count", expected_days, actual_days)):
+            for key in sorted(set(want) | set(have), key=str):
+                if want.get(key, 0) != have.get(key, 0):
+                    drift.append(f"{shard}: {label} {key}: stored {have.get(key, 0)}, actual {want.get(key, 0)}")
+
+        if repair and drift:
+            for stmt, params in rebuild_statements(expected):
+                await session.execute(stmt, params)
+            await session.commit()
+        else:
+            await session.rollback()
+
+    return drift
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Check list counters against the source tables")
+    parser.add_argument("--repair", action="store_true", help="Rewrite the counters of drifted shards")
+    args = parser.parse_args()
+
+    total = 0
+    for shard in shard_router.shard_names():
+        drift = await check_shard(shard, repair=args.repair)
+        total += len(drift)
+        for line in drift:
+            print(line)
+
+    if not total:
+        print("Counters are consistent")
+    elif args.repair:
+        print(f"Repaired {total} drifted counters")
+    else:
+        print(f"Found {total} drifted counters (run with --repair to fix)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
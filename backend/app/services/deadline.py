@@ -0,0 +1,125 @@
+"""
+Request Deadlines
+The deadline of the current request, set by DeadlineMiddleware, and its
+propagation into the database layer:
+
+- SQLite: a progress handler on every pooled connection interrupts the
+  running statement once the deadline passes or the request is cancelled
+  (it would otherwise keep running in the driver thread after the
+  request task is gone)
+- Postgres: SET LOCAL statement_timeout at the start of each transaction,
+  from the time left at that moment
+
+A statement stopped this way raises DeadlineExceeded (HTTP 504).
+"""
+
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..config import settings
+
+
+class Deadline:
+    """Point in time a request must finish by; cancelled when the client went away."""
+
+    __slots__ = ("expires_at", "cancelled")
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def lift(self):
+        """No limit from now on (the response has been sent)."""
+        self.expires_at = math.inf
+
+    @property
+    def expired(self) -> bool:
+        return self.cancelled or time.monotonic() >= self.expires_at
+
+
+class DeadlineExceeded(HTTPException):
+    """The request ran out of time."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Request deadline exceeded"
+        )
+
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+# Key of a SQLite connection's deadline slot in its pool record info
+SLOT_KEY = "deadline_slot"
+
+
+def _install_progress_handler(dbapi_connection, slot: list):
+    def interrupt() -> int:
+        deadline = slot[0]
+        return 1 if deadline is not None and deadline.expired else 0
+
+    if hasattr(dbapi_connection, "set_progress_handler"):  # pysqlite
+        dbapi_connection.set_progress_handler(interrupt, settings.SQLITE_PROGRESS_STEPS)
+    else:  # aiosqlite adapter: the handler is registered in the driver thread
+        dbapi_connection.await_(
+            dbapi_connection.driver_connection.set_progress_handler(interrupt, settings.SQLITE_PROGRESS_STEPS)
+        )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _arm_deadline(conn, cursor, statement, parameters, context, executemany):
+    deadline = current_deadline.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded()
+    if conn.dialect.name != "sqlite":
+        return
+    slot = conn.info.get(SLOT_KEY)
+    if slot is None:
+        if deadline is None:
+            return
+        slot = conn.info[SLOT_KEY] = [None]
+        _install_progress_handler(conn.connection.dbapi_connection, slot)
+    slot[0] = deadline
+
+
+def _disarm(conn):
+    slot = conn.info.get(SLOT_KEY)
+    if slot is not None:
+        slot[0] = None  # never interrupt a later COMMIT or another request's statement
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _disarm_after_execute(conn, cursor, statement, parameters, context, executemany):
+    _disarm(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _translate_interrupt(context):
+    if context.connection is not None:
+        _disarm(context.connection)
+    deadline = current_deadline.get()
+    if deadline is None or not deadline.expired:
+        return None
+    message = str(context.original_exception).lower()
+    if "interrupted" in message or "statement timeout" in message:
+        return DeadlineExceeded()
+    return None
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    deadline = current_deadline.get()
+    if deadline is None or connection.dialect.name != "postgresql" or deadline.remaining() == math.inf:
+        return
+    milliseconds = max(int(deadline.remaining() * 1000), 1)
+    connection.execute(text(f"SET LOCAL statement_timeout = {milliseconds}"))
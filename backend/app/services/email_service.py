@@ -3,18 +3,40 @@ Email Service
 Handles sending email notifications for bookings.
 """
 
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
-from jinja2 import Template
+from typing import Dict, List, Optional
 
 from ..config import settings
 
 
+READY_FOR_DELIVERY_SUBJECT = "Your Bike is Ready for Pickup! 🏍️"
+
+
 class EmailService:
     """Service class for sending email notifications."""
     
+    @staticmethod
+    def build_message(
+        to_email: str,
+        subject: str,
+        html_content: str,
+        plain_content: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Build a multipart email with optional plain text and HTML parts."""
+        message = MIMEMultipart("alternative")
+        message["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM_EMAIL}>"
+        message["To"] = to_email
+        message["Subject"] = subject
+        
+        # Add plain text version
+        if plain_content:
+            message.attach(MIMEText(plain_content, "plain"))
+        
+        # Add HTML version
+        message.attach(MIMEText(html_content, "html"))
+        return message
+    
     @staticmethod
     async def send_email(
         to_email: str,
@@ -31,19 +53,10 @@ class EmailService:
             return False
         
         try:
-            message = MIMEMultipart("alternative")
-            message["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM_EMAIL}>"
-            message["To"] = to_email
-            message["Subject"] = subject
+            message = EmailService.build_message(to_email, subject, html_content, plain_content)
             
-            # Add plain text version
-            if plain_content:
-                message.attach(MIMEText(plain_content, "plain"))
-            
-            # Add HTML version
-            message.attach(MIMEText(html_content, "html"))
-            
-            # Send email
+            # Send email (aiosmtplib is imported on first send, not at startup)
+            import aiosmtplib
             await aiosmtplib.send(
                 message,
                 hostname=settings.SMTP_HOST,
@@ -60,6 +73,41 @@ class EmailService:
             print(f"[EMAIL] Failed to send to {to_email}: {str(e)}")
             return False
     
+    @staticmethod
+    async def send_emails(messages: List[MIMEMultipart]) -> int:
+        """
+        Send several emails over a single SMTP connection.
+        Returns the number of emails sent.
+        """
+        if not messages:
+            return 0
+        if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
+            for message in messages:
+                print(f"[EMAIL] SMTP not configured. Would send to {message['To']}: {message['Subject']}")
+            return 0
+        
+        import aiosmtplib
+        sent = 0
+        try:
+            async with aiosmtplib.SMTP(
+                hostname=settings.SMTP_HOST,
+                port=settings.SMTP_PORT,
+                start_tls=settings.SMTP_TLS,
+                username=settings.SMTP_USER,
+                password=settings.SMTP_PASSWORD
+            ) as smtp:
+                for message in messages:
+                    try:
+                        await smtp.send_message(message)
+                        sent += 1
+                    except aiosmtplib.SMTPRecipientsRefused as e:
+                        print(f"[EMAIL] Failed to send to {message['To']}: {str(e)}")
+        except Exception as e:
+            print(f"[EMAIL] Batch failed after {sent} of {len(messages)} emails: {str(e)}")
+        
+        print(f"[EMAIL] Sent {sent} of {len(messages)} emails in one batch")
+        return sent
+    
     @staticmethod
     async def send_verification_email(to_email: str, name: str, token: str) -> bool:
         """Send email verification email."""
@@ -183,7 +231,32 @@ class EmailService:
         booking_id: str
     ) -> bool:
         """Send notification when bike is ready for delivery."""
-        html_content = f"""
+        return await EmailService.send_email(
+            to_email=to_email,
+            subject=READY_FOR_DELIVERY_SUBJECT,
+            html_content=EmailService.ready_for_delivery_html(customer_name, booking_id)
+        )
+    
+    @staticmethod
+    async def send_ready_for_delivery_batch(notifications: List[Dict[str, str]]) -> int:
+        """
+        Send ready-for-delivery notifications for many bookings in one job.
+        Each notification has to_email, customer_name and booking_id.
+        """
+        messages = [
+            EmailService.build_message(
+                n["to_email"],
+                READY_FOR_DELIVERY_SUBJECT,
+                EmailService.ready_for_delivery_html(n["customer_name"], n["booking_id"])
+            )
+            for n in notifications
+        ]
+        return await EmailService.send_emails(messages)
+    
+    @staticmethod
+    def ready_for_delivery_html(customer_name: str, booking_id: str) -> str:
+        """HTML body of the ready-for-delivery notification."""
+        return f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -216,12 +289,56 @@ class EmailService:
         </body>
         </html>
         """
-        
-        return await EmailService.send_email(
-            to_email=to_email,
-            subject="Your Bike is Ready for Pickup! 🏍️",
-            html_content=html_content
-        )
+    
+    @staticmethod
+    async def send_booking_reminders(reminders: List[Dict[str, str]]) -> int:
+        """
+        Send day-before reminders for many bookings over one connection.
+        Each reminder has to_email, customer_name, booking_id and booking_date.
+        """
+        messages = [
+            EmailService.build_message(
+                r["to_email"],
+                f"Reminder: Your Bike Service is Tomorrow - {r['booking_date']}",
+                EmailService.booking_reminder_html(r["customer_name"], r["booking_id"], r["booking_date"])
+            )
+            for r in reminders
+        ]
+        return await EmailService.send_emails(messages)
+    
+    @staticmethod
+    def booking_reminder_html(customer_name: str, booking_id: str, booking_date: str) -> str:
+        """HTML body of the day-before booking reminder."""
+        return f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+                .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>📅 See You Tomorrow!</h1>
+                </div>
+                <div class="content">
+                    <h2>Hello, {customer_name}!</h2>
+                    <p>This is a reminder that your bike service is booked for <strong>{booking_date}</strong>.</p>
+                    <p><strong>Booking Reference:</strong> {booking_id[:8]}...</p>
+                    <p>If you can no longer make it, please cancel the booking in the app.</p>
+                </div>
+                <div class="footer">
+                    <p>© 2024 Bike Service Station. All rights reserved.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
     
     @staticmethod
     async def send_new_booking_to_owner(
@@ -0,0 +1,141 @@
+"""
+HTTP Cache Helpers
+Weak ETags and conditional GET handling for polled endpoints, and
+cacheable file responses with byte-range support.
+"""
+
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+
+FILE_CHUNK = 64 * 1024
+
+
+def weak_etag(*parts: Any) -> str:
+    """Build a weak ETag from the values that determine a response."""
+    digest = hashlib.blake2b(
+        "|".join("" if p is None else str(p) for p in parts).encode(),
+        digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of If-None-Match against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def cache_headers(etag: str) -> dict:
+    """Headers for per-user responses that clients must revalidate."""
+    return {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization"
+    }
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching conditional GET."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single-range Range header; None to send the
+    whole file (no header, multiple ranges or an unparsable one).
+    Raises 416 for a range outside the file.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:  # suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+
+async def _file_chunks(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(f.read, min(FILE_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def immutable_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    etag: str,
+    last_modified: datetime,
+    cache_control: str = "private, max-age=31536000, immutable"
+) -> Response:
+    """
+    Stream a per-user file that never changes once written: cached by the
+    client for a year, 304 for a matching If-None-Match, 206 for a Range
+    request (unless an If-Range no longer matches). A URL whose file may be
+    replaced by a newer one passes cache_control="private, no-cache".
+    """
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    size = os.path.getsize(path)
+    requested = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    span = byte_range(requested, size) if not if_range or if_range == etag else None
+    if span is None:
+        start, end, status_code = 0, size - 1, status.HTTP_200_OK
+    else:
+        (start, end), status_code = span, status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(path, start, end - start + 1),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
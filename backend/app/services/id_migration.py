@@ -0,0 +1,289 @@
+"""
+Binary Id Migration
+Converts a shard's uuid columns from 36-character text (schema v7) to the
+compact storage of schema v8 (app/models/types.py).
+
+SQLite shards are converted online, while the v7 application keeps
+serving from the text tables:
+
+1. prepare: triggers on the live tables log the id of every row written
+   from now on; a shadow table <name>__v8 is created per table
+2. copy: rows are copied into the shadow tables in keyset batches of
+   ID_MIGRATION_BATCH_SIZE, one short transaction each (an interrupted
+   copy resumes where its shadow table ends)
+3. catch up: rows written meanwhile are re-copied from the log
+4. swap: in one transaction, the rest of the log is replayed, the live
+   tables are replaced by the shadow tables, their indexes are built and
+   the schema version becomes 8; deploy the v8 application right after
+
+Postgres shards created from database/schema.sql already use uuid columns;
+shards created by the application have their columns altered in place by
+the v8 migration step. A SQLite shard that was not converted beforehand is
+converted by the v8 step too, offline in the startup transaction.
+
+    python -m app.services.id_migration            # convert every v7 SQLite shard
+    python -m app.services.id_migration --no-swap  # prepare, copy and catch up only
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import (
+    Column, Integer, MetaData, String, Table, column, func, inspect, select, table as table_clause, text, type_coerce
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateTable
+
+from .. import models  # noqa: F401  (registers every table)
+from ..config import settings
+from ..database import Base, shard_router
+from ..migrations import get_stored_version, schema_version_table
+from ..models.types import UUIDKey
+
+
+BINARY_IDS_VERSION = 8  # later steps run at the next startup
+SHADOW_SUFFIX = "__v8"
+TRIGGER_PREFIX = "id_migration_"
+TRIGGER_EVENTS = {"INSERT": ["NEW"], "UPDATE": ["OLD", "NEW"], "DELETE": ["OLD"]}
+
+# Ids of rows written to a live table since prepare(), filled by triggers
+migration_log = Table(
+    "id_migration_log",
+    MetaData(),
+    Column("seq", Integer, primary_key=True),
+    Column("table_name", String(64), nullable=False),
+    Column("row_id", String(36), nullable=False),
+)
+
+
+def uuid_tables() -> List[Table]:
+    """Tables with uuid columns, parents before children."""
+    return [t for t in Base.metadata.sorted_tables if any(isinstance(c.type, UUIDKey) for c in t.columns)]
+
+
+def _key(table: Table) -> Column:
+    (key,) = table.primary_key.columns
+    return key
+
+
+def _as_text(col):
+    """A uuid column of a v7 (text) table, compared as the text it holds."""
+    return type_coerce(col, String)
+
+
+def _live_columns(conn: Connection, table: Table) -> list:
+    """Model columns present in the live table (columns of later versions are added after v8)."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    return [c for c in table.columns if c.name in existing]
+
+
+def _shadow(table: Table):
+    return table_clause(table.name + SHADOW_SUFFIX, *[column(c.name, c.type) for c in table.columns])
+
+
+def prepare(conn: Connection) -> List[Table]:
+    """Create the log, the triggers and the missing shadow tables; returns the tables to convert."""
+    existing = set(inspect(conn).get_table_names())
+    migration_log.create(conn, checkfirst=True)
+
+    tables = [t for t in uuid_tables() if t.name in existing]
+    for table in tables:
+        key = _key(table).name
+        for event, rows in TRIGGER_EVENTS.items():
+            values = ", ".join(f"('{table.name}', {row}.{key})" for row in rows)
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}{table.name}_{event.lower()} "
+                f"AFTER {event} ON {table.name} "
+                f"BEGIN INSERT INTO {migration_log.name} (table_name, row_id) VALUES {values}; END"
+            ))
+        if table.name + SHADOW_SUFFIX not in existing:
+            # Same definition as the model's table; indexes are built after the swap
+            ddl = str(CreateTable(table).compile(dialect=conn.dialect))
+            conn.execute(text(ddl.replace(
+                f"CREATE TABLE {table.name} (", f"CREATE TABLE {table.name}{SHADOW_SUFFIX} (", 1
+            )))
+    return tables
+
+
+def resume_point(conn: Connection, table: Table) -> str:
+    """Text id the copy of a table continues after ("" for a fresh copy)."""
+    shadow = _shadow(table)
+    last = conn.execute(select(func.max(shadow.c[_key(table).name]))).scalar()
+    return last or ""
+
+
+def copy_batch(conn: Connection, table: Table, after: str) -> Tuple[int, str]:
+    """Copy the next batch of rows after a text id; returns (rows copied, last id)."""
+    key = _key(table)
+    rows = conn.execute(
+        select(*_live_columns(conn, table))
+        .where(_as_text(key) > after)
+        .order_by(_as_text(key))
+        .limit(settings.ID_MIGRATION_BATCH_SIZE)
+    ).mappings().all()
+    if not rows:
+        return 0, after
+    conn.execute(_shadow(table).insert().prefix_with("OR REPLACE"), [dict(row) for row in rows])
+    return len(rows), rows[-1][key.name]
+
+
+def replay_log(conn: Connection, limit: int) -> int:
+    """Re-copy (or drop) the rows of up to limit log entries; returns the entries handled."""
+    entries = conn.execute(
+        select(migration_log.c.seq, migration_log.c.table_name, migration_log.c.row_id)
+        .order_by(migration_log.c.seq)
+        .limit(limit)
+    ).all()
+    if not entries:
+        return 0
+
+    changed = defaultdict(set)
+    for entry in entries:
+        changed[entry.table_name].add(entry.row_id)
+    for table in uuid_tables():
+        ids = changed.get(table.name)
+        if not ids:
+            continue
+        key, shadow = _key(table), _shadow(table)
+        conn.execute(shadow.delete().where(shadow.c[key.name].in_(ids)))
+        rows = conn.execute(select(*_live_columns(conn, table)).where(_as_text(key).in_(ids))).mappings().all()
+        if rows:
+            conn.execute(shadow.insert(), [dict(row) for row in rows])
+
+    conn.execute(migration_log.delete().where(migration_log.c.seq <= entries[-1].seq))
+    return len(entries)
+
+
+def swap(conn: Connection):
+    """Replay the rest of the log and put the shadow tables in place of the live ones."""
+    existing = set(inspect(conn).get_table_names())
+    tables = [t for t in uuid_tables() if t.name + SHADOW_SUFFIX in existing]
+
+    while replay_log(conn, settings.ID_MIGRATION_BATCH_SIZE):
+        pass
+    for table in tables:
+        for event in TRIGGER_EVENTS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {TRIGGER_PREFIX}{table.name}_{event.lower()}"))
+    migration_log.drop(conn)
+
+    for table in reversed(tables):
+        conn.execute(text(f"DROP TABLE {table.name}"))
+    for table in tables:
+        conn.execute(text(f"ALTER TABLE {table.name}{SHADOW_SUFFIX} RENAME TO {table.name}"))
+        for index in table.indexes:
+            index.create(conn)
+
+
+def convert_sqlite(conn: Connection):
+    """All phases in the caller's transaction (the offline path of the v8 migration step)."""
+    for table in prepare(conn):
+        after = resume_point(conn, table)
+        while True:
+            copied, after = copy_batch(conn, table, after)
+            if copied < settings.ID_MIGRATION_BATCH_SIZE:
+                break
+    swap(conn)
+
+
+def convert_postgres(conn: Connection):
+    """ALTER text uuid columns to uuid; foreign keys are dropped around the change."""
+    inspector = inspect(conn)
+    tables = [t for t in uuid_tables() if inspector.has_table(t.name)]
+    text_columns = [
+        (table.name, c["name"])
+        for table in tables
+        for c in inspector.get_columns(table.name)
+        if isinstance(table.c[c["name"]].type, UUIDKey) and c["type"].__class__.__name__ != "UUID"
+    ]
+    if not text_columns:
+        return
+
+    foreign_keys = [(table.name, fk) for table in tables for fk in inspector.get_foreign_keys(table.name)]
+    for table_name, fk in foreign_keys:
+        conn.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{fk["name"]}"'))
+    for table_name, name in text_columns:
+        conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {name} TYPE uuid USING {name}::uuid"))
+    for table_name, fk in foreign_keys:
+        on_delete = fk.get("options", {}).get("ondelete")
+        conn.execute(text(
+            f'ALTER TABLE {table_name} ADD CONSTRAINT "{fk["name"]}" '
+            f'FOREIGN KEY ({", ".join(fk["constrained_columns"])}) '
+            f'REFERENCES {fk["referred_table"]} ({", ".join(fk["referred_columns"])})'
+            + (f" ON DELETE {on_delete}" if on_delete else "")
+        ))
+
+
+def convert(conn: Connection):
+    """Convert a shard's uuid columns in the caller's transaction."""
+    if conn.dialect.name == "postgresql":
+        convert_postgres(conn)
+    else:
+        convert_sqlite(conn)
+
+
+def finish(conn: Connection):
+    """The swap transaction of the online path; the version update takes the write lock first."""
+    conn.execute(schema_version_table.update().values(version=BINARY_IDS_VERSION, applied_at=datetime.utcnow()))
+    swap(conn)
+
+
+async def migrate_shard(shard: str, swap_tables: bool = True) -> str:
+    """Convert one shard online; returns a short description of the outcome."""
+    engine = shard_router.engine(shard)
+    async with engine.connect() as conn:
+        version = await conn.run_sync(get_stored_version)
+    if version is None or version >= BINARY_IDS_VERSION:
+        return "already uses binary ids"
+    if version < BINARY_IDS_VERSION - 1:
+        return f"schema v{version}; migrate it to v{BINARY_IDS_VERSION - 1} first (start the v{BINARY_IDS_VERSION - 1} application once)"
+    if engine.dialect.name == "postgresql":
+        return "Postgres shards are converted by the v8 migration step at startup"
+
+    async with engine.begin() as conn:
+        tables = await conn.run_sync(prepare)
+
+    for table in tables:
+        async with engine.connect() as conn:
+            after = await conn.run_sync(resume_point, table)
+        total = 0
+        while True:
+            async with engine.begin() as conn:
+                copied, after = await conn.run_sync(copy_batch, table, after)
+            total += copied
+            if copied < settings.ID_MIGRATION_BATCH_SIZE:
+                break
+            # Let live requests get the database between batches
+            await asyncio.sleep(settings.ID_MIGRATION_BATCH_PAUSE_SECONDS)
+        print(f"Shard '{shard}': copied {total} rows of {table.name}")
+
+    while True:
+        async with engine.begin() as conn:
+            replayed = await conn.run_sync(replay_log, settings.ID_MIGRATION_BATCH_SIZE)
+        if replayed < settings.ID_MIGRATION_BATCH_SIZE:
+            break
+
+    if not swap_tables:
+        return "copied; triggers keep the shadow tables current until the swap"
+    async with engine.begin() as conn:
+        await conn.run_sync(finish)
+    return f"converted to schema v{BINARY_IDS_VERSION} (VACUUM returns the old tables' pages to the filesystem)"
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Convert text uuid columns to binary, online")
+    parser.add_argument("--no-swap", action="store_true", help="Stop before replacing the live tables")
+    args = parser.parse_args()
+
+    try:
+        for shard in shard_router.shard_names():
+            outcome = await migrate_shard(shard, swap_tables=not args.no_swap)
+            print(f"Shard '{shard}': {outcome}")
+    finally:
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
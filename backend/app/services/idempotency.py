@@ -0,0 +1,238 @@
+"""
+Idempotency Service
+Idempotency-Key support for mutating endpoints.
+A retried request gets the stored response of the first attempt at the cost
+of one key lookup, instead of re-running inserts and emails. Concurrent
+duplicates wait for the first attempt to finish. Expired records are
+deleted by the idempotency_purge job (services/jobs.py).
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, Header, HTTPException, Request, Response, status
+from pydantic import BaseModel
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import tenant_session
+from ..models.idempotency import IdempotencyRecord
+from ..models.user import User
+from .auth_service import get_current_user
+
+
+# Requests in flight in this worker, so local duplicates wait on an event instead of polling
+_inflight: Dict[Tuple[str, str], asyncio.Event] = {}
+
+# Poll interval while a duplicate in another worker is in flight
+POLL_INTERVAL = 0.1
+
+
+class IdempotencyGuard:
+    """
+    Per-request handle returned by the idempotency_guard dependency.
+    If `replay` is set, the route must return it without doing any work.
+    Otherwise the route calls `save()` with its response before returning.
+    """
+
+    def __init__(
+        self,
+        key: Optional[str] = None,
+        user_id: Optional[str] = None,
+        method: str = "",
+        path: str = "",
+        request_hash: str = ""
+    ):
+        self.key = key
+        self.user_id = user_id
+        self.method = method
+        self.path = path
+        self.request_hash = request_hash
+        self.record_id: Optional[str] = None
+        self.replay: Optional[Response] = None
+        self.completed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.key is not None
+
+    @property
+    def scope(self) -> Tuple[str, str]:
+        return (self.user_id, self.key)
+
+    async def acquire(self):
+        """Claim the key, or load the stored response, or wait for the in-flight duplicate."""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            now = datetime.utcnow()
+            record = await self._lookup()
+
+            if record is not None and record.expires_at <= now:
+                await self._delete(record.id)
+                record = None
+
+            if record is None:
+                if await self._claim(now):
+                    return
+                continue  # Lost the race to another request, re-read its claim
+
+            if record.request_hash != self.request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request"
+                )
+
+            if record.is_complete:
+                self.replay = Response(
+                    content=record.response_body,
+                    status_code=record.status_code,
+                    media_type="application/json" if record.response_body else None,
+                    headers={"Idempotent-Replayed": "true"}
+                )
+                return
+
+            if record.locked_until <= now and await self._take_over(record.id, now):
+                return  # The first attempt died without finishing
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "1"}
+                )
+
+            event = _inflight.get(self.scope)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+
+    async def save(self, db: AsyncSession, status_code: int, body: Optional[BaseModel] = None):
+        """
+        Store the response in the request's transaction and commit it,
+        so the response is persisted atomically with the work it describes.
+        """
+        if not self.enabled:
+            return
+        await db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.id == self.record_id)
+            .values(
+                status_code=status_code,
+                response_body=body.model_dump_json() if body is not None else None
+            )
+        )
+        await db.commit()
+        self.completed = True
+        self._wake()
+
+    async def release(self):
+        """Drop an unfinished claim so a retry can run the request again."""
+        if self.record_id and not self.completed:
+            await self._delete(self.record_id)
+        self._wake()
+
+    def _wake(self):
+        event = _inflight.pop(self.scope, None)
+        if event is not None:
+            event.set()
+
+    async def _lookup(self) -> Optional[IdempotencyRecord]:
+        async with tenant_session() as session:
+            result = await session.execute(
+                select(IdempotencyRecord).where(
+                    IdempotencyRecord.user_id == self.user_id,
+                    IdempotencyRecord.key == self.key
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def _claim(self, now: datetime) -> bool:
+        record = IdempotencyRecord(
+            key=self.key,
+            user_id=self.user_id,
+            method=self.method,
+            path=self.path,
+            request_hash=self.request_hash,
+            locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+        )
+        async with tenant_session() as session:
+            session.add(record)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return False
+        self.record_id = record.id
+        _inflight[self.scope] = asyncio.Event()
+        return True
+
+    async def _take_over(self, record_id: str, now: datetime) -> bool:
+        async with tenant_session() as session:
+            result = await session.execute(
+                update(IdempotencyRecord)
+                .where(
+                    IdempotencyRecord.id == record_id,
+                    IdempotencyRecord.status_code.is_(None),
+                    IdempotencyRecord.locked_until <= now
+                )
+                .values(locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS))
+            )
+            await session.commit()
+        if result.rowcount != 1:
+            return False
+        self.record_id = record_id
+        _inflight[self.scope] = asyncio.Event()
+        return True
+
+    @staticmethod
+    async def _delete(record_id: str):
+        async with tenant_session() as session:
+            await session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.id == record_id))
+            await session.commit()
+
+
+async def idempotency_guard(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """
+    Dependency adding Idempotency-Key support to a mutating route.
+    Requests without the header are processed normally.
+    """
+    if not idempotency_key:
+        yield IdempotencyGuard()
+        return
+
+    body = await request.body()
+    request_hash = hashlib.sha256(
+        request.method.encode() + b" " + request.url.path.encode() + b"\n" + body
+    ).hexdigest()
+
+    guard = IdempotencyGuard(
+        key=idempotency_key,
+        user_id=str(current_user.id),
+        method=request.method,
+        path=request.url.path,
+        request_hash=request_hash
+    )
+    await guard.acquire()
+
+    try:
+        yield guard
+    finally:
+        if guard.replay is None and not guard.completed:
+            await guard.release()
+
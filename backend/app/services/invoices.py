@@ -0,0 +1,452 @@
+"""
+Invoices
+Every booking that reaches "completed" gets an invoice: its services at
+the price they were booked for (booking_services.service_price) and the
+booking's total_price, as an HTML document and a plain-text one.
+
+Rendering never runs in the request that completes the booking: the
+status change records the booking in its session, and once the
+transaction commits the booking joins the in-process queue of the
+invoice renderer, whose INVOICE_WORKERS background tasks load the
+booking, render the documents in a thread and store the invoice row.
+A booking whose invoice was never rendered (queue full, worker stopped)
+is rendered when the invoice is first downloaded, or by the backfill:
+    python -m app.services.invoices backfill
+
+Documents are stored once under their content hash, in
+INVOICE_DIR/<hash[:2]>/<hash>.html|.txt, and served from disk; an
+invoice's documents never change, so downloads are cacheable for good.
+Monthly exports for owners (a zip of the month's documents plus a CSV)
+are cached in INVOICE_DIR/exports under a hash of the invoices they
+hold, and rebuilt only when the month gains an invoice:
+    python -m app.services.invoices export --tenant default --month 2024-05 --output may.zip
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import os
+import shutil
+import zipfile
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, event, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from ..config import settings
+from ..database import BASE_DIR, dialect_insert, shard_router, tenant_session
+from ..models.archive import ArchivedBooking, ArchivedBookingService
+from ..models.booking import Booking, BookingService, BookingStatus
+from ..models.invoice import Invoice
+from ..models.tenant import tenant_filtered, tenant_params
+from ..models.types import new_id
+from ..models.user import User
+from .metrics import metrics
+
+
+# Bookings of a session completed in its transaction, queued once it commits
+PENDING_KEY = "invoices_pending"
+
+# format -> (media type, file suffix); the response adds charset=utf-8
+FORMATS = {
+    "html": ("text/html", ".html"),
+    "text": ("text/plain", ".txt"),
+}
+
+metrics.describe("invoices_issued_total", "Invoices rendered and stored")
+metrics.describe("invoices_dropped_total", "Completed bookings not queued for an invoice because the queue was full")
+metrics.describe("invoices_queued", "Completed bookings waiting for their invoice")
+metrics.describe("invoice_render_seconds_total", "Time spent rendering and storing invoice documents")
+metrics.describe("invoice_exports_built_total", "Monthly invoice exports built (not served from the cache)")
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Invoice {{ number }}</title>
+<style>
+body { font-family: Arial, sans-serif; color: #333; max-width: 700px; margin: 40px auto; }
+table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+th, td { padding: 8px; border-bottom: 1px solid #eee; text-align: left; }
+td.price, th.price { text-align: right; }
+tr.total td { font-weight: bold; border-bottom: none; }
+</style>
+</head>
+<body>
+<h1>{{ station }}</h1>
+<h2>Invoice {{ number }}</h2>
+<p>
+Issued: {{ issued_at.strftime("%Y-%m-%d") }}<br>
+Booking: {{ booking_id }} (service date {{ booking_date }})
+</p>
+<p>
+Billed to:<br>
+{{ customer_name }}<br>
+{{ customer_email }}<br>
+{{ customer_phone }}
+</p>
+<table>
+<tr><th>Service</th><th class="price">Price</th></tr>
+{% for line in lines %}
+<tr><td>{{ line.name }}</td><td class="price">{{ "%.2f"|format(line.price) }}</td></tr>
+{% endfor %}
+<tr class="total"><td>Total</td><td class="price">{{ "%.2f"|format(total) }}</td></tr>
+</table>
+</body>
+</html>
+"""
+
+TEXT_TEMPLATE = """{{ station }}
+Invoice {{ number }}
+
+Issued:    {{ issued_at.strftime("%Y-%m-%d") }}
+Booking:   {{ booking_id }} (service date {{ booking_date }})
+Billed to: {{ customer_name }} <{{ customer_email }}>, {{ customer_phone }}
+
+{% for line in lines %}
+{{ "%-50s"|format(line.name[:50]) }} {{ "%10.2f"|format(line.price) }}
+{% endfor %}
+{{ "-" * 61 }}
+{{ "%-50s"|format("Total") }} {{ "%10.2f"|format(total) }}
+"""
+
+
+@lru_cache(maxsize=None)
+def invoice_template(format: str):
+    """
+    Compiled template of an invoice format, built on first use.
+    jinja2 is imported lazily: only the invoice renderer needs it.
+    """
+    from jinja2 import Environment
+    source, autoescape = {"html": (HTML_TEMPLATE, True), "text": (TEXT_TEMPLATE, False)}[format]
+    return Environment(autoescape=autoescape, trim_blocks=True, lstrip_blocks=True).from_string(source)
+
+
+# A booking with its customer and booked services, live and archived
+BOOKING_FOR_INVOICE = {
+    model: select(model).options(
+        selectinload(model.customer),
+        selectinload(model.booking_services).selectinload(link_model.service)
+    ).where(model.id == bindparam("booking_id"))
+    for model, link_model in ((Booking, BookingService), (ArchivedBooking, ArchivedBookingService))
+}
+INVOICE_OF_BOOKING = tenant_filtered(
+    select(Invoice).where(Invoice.booking_id == bindparam("booking_id")),
+    Invoice
+)
+# Invoices issued in a month with their customer, in issue order (ix_invoices_tenant_issued)
+MONTH_INVOICES = tenant_filtered(
+    select(Invoice, User.name, User.email)
+    .outerjoin(User, User.id == Invoice.customer_id)
+    .where(Invoice.issued_at >= bindparam("start"), Invoice.issued_at < bindparam("end"))
+    .order_by(Invoice.issued_at, Invoice.number),
+    Invoice
+)
+
+
+def invoice_dir() -> str:
+    return settings.INVOICE_DIR or os.path.join(BASE_DIR, "invoices")
+
+
+def document_path(sha256: str, format: str) -> str:
+    return os.path.join(invoice_dir(), sha256[:2], sha256 + FORMATS[format][1])
+
+
+def invoice_number(booking_id, issued_at: datetime) -> str:
+    """Stable number of a booking's invoice: issue month and the booking id's random tail."""
+    return f"INV-{issued_at:%Y%m}-{str(booking_id).replace('-', '')[-8:].upper()}"
+
+
+def invoice_data(booking) -> dict:
+    """Everything an invoice shows, taken from a completed (live or archived) booking."""
+    issued_at = booking.updated_at or booking.created_at or datetime.utcnow()
+    return {
+        "station": settings.APP_NAME,
+        "number": invoice_number(booking.id, issued_at),
+        "issued_at": issued_at,
+        "booking_id": str(booking.id),
+        "booking_date": booking.booking_date.isoformat(),
+        "customer_id": booking.customer_id,
+        "customer_name": booking.customer.name if booking.customer else "",
+        "customer_email": booking.customer.email if booking.customer else "",
+        "customer_phone": booking.customer.phone if booking.customer else "",
+        "lines": sorted(
+            ({"name": bs.service.name if bs.service else "Service", "price": bs.service_price}
+             for bs in booking.booking_services),
+            key=lambda line: (line["name"], line["price"])
+        ),
+        "total": booking.total_price,
+    }
+
+
+def store_document(content: bytes, format: str) -> str:
+    """Write a document under its content hash unless it is stored already; returns the hash."""
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = document_path(sha256, format)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part_path = f"{path}.{os.getpid()}.part"
+        with open(part_path, "wb") as f:
+            f.write(content)
+        os.replace(part_path, path)
+    return sha256
+
+
+def render_documents(data: dict) -> Tuple[str, str]:
+    """Render and store an invoice's HTML and text documents (blocking; run it in a thread)."""
+    html = invoice_template("html").render(**data).encode()
+    text = invoice_template("text").render(**data).encode()
+    return store_document(html, "html"), store_document(text, "text")
+
+
+def request_invoice(db: AsyncSession, tenant_id: str, booking_id):
+    """Queue the invoice of a booking completed in db's transaction, once the transaction commits."""
+    db.sync_session.info.setdefault(PENDING_KEY, []).append((tenant_id, str(booking_id)))
+
+
+async def issue_invoice(tenant_id: str, booking_id) -> Optional[Invoice]:
+    """
+    Render and store the invoice of a completed booking; returns the
+    existing invoice if it has one, None if the booking is not completed.
+    """
+    async with tenant_session(tenant_id) as session:
+        existing = await session.execute(INVOICE_OF_BOOKING, tenant_params(session, booking_id=booking_id))
+        invoice = existing.scalar_one_or_none()
+        if invoice is not None:
+            return invoice
+
+        for query in BOOKING_FOR_INVOICE.values():
+            booking = (await session.execute(query, {"booking_id": booking_id})).scalar_one_or_none()
+            if booking is not None:
+                break
+        if booking is None or booking.status != BookingStatus.COMPLETED.value:
+            return None
+
+        data = invoice_data(booking)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        html_sha256, text_sha256 = await asyncio.to_thread(render_documents, data)
+        metrics.increment("invoice_render_seconds_total", loop.time() - started)
+
+        row = {
+            "tenant_id": tenant_id,
+            "booking_id": booking.id,
+            "customer_id": data["customer_id"],
+            "number": data["number"],
+            "issued_at": data["issued_at"],
+            "total": data["total"],
+            "html_sha256": html_sha256,
+            "text_sha256": text_sha256,
+        }
+        # A concurrent render of the same booking (download while queued) keeps the first row
+        inserted = await session.execute(
+            dialect_insert(session)(Invoice).values(id=new_id(), **row)
+            .on_conflict_do_nothing(index_elements=[Invoice.tenant_id, Invoice.booking_id])
+        )
+        await session.commit()
+        if inserted.rowcount:
+            metrics.increment("invoices_issued_total")
+        result = await session.execute(INVOICE_OF_BOOKING, tenant_params(session, booking_id=booking.id))
+        return result.scalar_one()
+
+
+class InvoiceRenderer:
+    """Renders the invoices of completed bookings in background tasks, off the request path."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None  # created by start()
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Set[Tuple[str, str]] = set()  # queued or being rendered
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(settings.INVOICE_QUEUE_MAX)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(settings.INVOICE_WORKERS)]
+
+    async def stop(self):
+        """Stop the workers; bookings still queued are rendered on download or by the backfill."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+        metrics.set("invoices_queued", 0)
+
+    def enqueue(self, bookings: List[Tuple[str, str]]) -> int:
+        """
+        Queue (tenant, booking id) pairs for rendering. Returns how many
+        are queued or already being rendered: none before start(), fewer
+        than given when the queue is full.
+        """
+        if self._queue is None:
+            return 0
+        accepted = 0
+        for item in bookings:
+            if item in self._pending:
+                accepted += 1
+                continue
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                metrics.increment("invoices_dropped_total")
+                continue
+            self._pending.add(item)
+            accepted += 1
+        metrics.set("invoices_queued", self._queue.qsize())
+        return accepted
+
+    async def wait(self):
+        """Wait until the bookings queued so far have their invoice."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await issue_invoice(*item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[INVOICES] Could not issue the invoice of booking {item[1]}: {str(e)}")
+            finally:
+                self._pending.discard(item)
+                self._queue.task_done()
+                metrics.set("invoices_queued", self._queue.qsize())
+
+
+invoice_renderer = InvoiceRenderer()
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_completed_bookings(session):
+    bookings = session.info.pop(PENDING_KEY, None)
+    if bookings:
+        invoice_renderer.enqueue(bookings)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_completed_bookings(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def month_range(month: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a "YYYY-MM" month."""
+    year, number = (int(part) for part in month.split("-"))
+    start = datetime(year, number, 1)
+    end = datetime(year + number // 12, number % 12 + 1, 1)
+    return start, end
+
+
+def build_export(tenant_id: str, month: str, rows: list) -> Tuple[str, str]:
+    """
+    Zip of a month's invoice documents and a CSV listing them (blocking;
+    run it in a thread). Returns (path, key): the archive is cached under
+    a key hashed from its invoices and reused while they stay the same.
+    """
+    key = hashlib.sha256("\n".join(
+        [tenant_id, month] + [f"{i.number}|{i.html_sha256}|{i.text_sha256}|{name}|{email}" for i, name, email in rows]
+    ).encode()).hexdigest()
+    directory = os.path.join(invoice_dir(), "exports")
+    path = os.path.join(directory, key + ".zip")
+    if os.path.exists(path):
+        return path, key
+
+    os.makedirs(directory, exist_ok=True)
+    listing = io.StringIO()
+    writer = csv.writer(listing)
+    writer.writerow(["number", "issued_at", "booking_id", "customer_name", "customer_email", "total"])
+    part_path = f"{path}.{os.getpid()}.part"
+    with zipfile.ZipFile(part_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for invoice, name, email in rows:
+            writer.writerow([
+                invoice.number, invoice.issued_at.isoformat(), str(invoice.booking_id),
+                name or "", email or "", f"{invoice.total:.2f}"
+            ])
+            for format, sha256 in (("html", invoice.html_sha256), ("text", invoice.text_sha256)):
+                archive.write(document_path(sha256, format), invoice.number + FORMATS[format][1])
+        archive.writestr(f"invoices-{month}.csv", listing.getvalue())
+    os.replace(part_path, path)
+    metrics.increment("invoice_exports_built_total")
+    _prune_exports(directory, settings.INVOICE_EXPORTS_KEEP)
+    return path, key
+
+
+def _prune_exports(directory: str, keep: int):
+    """Delete the oldest export archives beyond keep."""
+    archives = sorted(
+        (os.path.join(directory, entry) for entry in os.listdir(directory) if entry.endswith(".zip")),
+        key=os.path.getmtime
+    )
+    for path in archives[:max(len(archives) - keep, 0)]:
+        os.remove(path)
+
+
+async def export_month(db: AsyncSession, month: str) -> Tuple[str, str, int]:
+    """Export archive of the session tenant's invoices issued in month: (path, key, invoice count)."""
+    start, end = month_range(month)
+    result = await db.execute(MONTH_INVOICES, tenant_params(db, start=start, end=end))
+    rows = result.all()
+    path, key = await asyncio.to_thread(build_export, db.info["tenant_id"], month, rows)
+    return path, key, len(rows)
+
+
+async def backfill(tenant_id: Optional[str] = None) -> int:
+    """Issue the missing invoices of completed bookings (live and archived); returns how many were issued."""
+    issued = 0
+    for shard in shard_router.shard_names():
+        if tenant_id is not None and shard_router.shard_for(tenant_id) != shard:
+            continue
+        async with shard_router.sessionmaker(shard)() as session:
+            missing = []
+            for model in (Booking, ArchivedBooking):
+                query = select(model.tenant_id, model.id).where(
+                    model.status == BookingStatus.COMPLETED.value,
+                    ~exists().where(Invoice.tenant_id == model.tenant_id, Invoice.booking_id == model.id)
+                )
+                if tenant_id is not None:
+                    query = query.where(model.tenant_id == tenant_id)
+                missing.extend((await session.execute(query)).all())
+        for booking_tenant, booking_id in missing:
+            if await issue_invoice(booking_tenant, booking_id) is not None:
+                issued += 1
+    return issued
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Invoices of completed bookings")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill_command = commands.add_parser("backfill", help="Issue the invoices completed bookings are missing")
+    backfill_command.add_argument("--tenant", help="Only this station (default: every station)")
+    export = commands.add_parser("export", help="Write a station's monthly invoice export")
+    export.add_argument("--tenant", default=settings.DEFAULT_TENANT_ID)
+    export.add_argument("--month", required=True, help="YYYY-MM")
+    export.add_argument("--output", required=True, help="Zip file to write")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "backfill":
+            issued = await backfill(args.tenant)
+            print(f"Issued {issued} invoices")
+        elif args.command == "export":
+            async with tenant_session(args.tenant) as session:
+                path, _, count = await export_month(session, args.month)
+            shutil.copyfile(path, args.output)
+            print(f"{count} invoices of {args.month} written to {args.output}")
+    finally:
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
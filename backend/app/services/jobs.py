@@ -0,0 +1,205 @@
+"""
+Scheduled Jobs
+- booking_reminders: emails customers the day before their booking
+- pending_expiry: cancels pending bookings whose date has passed
+- rate_limit_purge: deletes the rate_limit_counters windows that have ended
+  (default shard only, where the database rate limit store keeps them)
+- idempotency_purge: deletes expired Idempotency-Key records
+
+The booking jobs walk bookings of all tenants through
+ix_bookings_status_date_id in keyset batches of JOB_BATCH_SIZE; the
+checkpoint is the last (booking_date, id) handled. The purges delete
+JOB_BATCH_SIZE rows per batch; their checkpoint is the run's cutoff.
+
+Run a job once by hand with:
+    python -m app.services.jobs booking_reminders
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select, true, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import DEFAULT_SHARD, shard_router
+from ..models.booking import Booking, BookingStatus
+from ..models.idempotency import IdempotencyRecord
+from ..models.rate_limit import RateLimitCounter
+from ..models.user import User
+from .booking_workflow import BookingWorkflow
+from .email_service import EmailService
+from .scheduler import BatchResult, Job, scheduler
+from .status_history import status_history
+
+
+REMINDER_STATUSES = [BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]
+
+
+def encode_checkpoint(booking_date: date, booking_id: str) -> str:
+    return f"{booking_date.isoformat()}|{booking_id}"
+
+
+def decode_checkpoint(checkpoint: Optional[str]) -> Optional[Tuple[date, str]]:
+    if not checkpoint:
+        return None
+    day, booking_id = checkpoint.split("|", 1)
+    return date.fromisoformat(day), booking_id
+
+
+def _after(checkpoint: Optional[Tuple[date, str]]):
+    """Keyset condition: bookings after the checkpoint in (booking_date, id) order."""
+    if checkpoint is None:
+        return true()
+    day, booking_id = checkpoint
+    return or_(Booking.booking_date > day, and_(Booking.booking_date == day, Booking.id > booking_id))
+
+
+async def send_reminders_batch(session: AsyncSession, checkpoint: Optional[str]) -> BatchResult:
+    """Claim one batch of tomorrow's unreminded bookings; the emails go out after commit."""
+    tomorrow = date.today() + timedelta(days=1)
+    position = decode_checkpoint(checkpoint)
+    if position is not None and position[0] != tomorrow:
+        position = None  # a run left over from another day
+
+    result = await session.execute(
+        select(Booking.id, Booking.booking_date, User.email, User.name)
+        .join(User, User.id == Booking.customer_id)
+        .where(
+            Booking.status.in_(REMINDER_STATUSES),
+            Booking.booking_date == tomorrow,
+            Booking.reminder_sent_at.is_(None),
+            _after(position)
+        )
+        .order_by(Booking.booking_date, Booking.id)
+        .limit(settings.JOB_BATCH_SIZE)
+    )
+    rows = result.all()
+    if not rows:
+        return 0, None, None
+
+    # Claim before sending, so a reminder is never sent twice; a reminder is not an edit of the booking
+    claimed = await session.execute(
+        update(Booking)
+        .where(Booking.id.in_([row.id for row in rows]), Booking.reminder_sent_at.is_(None))
+        .values(reminder_sent_at=datetime.utcnow(), updated_at=Booking.updated_at)
+        .returning(Booking.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed_ids = set(claimed.scalars().all())
+    reminders = [
+        {
+            "to_email": row.email,
+            "customer_name": row.name,
+            "booking_id": row.id,
+            "booking_date": str(row.booking_date)
+        }
+        for row in rows if row.id in claimed_ids
+    ]
+
+    async def send():
+        await EmailService.send_booking_reminders(reminders)
+
+    last = rows[-1]
+    next_checkpoint = encode_checkpoint(last.booking_date, last.id) if len(rows) == settings.JOB_BATCH_SIZE else None
+    return len(reminders), next_checkpoint, send
+
+
+async def expire_pending_batch(session: AsyncSession, checkpoint: Optional[str]) -> BatchResult:
+    """Cancel one batch of pending bookings dated before the grace cutoff."""
+    cutoff = date.today() - timedelta(days=settings.PENDING_EXPIRY_GRACE_DAYS)
+
+    result = await session.execute(
+        select(Booking.id, Booking.tenant_id, Booking.booking_date)
+        .where(
+            Booking.status == BookingStatus.PENDING.value,
+            Booking.booking_date < cutoff,
+            _after(decode_checkpoint(checkpoint))
+        )
+        .order_by(Booking.booking_date, Booking.id)
+        .limit(settings.JOB_BATCH_SIZE)
+    )
+    rows = result.all()
+    if not rows:
+        return 0, None, None
+
+    # Through the workflow, per tenant, so versions, change sequences and counters stay right
+    expired = 0
+    for tenant_id in sorted({row.tenant_id for row in rows}):
+        session.info["tenant_id"] = tenant_id
+        updated, _ = await BookingWorkflow.transition_many(
+            session,
+            [row.id for row in rows if row.tenant_id == tenant_id],
+            BookingStatus.CANCELLED
+        )
+        expired += len(updated)
+    session.info.pop("tenant_id", None)
+
+    last = rows[-1]
+    next_checkpoint = encode_checkpoint(last.booking_date, last.id) if len(rows) == settings.JOB_BATCH_SIZE else None
+    return expired, next_checkpoint, None
+
+
+async def purge_rate_limit_windows_batch(session: AsyncSession, checkpoint: Optional[str]) -> BatchResult:
+    """Delete one batch of rate limit windows that ended before the run started."""
+    cutoff = int(checkpoint) if checkpoint else int(time.time()) - settings.RATE_LIMIT_WINDOW_SECONDS
+    expired = (
+        select(RateLimitCounter.key, RateLimitCounter.window_start)
+        .where(RateLimitCounter.window_start <= cutoff)
+        .limit(settings.JOB_BATCH_SIZE)
+    )
+    result = await session.execute(
+        delete(RateLimitCounter)
+        .where(tuple_(RateLimitCounter.key, RateLimitCounter.window_start).in_(expired))
+        .execution_options(synchronize_session=False)
+    )
+    next_checkpoint = str(cutoff) if result.rowcount == settings.JOB_BATCH_SIZE else None
+    return result.rowcount, next_checkpoint, None
+
+
+async def purge_idempotency_keys_batch(session: AsyncSession, checkpoint: Optional[str]) -> BatchResult:
+    """Delete one batch of Idempotency-Key records that expired before the run started."""
+    cutoff = datetime.fromisoformat(checkpoint) if checkpoint else datetime.utcnow()
+    expired = (
+        select(IdempotencyRecord.id)
+        .where(IdempotencyRecord.expires_at <= cutoff)
+        .limit(settings.JOB_BATCH_SIZE)
+    )
+    result = await session.execute(
+        delete(IdempotencyRecord)
+        .where(IdempotencyRecord.id.in_(expired))
+        .execution_options(synchronize_session=False)
+    )
+    next_checkpoint = cutoff.isoformat() if result.rowcount == settings.JOB_BATCH_SIZE else None
+    return result.rowcount, next_checkpoint, None
+
+
+scheduler.register(Job("booking_reminders", settings.REMINDER_JOB_INTERVAL_SECONDS, send_reminders_batch))
+scheduler.register(Job("pending_expiry", settings.PENDING_EXPIRY_JOB_INTERVAL_SECONDS, expire_pending_batch))
+scheduler.register(Job(
+    "rate_limit_purge", settings.RATE_LIMIT_PURGE_JOB_INTERVAL_SECONDS, purge_rate_limit_windows_batch,
+    shards=[DEFAULT_SHARD]
+))
+scheduler.register(Job("idempotency_purge", settings.IDEMPOTENCY_PURGE_JOB_INTERVAL_SECONDS, purge_idempotency_keys_batch))
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Run a scheduled job once on every shard it runs on")
+    parser.add_argument("job", choices=[job.name for job in scheduler.jobs])
+    args = parser.parse_args()
+
+    job = next(job for job in scheduler.jobs if job.name == args.job)
+    for shard in filter(job.runs_on, shard_router.shard_names()):
+        processed = await scheduler.run_job(shard, job, force=True)
+        if processed is None:
+            print(f"Shard '{shard}': '{job.name}' is running on another worker")
+        else:
+            print(f"Shard '{shard}': '{job.name}' processed {processed} rows")
+    await status_history.flush()  # no background flusher in this process
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
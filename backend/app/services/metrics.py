@@ -0,0 +1,64 @@
+"""
+Metrics Registry
+In-process counters and gauges, exposed in the Prometheus text format at
+GET /metrics. Values are per worker; the scraper sums the workers.
+"""
+
+from typing import Dict, Tuple
+
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metrics:
+    """Named counters and gauges with labels."""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def increment(self, name: str, value: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def value(self, name: str, **labels) -> float:
+        """Current value of a series (0 if it was never recorded)."""
+        key = _labels(labels)
+        return self._counters.get(name, {}).get(key, self._gauges.get(name, {}).get(key, 0))
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format."""
+        lines = []
+        for kind, families in (("counter", self._counters), ("gauge", self._gauges)):
+            for name in sorted(families):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(families[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,442 @@
+"""
+Booking Photos
+Photos of a bike's damage attached to a booking (POST /bookings/{id}/photos).
+
+Uploads are streamed: the multipart/form-data body is parsed as it
+arrives and the file part goes to disk one received chunk at a time, so
+a worker holds a few kilobytes of an upload in memory however large the
+photo is. An upload growing past PHOTO_MAX_BYTES is cut off with 413 as
+soon as it crosses the limit. The image type comes from the file's first
+bytes, not from what the client claims.
+
+Each photo gets two resized JPEG variants, "display" (PHOTO_DISPLAY_SIZE)
+and "thumbnail" (PHOTO_THUMBNAIL_SIZE), turned upright and stripped of
+their metadata (camera location). They are made by a pool of
+PHOTO_WORKERS processes, so decoding and resampling never run on the
+event loop nor hold the GIL of a worker serving requests. A photo is
+"processing" until both variants exist; photos still processing when a
+worker stops are picked up again by the next start.
+
+Pillow is imported by the pool processes only. Without it (a broken
+install) the app still accepts photos but keeps their original only
+("original_only"), and warns at startup.
+
+An upload first claims one of the booking's PHOTO_MAX_PER_BOOKING slots:
+an "uploading" row inserted only while fewer slots are taken, in one
+statement (on Postgres behind a lock on the booking row), so concurrent
+uploads cannot exceed the limit. The row is filled in once the file is
+stored, and deleted if the upload fails. A claim left by a killed worker
+stops counting after PHOTO_CLAIM_SECONDS and is deleted at the next start.
+
+Files live in PHOTO_DIR/<tenant>/<photo id>.<variant>.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request, status
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import bindparam, delete, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import BASE_DIR, shard_router, tenant_session
+from ..models.booking import Booking
+from ..models.booking_photo import BookingPhoto, PhotoStatus
+from ..models.tenant import TENANT_PARAM
+from ..models.types import UUIDKey
+from .deadline import current_deadline
+from .metrics import metrics
+
+
+# Form field carrying the photo
+PHOTO_FIELD = "file"
+
+# Variants served besides the original, largest first
+VARIANTS = ("display", "thumbnail")
+
+# File signatures of the accepted image types
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+metrics.describe("photo_uploads_total", "Booking photos stored")
+metrics.describe("photo_upload_bytes_total", "Bytes of booking photos stored")
+metrics.describe("photo_uploads_rejected_total", "Booking photo uploads rejected, by reason")
+metrics.describe("photo_processing_seconds_total", "Time spent making photo variants in the process pool")
+
+# Slots of a booking taken by its photos and by the uploads in progress
+PHOTO_SLOTS_TAKEN = (
+    select(func.count()).select_from(BookingPhoto)
+    .where(
+        BookingPhoto.tenant_id == bindparam(TENANT_PARAM),
+        BookingPhoto.booking_id == bindparam("booking_id", type_=UUIDKey),
+        or_(
+            BookingPhoto.status != PhotoStatus.UPLOADING.value,
+            BookingPhoto.created_at >= bindparam("claims_since")
+        )
+    )
+    .scalar_subquery()
+)
+CLAIM_PHOTO_SLOT = insert(BookingPhoto.__table__).from_select(
+    ["id", "tenant_id", "booking_id", "uploaded_by", "filename", "content_type", "size", "sha256", "status", "created_at"],
+    select(
+        bindparam("photo_id", type_=UUIDKey),
+        bindparam(TENANT_PARAM),
+        bindparam("booking_id", type_=UUIDKey),
+        bindparam("uploaded_by", type_=UUIDKey),
+        literal(""),
+        literal(""),
+        literal(0),
+        literal(""),
+        literal(PhotoStatus.UPLOADING.value),
+        bindparam("created_at")
+    ).where(PHOTO_SLOTS_TAKEN < bindparam("max_photos"))
+)
+# Postgres: concurrent claims for one booking wait for each other here
+BOOKING_ROW_LOCK = select(Booking.id).where(Booking.id == bindparam("booking_id", type_=UUIDKey)).with_for_update()
+
+
+def photo_dir(tenant_id: str) -> str:
+    return os.path.join(settings.PHOTO_DIR or os.path.join(BASE_DIR, "photos"), tenant_id)
+
+
+def photo_path(tenant_id: str, photo_id: str, variant: str = "original") -> str:
+    suffix = "" if variant == "original" else ".jpg"
+    return os.path.join(photo_dir(tenant_id), f"{photo_id}.{variant}{suffix}")
+
+
+def detect_type(head: bytes) -> Optional[str]:
+    """Content type of an image from its first bytes; None if it is not an accepted image."""
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _reject(status_code: int, reason: str, detail: str) -> HTTPException:
+    metrics.increment("photo_uploads_rejected_total", reason=reason)
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return _reject(
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "too_large",
+        f"Photos are limited to {max_bytes / (1024 * 1024):.1f} MB"
+    )
+
+
+class StreamedUpload:
+    """The PHOTO_FIELD part of a multipart/form-data body, written to disk as it arrives."""
+
+    def __init__(self, boundary: bytes, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.size = 0
+        self.head = b""
+        self.digest = hashlib.sha256()
+        self.complete = False
+        self.too_large = False
+        self._in_photo = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._received: List[bytes] = []  # file data of the current body chunk
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._in_photo = (
+            not self.complete
+            and options.get(b"name") == PHOTO_FIELD.encode()
+            and b"filename" in options
+        )
+        if self._in_photo:
+            self.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))[:255] or "photo"
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_photo or self.too_large:
+            return  # other form fields are ignored
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.too_large = True
+            return
+        if len(self.head) < 16:
+            self.head += chunk[:16 - len(self.head)]
+        self.digest.update(chunk)
+        self._received.append(chunk)
+
+    def _on_part_end(self):
+        if self._in_photo:
+            self._in_photo = False
+            self.complete = True
+
+    async def receive(self, request: Request, path: str):
+        """Parse the request body, appending the photo's bytes to path."""
+        f = await asyncio.to_thread(open, path, "wb")
+        try:
+            async for chunk in request.stream():
+                self._parser.write(chunk)
+                if self.too_large:
+                    raise _too_large(self.max_bytes)
+                if self._received:
+                    data = b"".join(self._received)
+                    self._received.clear()
+                    await asyncio.to_thread(f.write, data)
+            self._parser.finalize()
+        except MultipartParseError:
+            raise _reject(status.HTTP_400_BAD_REQUEST, "bad_request", "Malformed multipart/form-data body")
+        finally:
+            await asyncio.to_thread(f.close)
+
+
+async def receive_photo(request: Request, tenant_id: str, photo_id: str) -> dict:
+    """
+    Stream the photo of an upload request to its original file.
+    Returns the BookingPhoto columns describing the file; raises 400, 413
+    or 415 (and leaves no file behind) when the upload is not acceptable.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise _reject(status.HTTP_400_BAD_REQUEST, "bad_request", "Send the photo as multipart/form-data")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.PHOTO_MAX_BYTES + 64 * 1024:
+        # Clearly too large: refuse before reading a byte (the margin covers the multipart framing)
+        raise _too_large(settings.PHOTO_MAX_BYTES)
+
+    path = photo_path(tenant_id, photo_id)
+    part_path = path + ".part"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    upload = StreamedUpload(options[b"boundary"], settings.PHOTO_MAX_BYTES)
+    try:
+        await upload.receive(request, part_path)
+        if not upload.complete:
+            raise _reject(
+                status.HTTP_400_BAD_REQUEST, "bad_request", f"The photo must be sent as the '{PHOTO_FIELD}' file field"
+            )
+        image_type = detect_type(upload.head)
+        if image_type is None:
+            raise _reject(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "unsupported_type", "Photos must be JPEG, PNG or WebP images"
+            )
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    metrics.increment("photo_uploads_total")
+    metrics.increment("photo_upload_bytes_total", upload.size)
+    return {
+        "filename": upload.filename,
+        "content_type": image_type,
+        "size": upload.size,
+        "sha256": upload.digest.hexdigest(),
+    }
+
+
+def _claims_since() -> datetime:
+    """Uploads claimed before this are abandoned (a killed worker) and no longer hold a slot."""
+    return datetime.utcnow() - timedelta(seconds=settings.PHOTO_CLAIM_SECONDS)
+
+
+async def claim_photo_slot(db: AsyncSession, booking_id: str, photo_id: str, uploaded_by: str) -> bool:
+    """
+    Claim one of a booking's PHOTO_MAX_PER_BOOKING slots for an upload as
+    an "uploading" photo, and commit. False when every slot is taken.
+    Start it in a fresh transaction: on SQLite the claim must be the
+    transaction's first statement to count the latest claims.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(BOOKING_ROW_LOCK, {"booking_id": booking_id})
+    result = await db.execute(CLAIM_PHOTO_SLOT, {
+        TENANT_PARAM: db.info["tenant_id"],
+        "photo_id": photo_id,
+        "booking_id": booking_id,
+        "uploaded_by": uploaded_by,
+        "created_at": datetime.utcnow(),
+        "claims_since": _claims_since(),
+        "max_photos": settings.PHOTO_MAX_PER_BOOKING,
+    })
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def release_photo_slot(tenant_id: str, photo_id: str):
+    """
+    Delete the claim of a failed upload. Runs without the request's
+    deadline, which may be what ended the upload.
+    """
+    token = current_deadline.set(None)
+    try:
+        async with tenant_session(tenant_id) as session:
+            await session.execute(
+                delete(BookingPhoto)
+                .where(BookingPhoto.id == photo_id, BookingPhoto.status == PhotoStatus.UPLOADING.value)
+            )
+            await session.commit()
+    except Exception as e:
+        print(f"[PHOTOS] Could not release the upload slot of photo {photo_id}: {str(e)}")
+    finally:
+        current_deadline.reset(token)
+
+
+def remove_photo_files(tenant_id: str, photo_id: str):
+    for variant in ("original",) + VARIANTS:
+        path = photo_path(tenant_id, photo_id, variant)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def make_variants(source: str, targets: List[Tuple[str, int]], quality: int, max_pixels: int) -> Tuple[int, int]:
+    """
+    Write the resized JPEG variants of an image, largest first; runs in
+    the process pool. Returns the upright size of the original.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientation: rotated by 90 degrees
+            width, height = height, width
+        # JPEG: decode straight at a reduced scale, still at least the largest variant's size
+        image.draft("RGB", (targets[0][1], targets[0][1]))
+        current = ImageOps.exif_transpose(image).convert("RGB")
+
+    for path, size in targets:
+        current.thumbnail((size, size), Image.LANCZOS)  # each variant is resized from the previous one
+        part_path = path + ".part"
+        current.save(part_path, "JPEG", quality=quality, optimize=True)
+        os.replace(part_path, path)
+    return width, height
+
+
+@lru_cache(maxsize=None)
+def pillow_installed() -> bool:
+    """Whether the pool processes can import Pillow (looked up without importing it)."""
+    return importlib.util.find_spec("PIL") is not None
+
+
+class PhotoProcessor:
+    """Makes photo variants in a process pool, off the event loop."""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def initial_status() -> PhotoStatus:
+        return PhotoStatus.PROCESSING if pillow_installed() else PhotoStatus.ORIGINAL_ONLY
+
+    async def start(self):
+        """
+        Delete the upload claims abandoned by the last run, then start the
+        pool and queue the photos it left processing.
+        """
+        if self._pool is not None:
+            return
+        for shard in shard_router.shard_names():
+            async with shard_router.sessionmaker(shard)() as session:
+                await session.execute(
+                    delete(BookingPhoto)
+                    .where(BookingPhoto.status == PhotoStatus.UPLOADING.value, BookingPhoto.created_at < _claims_since())
+                )
+                await session.commit()
+        if not pillow_installed():
+            print("[PHOTOS] WARNING: Pillow is not installed; photos keep their original only (pip install -r requirements.txt)")
+            return
+        # spawn: forking a process that runs an event loop and driver threads is not safe
+        self._pool = ProcessPoolExecutor(settings.PHOTO_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        for shard in shard_router.shard_names():
+            async with shard_router.sessionmaker(shard)() as session:
+                result = await session.execute(
+                    select(BookingPhoto.tenant_id, BookingPhoto.id)
+                    .where(BookingPhoto.status == PhotoStatus.PROCESSING.value)
+                )
+                for tenant_id, photo_id in result.all():
+                    self.submit(tenant_id, photo_id)
+
+    async def stop(self):
+        """Stop the pool; unfinished photos stay processing until the next start."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, tenant_id: str, photo_id: str):
+        """Make a stored photo's variants in the background."""
+        if self._pool is None:
+            return
+        task = asyncio.create_task(self._process(tenant_id, photo_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, tenant_id: str, photo_id: str):
+        loop = asyncio.get_running_loop()
+        targets = [
+            (photo_path(tenant_id, photo_id, "display"), settings.PHOTO_DISPLAY_SIZE),
+            (photo_path(tenant_id, photo_id, "thumbnail"), settings.PHOTO_THUMBNAIL_SIZE),
+        ]
+        started = loop.time()
+        try:
+            width, height = await loop.run_in_executor(
+                self._pool, make_variants, photo_path(tenant_id, photo_id), targets,
+                settings.PHOTO_JPEG_QUALITY, settings.PHOTO_MAX_PIXELS
+            )
+            values = {"status": PhotoStatus.READY.value, "width": width, "height": height}
+        except Exception as e:
+            print(f"[PHOTOS] Could not process photo {photo_id}: {str(e)}")
+            values = {"status": PhotoStatus.FAILED.value}
+        finally:
+            metrics.increment("photo_processing_seconds_total", loop.time() - started)
+
+        async with tenant_session(tenant_id) as session:
+            await session.execute(
+                update(BookingPhoto).where(BookingPhoto.id == photo_id).values(**values)
+            )
+            await session.commit()
+
+    async def wait(self):
+        """Wait until the photos submitted so far are processed."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+photo_processor = PhotoProcessor()
@@ -0,0 +1,251 @@
+"""
+Request Profiling
+On-demand profiles of single requests, taken by ProfilingMiddleware
+(app/middleware/profiling.py) when an owner sends the PROFILE_HEADER
+header or a request is sampled (PROFILE_SAMPLE_RATE).
+
+A profile holds:
+
+- a cProfile trace of the event loop thread while the request ran, as a
+  .prof file (python -m pstats, snakeviz)
+- a JSON summary: the request, its duration, every SQL statement with its
+  time, rows and compiled-cache status, the slowest functions, and the
+  Python time per package (pydantic, sqlalchemy, fastapi, starlette, app...)
+
+The database driver runs in its own thread, so its time shows up in the
+statement times, not in the trace. The trace also covers other requests
+the worker served meanwhile (concurrent_requests in the summary); only
+one profile runs per worker at a time.
+
+Profiles are kept in a ring on disk (PROFILE_DIR): beyond PROFILE_KEEP
+the oldest are deleted.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+from ..database import BASE_DIR
+
+
+SUMMARY_SUFFIX = ".json"
+TRACE_SUFFIX = ".prof"
+
+# Start time and cache status of the statements running on a connection
+STARTED_KEY = "profile_statement_started"
+
+# Compiled cache status of a statement (ExecutionContext.cache_hit) as recorded in a profile
+CACHE_STATUS = {
+    "CACHE_HIT": "hit",
+    "CACHE_MISS": "miss",
+    "CACHING_DISABLED": "disabled",
+    "NO_CACHE_KEY": "no key",
+    "NO_DIALECT_SUPPORT": "unsupported",
+}
+
+
+class RequestProfile:
+    """Trace and SQL statements of one profiled request."""
+
+    def __init__(self, method: str, path: str, tenant_id: Optional[str], trigger: str):
+        created_at = datetime.utcnow()
+        self.id = f"{created_at:%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}"
+        self.created_at = created_at
+        self.method = method
+        self.path = path
+        self.tenant_id = tenant_id
+        self.trigger = trigger
+        self.route: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.concurrent_requests = 0
+        self.statements: List[dict] = []
+        self.statements_dropped = 0
+        self.profiler = cProfile.Profile()
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+
+    def add_statement(self, statement: str, seconds: float, rows: int, cache: Optional[str], executemany: bool):
+        if len(self.statements) >= settings.PROFILE_MAX_STATEMENTS:
+            self.statements_dropped += 1
+            return
+        self.statements.append({
+            "sql": statement,
+            "ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "cache": cache,
+            "executemany": executemany,
+        })
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def cache_status(context) -> Optional[str]:
+    """Whether a statement's compiled form came from the compiled cache; None if unknown."""
+    status = getattr(context, "cache_hit", None)
+    return CACHE_STATUS.get(getattr(status, "name", None))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is None:
+        return
+    conn.info.setdefault(STARTED_KEY, []).append((time.perf_counter(), cache_status(context)))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    started = conn.info.get(STARTED_KEY)
+    if profile is None or not started:
+        return
+    started_at, cache = started.pop()
+    profile.add_statement(statement, time.perf_counter() - started_at, cursor.rowcount, cache, executemany)
+
+
+def profile_dir() -> str:
+    return settings.PROFILE_DIR or os.path.join(BASE_DIR, "profiles")
+
+
+def _package(filename: str) -> str:
+    """Package a profiled function belongs to, for the per-package totals."""
+    if filename.startswith("~") or filename.startswith("<"):
+        return "builtins"
+    if "site-packages" in filename:
+        return filename.split("site-packages" + os.sep, 1)[1].split(os.sep, 1)[0].split(".", 1)[0]
+    if filename.startswith(BASE_DIR):
+        return "app"
+    return "stdlib"
+
+
+def _function_label(function: tuple) -> str:
+    filename, line, name = function
+    if filename.startswith("~"):
+        return name
+    for root in (BASE_DIR, sys.prefix):
+        if filename.startswith(root):
+            filename = os.path.relpath(filename, root)
+            break
+    return f"{filename}:{line}({name})"
+
+
+def summarize(profile: RequestProfile, stats: pstats.Stats) -> dict:
+    """JSON summary of a finished profile."""
+    packages = defaultdict(float)
+    functions = []
+    for function, (primitive_calls, calls, own, cumulative, callers) in stats.stats.items():
+        packages[_package(function[0])] += own
+        functions.append((cumulative, own, calls, function))
+    functions.sort(key=lambda f: f[0], reverse=True)
+
+    sql_seconds = sum(s["ms"] for s in profile.statements) / 1000
+    return {
+        "id": profile.id,
+        "created_at": profile.created_at.isoformat() + "Z",
+        "method": profile.method,
+        "path": profile.path,
+        "route": profile.route,
+        "status_code": profile.status_code,
+        "tenant_id": profile.tenant_id,
+        "trigger": profile.trigger,
+        "duration_ms": round(profile.duration * 1000, 3),
+        "sql_ms": round(sql_seconds * 1000, 3),
+        "sql_count": len(profile.statements) + profile.statements_dropped,
+        "concurrent_requests": profile.concurrent_requests,
+        "packages_ms": {
+            name: round(seconds * 1000, 3)
+            for name, seconds in sorted(packages.items(), key=lambda p: p[1], reverse=True)
+        },
+        "top_functions": [
+            {
+                "function": _function_label(function),
+                "calls": calls,
+                "own_ms": round(own * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for cumulative, own, calls, function in functions[:settings.PROFILE_TOP_FUNCTIONS]
+        ],
+        "statements": profile.statements,
+        "statements_dropped": profile.statements_dropped,
+    }
+
+
+def save_profile(profile: RequestProfile) -> dict:
+    """Write a finished profile to the ring (blocking; run it in a thread); returns its summary."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    stats = pstats.Stats(profile.profiler)
+    summary = summarize(profile, stats)
+
+    # Trace first, summary last: a listed summary always has its trace
+    stats.dump_stats(os.path.join(directory, profile.id + TRACE_SUFFIX))
+    with open(os.path.join(directory, profile.id + SUMMARY_SUFFIX), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    _prune(settings.PROFILE_KEEP)
+    return summary
+
+
+def _prune(keep: int):
+    """Delete the oldest profiles beyond keep."""
+    directory = profile_dir()
+    ids = sorted(entry[:-len(SUMMARY_SUFFIX)] for entry in os.listdir(directory) if entry.endswith(SUMMARY_SUFFIX))
+    for profile_id in ids[:max(len(ids) - keep, 0)]:
+        for suffix in (SUMMARY_SUFFIX, TRACE_SUFFIX):
+            path = os.path.join(directory, profile_id + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def profile_path(profile_id: str, suffix: str) -> Optional[str]:
+    """File of a stored profile; None if it does not exist (or the id is not a profile id)."""
+    if not profile_id or os.sep in profile_id or profile_id.startswith("."):
+        return None
+    path = os.path.join(profile_dir(), profile_id + suffix)
+    return path if os.path.exists(path) else None
+
+
+def load_summary(profile_id: str) -> Optional[dict]:
+    path = profile_path(profile_id, SUMMARY_SUFFIX)
+    if path is None:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_profiles(tenant_id: Optional[str] = None) -> List[dict]:
+    """Summaries of the stored profiles without their statements and functions, newest first."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in sorted(os.listdir(directory), reverse=True):
+        if not entry.endswith(SUMMARY_SUFFIX):
+            continue
+        with open(os.path.join(directory, entry)) as f:
+            summary = json.load(f)
+        if tenant_id is None or summary["tenant_id"] == tenant_id:
+            for detail in ("statements", "top_functions"):
+                summary.pop(detail, None)
+            profiles.append(summary)
+    return profiles
@@ -0,0 +1,198 @@
+"""
+Rate Limiter Service
+Per-IP / per-email request limits and admission control for password hashing.
+Every login and register call costs a full bcrypt computation, so over-limit
+requests are rejected here before any hashing or database work happens.
+"""
+
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from ..config import settings
+from ..database import DEFAULT_SHARD, current_tenant, shard_router
+from ..models.rate_limit import RateLimitCounter
+
+
+class RateLimitStore(ABC):
+    """
+    Storage backend for rate limit windows.
+    Implementations must be safe to share between requests; a shared backend
+    (database, Redis, ...) makes the limits apply across all workers.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        """
+        Record one hit for key.
+        Returns 0 if the hit is allowed, otherwise the seconds until a retry may succeed.
+        """
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Sliding-window log kept in process memory (limits are per worker)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = deque()
+            self._hits[key] = hits
+            # Evict least recently used keys so a flood of random emails cannot grow memory
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+
+        if len(hits) >= limit:
+            return hits[0] + window - now
+
+        hits.append(now)
+        return 0.0
+
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """
+    Fixed-window counters in the rate_limit_counters table of the default shard.
+    Shared by every worker; the windows are not tenant data (per-IP keys span
+    all stations), so they live in one place whatever the sharding. Ended
+    windows are deleted by the rate_limit_purge job (services/jobs.py).
+    """
+
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        return await self._hit(key, limit, window, retry=True)
+
+    async def _hit(self, key: str, limit: int, window: int, retry: bool) -> float:
+        now = time.time()
+        window_start = int(now // window * window)
+
+        async with shard_router.sessionmaker(DEFAULT_SHARD)() as session:
+            result = await session.execute(
+                update(RateLimitCounter)
+                .where(
+                    RateLimitCounter.key == key,
+                    RateLimitCounter.window_start == window_start
+                )
+                .values(count=RateLimitCounter.count + 1)
+                .returning(RateLimitCounter.count)
+            )
+            count = result.scalar_one_or_none()
+
+            if count is None:
+                session.add(RateLimitCounter(key=key, window_start=window_start, count=1))
+                try:
+                    await session.commit()
+                    return 0.0
+                except IntegrityError:
+                    # Another worker created the window first; the retry's UPDATE finds it
+                    await session.rollback()
+                    if not retry:
+                        raise
+                    return await self._hit(key, limit, window, retry=False)
+
+            await session.commit()
+
+        if count > limit:
+            return window_start + window - now
+        return 0.0
+
+
+class AuthRateLimiter:
+    """Applies the configured per-IP and per-email limits to auth requests."""
+
+    def __init__(self, store: RateLimitStore):
+        self.store = store
+
+    @staticmethod
+    def client_ip(request: Request) -> str:
+        """Resolve the client address, optionally trusting X-Forwarded-For."""
+        if settings.RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def _enforce(self, key: str, limit: int):
+        retry_after = await self.store.hit(key, limit, settings.RATE_LIMIT_WINDOW_SECONDS)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    async def check_login(self, request: Request, email: str):
+        """Raise HTTP 429 if this IP or email exceeded the login limit."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        await self._enforce(f"login:ip:{self.client_ip(request)}", settings.LOGIN_RATE_LIMIT_PER_IP)
+        await self._enforce(
+            f"login:email:{current_tenant.get()}:{email.lower()}", settings.LOGIN_RATE_LIMIT_PER_EMAIL
+        )
+
+    async def check_register(self, request: Request):
+        """Raise HTTP 429 if this IP exceeded the registration limit."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        await self._enforce(f"register:ip:{self.client_ip(request)}", settings.REGISTER_RATE_LIMIT_PER_IP)
+
+
+class HashAdmission:
+    """
+    Global cap on concurrent password hashing in this worker.
+    Requests that cannot get a slot within the queue timeout get HTTP 503
+    instead of piling up behind bcrypt and starving the event loop.
+    """
+
+    def __init__(self, max_concurrent: int, queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_concurrent = max_concurrent
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one hashing slot for the duration of the block."""
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please try again shortly.",
+                headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout)))}
+            )
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+
+def _build_store() -> RateLimitStore:
+    if settings.RATE_LIMIT_STORE == "database":
+        return DatabaseRateLimitStore()
+    return MemoryRateLimitStore()
+
+
+auth_rate_limiter = AuthRateLimiter(_build_store())
+hash_admission = HashAdmission(settings.AUTH_MAX_CONCURRENT_HASHES, settings.AUTH_HASH_QUEUE_TIMEOUT)
@@ -0,0 +1,391 @@
+"""
+Traffic Replay
+Re-runs a traffic capture (app/services/capture.py) against a test
+instance and reports per route the captured and the replayed latency:
+
+    python -m app.services.replay captures/capture-*.ndjson --target http://localhost:8001 --speed 2
+
+Requests go out open-loop at their captured offsets divided by --speed
+(1, 2, 10...), so a 2x replay offers the same mix at twice the rate.
+"lag" in the report is how late the replayer sent requests; a large lag
+means the replayer, not the target, was the bottleneck.
+
+Every captured user (role and pseudonym) becomes one synthetic user of
+the same role, registered on the target before the clock starts; an
+owner seeds --services services and every customer --bookings bookings.
+Path parameters are filled from the seeded data ({service_id},
+{booking_id}: a customer's own bookings), and the writes in
+BODY_BUILDERS get synthetic bodies. Requests whose parameters cannot be
+filled are skipped and counted.
+
+The target should run with RATE_LIMIT_ENABLED=false on a database that
+can be thrown away: the replay registers users and writes bookings.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+
+PASSWORD = "ReplayPassw0rd"
+PATH_PARAM = re.compile(r"\{(\w+)\}")
+REDACTED = "[redacted]"
+
+
+class SyntheticUser:
+    """A user registered on the target for one captured user."""
+
+    def __init__(self, role: str, email: str, token: str):
+        self.role = role
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.bookings: List[str] = []
+
+
+class ReplayRequest:
+    """A request to send for a captured one; after runs on a 2xx response."""
+
+    def __init__(self, method: str, path: str, params: Optional[dict] = None, body: Optional[dict] = None,
+                 after: Optional[Callable] = None):
+        self.method = method
+        self.path = path
+        self.params = params or {}
+        self.body = body
+        self.after = after
+
+
+class ReplayContext:
+    """Synthetic users and the ids seeded on the target."""
+
+    def __init__(self, client, tenant_id: str):
+        self.client = client
+        self.tenant_headers = {"X-Tenant-ID": tenant_id}
+        self.run = uuid.uuid4().hex[:8]  # unique emails across replays on the same target
+        self.registered = 0
+        self.users: Dict[Tuple[str, str], SyntheticUser] = {}
+        self.services: List[str] = []
+        self.bookings: List[str] = []
+        self.pending: List[Tuple[str, SyntheticUser]] = []  # bookings still pending, with their customer
+
+    async def register(self, role: str) -> SyntheticUser:
+        self.registered += 1
+        email = f"replay-{self.run}-{self.registered}@replay.example.com"
+        response = await self.client.post("/api/v1/auth/register", headers=self.tenant_headers, json={
+            "email": email, "password": PASSWORD, "name": f"Replay {role} {self.registered}",
+            "phone": "1234567890", "role": role
+        })
+        if response.status_code != 201:
+            raise SystemExit(f"Could not register a synthetic {role} on the target: {response.status_code} {response.text}")
+        return SyntheticUser(role, email, response.json()["access_token"])
+
+    def user_for(self, record: dict) -> Optional[SyntheticUser]:
+        if record.get("role") in (None, "anonymous"):
+            return None
+        return self.users.get((record["role"], record.get("user") or "shared"))
+
+    def add_booking(self, booking_id: str, customer: SyntheticUser):
+        customer.bookings.append(booking_id)
+        self.bookings.append(booking_id)
+        self.pending.append((booking_id, customer))
+
+    def take_pending(self, customer: Optional[SyntheticUser] = None) -> Optional[str]:
+        """A pending booking (of customer, if given), no longer pending afterwards."""
+        for index, (booking_id, owner_of) in enumerate(self.pending):
+            if customer is None or owner_of is customer:
+                del self.pending[index]
+                return booking_id
+        return None
+
+    def booking_body(self) -> dict:
+        return {
+            "service_ids": random.sample(self.services, random.randint(1, min(3, len(self.services)))),
+            "booking_date": str(date.today() + timedelta(days=random.randint(1, 30))),
+        }
+
+    async def seed(self, records: List[dict], services: int, bookings: int):
+        """Register a user per captured user, then the services and bookings the requests will use."""
+        for record in records:
+            role = record.get("role")
+            if role not in (None, "anonymous"):
+                key = (role, record.get("user") or "shared")
+                if key not in self.users:
+                    self.users[key] = await self.register(role)
+
+        owners = [user for user in self.users.values() if user.role == "owner"]
+        owner = owners[0] if owners else await self.register("owner")
+        for n in range(services):
+            response = await self.client.post("/api/v1/services", headers=owner.headers, json={
+                "name": f"Replay service {n}", "price": "10.00", "estimated_time": 30
+            })
+            self.services.append(response.json()["id"])
+
+        for user in self.users.values():
+            if user.role != "customer":
+                continue
+            for _ in range(bookings):
+                response = await self.client.post("/api/v1/bookings", headers=user.headers, json=self.booking_body())
+                self.add_booking(response.json()["id"], user)
+
+
+def _create_booking(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    if user is None or user.role != "customer" or not ctx.services:
+        return None
+    return ReplayRequest(
+        "POST", "/api/v1/bookings", body=ctx.booking_body(),
+        after=lambda response: ctx.add_booking(response.json()["id"], user)
+    )
+
+
+def _update_status(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    booking_id = ctx.take_pending() if user is not None and user.role == "owner" else None
+    if booking_id is None:
+        return None
+    return ReplayRequest("PUT", f"/api/v1/bookings/{booking_id}/status", body={"status": "confirmed"})
+
+
+def _cancel_booking(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    if user is None:
+        return None
+    booking_id = ctx.take_pending(user if user.role == "customer" else None)
+    if booking_id is None:
+        return None
+    return ReplayRequest("DELETE", f"/api/v1/bookings/{booking_id}")
+
+
+def _login(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    if not ctx.users:
+        return None
+    login_user = random.choice(list(ctx.users.values()))
+    return ReplayRequest("POST", "/api/v1/auth/login", body={"email": login_user.email, "password": PASSWORD})
+
+
+def _register(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    ctx.registered += 1
+    return ReplayRequest("POST", "/api/v1/auth/register", body={
+        "email": f"replay-{ctx.run}-{ctx.registered}@replay.example.com", "password": PASSWORD,
+        "name": f"Replay customer {ctx.registered}", "phone": "1234567890"
+    })
+
+
+def _create_service(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    if user is None or user.role != "owner":
+        return None
+    return ReplayRequest(
+        "POST", "/api/v1/services",
+        body={"name": f"Replay service {len(ctx.services)}", "price": "10.00", "estimated_time": 30},
+        after=lambda response: ctx.services.append(response.json()["id"])
+    )
+
+
+def _update_service(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    if user is None or user.role != "owner" or not ctx.services:
+        return None
+    return ReplayRequest(
+        "PUT", f"/api/v1/services/{random.choice(ctx.services)}",
+        body={"price": f"{random.randint(5, 50)}.00"}
+    )
+
+
+# "METHOD route" -> builder of a request with a synthetic body
+BODY_BUILDERS = {
+    "POST /api/v1/bookings": _create_booking,
+    "PUT /api/v1/bookings/{booking_id}/status": _update_status,
+    "DELETE /api/v1/bookings/{booking_id}": _cancel_booking,
+    "POST /api/v1/auth/login": _login,
+    "POST /api/v1/auth/register": _register,
+    "POST /api/v1/services": _create_service,
+    "PUT /api/v1/services/{service_id}": _update_service,
+}
+
+
+def build_request(ctx: ReplayContext, record: dict, user: Optional[SyntheticUser]) -> Optional[ReplayRequest]:
+    """The request replaying a captured one; None if it cannot be replayed."""
+    builder = BODY_BUILDERS.get(f"{record['method']} {record['route']}")
+    if builder is not None:
+        return builder(ctx, record, user)
+    if record["method"] != "GET":
+        return None
+
+    def fill(match) -> str:
+        name = match.group(1)
+        if name == "service_id" and ctx.services:
+            return random.choice(ctx.services)
+        if name == "booking_id":
+            bookings = user.bookings if user is not None and user.role == "customer" else ctx.bookings
+            if bookings:
+                return random.choice(bookings)
+        raise LookupError(name)
+
+    try:
+        path = PATH_PARAM.sub(fill, record["route"])
+    except LookupError:
+        return None
+    params = {name: value for name, value in record.get("query", {}).items() if value != REDACTED}
+    return ReplayRequest("GET", path, params=params)
+
+
+def load_capture(paths: List[str]) -> List[dict]:
+    """Matched-route records of the capture files, oldest first."""
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if record.get("route"):
+                        records.append(record)
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+def _status_class(status_code: int) -> int:
+    return status_code // 100
+
+
+async def replay(ctx: ReplayContext, records: List[dict], speed: float, max_in_flight: int) -> List[dict]:
+    """Send the records' requests on their captured schedule; one result per record."""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    results: List[dict] = []
+    tasks = []
+
+    async def send(record: dict, request: ReplayRequest, user: Optional[SyntheticUser], due: float):
+        async with slots:
+            lag = loop.time() - due
+            started = loop.time()
+            try:
+                response = await ctx.client.request(
+                    request.method, request.path, params=request.params, json=request.body,
+                    headers=user.headers if user is not None else ctx.tenant_headers
+                )
+                status_code = response.status_code
+            except Exception as e:  # connection refused, timeout: counted as a server error
+                print(f"[REPLAY] {request.method} {request.path} failed: {e!r}")
+                response, status_code = None, 599
+            elapsed = loop.time() - started
+        if request.after is not None and status_code < 300:
+            request.after(response)
+        results.append({
+            "route": f"{record['method']} {record['route']}",
+            "captured_ms": record["ms"],
+            "replayed_ms": elapsed * 1000,
+            "lag_ms": lag * 1000,
+            "mismatch": _status_class(status_code) != _status_class(record["status"]),
+            "server_error": status_code >= 500,
+        })
+
+    first = records[0]["t"]
+    started = loop.time()
+    for record in records:
+        due = started + (record["t"] - first) / speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        user = ctx.user_for(record)
+        request = build_request(ctx, record, user)
+        if request is None:
+            results.append({"route": f"{record['method']} {record['route']}", "skipped": True})
+            continue
+        tasks.append(asyncio.create_task(send(record, request, user, due)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+def summarize(results: List[dict]) -> List[dict]:
+    """Per-route latency comparison, busiest route first."""
+    by_route: Dict[str, List[dict]] = defaultdict(list)
+    for result in results:
+        by_route[result["route"]].append(result)
+
+    summary = []
+    for route, route_results in by_route.items():
+        sent = [r for r in route_results if not r.get("skipped")]
+        captured = [r["captured_ms"] for r in sent]
+        replayed = [r["replayed_ms"] for r in sent]
+        row = {
+            "route": route,
+            "requests": len(route_results),
+            "skipped": len(route_results) - len(sent),
+            "mismatched": sum(r["mismatch"] for r in sent),
+            "server_errors": sum(r["server_error"] for r in sent),
+            "lag_p95_ms": round(_percentile([r["lag_ms"] for r in sent], 0.95), 3),
+        }
+        for q, label in ((0.5, "p50"), (0.95, "p95")):
+            before, after = _percentile(captured, q), _percentile(replayed, q)
+            row[f"captured_{label}_ms"] = round(before, 3)
+            row[f"replayed_{label}_ms"] = round(after, 3)
+            row[f"{label}_change"] = round((after - before) / before, 4) if before else None
+        summary.append(row)
+    summary.sort(key=lambda row: row["requests"], reverse=True)
+    return summary
+
+
+def print_summary(summary: List[dict], speed: float):
+    print(f"Replay at {speed:g}x (latency in ms; change = replayed vs captured)")
+    print(
+        f"  {'route':48} {'reqs':>6} {'skip':>5} {'diff':>5} {'cap p50':>8} {'rep p50':>8} {'change':>7} "
+        f"{'cap p95':>8} {'rep p95':>8} {'change':>7} {'lag p95':>8}"
+    )
+
+    def change(value: Optional[float]) -> str:
+        return f"{value:+.0%}" if value is not None else "-"
+
+    for row in summary:
+        print(
+            f"  {row['route'][:48]:48} {row['requests']:6} {row['skipped']:5} {row['mismatched']:5} "
+            f"{row['captured_p50_ms']:8.1f} {row['replayed_p50_ms']:8.1f} {change(row['p50_change']):>7} "
+            f"{row['captured_p95_ms']:8.1f} {row['replayed_p95_ms']:8.1f} {change(row['p95_change']):>7} "
+            f"{row['lag_p95_ms']:8.1f}"
+        )
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Replay a traffic capture against a test instance")
+    parser.add_argument("captures", nargs="+", help="Capture files (NDJSON)")
+    parser.add_argument("--target", required=True, help="Base URL of the test instance, e.g. http://localhost:8001")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed: 1, 2, 10...")
+    parser.add_argument("--tenant", default=settings.DEFAULT_TENANT_ID, help="Station the synthetic users belong to")
+    parser.add_argument("--services", type=int, default=10, help="Services seeded before the replay")
+    parser.add_argument("--bookings", type=int, default=3, help="Bookings seeded per synthetic customer")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="Concurrent requests at most")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable replays")
+    parser.add_argument("--json", help="Also write the per-route report to this file")
+    args = parser.parse_args()
+
+    import httpx
+
+    random.seed(args.seed)
+    records = load_capture(args.captures)
+    if not records:
+        raise SystemExit("The capture holds no requests")
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.target, limits=limits, timeout=60) as client:
+        ctx = ReplayContext(client, args.tenant)
+        await ctx.seed(records, args.services, args.bookings)
+        print(f"{len(records)} requests, {len(ctx.users)} synthetic users, "
+              f"{(records[-1]['t'] - records[0]['t']) / args.speed:.1f} s at {args.speed:g}x")
+        summary = summarize(await replay(ctx, records, args.speed, args.max_in_flight))
+
+    print_summary(summary, args.speed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"speed": args.speed, "routes": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,184 @@
+"""
+Job Scheduler
+Runs periodic maintenance jobs inside the app workers.
+
+Every worker runs the same loop, but a job runs on one worker at a time
+per shard: the worker must hold the job's row in job_leases. A run is a
+sequence of small batches; each batch commits in its own short
+transaction together with the job's checkpoint and a lease renewal
+(fenced on the lease owner), so a crashed or stalled worker loses the job
+after JOB_LEASE_SECONDS and the next one resumes at the checkpoint.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import dialect_insert, shard_router
+from ..models.job_lease import JobLease
+
+
+# run_batch(session, checkpoint) -> (rows processed, checkpoint to resume at or None when finished,
+#                                    optional coroutine function to call after the batch committed)
+BatchResult = Tuple[int, Optional[str], Optional[Callable[[], Awaitable]]]
+BatchFunction = Callable[[AsyncSession, Optional[str]], Awaitable[BatchResult]]
+
+
+class Job:
+    """A periodic job made of bounded batches; shards limits it to some shards (default: all)."""
+
+    def __init__(self, name: str, interval_seconds: float, run_batch: BatchFunction,
+                 shards: Optional[List[str]] = None):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.run_batch = run_batch
+        self.shards = shards
+
+    def runs_on(self, shard: str) -> bool:
+        return self.shards is None or shard in self.shards
+
+
+class Scheduler:
+    """Runs registered jobs on every shard under a lease."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @property
+    def jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def jobs_on(self, shard: str) -> List[Job]:
+        return [job for job in self._jobs.values() if job.runs_on(shard)]
+
+    def register(self, job: Job):
+        self._jobs[job.name] = job
+
+    async def start(self):
+        """Start one scheduling loop per shard."""
+        if not settings.SCHEDULER_ENABLED or self._tasks:
+            return
+        for shard in shard_router.shard_names():
+            self._tasks.append(asyncio.create_task(self._loop(shard)))
+
+    async def stop(self):
+        """Stop the loops; an interrupted batch rolls back and its lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _loop(self, shard: str):
+        while True:
+            for job in self.jobs_on(shard):
+                try:
+                    await self.run_job(shard, job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"[SCHEDULER] Job '{job.name}' failed on shard '{shard}': {str(e)}")
+            await asyncio.sleep(settings.SCHEDULER_TICK_SECONDS)
+
+    async def run_job(self, shard: str, job: Job, force: bool = False) -> Optional[int]:
+        """
+        Run a job on a shard if it is due (or force) and no other worker holds it.
+        Returns the number of rows processed, or None if the job was not run.
+        """
+        acquired, checkpoint = await self._acquire(shard, job, force)
+        if not acquired:
+            return None
+
+        processed = 0
+        while True:
+            async with shard_router.sessionmaker(shard)() as session:
+                if not await self._renew(session, job):
+                    await session.rollback()
+                    print(f"[SCHEDULER] Lost the lease of '{job.name}' on shard '{shard}'")
+                    return processed
+
+                count, checkpoint, after_commit = await job.run_batch(session, checkpoint)
+                processed += count
+                await self._record(session, job, checkpoint, processed)
+                await session.commit()
+
+            if after_commit is not None:
+                await after_commit()
+            if checkpoint is None:
+                return processed
+            await asyncio.sleep(settings.JOB_BATCH_PAUSE_SECONDS)
+
+    async def _acquire(self, shard: str, job: Job, force: bool) -> Tuple[bool, Optional[str]]:
+        """Take the job's lease if it is free or expired; returns (acquired, checkpoint)."""
+        now = datetime.utcnow()
+        async with shard_router.sessionmaker(shard)() as session:
+            await session.execute(
+                dialect_insert(session)(JobLease)
+                .values(name=job.name, next_run_at=now, last_processed=0)
+                .on_conflict_do_nothing(index_elements=[JobLease.name])
+            )
+            stmt = (
+                update(JobLease)
+                .where(
+                    JobLease.name == job.name,
+                    or_(
+                        JobLease.owner.is_(None),
+                        JobLease.leased_until < now,
+                        JobLease.owner == self.owner
+                    )
+                )
+                .values(
+                    owner=self.owner,
+                    leased_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    last_started_at=now
+                )
+                .returning(JobLease.checkpoint)
+            )
+            if not force:
+                stmt = stmt.where(JobLease.next_run_at <= now)
+            row = (await session.execute(stmt)).one_or_none()
+            await session.commit()
+
+        if row is None:
+            return False, None
+        return True, row.checkpoint
+
+    async def _renew(self, session: AsyncSession, job: Job) -> bool:
+        """
+        Extend the lease at the start of a batch transaction; False if another
+        worker took it over. On Postgres the row lock also fences the batch.
+        """
+        result = await session.execute(
+            update(JobLease)
+            .where(JobLease.name == job.name, JobLease.owner == self.owner)
+            .values(leased_until=datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS))
+        )
+        return result.rowcount == 1
+
+    async def _record(self, session: AsyncSession, job: Job, checkpoint: Optional[str], processed: int):
+        """Store the checkpoint in the batch transaction; release the lease when the run is done."""
+        values = {"checkpoint": checkpoint, "last_processed": processed}
+        if checkpoint is None:
+            now = datetime.utcnow()
+            values.update(
+                owner=None,
+                leased_until=None,
+                last_finished_at=now,
+                next_run_at=now + timedelta(seconds=job.interval_seconds)
+            )
+        await session.execute(
+            update(JobLease)
+            .where(JobLease.name == job.name, JobLease.owner == self.owner)
+            .values(**values)
+        )
+
+
+scheduler = Scheduler()
@@ -0,0 +1,162 @@
+"""
+Single-Flight Reads
+Coalesces identical concurrent reads: while one request runs a handler
+for a key, requests arriving with the same key wait for it and get the
+same return value instead of opening their own session and running the
+same queries; each of them still gets its own response, validated
+against the route's response_model. A burst of clients on GET /services
+(a promotion going out, a catalog cache just invalidated) costs one
+execution per worker.
+
+Decorate an idempotent GET handler below its route decorator:
+
+    @router.get("/{service_id}", response_model=ServiceResponse)
+    @single_flight("services:get")
+    async def get_service(service_id: UUID, db: AsyncSession = Depends(get_db)): ...
+
+The key is the name, the request's tenant and the handler's plain
+arguments (path and query parameters: str, int, float, bool, UUID, enum,
+None). Dependencies resolving to objects (session, user) are not part of
+it, so a handler whose response depends on the caller must not be
+coalesced. Only the requests overlapping an execution share it; nothing
+is kept once it finishes (caching is VersionedCache's job).
+
+A cancelled execution (its request timed out or was dropped) does not
+fail the requests waiting on it: the next of them runs the handler.
+
+Metrics per decorated route (label "route", the name given to the
+decorator): single_flight_executions_total,
+single_flight_coalesced_total and single_flight_coalescing_ratio
+(coalesced requests / all requests).
+"""
+
+import asyncio
+import functools
+import inspect
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from uuid import UUID
+
+from fastapi import HTTPException, Request, Response
+
+from ..config import settings
+from ..database import current_tenant
+from .metrics import metrics
+
+
+# Argument types that go into a key as they are
+KEY_TYPES = (str, int, float, bool, type(None))
+
+metrics.describe("single_flight_executions_total", "Coalescable reads that ran their handler")
+metrics.describe("single_flight_coalesced_total", "Reads served from another request's execution")
+metrics.describe("single_flight_coalescing_ratio", "Share of coalescable reads served from another request's execution")
+
+def _key_value(value: Any) -> Any:
+    """Hashable form of a plain handler argument; None marks arguments left out of the key."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, KEY_TYPES):
+        return value
+    return None
+
+
+def flight_key(name: str, arguments: Dict[str, Any]) -> Hashable:
+    plain = tuple(sorted(
+        (argument, _key_value(value)) for argument, value in arguments.items()
+        if value is None or _key_value(value) is not None
+    ))
+    return (name, current_tenant.get() or settings.DEFAULT_TENANT_ID, plain)
+
+
+def _for_follower(value: Any) -> Any:
+    """
+    A follower's copy of the leader's return value. Plain values and
+    models are returned as they are (FastAPI validates and serializes
+    them per request); a Response is sent once, so followers get their own.
+    """
+    if isinstance(value, Response):
+        response = Response(content=value.body, status_code=value.status_code)
+        response.raw_headers = list(value.raw_headers)
+        return response
+    return value
+
+
+class SingleFlight:
+    """In-flight executions of this worker, by key."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, name: str, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call for key, or wait for the execution already running for it; returns its value."""
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                return await self._lead(name, key, call)
+            # Raises only if this request is cancelled; the execution is left running
+            await asyncio.wait({future})
+            if future.cancelled():
+                continue  # the leading request was cancelled, not this one: take over
+            self._count(name, coalesced=True)
+            error = future.exception()
+            if isinstance(error, HTTPException):
+                raise HTTPException(status_code=error.status_code, detail=error.detail, headers=error.headers)
+            if error is not None:
+                raise error
+            return _for_follower(future.result())
+
+    async def _lead(self, name: str, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved: no warning when nobody was waiting
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._flights[key]
+            self._count(name, coalesced=False)
+
+    @staticmethod
+    def _count(name: str, coalesced: bool):
+        metrics.increment("single_flight_coalesced_total" if coalesced else "single_flight_executions_total", route=name)
+        coalesced_total = metrics.value("single_flight_coalesced_total", route=name)
+        total = coalesced_total + metrics.value("single_flight_executions_total", route=name)
+        metrics.set("single_flight_coalescing_ratio", round(coalesced_total / total, 4), route=name)
+
+
+single_flight_group = SingleFlight()
+
+
+def single_flight(name: str):
+    """Decorator coalescing concurrent identical calls of a read-only route handler (see module docstring)."""
+
+    def decorate(handler):
+        signature = inspect.signature(handler)
+        for parameter in signature.parameters.values():
+            if parameter.annotation in (Request, Response):
+                raise TypeError(f"{handler.__name__}: a handler taking the {parameter.annotation.__name__} cannot be coalesced")
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            if not settings.SINGLE_FLIGHT_ENABLED:
+                return await handler(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs).arguments
+            return await single_flight_group.do(name, flight_key(name, arguments), lambda: handler(*args, **kwargs))
+
+        return wrapper
+
+    return decorate
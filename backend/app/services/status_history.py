@@ -0,0 +1,227 @@
+"""
+Booking Status History
+Every status change appends a booking_status_events row; the timeline of
+a booking is read from it (GET /bookings/{id}/timeline).
+
+Two write modes (STATUS_HISTORY_MODE):
+
+- "queue": the change records its events in the session, and they join
+  an in-process queue once the transaction commits (a rolled back change
+  leaves no event). A background task writes the queue in multi-row
+  INSERTs of up to STATUS_HISTORY_BATCH_SIZE events, as soon as a batch
+  is full or every STATUS_HISTORY_FLUSH_INTERVAL seconds. The status
+  update request itself does no extra write. A timeline read from the
+  worker that made a change includes its unwritten events; read from
+  another worker it may trail the booking by one flush interval. Events
+  still queued when a worker is killed are lost (a clean shutdown
+  flushes them).
+- "transaction": the events are inserted in the status change's own
+  transaction, so the timeline is never behind the booking.
+"""
+
+import asyncio
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import shard_router
+from ..models.archive import ArchivedBooking
+from ..models.booking import Booking, BookingStatus
+from ..models.status_event import BookingStatusEvent
+from .metrics import metrics
+
+
+# Events of a session, queued once its transaction commits
+PENDING_KEY = "status_history_pending"
+
+metrics.describe("status_history_written_total", "Booking status events written by the history queue")
+metrics.describe("status_history_dropped_total", "Booking status events dropped because the history queue was full")
+metrics.describe("status_history_queued", "Booking status events waiting in the history queue")
+
+
+def status_event(
+    tenant_id: str,
+    booking_id: str,
+    from_status: Optional[str],
+    to_status: str,
+    version: int,
+    changed_by: Optional[str] = None,
+    changed_at: Optional[datetime] = None
+) -> dict:
+    """Row of booking_status_events; the time is taken when the change happens, not when it is written."""
+    return {
+        "tenant_id": tenant_id,
+        "booking_id": booking_id,
+        "from_status": BookingStatus(from_status).value if from_status else None,
+        "to_status": BookingStatus(to_status).value,
+        "version": version,
+        "changed_by": changed_by,
+        "changed_at": changed_at or datetime.utcnow(),
+    }
+
+
+class StatusHistory:
+    """Appends booking status events, batched per worker."""
+
+    def __init__(self):
+        self._queue: Deque[dict] = deque()
+        self._writing: List[dict] = []  # batch taken off the queue, not committed yet
+        self._full: Optional[asyncio.Event] = None  # set when a batch is full; created by start()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def unwritten(self, booking_id: str) -> List[dict]:
+        """Events of a booking committed in this worker but not written yet."""
+        return [e for e in (*self._writing, *self._queue) if e["booking_id"] == booking_id]
+
+    async def record(self, db: AsyncSession, events: List[dict]):
+        """Record events of a status change made in db's transaction."""
+        if not events:
+            return
+        if settings.STATUS_HISTORY_MODE == "transaction":
+            await db.execute(insert(BookingStatusEvent), events)
+        else:
+            db.sync_session.info.setdefault(PENDING_KEY, []).extend(events)
+
+    def enqueue(self, events: List[dict]):
+        """Queue committed events for the next flush."""
+        room = settings.STATUS_HISTORY_QUEUE_MAX - len(self._queue)
+        if room < len(events):
+            metrics.increment("status_history_dropped_total", len(events) - max(room, 0))
+            events = events[:max(room, 0)]
+        self._queue.extend(events)
+        metrics.set("status_history_queued", len(self._queue))
+        if self._full is not None and len(self._queue) >= settings.STATUS_HISTORY_BATCH_SIZE:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Write every queued event; returns the number written."""
+        written = 0
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), settings.STATUS_HISTORY_BATCH_SIZE))]
+            self._writing = batch
+            try:
+                await self._write(batch)
+            except Exception:
+                self._queue.extendleft(reversed(batch))  # retried by the next flush
+                raise
+            finally:
+                self._writing = []
+                metrics.set("status_history_queued", len(self._queue))
+            written += len(batch)
+            metrics.increment("status_history_written_total", len(batch))
+        return written
+
+    async def start(self):
+        """Start the background flusher (queue mode only)."""
+        if settings.STATUS_HISTORY_MODE != "queue" or self._task:
+            return
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write what is left in the queue."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._full = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"[STATUS HISTORY] Dropped {len(self._queue)} events at shutdown: {str(e)}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), settings.STATUS_HISTORY_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[STATUS HISTORY] Flush failed, {len(self._queue)} events kept: {str(e)}")
+                await asyncio.sleep(1)
+
+    @staticmethod
+    async def _write(batch: List[dict]):
+        """One INSERT per shard the batch touches."""
+        by_shard: Dict[str, List[dict]] = defaultdict(list)
+        for row in batch:
+            by_shard[shard_router.shard_for(row["tenant_id"])].append(row)
+        for shard, rows in by_shard.items():
+            async with shard_router.sessionmaker(shard)() as session:
+                await session.execute(insert(BookingStatusEvent), rows)
+                await session.commit()
+
+
+status_history = StatusHistory()
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_pending_events(session):
+    events = session.info.pop(PENDING_KEY, None)
+    if events:
+        status_history.enqueue(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def seed_history(conn: Connection, batch_size: int = 1000):
+    """
+    Events for bookings that predate the history: their creation (version
+    1) and, if the booking has moved on since, the change to its current
+    status at the booking's version. Bookings that moved on before the
+    version column existed (v4) are still at version 1; they are raised to
+    2, so the next change continues the sequence instead of repeating 2.
+    """
+    inspector = inspect(conn)
+    for model in (Booking, ArchivedBooking):
+        if not inspector.has_table(model.__tablename__):
+            continue  # created empty after the migration steps
+        after = None
+        while True:
+            query = select(
+                model.id, model.tenant_id, model.status, model.previous_status,
+                model.version, model.created_at, model.updated_at
+            ).order_by(model.id).limit(batch_size)
+            if after is not None:
+                query = query.where(model.id > after)
+            rows = conn.execute(query).all()
+            if not rows:
+                break
+
+            events, unversioned = [], []
+            for row in rows:
+                created_at = row.created_at or datetime.utcnow()
+                events.append(status_event(
+                    row.tenant_id, row.id, None, BookingStatus.PENDING, 1, changed_at=created_at
+                ))
+                if row.status != BookingStatus.PENDING.value:
+                    if row.version < 2:
+                        unversioned.append(row.id)
+                    events.append(status_event(
+                        row.tenant_id, row.id, row.previous_status, row.status, max(row.version, 2),
+                        changed_at=row.updated_at or created_at
+                    ))
+            conn.execute(insert(BookingStatusEvent), events)
+            if unversioned:
+                conn.execute(
+                    update(model).where(model.id.in_(unversioned)).values(version=2, updated_at=model.updated_at)
+                )
+            after = rows[-1].id
@@ -0,0 +1,166 @@
+"""
+Workshop Queue
+Confirmed and in-progress bookings waiting for a mechanic, in priority
+order: booking_date, then arrival (created_at), then the shortest job
+(estimated_minutes), with the id as tie-breaker.
+
+The queue is the partial index ix_bookings_workqueue, which holds exactly
+the unclaimed queued bookings in that order. Peeking at the head, claiming
+and releasing are each one statement that touches one index entry, so
+they cost O(log n) whatever the length of the booking list.
+
+Claims are row-level: a claim is a conditional UPDATE that only matches an
+unclaimed booking. Claiming the head picks it in a subquery locked with
+FOR UPDATE SKIP LOCKED on Postgres, so concurrent mechanics take different
+jobs instead of queueing on the same row; SQLite runs the whole statement
+under its write lock. A claim is workshop state, not an edit of the
+booking: it keeps version, change_seq and updated_at.
+"""
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..models.booking import Booking, WORKQUEUE_STATUSES, workqueue_predicate
+from ..models.tenant import TENANT_PARAM, tenant_filtered, tenant_params
+from ..models.types import UUIDKey
+
+
+def _queue_order(model) -> tuple:
+    """Priority order of the queue, the column order of ix_bookings_workqueue."""
+    return (model.booking_date, model.created_at, model.estimated_minutes, model.id)
+
+
+def _claim(condition):
+    """UPDATE claiming the booking matched by condition, if it is still unclaimed."""
+    return tenant_filtered(
+        update(Booking)
+        .where(condition, workqueue_predicate(Booking.status, Booking.claimed_by))
+        .values(
+            claimed_by=bindparam("mechanic_id", type_=UUIDKey),
+            claimed_at=bindparam("claimed_at"),
+            updated_at=Booking.updated_at
+        )
+        .returning(Booking.id)
+        .execution_options(synchronize_session=False),
+        Booking
+    )
+
+
+NEXT_JOB = tenant_filtered(
+    select(Booking.id)
+    .where(workqueue_predicate(Booking.status, Booking.claimed_by))
+    .order_by(*_queue_order(Booking))
+    .limit(1),
+    Booking
+)
+
+_queued = aliased(Booking)
+CLAIM_NEXT = _claim(
+    Booking.id == (
+        select(_queued.id)
+        .where(_queued.tenant_id == bindparam(TENANT_PARAM), workqueue_predicate(_queued.status, _queued.claimed_by))
+        .order_by(*_queue_order(_queued))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+)
+
+CLAIM_BY_ID = _claim(Booking.id == bindparam("booking_id", type_=UUIDKey))
+
+CLAIM_STATE = tenant_filtered(
+    select(Booking.status, Booking.claimed_by).where(Booking.id == bindparam("booking_id", type_=UUIDKey)),
+    Booking
+)
+
+
+class WorkQueue:
+    """Service class for the workshop job queue."""
+
+    @staticmethod
+    async def next_job(db: AsyncSession) -> Optional[str]:
+        """Id of the booking at the head of the queue, without claiming it."""
+        result = await db.execute(NEXT_JOB, tenant_params(db))
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def claim_next(db: AsyncSession, mechanic_id: str) -> Optional[str]:
+        """Claim the booking at the head of the queue; None when the queue is empty."""
+        result = await db.execute(
+            CLAIM_NEXT, tenant_params(db, mechanic_id=mechanic_id, claimed_at=datetime.utcnow())
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def claim(db: AsyncSession, booking_id: UUID, mechanic_id: str) -> str:
+        """Claim one queued booking; raises 404 or 409 when it cannot be claimed."""
+        result = await db.execute(
+            CLAIM_BY_ID,
+            tenant_params(db, booking_id=booking_id, mechanic_id=mechanic_id, claimed_at=datetime.utcnow())
+        )
+        claimed = result.scalar_one_or_none()
+        if claimed is None:
+            await WorkQueue._raise_unclaimable(db, booking_id)
+        return claimed
+
+    @staticmethod
+    async def release(db: AsyncSession, booking_id: UUID, mechanic_id: str, force: bool = False) -> str:
+        """
+        Put a claimed booking back in the queue.
+        Only the mechanic holding the claim may release it, unless force is set.
+        """
+        stmt = (
+            update(Booking)
+            .where(Booking.id == booking_id, Booking.claimed_by.is_not(None))
+            .values(claimed_by=None, claimed_at=None, updated_at=Booking.updated_at)
+            .returning(Booking.id)
+            .execution_options(synchronize_session=False)
+        )
+        if not force:
+            stmt = stmt.where(Booking.claimed_by == mechanic_id)
+
+        released = (await db.execute(stmt)).scalar_one_or_none()
+        if released is None:
+            row = await WorkQueue._claim_state(db, booking_id)
+            if row.claimed_by is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Booking is not claimed"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Booking is claimed by another mechanic"
+            )
+        return released
+
+    @staticmethod
+    async def _claim_state(db: AsyncSession, booking_id: UUID):
+        """Current status and claim of a booking; raises 404 when it does not exist."""
+        result = await db.execute(CLAIM_STATE, tenant_params(db, booking_id=booking_id))
+        row = result.one_or_none()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Booking not found"
+            )
+        return row
+
+    @staticmethod
+    async def _raise_unclaimable(db: AsyncSession, booking_id: UUID):
+        """Explain why a claim matched no row (only runs on the failure path)."""
+        row = await WorkQueue._claim_state(db, booking_id)
+        if row.status not in {s.value for s in WORKQUEUE_STATUSES}:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Bookings in status '{row.status}' are not in the workshop queue"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Booking is already claimed"
+        )
@@ -0,0 +1,121 @@
+"""
+Primary Key Benchmark
+Compares the key layouts of a bookings-like table on SQLite:
+
+- uuid4 text: random 36-character ids (schema v7)
+- uuid7 text: time-ordered ids, still as text
+- uuid4 binary: random ids in 16 bytes
+- uuid7 binary: time-ordered ids in 16 bytes (schema v8)
+
+For each it reports the insert throughput (batched inserts, one commit
+per batch, as the booking routes write) and the size of the table, its
+primary key index and its secondary indexes (from the dbstat table).
+
+Run from the backend directory:
+    python benchmarks/id_benchmark.py --rows 200000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Column, Date, DateTime, Float, Index, MetaData, String, Table, create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.types import UUIDKey, uuid7  # noqa: E402
+
+
+VARIANTS = [
+    ("uuid4 text", uuid.uuid4, String(36)),
+    ("uuid7 text", uuid7, String(36)),
+    ("uuid4 binary", uuid.uuid4, UUIDKey()),
+    ("uuid7 binary", uuid7, UUIDKey()),
+]
+
+
+def bookings_table(key_type) -> Table:
+    metadata = MetaData()
+    return Table(
+        "bookings",
+        metadata,
+        Column("id", key_type, primary_key=True),
+        Column("tenant_id", String(36), nullable=False),
+        Column("customer_id", key_type, nullable=False),
+        Column("booking_date", Date, nullable=False),
+        Column("status", String(30), nullable=False),
+        Column("total_price", Float, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Index("ix_bookings_tenant_customer_created", "tenant_id", "customer_id", "created_at"),
+        Index("ix_bookings_status_date_id", "status", "booking_date", "id"),
+    )
+
+
+def run_variant(path: str, make_id, key_type, rows: int, batch_size: int, customers: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    table = bookings_table(key_type)
+    table.metadata.create_all(engine)
+
+    customer_ids = [str(make_id()) for _ in range(customers)]
+    today = date.today()
+    elapsed = 0.0
+    with engine.connect() as conn:
+        for start in range(0, rows, batch_size):
+            batch = [
+                {
+                    "id": str(make_id()),
+                    "tenant_id": "default",
+                    "customer_id": customer_ids[n % customers],
+                    "booking_date": today + timedelta(days=n % 60),
+                    "status": "pending",
+                    "total_price": 10.0,
+                    "created_at": datetime.utcnow(),
+                }
+                for n in range(start, min(start + batch_size, rows))
+            ]
+            began = time.perf_counter()
+            conn.execute(table.insert(), batch)
+            conn.commit()
+            elapsed += time.perf_counter() - began
+
+        sizes = dict(conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+    engine.dispose()
+
+    return {
+        "rows_per_second": rows / elapsed,
+        "table_bytes": sizes.get("bookings", 0),
+        "primary_key_bytes": sizes.get("sqlite_autoindex_bookings_1", 0),
+        "secondary_index_bytes": sum(
+            size for name, size in sizes.items() if name.startswith("ix_bookings")
+        ),
+        "file_bytes": os.path.getsize(path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark primary key layouts on SQLite")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--customers", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows in batches of {args.batch_size}")
+    print(f"  {'layout':14} {'rows/s':>9} {'table':>9} {'pk index':>9} {'2nd idx':>9} {'file':>9}  (MiB)")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make_id, key_type in VARIANTS:
+            path = os.path.join(directory, name.replace(" ", "_") + ".db")
+            result = run_variant(path, make_id, key_type, args.rows, args.batch_size, args.customers)
+            mib = 1024 * 1024
+            print(
+                f"  {name:14} {result['rows_per_second']:9.0f} "
+                f"{result['table_bytes'] / mib:9.2f} {result['primary_key_bytes'] / mib:9.2f} "
+                f"{result['secondary_index_bytes'] / mib:9.2f} {result['file_bytes'] / mib:9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Photo Upload Benchmark
+Uploads booking photos through POST /api/v1/bookings/{id}/photos and
+reports, per photo size:
+
+- upload throughput (MB/s) and latency (p50, ms), the body sent in 64 KB
+  chunks as a network client would
+- the peak Python memory allocated while one photo is received
+  (tracemalloc), to compare with the photo's size: a streamed upload
+  stays flat however large the photo is
+- the time per photo until all uploads and their display and thumbnail
+  variants are done; the process pool makes the variants while the
+  uploads go on
+
+Needs Pillow (pip install Pillow) to build the test photos.
+The data lives in a temporary SQLite shard of its own ("bench" tenant).
+
+Run from the backend directory:
+    python benchmarks/photo_benchmark.py --uploads 20
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TENANT = "bench"
+BOUNDARY = "photo-benchmark-boundary"
+SEND_CHUNK = 64 * 1024
+
+
+def configure(directory: str):
+    """Settings for the benchmark process; must run before the app is imported."""
+    os.environ.update({
+        "DEBUG": "false",
+        "DATABASE_SHARDS": json.dumps({TENANT: f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"}),
+        "TENANT_SHARDS": json.dumps({TENANT: TENANT}),
+        "PHOTO_DIR": os.path.join(directory, "photos"),
+        "PHOTO_MAX_PER_BOOKING": "100000",
+        "PHOTO_MAX_BYTES": str(64 * 1024 * 1024),
+        "RATE_LIMIT_ENABLED": "false",
+        "ADMISSION_ENABLED": "false",
+        "CACHE_BUS_ENABLED": "false",
+        "SCHEDULER_ENABLED": "false",
+        "STARTUP_WARMUP": "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def make_photo(megapixels: float) -> bytes:
+    """A noisy JPEG (compresses like a real photo, unlike a flat colour)."""
+    from PIL import Image
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    noise = Image.effect_noise((width, height), 64)
+    image = Image.merge("RGB", (noise, noise.rotate(90, expand=False), noise.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def multipart_body(photo: bytes):
+    """The upload body in network-sized chunks."""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="damage.jpg"\r\n'
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    for offset in range(0, len(photo), SEND_CHUNK):
+        yield photo[offset:offset + SEND_CHUNK]
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def seed(client) -> dict:
+    """Customer with one booking to attach the photos to."""
+    tenant = {"X-Tenant-ID": TENANT}
+    password = "Passw0rdX"
+    owner = await client.post("/api/v1/auth/register", headers=tenant, json={
+        "email": "owner@bench.example.com", "password": password, "name": "Owner", "phone": "1234567890", "role": "owner"
+    })
+    customer = await client.post("/api/v1/auth/register", headers=tenant, json={
+        "email": "customer@bench.example.com", "password": password, "name": "Customer", "phone": "1234567890"
+    })
+    owner_headers = {"Authorization": f"Bearer {owner.json()['access_token']}"}
+    customer_headers = {"Authorization": f"Bearer {customer.json()['access_token']}"}
+    service = await client.post("/api/v1/services", headers=owner_headers, json={
+        "name": "Repair", "price": "10.0", "estimated_time": 30
+    })
+    booking = await client.post("/api/v1/bookings", headers=customer_headers, json={
+        "service_ids": [service.json()["id"]], "booking_date": str(date.today() + timedelta(days=1))
+    })
+    return {"headers": customer_headers, "booking_id": booking.json()["id"]}
+
+
+async def upload(client, seeded: dict, photo: bytes) -> dict:
+    response = await client.post(
+        f"/api/v1/bookings/{seeded['booking_id']}/photos",
+        content=multipart_body(photo),
+        headers={**seeded["headers"], "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def run(args):
+    import httpx
+    import main
+    from app.services.photos import photo_processor
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            seeded = await seed(client)
+            await upload(client, seeded, make_photo(1))  # start the pool's processes
+
+            print(f"{'photo':>16} {'MB/s':>7} {'p50 ms':>7} {'peak KB':>8} {'done s/photo':>12}")
+            for megapixels in args.megapixels:
+                photo = make_photo(megapixels)
+                await photo_processor.wait()
+
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(args.uploads):
+                    upload_started = time.perf_counter()
+                    await upload(client, seeded, photo)
+                    latencies.append(time.perf_counter() - upload_started)
+                uploaded = time.perf_counter() - started
+                await photo_processor.wait()
+                processed = time.perf_counter() - started
+
+                tracemalloc.start()
+                await upload(client, seeded, photo)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                await photo_processor.wait()
+
+                throughput = len(photo) * args.uploads / uploaded / (1024 * 1024)
+                print(
+                    f"{megapixels:4.0f} MP {len(photo) / 1024:6.0f} KB {throughput:7.1f} "
+                    f"{statistics.median(latencies) * 1000:7.1f} {peak / 1024:8.0f} {processed / args.uploads:12.3f}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed booking photo uploads")
+    parser.add_argument("--uploads", type=int, default=10, help="Uploads per photo size")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[2, 8, 24], help="Photo sizes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure(directory)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Hot Query Benchmark
+Python CPU time per request of the hot read routes on a small dataset,
+where a request costs statement construction and compilation far more
+than the database work:
+
+- GET /api/v1/bookings          (owner, with get_current_user)
+- GET /api/v1/bookings/{id}     (customer)
+- GET /api/v1/auth/me           (get_current_user alone)
+- GET /api/v1/services          (catalog cache off, so the query runs)
+
+The data lives in a temporary SQLite shard of its own ("bench" tenant),
+so the development database only gets its schema checked.
+
+Run from the backend directory:
+    python benchmarks/query_benchmark.py --requests 500
+    python benchmarks/query_benchmark.py --profile "GET /api/v1/bookings"   # cProfile of one route
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TENANT = "bench"
+
+
+def configure(db_path: str):
+    """Settings for the benchmark process; must run before the app is imported."""
+    os.environ.update({
+        "DEBUG": "false",
+        "DATABASE_SHARDS": json.dumps({TENANT: f"sqlite+aiosqlite:///{db_path}"}),
+        "TENANT_SHARDS": json.dumps({TENANT: TENANT}),
+        "RATE_LIMIT_ENABLED": "false",
+        "ADMISSION_ENABLED": "false",
+        "CACHE_BUS_ENABLED": "false",
+        "SCHEDULER_ENABLED": "false",
+        "STARTUP_WARMUP": "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+
+async def seed(client, bookings: int) -> dict:
+    """Owner, customer, services and bookings; returns the headers and ids the routes need."""
+    tenant = {"X-Tenant-ID": TENANT}
+    password = "Passw0rdX"
+    owner = await client.post("/api/v1/auth/register", headers=tenant, json={
+        "email": "owner@bench.example.com", "password": password, "name": "Owner", "phone": "1234567890", "role": "owner"
+    })
+    customer = await client.post("/api/v1/auth/register", headers=tenant, json={
+        "email": "customer@bench.example.com", "password": password, "name": "Customer", "phone": "1234567890"
+    })
+    owner_headers = {"Authorization": f"Bearer {owner.json()['access_token']}"}
+    customer_headers = {"Authorization": f"Bearer {customer.json()['access_token']}"}
+
+    service_ids = []
+    for n in range(3):
+        response = await client.post("/api/v1/services", headers=owner_headers, json={
+            "name": f"Service {n}", "price": "10.0", "estimated_time": 30
+        })
+        service_ids.append(response.json()["id"])
+
+    booking_ids = []
+    for n in range(bookings):
+        response = await client.post("/api/v1/bookings", headers=customer_headers, json={
+            "service_ids": service_ids[:1 + n % 3],
+            "booking_date": str(date.today() + timedelta(days=1 + n % 30))
+        })
+        booking_ids.append(response.json()["id"])
+
+    return {"owner": owner_headers, "customer": customer_headers, "booking_id": booking_ids[0]}
+
+
+def routes(seeded: dict) -> list:
+    """(label, url, headers) of the measured requests."""
+    return [
+        ("GET /api/v1/bookings", "/api/v1/bookings", seeded["owner"]),
+        ("GET /api/v1/bookings/{id}", f"/api/v1/bookings/{seeded['booking_id']}", seeded["customer"]),
+        ("GET /api/v1/auth/me", "/api/v1/auth/me", seeded["customer"]),
+        ("GET /api/v1/services", "/api/v1/services", {"X-Tenant-ID": TENANT}),
+    ]
+
+
+async def measure(client, url: str, headers: dict, requests: int) -> dict:
+    for _ in range(20):  # warm the pools and SQLAlchemy's caches
+        await client.get(url, headers=headers)
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+    return {
+        "cpu_ms": (time.process_time() - cpu_started) / requests * 1000,
+        "wall_ms": (time.perf_counter() - wall_started) / requests * 1000,
+    }
+
+
+async def run(args):
+    import httpx
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            seeded = await seed(client, args.bookings)
+
+            if args.profile:
+                label, url, headers = next(r for r in routes(seeded) if r[0] == args.profile)
+                await measure(client, url, headers, 20)
+                profiler = cProfile.Profile()
+                profiler.enable()
+                await measure(client, url, headers, args.requests)
+                profiler.disable()
+                print(f"{label}, {args.requests} requests:")
+                pstats.Stats(profiler).sort_stats(args.sort).print_stats(args.top)
+                return
+
+            print(f"{args.bookings} bookings, {args.requests} requests per route")
+            print(f"  {'route':28} {'cpu ms/req':>10} {'wall ms/req':>11}")
+            for label, url, headers in routes(seeded):
+                result = await measure(client, url, headers, args.requests)
+                print(f"  {label:28} {result['cpu_ms']:10.3f} {result['wall_ms']:11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU time of the hot read routes")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--bookings", type=int, default=20)
+    parser.add_argument("--profile", help="Profile one route, e.g. \"GET /api/v1/bookings\"")
+    parser.add_argument("--top", type=int, default=25, help="Functions listed by --profile")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key for --profile (cumulative, tottime)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure(os.path.join(directory, "bench.db"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Single-Flight Benchmark
+Bursts of identical concurrent catalog reads, as when a promotion goes
+out, with request coalescing (app/services/single_flight.py) off and on:
+
+- GET /api/v1/services
+- GET /api/v1/services/{id}
+
+Reports per route and mode the SQL statements run per burst, the burst's
+wall time, the p50 and p99 latency and the coalescing ratio. The catalog
+cache is off, so without coalescing every request runs its queries.
+
+The data lives in a temporary SQLite shard of its own ("bench" tenant).
+
+Run from the backend directory:
+    python benchmarks/single_flight_benchmark.py --concurrency 200 --bursts 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TENANT = "bench"
+
+
+def configure(db_path: str):
+    """Settings for the benchmark process; must run before the app is imported."""
+    os.environ.update({
+        "DEBUG": "false",
+        "DATABASE_SHARDS": json.dumps({TENANT: f"sqlite+aiosqlite:///{db_path}"}),
+        "TENANT_SHARDS": json.dumps({TENANT: TENANT}),
+        "RATE_LIMIT_ENABLED": "false",
+        "ADMISSION_ENABLED": "false",
+        "CACHE_BUS_ENABLED": "false",
+        "SCHEDULER_ENABLED": "false",
+        "STARTUP_WARMUP": "false",
+        "PROFILING_ENABLED": "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+
+async def seed(client, services: int) -> str:
+    """A catalog of services; returns the id of the first one."""
+    owner = await client.post("/api/v1/auth/register", headers={"X-Tenant-ID": TENANT}, json={
+        "email": "owner@bench.example.com", "password": "Passw0rdX", "name": "Owner", "phone": "1234567890", "role": "owner"
+    })
+    headers = {"Authorization": f"Bearer {owner.json()['access_token']}"}
+    ids = []
+    for n in range(services):
+        response = await client.post("/api/v1/services", headers=headers, json={
+            "name": f"Service {n}", "price": "10.0", "estimated_time": 30
+        })
+        ids.append(response.json()["id"])
+    return ids[0]
+
+
+async def burst(client, url: str, concurrency: int) -> list:
+    """Latencies of concurrency identical requests sent at once."""
+    async def timed():
+        started = time.perf_counter()
+        response = await client.get(url, headers={"X-Tenant-ID": TENANT})
+        assert response.status_code == 200, response.text
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(timed() for _ in range(concurrency)))
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    import main
+    from app.config import settings
+    from app.services.metrics import metrics
+
+    statements = 0
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=None) as client:
+            service_id = await seed(client, args.services)
+            routes = [
+                ("GET /api/v1/services", "/api/v1/services", "services:list"),
+                ("GET /api/v1/services/{id}", f"/api/v1/services/{service_id}", "services:get"),
+            ]
+
+            print(f"{args.bursts} bursts of {args.concurrency} concurrent requests")
+            print(f"  {'route':28} {'mode':5} {'stmts/burst':>11} {'burst ms':>9} {'p50 ms':>7} {'p99 ms':>7} {'ratio':>6}")
+            for label, url, name in routes:
+                for enabled in (False, True):
+                    settings.SINGLE_FLIGHT_ENABLED = enabled
+                    await burst(client, url, args.concurrency)  # warm the pools and SQLAlchemy's caches
+                    coalesced = metrics.value("single_flight_coalesced_total", route=name)
+                    executions = metrics.value("single_flight_executions_total", route=name)
+                    statements = 0
+                    latencies, burst_seconds = [], []
+                    for _ in range(args.bursts):
+                        started = time.perf_counter()
+                        latencies.extend(await burst(client, url, args.concurrency))
+                        burst_seconds.append(time.perf_counter() - started)
+                    coalesced = metrics.value("single_flight_coalesced_total", route=name) - coalesced
+                    executions = metrics.value("single_flight_executions_total", route=name) - executions
+                    latencies.sort()
+                    ratio = coalesced / (coalesced + executions) if coalesced + executions else 0.0
+                    print(
+                        f"  {label:28} {'on' if enabled else 'off':5} {statements / args.bursts:11.1f} "
+                        f"{statistics.mean(burst_seconds) * 1000:9.1f} {latencies[len(latencies) // 2] * 1000:7.1f} "
+                        f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} {ratio:6.2f}"
+                    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-flight coalescing of catalog reads")
+    parser.add_argument("--concurrency", type=int, default=200, help="Identical requests per burst")
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--services", type=int, default=20, help="Services in the catalog")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure(os.path.join(directory, "bench.db"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Startup Benchmark
+Measures what a freshly scaled-up worker pays before serving traffic:
+
+- import time of `main` and its heaviest modules (python -X importtime)
+- lifespan startup time (schema check, warmup)
+- latency of the first and following requests
+
+Each run happens in a fresh interpreter so module caches do not hide the cost.
+
+Run from the backend directory:
+    python benchmarks/startup_benchmark.py --runs 5
+    python benchmarks/startup_benchmark.py --no-warmup   # compare against a cold first request
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child interpreter; prints one JSON line with the timings
+CHILD_SCRIPT = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import httpx
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            latencies = []
+            for _ in range(5):
+                t0 = time.perf_counter()
+                response = await client.get("/api/v1/services")
+                latencies.append(time.perf_counter() - t0)
+                assert response.status_code == 200, response.text
+    return ready, latencies
+
+ready, latencies = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": latencies[0] * 1000,
+    "next_request_ms": sum(latencies[1:]) / len(latencies[1:]) * 1000,
+}))
+"""
+
+
+def child_env(warmup: bool) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["STARTUP_WARMUP"] = "true" if warmup else "false"
+    env["DEBUG"] = "false"
+    return env
+
+
+def measure_startup(warmup: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=BACKEND_DIR,
+        env=child_env(warmup),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_breakdown(top: int) -> list:
+    """Cumulative import time (ms) per module from python -X importtime, heaviest first."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env=child_env(False),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1000, name.strip()))
+    modules.sort(reverse=True)
+    return modules[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Heaviest imports to list")
+    parser.add_argument("--no-warmup", action="store_true", help="Disable STARTUP_WARMUP")
+    args = parser.parse_args()
+
+    print("Heaviest imports of main (cumulative):")
+    for ms, name in import_breakdown(args.top):
+        print(f"  {ms:8.1f} ms  {name}")
+
+    runs = [measure_startup(not args.no_warmup) for _ in range(args.runs)]
+    print(f"\nStartup over {args.runs} runs (warmup {'off' if args.no_warmup else 'on'}), median:")
+    for metric in ("import_ms", "startup_ms", "first_request_ms", "next_request_ms"):
+        values = [run[metric] for run in runs]
+        print(f"  {metric:18} {statistics.median(values):8.1f} ms  "
+              f"(min {min(values):.1f}, max {max(values):.1f})")
+
+
+if __name__ == "__main__":
+    main()
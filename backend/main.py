@@ -6,25 +6,51 @@ Main entry point and application configuration.
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.config import settings
 from app.database import init_db, close_db
-from app.routes import auth_router, services_router, bookings_router
+from app.routes import auth_router, services_router, bookings_router, workqueue_router, photos_router, backups_router, profiles_router, invoices_router
+from app.middleware import CompressionMiddleware, TenantMiddleware, DeadlineMiddleware, AdmissionMiddleware, ProfilingMiddleware, CaptureMiddleware
+from app.services.cache_bus import cache_bus
+from app.services.jobs import scheduler
+from app.services.status_history import status_history
+from app.services.photos import photo_processor
+from app.services.invoices import invoice_renderer
+from app.services.capture import capture_log
+from app.services.metrics import metrics
+from app.warmup import warm_up
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle manager."""
     # Startup
+    app.state.ready = False
     print(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     await init_db()
     print("Database initialized")
+    await cache_bus.start()
+    await status_history.start()
+    await photo_processor.start()
+    await invoice_renderer.start()
+    await capture_log.start()
+    await scheduler.start()
+    if settings.STARTUP_WARMUP:
+        elapsed = await warm_up(app)
+        print(f"Warmup finished in {elapsed * 1000:.0f} ms")
+    app.state.ready = True
     
     yield
     
     # Shutdown
     print("Shutting down...")
+    await scheduler.stop()
+    await capture_log.stop()
+    await invoice_renderer.stop()
+    await photo_processor.stop()
+    await status_history.stop()
+    await cache_bus.stop()
     await close_db()
     print("Database connections closed")
 
@@ -54,6 +80,18 @@ app = FastAPI(
 )
 
 
+# On-demand and sampled request profiles; innermost, so only the request's own work is timed
+app.add_middleware(ProfilingMiddleware)
+
+# Resolve the station (tenant) of each request; runs inside CORS
+app.add_middleware(TenantMiddleware)
+
+# Per-route deadlines; cancels work of timed-out and abandoned requests
+app.add_middleware(DeadlineMiddleware)
+
+# Per-route-class concurrency limits; sheds load with 503 before any work starts
+app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -63,6 +101,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (booking lists)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Opt-in traffic capture for replay (CAPTURE_ENABLED); outermost, so it times what clients see
+app.add_middleware(CaptureMiddleware)
+
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -79,6 +123,11 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(services_router, prefix="/api/v1")
 app.include_router(bookings_router, prefix="/api/v1")
+app.include_router(photos_router, prefix="/api/v1")
+app.include_router(invoices_router, prefix="/api/v1")
+app.include_router(workqueue_router, prefix="/api/v1")
+app.include_router(backups_router, prefix="/api/v1")
+app.include_router(profiles_router, prefix="/api/v1")
 
 
 # Health check endpoint
@@ -94,7 +143,12 @@ async def root():
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Detailed health check."""
+    """Detailed health check. Returns 503 until startup and warmup have finished."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting", "version": settings.APP_VERSION}
+        )
     return {
         "status": "healthy",
         "database": "connected",
@@ -102,6 +156,14 @@ async def health_check():
     }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics_endpoint():
+    """Metrics of this worker in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render())
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,140 @@
+"""
+Test Fixtures
+Each test gets a fresh in-memory SQLite database as the default shard and
+an httpx client calling the app in-process. The app's lifespan does not
+run: tests start the background services they need themselves.
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+# Settings are read when the app is imported
+_data_dir = tempfile.mkdtemp(prefix="bike_service_tests_")
+os.environ.update({
+    "DEBUG": "false",
+    "RATE_LIMIT_ENABLED": "false",
+    "SCHEDULER_ENABLED": "false",
+    "STARTUP_WARMUP": "false",
+    "CAPTURE_ENABLED": "false",
+    "SMTP_USER": "",
+    "BACKUP_DIR": os.path.join(_data_dir, "backups"),
+    "PHOTO_DIR": os.path.join(_data_dir, "photos"),
+    "INVOICE_DIR": os.path.join(_data_dir, "invoices"),
+    "PROFILE_DIR": os.path.join(_data_dir, "profiles"),
+    "CAPTURE_DIR": os.path.join(_data_dir, "captures"),
+})
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.database import DEFAULT_SHARD, init_db, shard_router
+
+
+PASSWORD = "Passw0rdX"
+TOMORROW = str(date.today() + timedelta(days=1))
+
+
+@pytest.fixture
+async def engine(monkeypatch):
+    """A new in-memory database as the default shard, migrated to the current schema."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    monkeypatch.setitem(shard_router._engines, DEFAULT_SHARD, engine)
+    monkeypatch.setitem(shard_router._sessionmakers, DEFAULT_SHARD, async_sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    ))
+    await init_db()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """Session factory on the test database, for arranging and checking rows."""
+    return shard_router.sessionmaker(DEFAULT_SHARD)
+
+
+@pytest.fixture
+async def shard_at(monkeypatch):
+    """Point the default shard at a database file."""
+    engines = []
+
+    def point(path: str):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=StaticPool)
+        engines.append(engine)
+        monkeypatch.setitem(shard_router._engines, DEFAULT_SHARD, engine)
+        monkeypatch.setitem(shard_router._sessionmakers, DEFAULT_SHARD, async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        ))
+
+    yield point
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def client(engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def register(client, email: str, role: str = "customer", tenant: str = None) -> dict:
+    """Register a user; returns the Authorization header of their token."""
+    response = await client.post(
+        "/api/v1/auth/register",
+        headers={"X-Tenant-ID": tenant} if tenant else {},
+        json={"email": email, "password": PASSWORD, "name": "Test User", "phone": "1234567890", "role": role}
+    )
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def create_booking(client, headers: dict, service_ids: list, booking_date: str = TOMORROW) -> dict:
+    response = await client.post(
+        "/api/v1/bookings", headers=headers, json={"service_ids": service_ids, "booking_date": booking_date}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def set_status(client, headers: dict, booking_id: str, *statuses: str) -> dict:
+    """Move a booking through statuses as the owner; returns the last response body."""
+    response = None
+    for status in statuses:
+        response = await client.put(
+            f"/api/v1/bookings/{booking_id}/status", headers=headers, json={"status": status}
+        )
+        assert response.status_code == 200, response.text
+    return response.json() if response is not None else None
+
+
+@pytest.fixture
+async def owner(client):
+    return await register(client, "owner@example.com", "owner")
+
+
+@pytest.fixture
+async def customer(client):
+    return await register(client, "customer@example.com")
+
+
+@pytest.fixture
+async def service_id(client, owner):
+    response = await client.post(
+        "/api/v1/services", headers=owner, json={"name": "Wash", "price": "10.50", "estimated_time": 30}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+async def booking(client, customer, service_id):
+    return await create_booking(client, customer, [service_id])
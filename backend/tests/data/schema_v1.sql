@@ -0,0 +1,99 @@
+-- Database of the application before schema versioning (schema v1): the
+-- original tables plus idempotency_keys and the archive tables, text ids,
+-- no tenant_id anywhere.
+
+CREATE TABLE idempotency_keys (
+    id VARCHAR(36) NOT NULL,
+    "key" VARCHAR(255) NOT NULL,
+    user_id VARCHAR(36) NOT NULL,
+    method VARCHAR(10) NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code INTEGER,
+    response_body TEXT,
+    locked_until DATETIME NOT NULL,
+    created_at DATETIME,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_idempotency_user_key UNIQUE (user_id, "key")
+);
+CREATE INDEX ix_idempotency_expires ON idempotency_keys (expires_at);
+
+CREATE TABLE services (
+    id VARCHAR(36) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    price FLOAT NOT NULL,
+    estimated_time INTEGER NOT NULL,
+    is_active BOOLEAN,
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE users (
+    id VARCHAR(36) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    phone VARCHAR(20) NOT NULL,
+    role VARCHAR(20) NOT NULL,
+    is_verified BOOLEAN,
+    verification_token VARCHAR(255),
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+
+CREATE TABLE bookings (
+    id VARCHAR(36) NOT NULL,
+    customer_id VARCHAR(36) NOT NULL,
+    booking_date DATE NOT NULL,
+    status VARCHAR(30) NOT NULL,
+    total_price FLOAT NOT NULL,
+    notes TEXT,
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(customer_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_bookings_status_updated ON bookings (status, updated_at);
+
+CREATE TABLE bookings_archive (
+    id VARCHAR(36) NOT NULL,
+    customer_id VARCHAR(36) NOT NULL,
+    booking_date DATE NOT NULL,
+    status VARCHAR(30) NOT NULL,
+    total_price FLOAT NOT NULL,
+    notes TEXT,
+    created_at DATETIME,
+    updated_at DATETIME,
+    archived_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(customer_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_bookings_archive_created ON bookings_archive (created_at);
+CREATE INDEX ix_bookings_archive_customer_created ON bookings_archive (customer_id, created_at);
+
+CREATE TABLE booking_services (
+    id VARCHAR(36) NOT NULL,
+    booking_id VARCHAR(36) NOT NULL,
+    service_id VARCHAR(36) NOT NULL,
+    service_price FLOAT NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(booking_id) REFERENCES bookings (id) ON DELETE CASCADE,
+    FOREIGN KEY(service_id) REFERENCES services (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_booking_services_booking_id ON booking_services (booking_id);
+
+CREATE TABLE booking_services_archive (
+    id VARCHAR(36) NOT NULL,
+    booking_id VARCHAR(36) NOT NULL,
+    service_id VARCHAR(36) NOT NULL,
+    service_price FLOAT NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(booking_id) REFERENCES bookings_archive (id) ON DELETE CASCADE,
+    FOREIGN KEY(service_id) REFERENCES services (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_booking_services_archive_booking_id ON booking_services_archive (booking_id);
@@ -0,0 +1,104 @@
+"""Per-route-class admission control and load shedding."""
+
+import asyncio
+
+import pytest
+
+from app.services.admission import ADJUST_EVERY, AdaptiveLimiter, Shed, admission
+
+
+def limiter(limit: int = 2, max_queue: int = 2, max_wait: float = 0.5, p99_target: float = 1.0) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        "test", limit=limit, min_limit=1, max_limit=8, max_queue=max_queue, max_wait=max_wait, p99_target=p99_target
+    )
+
+
+async def test_waiters_get_freed_slots_in_order():
+    classes = limiter()
+    await classes.acquire()
+    await classes.acquire()
+    admitted = []
+
+    async def wait(n):
+        await classes.acquire()
+        admitted.append(n)
+
+    waiters = [asyncio.create_task(wait(n)) for n in range(2)]
+    await asyncio.sleep(0)
+    assert classes.queued == 2
+    classes.release(0.01)
+    classes.release(0.01)
+    await asyncio.gather(*waiters)
+    assert admitted == [0, 1]
+    assert classes.in_flight == 2 and classes.queued == 0
+
+
+async def test_full_queue_is_shed():
+    classes = limiter(limit=1, max_queue=1)
+    await classes.acquire()
+    waiter = asyncio.create_task(classes.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Shed) as shed:
+        await classes.acquire()
+    assert shed.value.reason == "queue_full"
+    classes.release(0.01)
+    await waiter
+
+
+async def test_wait_timeout_is_shed_and_leaves_the_queue():
+    classes = limiter(limit=1, max_wait=0.05)
+    await classes.acquire()
+    with pytest.raises(Shed) as shed:
+        await classes.acquire()
+    assert shed.value.reason == "wait_timeout"
+    assert classes.queued == 0 and classes.in_flight == 1
+
+
+async def test_expected_wait_beyond_max_wait_is_shed_at_once():
+    classes = limiter(limit=1, max_wait=0.5)
+    await classes.acquire()
+    classes.release(2.0)  # requests of this class take about two seconds
+    await classes.acquire()
+    with pytest.raises(Shed) as shed:
+        await classes.acquire()
+    assert shed.value.reason == "expected_wait"
+    assert shed.value.retry_after == 2
+
+
+async def test_cancelled_waiter_passes_its_slot_on():
+    classes = limiter(limit=1)
+    await classes.acquire()
+    cancelled = asyncio.create_task(classes.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+    classes.release(0.01)
+    assert classes.in_flight == 0 and classes.queued == 0
+
+
+async def test_limit_shrinks_above_the_p99_target_and_grows_when_saturated():
+    classes = limiter(limit=4, p99_target=0.1)
+    for _ in range(ADJUST_EVERY):
+        await classes.acquire()
+        classes.release(0.5)
+    assert classes.limit == pytest.approx(3.2)
+
+    classes.p99_target = 1.0
+    classes._saturated = True
+    for _ in range(ADJUST_EVERY):
+        await classes.acquire()
+        classes.release(0.01)
+    assert classes.limit == pytest.approx(4.2)
+
+
+async def test_shed_request_gets_503_with_retry_after(client, monkeypatch):
+    public = admission.limiter("public-read")
+    monkeypatch.setattr(public, "limit", 1.0)
+    monkeypatch.setattr(public, "max_queue", 0)
+    monkeypatch.setattr(public, "in_flight", 1)
+
+    response = await client.get("/api/v1/services")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    # Other classes are not affected
+    assert (await client.get("/api/v1/bookings")).status_code in (401, 403)
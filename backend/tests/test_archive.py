@@ -0,0 +1,68 @@
+"""Archival of finished bookings into the archive tables."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models.booking import Booking
+from app.services.archive_service import ArchiveService
+
+from .conftest import create_booking, set_status
+
+
+async def finish_long_ago(db, client, owner, booking_id: str, *statuses: str):
+    await set_status(client, owner, booking_id, *statuses)
+    async with db() as session:
+        await session.execute(
+            update(Booking).where(Booking.id == booking_id).values(updated_at=datetime.utcnow() - timedelta(days=120))
+        )
+        await session.commit()
+
+
+async def test_old_finished_bookings_move_to_the_archive(client, db, owner, customer, service_id, booking):
+    live = await create_booking(client, customer, [service_id])
+    await finish_long_ago(db, client, owner, booking["id"], "confirmed", "in_progress", "ready_for_delivery", "completed")
+
+    assert await ArchiveService.archive_bookings(older_than_days=90) == 1
+
+    listed = (await client.get("/api/v1/bookings", headers=owner)).json()
+    assert [b["id"] for b in listed["bookings"]] == [live["id"]]
+    assert listed["total"] == 1
+
+    listed = (await client.get("/api/v1/bookings", headers=owner, params={"include_archived": "true"})).json()
+    assert {b["id"] for b in listed["bookings"]} == {live["id"], booking["id"]}
+    assert listed["total"] == 2
+
+
+async def test_archived_booking_resolves_by_id_on_request(client, db, owner, customer, booking):
+    await finish_long_ago(db, client, owner, booking["id"], "cancelled")
+    await ArchiveService.archive_bookings(older_than_days=90)
+
+    url = f"/api/v1/bookings/{booking['id']}"
+    assert (await client.get(url, headers=customer)).status_code == 404
+    response = await client.get(url, headers=customer, params={"include_archived": "true"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    assert len(response.json()["services"]) == 1
+
+
+async def test_recent_and_open_bookings_stay_live(client, db, owner, customer, service_id, booking):
+    recent = await create_booking(client, customer, [service_id])
+    await set_status(client, owner, recent["id"], "cancelled")
+    async with db() as session:
+        await session.execute(
+            update(Booking).where(Booking.id == booking["id"]).values(updated_at=datetime.utcnow() - timedelta(days=120))
+        )
+        await session.commit()
+
+    assert await ArchiveService.archive_bookings(older_than_days=90) == 0
+
+
+async def test_archival_leaves_a_tombstone_for_delta_sync(client, db, owner, booking):
+    token = (await client.get("/api/v1/bookings/changes", headers=owner)).json()["next_token"]
+    await finish_long_ago(db, client, owner, booking["id"], "cancelled")
+    await ArchiveService.archive_bookings(older_than_days=90)
+
+    changes = (await client.get("/api/v1/bookings/changes", headers=owner, params={"since": token})).json()
+    assert [t["booking_id"] for t in changes["removed"]] == [booking["id"]]
+    assert changes["removed"][0]["reason"] == "archived"
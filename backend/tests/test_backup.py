@@ -0,0 +1,103 @@
+"""Online SQLite snapshots: consistency while writers run, verification, restore and pruning."""
+
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+from app.config import settings
+from app.database import DEFAULT_SHARD, init_db
+from app.services.backup import backup_service, list_snapshots, restore_snapshot, take_snapshot, verify_snapshot
+
+from .conftest import register
+
+
+@pytest.fixture
+async def shard_file(tmp_path, shard_at, monkeypatch):
+    """The default shard as a WAL database file; snapshots go to a directory of this test."""
+    monkeypatch.setattr(settings, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(settings, "BACKUP_CPU_SHARE", 1.0)
+    path = str(tmp_path / "station.db")
+    with sqlite3.connect(path) as raw:
+        raw.execute("PRAGMA journal_mode=wal")
+    shard_at(path)
+    await init_db()
+    return path
+
+
+def snapshot_path(manifest: dict) -> str:
+    return os.path.join(settings.BACKUP_DIR, manifest["file"])
+
+
+def count_services(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM services").fetchone()[0]
+
+
+def add_service(conn: sqlite3.Connection, name: str):
+    conn.execute(
+        "INSERT INTO services (id, tenant_id, name, price, estimated_time, is_active, created_at, updated_at) "
+        "VALUES (randomblob(16), 'default', ?, 5, 15, 1, '2024-01-01', '2024-01-01')", (name,)
+    )
+
+
+def test_snapshot_is_taken_while_a_writer_holds_its_transaction(shard_file, tmp_path):
+    writer = sqlite3.connect(shard_file, isolation_level=None)
+    add_service(writer, "Committed")
+    writer.execute("BEGIN IMMEDIATE")
+    add_service(writer, "In flight")
+
+    manifest = take_snapshot(DEFAULT_SHARD)
+    writer.execute("COMMIT")
+    writer.close()
+
+    assert manifest["schema_version"] is not None
+    assert verify_snapshot(snapshot_path(manifest)) == []
+    restored = str(tmp_path / "restored.db")
+    restore_snapshot(snapshot_path(manifest), restored)
+    assert count_services(restored) == 1
+    assert count_services(shard_file) == 2
+
+
+def test_damaged_snapshot_fails_verification_and_is_not_restored(shard_file, tmp_path):
+    manifest = take_snapshot(DEFAULT_SHARD)
+    path = snapshot_path(manifest)
+    with gzip.open(path, "rb") as f:
+        raw = bytearray(f.read())
+    raw[len(raw) // 2] ^= 0xFF
+    with gzip.open(path, "wb") as f:
+        f.write(bytes(raw))
+
+    assert verify_snapshot(path) == ["compressed file does not match its checksum"]
+    with pytest.raises(ValueError):
+        restore_snapshot(path, str(tmp_path / "restored.db"))
+    assert not os.path.exists(tmp_path / "restored.db")
+
+
+def test_restore_does_not_replace_a_file_unless_forced(shard_file):
+    manifest = take_snapshot(DEFAULT_SHARD)
+    with pytest.raises(FileExistsError):
+        restore_snapshot(snapshot_path(manifest), shard_file)
+
+
+def test_old_snapshots_are_pruned(shard_file, monkeypatch):
+    monkeypatch.setattr(settings, "BACKUP_KEEP", 2)
+    taken = [take_snapshot(DEFAULT_SHARD)["name"] for _ in range(3)]
+
+    assert [m["name"] for m in list_snapshots(DEFAULT_SHARD)] == taken[:0:-1]
+    assert sorted(os.listdir(settings.BACKUP_DIR)) == sorted(
+        name + suffix for name in taken[1:] for suffix in (".db.gz", ".json")
+    )
+
+
+async def test_owner_starts_a_snapshot_and_sees_it_listed(client, shard_file):
+    owner = await register(client, "owner@example.com", "owner")
+    started = await client.post("/api/v1/backups", headers=owner)
+    assert started.status_code == 202
+    assert started.json()["running"] is True
+
+    manifest = await backup_service.snapshot_shard(DEFAULT_SHARD)  # joins the running snapshot
+    listed = (await client.get("/api/v1/backups", headers=owner)).json()
+    assert listed["running"] is False
+    assert [m["name"] for m in listed["snapshots"]] == [manifest["name"]]
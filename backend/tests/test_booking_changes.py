@@ -0,0 +1,74 @@
+"""Delta sync of bookings with change tokens."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models.booking import Booking
+from app.services.archive_service import ArchiveService
+
+from .conftest import create_booking, register, set_status
+
+
+async def sync(client, headers: dict, since: str = None, limit: int = 100) -> dict:
+    params = {"limit": limit}
+    if since:
+        params["since"] = since
+    response = await client.get("/api/v1/bookings/changes", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_full_sync_then_only_new_changes(client, owner, customer, service_id, booking):
+    first = await sync(client, customer)
+    assert [b["id"] for b in first["changed"]] == [booking["id"]]
+    assert first["has_more"] is False
+
+    assert (await sync(client, customer, first["next_token"]))["changed"] == []
+
+    await set_status(client, owner, booking["id"], "confirmed")
+    created = await create_booking(client, customer, [service_id])
+    second = await sync(client, customer, first["next_token"])
+    assert [b["id"] for b in second["changed"]] == [booking["id"], created["id"]]
+    assert second["changed"][0]["status"] == "confirmed"
+
+
+async def test_pages_through_changes_without_gaps(client, customer, service_id):
+    ids = [(await create_booking(client, customer, [service_id]))["id"] for _ in range(5)]
+    seen, token = [], None
+    while True:
+        page = await sync(client, customer, token, limit=2)
+        seen += [b["id"] for b in page["changed"]]
+        token = page["next_token"]
+        if not page["has_more"]:
+            break
+    assert seen == ids
+
+
+async def test_customers_only_see_their_own_bookings(client, owner, customer, service_id, booking):
+    other = await register(client, "other@example.com")
+    theirs = await create_booking(client, other, [service_id])
+
+    assert [b["id"] for b in (await sync(client, other))["changed"]] == [theirs["id"]]
+    assert {b["id"] for b in (await sync(client, owner))["changed"]} == {booking["id"], theirs["id"]}
+
+
+async def test_archived_bookings_come_back_as_removed(client, db, owner, customer, booking):
+    token = (await sync(client, customer))["next_token"]
+    await set_status(client, owner, booking["id"], "cancelled")
+    async with db() as session:
+        await session.execute(
+            update(Booking).where(Booking.id == booking["id"]).values(updated_at=datetime.utcnow() - timedelta(days=120))
+        )
+        await session.commit()
+    await ArchiveService.archive_bookings(older_than_days=90)
+
+    changes = await sync(client, customer, token)
+    assert changes["changed"] == []
+    assert [t["booking_id"] for t in changes["removed"]] == [booking["id"]]
+    assert changes["removed"][0]["reason"] == "archived"
+
+
+async def test_invalid_token_is_rejected(client, customer):
+    response = await client.get("/api/v1/bookings/changes", headers=customer, params={"since": "not a token"})
+    assert response.status_code == 400
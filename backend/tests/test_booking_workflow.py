@@ -0,0 +1,103 @@
+"""Compare-and-swap booking status transitions and cancellation rules."""
+
+import asyncio
+
+import pytest
+
+from app.models.booking import BOOKING_TRANSITIONS, BookingStatus, can_transition, predecessors
+
+from .conftest import register, set_status
+
+
+async def put_status(client, owner, booking_id: str, status: str, expected_version: int = None):
+    body = {"status": status}
+    if expected_version is not None:
+        body["expected_version"] = expected_version
+    return await client.put(f"/api/v1/bookings/{booking_id}/status", headers=owner, json=body)
+
+
+def test_state_machine_ends_in_completed_or_cancelled():
+    assert predecessors(BookingStatus.COMPLETED) == {BookingStatus.READY_FOR_DELIVERY}
+    assert not BOOKING_TRANSITIONS[BookingStatus.COMPLETED]
+    assert not BOOKING_TRANSITIONS[BookingStatus.CANCELLED]
+    assert can_transition(BookingStatus.READY_FOR_DELIVERY, BookingStatus.IN_PROGRESS)
+
+
+async def test_each_transition_bumps_the_version(client, owner, booking):
+    assert booking["version"] == 1
+    updated = await set_status(client, owner, booking["id"], "confirmed", "in_progress")
+    assert updated["status"] == "in_progress"
+    assert updated["version"] == 3
+
+
+async def test_transition_outside_the_state_machine_conflicts(client, owner, booking):
+    response = await put_status(client, owner, booking["id"], "completed")
+    assert response.status_code == 409
+    assert "from 'pending' to 'completed'" in response.json()["detail"]
+
+
+async def test_stale_expected_version_conflicts(client, owner, booking):
+    await set_status(client, owner, booking["id"], "confirmed")
+    response = await put_status(client, owner, booking["id"], "in_progress", expected_version=1)
+    assert response.status_code == 409
+    assert "current version 2" in response.json()["detail"]
+
+
+async def test_concurrent_updates_of_one_version_have_one_winner(client, owner, booking):
+    responses = await asyncio.gather(
+        put_status(client, owner, booking["id"], "confirmed", expected_version=1),
+        put_status(client, owner, booking["id"], "cancelled", expected_version=1),
+    )
+    assert sorted(response.status_code for response in responses) == [200, 409]
+
+
+async def test_unknown_booking_is_not_found(client, owner):
+    response = await put_status(client, owner, "01900000-0000-7000-8000-000000000000", "confirmed")
+    assert response.status_code == 404
+
+
+async def test_customer_cancels_own_open_booking(client, customer, booking):
+    response = await client.delete(f"/api/v1/bookings/{booking['id']}", headers=customer)
+    assert response.status_code == 204
+    booking = (await client.get(f"/api/v1/bookings/{booking['id']}", headers=customer)).json()
+    assert booking["status"] == "cancelled"
+
+
+async def test_customer_cannot_cancel_work_in_progress(client, owner, customer, booking):
+    await set_status(client, owner, booking["id"], "confirmed", "in_progress")
+    response = await client.delete(f"/api/v1/bookings/{booking['id']}", headers=customer)
+    assert response.status_code == 409
+
+
+async def test_customer_cannot_cancel_another_customers_booking(client, booking):
+    other = await register(client, "other@example.com")
+    response = await client.delete(f"/api/v1/bookings/{booking['id']}", headers=other)
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("statuses", [
+    (),
+    ("confirmed", "in_progress", "ready_for_delivery"),
+    ("confirmed", "in_progress", "ready_for_delivery", "completed"),
+])
+async def test_owner_cancels_a_booking_in_any_open_or_finished_status(client, owner, booking, statuses):
+    await set_status(client, owner, booking["id"], *statuses)
+    response = await client.delete(f"/api/v1/bookings/{booking['id']}", headers=owner)
+    assert response.status_code == 204
+    booking = (await client.get(f"/api/v1/bookings/{booking['id']}", headers=owner)).json()
+    assert booking["status"] == "cancelled"
+
+
+async def test_owner_cannot_cancel_a_cancelled_booking_again(client, owner, booking):
+    await set_status(client, owner, booking["id"], "cancelled")
+    response = await client.delete(f"/api/v1/bookings/{booking['id']}", headers=owner)
+    assert response.status_code == 409
+
+
+async def test_owner_cancellation_keeps_the_list_counters_right(client, owner, booking):
+    await set_status(client, owner, booking["id"], "confirmed", "in_progress", "ready_for_delivery")
+    await client.delete(f"/api/v1/bookings/{booking['id']}", headers=owner)
+    listed = await client.get("/api/v1/bookings", headers=owner, params={"status_filter": "cancelled"})
+    assert listed.json()["total"] == 1
+    listed = await client.get("/api/v1/bookings", headers=owner, params={"status_filter": "ready_for_delivery"})
+    assert listed.json()["total"] == 0
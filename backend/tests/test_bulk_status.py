@@ -0,0 +1,75 @@
+"""Bulk status updates with one batched notification job."""
+
+from app.services.email_service import EmailService
+
+from .conftest import create_booking, register, set_status
+
+
+UNKNOWN_ID = "01900000-0000-7000-8000-000000000000"
+
+
+async def put_batch(client, owner, booking_ids: list, status: str):
+    return await client.put(
+        "/api/v1/bookings/status:batch", headers=owner, json={"booking_ids": booking_ids, "status": status}
+    )
+
+
+async def test_batch_reports_a_result_per_booking(client, owner, customer, service_id):
+    pending = await create_booking(client, customer, [service_id])
+    completed = await create_booking(client, customer, [service_id])
+    await set_status(client, owner, completed["id"], "confirmed", "in_progress", "ready_for_delivery", "completed")
+
+    response = await put_batch(client, owner, [pending["id"], completed["id"], UNKNOWN_ID, pending["id"]], "confirmed")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated"] == 1
+    results = {result["id"]: result for result in body["results"]}
+    assert len(body["results"]) == 3  # duplicate ids are reported once
+    assert results[pending["id"]]["status_code"] == 200
+    assert results[pending["id"]]["status"] == "confirmed"
+    assert results[pending["id"]]["version"] == 2
+    assert results[completed["id"]]["status_code"] == 409
+    assert results[UNKNOWN_ID]["status_code"] == 404
+
+    detail = await client.get(f"/api/v1/bookings/{completed['id']}", headers=owner)
+    assert detail.json()["status"] == "completed"
+
+
+async def test_ready_for_delivery_sends_one_batched_job(client, owner, service_id, monkeypatch):
+    batches = []
+
+    async def send_batch(notifications):
+        batches.append(notifications)
+        return len(notifications)
+
+    monkeypatch.setattr(EmailService, "send_ready_for_delivery_batch", send_batch)
+    ids = []
+    for n in range(3):
+        customer = await register(client, f"rider{n}@example.com")
+        booking = await create_booking(client, customer, [service_id])
+        await set_status(client, owner, booking["id"], "confirmed", "in_progress")
+        ids.append(booking["id"])
+
+    response = await put_batch(client, owner, ids, "ready_for_delivery")
+    assert response.json()["updated"] == 3
+    assert len(batches) == 1
+    assert sorted(n["booking_id"] for n in batches[0]) == sorted(ids)
+    assert {n["to_email"] for n in batches[0]} == {f"rider{n}@example.com" for n in range(3)}
+
+
+async def test_no_notification_when_nothing_was_updated(client, owner, booking, monkeypatch):
+    batches = []
+
+    async def send_batch(notifications):
+        batches.append(notifications)
+        return len(notifications)
+
+    monkeypatch.setattr(EmailService, "send_ready_for_delivery_batch", send_batch)
+    response = await put_batch(client, owner, [booking["id"]], "ready_for_delivery")
+    assert response.json()["results"][0]["status_code"] == 409
+    assert batches == []
+
+
+async def test_batch_is_owner_only(client, customer, booking):
+    response = await put_batch(client, customer, [booking["id"]], "confirmed")
+    assert response.status_code == 403
@@ -0,0 +1,85 @@
+"""Versioned in-process caches and the invalidation bus."""
+
+from collections import OrderedDict
+
+import pytest
+
+from app.services.cache_bus import VersionedCache, cache_bus, service_catalog_cache
+
+
+@pytest.fixture
+def bus_running(monkeypatch):
+    """Caches are bypassed unless every shard's listener is connected."""
+    monkeypatch.setattr(cache_bus, "_connected", {"default": True})
+    monkeypatch.setattr(cache_bus, "_versions", {})
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+async def test_value_is_served_until_its_channel_is_published(db, bus_running):
+    cache, load = VersionedCache("things"), Loader()
+    assert await cache.get_or_load("k", load) == 1
+    assert await cache.get_or_load("k", load) == 1
+
+    async with db() as session:
+        await cache.invalidate(session, "default")
+        assert await cache.get_or_load("k", load) == 1  # not before the commit
+        await session.commit()
+    assert await cache.get_or_load("k", load) == 2
+
+
+async def test_rolled_back_publish_keeps_the_cache(db, bus_running):
+    cache, load = VersionedCache("things"), Loader()
+    await cache.get_or_load("k", load)
+    async with db() as session:
+        await cache.invalidate(session, "default")
+        await session.rollback()
+    assert await cache.get_or_load("k", load) == 1
+
+
+async def test_channels_are_per_tenant(db, bus_running):
+    cache, load = VersionedCache("things"), Loader()
+    assert cache.channel("acme") == "acme:things"
+    await cache.get_or_load("k", load)
+    async with db() as session:
+        await cache.invalidate(session, "acme")
+        await session.commit()
+    assert await cache.get_or_load("k", load) == 1  # the default tenant's entry is still current
+
+
+async def test_cache_is_bypassed_while_the_bus_is_down(monkeypatch):
+    monkeypatch.setattr(cache_bus, "_connected", {"default": False})
+    cache, load = VersionedCache("things"), Loader()
+    await cache.get_or_load("k", load)
+    assert await cache.get_or_load("k", load) == 2
+
+
+def test_versions_only_move_forward(monkeypatch):
+    monkeypatch.setattr(cache_bus, "_versions", {})
+    cache_bus.observe("default:things", 3)
+    cache_bus.observe("default:things", 2)
+    assert cache_bus.version("default:things") == 3
+
+
+async def test_catalog_reflects_service_changes(client, owner, service_id, bus_running, monkeypatch):
+    monkeypatch.setattr(service_catalog_cache, "_entries", OrderedDict())
+    assert float((await client.get("/api/v1/services")).json()["services"][0]["price"]) == 10.5
+
+    response = await client.put(f"/api/v1/services/{service_id}", headers=owner, json={"price": "12.00"})
+    assert response.status_code == 200
+    assert float((await client.get("/api/v1/services")).json()["services"][0]["price"]) == 12.0
+
+
+async def test_unchanged_service_update_keeps_the_catalog_version(client, owner, service_id, bus_running):
+    channel = service_catalog_cache.channel("default")
+    before = cache_bus.version(channel)
+    response = await client.put(f"/api/v1/services/{service_id}", headers=owner, json={"price": "10.50"})
+    assert response.status_code == 200
+    assert cache_bus.version(channel) == before
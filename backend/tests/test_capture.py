@@ -0,0 +1,119 @@
+"""Traffic capture (sanitized request shapes) and its replay against an instance."""
+
+import json
+import os
+from collections import deque
+
+import pytest
+
+from app.config import settings
+from app.services import capture
+from app.services.capture import capture_log, sanitize_query, user_key
+from app.services.replay import ReplayContext, load_capture, replay, summarize
+
+from .conftest import PASSWORD
+
+
+@pytest.fixture
+def captured(monkeypatch, tmp_path):
+    """Capture every API request into a fresh buffer and directory; yields the buffer."""
+    monkeypatch.setattr(settings, "CAPTURE_ENABLED", True)
+    monkeypatch.setattr(settings, "CAPTURE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "CAPTURE_DIR", str(tmp_path))
+    monkeypatch.setattr(capture_log, "_buffer", deque())
+    monkeypatch.setattr(capture_log, "_path", None)
+    return capture_log._buffer
+
+
+def test_sensitive_query_values_are_redacted_and_long_ones_cut():
+    query = sanitize_query({"access_token": "abc", "Email": "a@b.c", "page": "2", "q": "x" * 500})
+    assert query["access_token"] == "[redacted]"
+    assert query["Email"] == "[redacted]"
+    assert query["page"] == "2"
+    assert len(query["q"]) == capture.MAX_QUERY_VALUE
+
+
+def test_user_key_is_a_stable_pseudonym():
+    assert user_key("42") == user_key("42")
+    assert user_key("42") != user_key("43")
+    assert "42" not in user_key("42")
+    assert user_key(None) is None
+
+
+async def test_requests_are_recorded_without_secrets(client, captured, customer, booking):
+    captured.clear()
+    await client.post("/api/v1/auth/login", json={"email": "customer@example.com", "password": PASSWORD})
+    await client.get(f"/api/v1/bookings/{booking['id']}", headers=customer, params={"token": "abc"})
+    await client.get("/health")
+
+    login, read = list(captured)
+    assert login["route"] == "/api/v1/auth/login"
+    assert login["role"] == "anonymous"
+    assert login["body_bytes"] > 0
+    assert login["content_type"] == "application/json"
+
+    assert read["route"] == "/api/v1/bookings/{booking_id}"
+    assert read["query"] == {"token": "[redacted]"}
+    assert read["role"] == "customer"
+    assert read["tenant"] == "default"
+    assert read["status"] == 200
+    assert read["ms"] > 0 and read["response_bytes"] > 0
+
+    text = json.dumps([login, read])
+    for secret in (PASSWORD, booking["id"], customer["Authorization"].split()[1], "customer@example.com"):
+        assert secret not in text
+
+
+async def test_capture_is_off_unless_enabled(client, captured, monkeypatch):
+    monkeypatch.setattr(settings, "CAPTURE_ENABLED", False)
+    await client.get("/api/v1/services")
+    assert not captured
+
+
+async def test_full_buffer_drops_records(client, captured, monkeypatch):
+    monkeypatch.setattr(settings, "CAPTURE_BUFFER_MAX", 2)
+    for _ in range(4):
+        await client.get("/api/v1/services")
+    assert len(captured) == 2
+
+
+async def test_flush_appends_ndjson_and_rotates_files(captured, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CAPTURE_MAX_BYTES", 1)
+    monkeypatch.setattr(settings, "CAPTURE_KEEP", 2)
+    for n in range(3):
+        capture_log.record({"t": n, "method": "GET", "route": "/api/v1/services"})
+        assert await capture_log.flush() == 1
+
+    files = [str(tmp_path / name) for name in sorted(os.listdir(tmp_path))]
+    assert len(files) == 2  # rotated after every append, the oldest file pruned
+    assert [r["t"] for r in load_capture(files)] == [1, 2]
+
+
+async def test_capture_replays_against_an_instance(client, captured, owner, customer, service_id, booking):
+    captured.clear()
+    await client.get("/api/v1/services")
+    await client.get(f"/api/v1/services/{service_id}")
+    await client.get(f"/api/v1/bookings/{booking['id']}", headers=customer)
+    await client.post(
+        "/api/v1/bookings", headers=customer, json={"service_ids": [service_id], "booking_date": booking["booking_date"]}
+    )
+    await client.put(f"/api/v1/bookings/{booking['id']}/status", headers=owner, json={"status": "confirmed"})
+    await client.get("/api/v1/workqueue/nope", headers=owner)  # unmatched: not replayed
+    await capture_log.flush()
+
+    records = load_capture([capture_log._path])
+    assert len(records) == 5
+    ctx = ReplayContext(client, "default")
+    await ctx.seed(records, services=2, bookings=1)
+    assert {user.role for user in ctx.users.values()} == {"owner", "customer"}
+
+    summary = summarize(await replay(ctx, records, speed=10, max_in_flight=10))
+
+    by_route = {row["route"]: row for row in summary}
+    assert set(by_route) == {
+        "GET /api/v1/services", "GET /api/v1/services/{service_id}", "GET /api/v1/bookings/{booking_id}",
+        "POST /api/v1/bookings", "PUT /api/v1/bookings/{booking_id}/status",
+    }
+    assert all(row["skipped"] == 0 and row["server_errors"] == 0 for row in summary)
+    assert all(row["mismatched"] == 0 for row in summary)
+    assert by_route["GET /api/v1/bookings/{booking_id}"]["replayed_p50_ms"] > 0
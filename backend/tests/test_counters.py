@@ -0,0 +1,81 @@
+"""Maintained list totals and the counter consistency checker."""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+from app.database import DEFAULT_SHARD
+from app.models.booking import Booking
+from app.models.counter import Counter
+from app.services.archive_service import ArchiveService
+from app.services.counters import check_shard
+
+from .conftest import create_booking, register, set_status
+
+
+async def total(client, headers: dict, **params) -> int:
+    response = await client.get("/api/v1/bookings", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["total"]
+
+
+async def test_booking_totals_follow_creates_and_status_changes(client, owner, customer, service_id, booking):
+    other = await register(client, "other@example.com")
+    await create_booking(client, other, [service_id])
+    await set_status(client, owner, booking["id"], "confirmed")
+
+    assert await total(client, owner) == 2
+    assert await total(client, owner, status_filter="pending") == 1
+    assert await total(client, owner, status_filter="confirmed") == 1
+    assert await total(client, customer) == 1
+    assert await total(client, customer, status_filter="pending") == 0
+    assert await total(client, other, status_filter="pending") == 1
+
+
+async def test_date_range_totals_sum_the_day_counts(client, owner, customer, service_id):
+    days = [str(date.today() + timedelta(days=n)) for n in (1, 2, 5)]
+    for day in days:
+        await create_booking(client, customer, [service_id], booking_date=day)
+
+    assert await total(client, owner, date_from=days[0], date_to=days[1]) == 2
+    assert await total(client, owner, date_from=days[1]) == 2
+    assert await total(client, owner, date_to=days[0], status_filter="pending") == 1
+    assert await total(client, customer, date_from=days[1]) == 2  # counted from the rows
+
+
+async def test_archived_bookings_leave_the_totals(client, db, owner, customer, booking):
+    await set_status(client, owner, booking["id"], "cancelled")
+    async with db() as session:
+        await session.execute(
+            update(Booking).where(Booking.id == booking["id"]).values(updated_at=datetime.utcnow() - timedelta(days=120))
+        )
+        await session.commit()
+    await ArchiveService.archive_bookings(older_than_days=90)
+
+    assert await total(client, owner) == 0
+    assert await total(client, owner, status_filter="cancelled") == 0
+    assert await total(client, owner, include_archived="true") == 1
+
+
+async def test_service_totals_follow_deactivation(client, owner, service_id):
+    await client.delete(f"/api/v1/services/{service_id}", headers=owner)
+    active = await client.get("/api/v1/services")
+    everything = await client.get("/api/v1/services", params={"active_only": "false"})
+    assert active.json()["total"] == 0
+    assert everything.json()["total"] == 1
+
+
+async def test_checker_finds_and_repairs_drift(client, db, owner, booking):
+    await set_status(client, owner, booking["id"], "confirmed", "in_progress")
+    assert await check_shard(DEFAULT_SHARD) == []
+
+    async with db() as session:
+        await session.execute(update(Counter).where(Counter.name == "bookings").values(count=7))
+        await session.commit()
+    drift = await check_shard(DEFAULT_SHARD)
+    assert len(drift) == 1
+    assert "'bookings'" in drift[0] and "stored 7, actual 1" in drift[0]
+
+    assert await check_shard(DEFAULT_SHARD, repair=True) == drift
+    assert await check_shard(DEFAULT_SHARD) == []
+    assert await total(client, owner) == 1
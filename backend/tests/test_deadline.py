@@ -0,0 +1,109 @@
+"""Request deadlines and cancellation on client disconnect."""
+
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.config import settings
+from app.middleware.deadline import DeadlineMiddleware, match_route
+from app.services.deadline import current_deadline
+from app.services.metrics import metrics
+
+
+def build_app(events: list, handler_seconds: float = 0, background_seconds: float = 0):
+    async def after_response():
+        await asyncio.sleep(background_seconds)
+        events.append(("background", current_deadline.get().expired))
+
+    async def endpoint(request):
+        try:
+            await asyncio.sleep(handler_seconds)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        return PlainTextResponse("done", background=BackgroundTask(after_response))
+
+    return DeadlineMiddleware(Starlette(routes=[Route("/work", endpoint)]))
+
+
+async def call(app, disconnect_after: float = None, disconnect_when_sent: bool = False) -> list:
+    """Run one GET /work; the client disconnects after a delay or once the response is complete."""
+    sent = []
+    complete = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        if disconnect_when_sent:
+            await complete.wait()
+        elif disconnect_after is not None:
+            await asyncio.sleep(disconnect_after)
+        else:
+            await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            complete.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/work", "raw_path": b"/work", "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+def disconnects() -> float:
+    return metrics.value("http_client_disconnects_total", route="GET unmatched")
+
+
+async def test_background_task_survives_the_end_of_the_response(monkeypatch):
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "ROUTE_DEADLINES", {})
+    events, before = [], disconnects()
+
+    sent = await call(build_app(events, background_seconds=0.3), disconnect_when_sent=True)
+
+    assert sent[0]["status"] == 200
+    # Ran past the request deadline and after the client left, with the deadline lifted
+    assert events == [("background", False)]
+    assert disconnects() == before
+
+
+async def test_disconnect_before_the_response_cancels_the_request(monkeypatch):
+    monkeypatch.setattr(settings, "ROUTE_DEADLINES", {})
+    events, before = [], disconnects()
+
+    sent = await call(build_app(events, handler_seconds=5), disconnect_after=0.05)
+
+    assert events == ["cancelled"]
+    assert sent == []
+    assert disconnects() == before + 1
+
+
+async def test_slow_request_gets_504(monkeypatch):
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "ROUTE_DEADLINES", {})
+    events = []
+
+    sent = await call(build_app(events, handler_seconds=5))
+
+    assert events == ["cancelled"]
+    assert sent[0]["status"] == 504
+
+
+def test_longest_matching_route_prefix_wins():
+    table = {"/api/v1": 1, "GET /api/v1/bookings": 2, "POST /api/v1/bookings/{booking_id}/photos": 3}
+    assert match_route(table, "GET", "/api/v1/bookings/abc") == 2
+    assert match_route(table, "POST", "/api/v1/bookings/abc/photos") == 3
+    assert match_route(table, "POST", "/api/v1/bookings") == 1
+    assert match_route(table, "GET", "/health", 9) == 9
@@ -0,0 +1,56 @@
+"""Conditional GET on bookings and response compression."""
+
+from .conftest import create_booking, register, set_status
+
+
+async def test_booking_list_revalidates_until_a_booking_changes(client, owner, booking):
+    response = await client.get("/api/v1/bookings", headers=owner)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    response = await client.get("/api/v1/bookings", headers={**owner, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    await set_status(client, owner, booking["id"], "confirmed")
+    response = await client.get("/api/v1/bookings", headers={**owner, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_booking_list_etag_differs_per_filter(client, owner, booking):
+    all_bookings = await client.get("/api/v1/bookings", headers=owner)
+    pending = await client.get("/api/v1/bookings", headers=owner, params={"status_filter": "pending"})
+    assert all_bookings.headers["ETag"] != pending.headers["ETag"]
+
+
+async def test_single_booking_revalidates(client, customer, owner, booking):
+    url = f"/api/v1/bookings/{booking['id']}"
+    etag = (await client.get(url, headers=customer)).headers["ETag"]
+    assert (await client.get(url, headers={**customer, "If-None-Match": etag})).status_code == 304
+
+    await set_status(client, owner, booking["id"], "confirmed")
+    response = await client.get(url, headers={**customer, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed"
+
+
+async def test_other_customers_booking_is_forbidden_before_the_etag(client, booking):
+    other = await register(client, "other@example.com")
+    response = await client.get(f"/api/v1/bookings/{booking['id']}", headers={**other, "If-None-Match": "*"})
+    assert response.status_code == 403
+
+
+async def test_large_json_responses_are_compressed(client, owner, customer, service_id):
+    for _ in range(8):
+        await create_booking(client, customer, [service_id])
+    response = await client.get("/api/v1/bookings", headers={**owner, "Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.json()["total"] == 8
+
+
+async def test_small_responses_are_not_compressed(client):
+    response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,89 @@
+"""Idempotency-Key replay on mutating routes and the expired key purge."""
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.booking import Booking
+from app.models.idempotency import IdempotencyRecord
+from app.services.scheduler import scheduler
+
+from .conftest import TOMORROW, register
+
+
+async def booking_count(db) -> int:
+    async with db() as session:
+        return (await session.execute(select(func.count()).select_from(Booking))).scalar()
+
+
+async def test_retry_replays_the_first_response(client, db, customer, service_id):
+    headers = {**customer, "Idempotency-Key": "create-1"}
+    body = {"service_ids": [service_id], "booking_date": TOMORROW}
+
+    first = await client.post("/api/v1/bookings", headers=headers, json=body)
+    retry = await client.post("/api/v1/bookings", headers=headers, json=body)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert await booking_count(db) == 1
+
+
+async def test_key_reused_with_another_body_is_rejected(client, customer, service_id):
+    headers = {**customer, "Idempotency-Key": "create-1"}
+    await client.post("/api/v1/bookings", headers=headers, json={"service_ids": [service_id], "booking_date": TOMORROW})
+    response = await client.post("/api/v1/bookings", headers=headers, json={"service_ids": [service_id], "booking_date": "2999-01-01"})
+    assert response.status_code == 422
+
+
+async def test_keys_are_scoped_per_user(client, db, customer, service_id):
+    other = await register(client, "other@example.com")
+    body = {"service_ids": [service_id], "booking_date": TOMORROW}
+    first = await client.post("/api/v1/bookings", headers={**customer, "Idempotency-Key": "k"}, json=body)
+    second = await client.post("/api/v1/bookings", headers={**other, "Idempotency-Key": "k"}, json=body)
+    assert first.json()["id"] != second.json()["id"]
+    assert await booking_count(db) == 2
+
+
+async def test_requests_without_a_key_are_not_deduplicated(client, db, customer, service_id):
+    body = {"service_ids": [service_id], "booking_date": TOMORROW}
+    await client.post("/api/v1/bookings", headers=customer, json=body)
+    await client.post("/api/v1/bookings", headers=customer, json=body)
+    assert await booking_count(db) == 2
+
+
+async def test_failed_request_releases_its_key(client, db, customer, service_id):
+    headers = {**customer, "Idempotency-Key": "retry-me"}
+    body = {"service_ids": [str(uuid.uuid4())], "booking_date": TOMORROW}
+    failed = await client.post("/api/v1/bookings", headers=headers, json=body)
+    assert failed.status_code >= 400
+
+    async with db() as session:
+        assert (await session.execute(select(func.count()).select_from(IdempotencyRecord))).scalar() == 0
+
+
+async def test_purge_job_deletes_expired_keys_only(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BATCH_SIZE", 2)
+    now = datetime.utcnow()
+    user_id = str(uuid.uuid4())
+
+    def record(key: str, expires_at: datetime) -> IdempotencyRecord:
+        return IdempotencyRecord(
+            key=key, user_id=user_id, method="POST", path="/api/v1/bookings", request_hash="0" * 64,
+            status_code=201, response_body="{}", locked_until=now, expires_at=expires_at
+        )
+
+    async with db() as session:
+        session.add_all([record(f"old-{n}", now - timedelta(hours=1)) for n in range(3)])
+        session.add(record("fresh", now + timedelta(hours=1)))
+        await session.commit()
+
+    job = next(job for job in scheduler.jobs if job.name == "idempotency_purge")
+    assert job.runs_on("default") and job.runs_on("eu")
+    assert await scheduler.run_job("default", job, force=True) == 3
+
+    async with db() as session:
+        assert (await session.execute(select(IdempotencyRecord.key))).scalars().all() == ["fresh"]
@@ -0,0 +1,80 @@
+"""Time-ordered UUIDv7 keys, their binary storage and the online id conversion."""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.migrations import MIGRATIONS, SCHEMA_VERSION, schema_version_table
+from app.models.types import UUIDKey, uuid7
+from app.services.id_migration import BINARY_IDS_VERSION, copy_batch, finish, prepare, resume_point
+
+from .test_migrations import BOOKING_ID, CUSTOMER_ID, create_v1, migrate
+
+
+def test_uuid7_is_a_time_ordered_rfc_9562_uuid():
+    before = datetime.utcnow().timestamp()
+    value = uuid7()
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs((value.int >> 80) / 1000 - before) < 1
+
+
+def test_uuid7_ids_from_one_process_strictly_increase():
+    ids = [uuid7() for _ in range(10000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_uuid_key_stores_16_bytes_on_sqlite_and_reads_strings():
+    key, sqlite = UUIDKey(), create_engine("sqlite://").dialect
+    value = str(uuid7())
+    stored = key.process_bind_param(value, sqlite)
+    assert stored == uuid.UUID(value).bytes
+    assert key.process_result_value(stored, sqlite) == value
+    assert key.process_result_value(value, sqlite) == value  # text id from before v8
+
+
+async def test_new_rows_get_binary_uuid7_keys(client, engine, booking):
+    assert uuid.UUID(booking["id"]).version == 7
+    async with engine.connect() as conn:
+        kinds = (await conn.execute(text("SELECT typeof(id), length(id) FROM bookings"))).all()
+    assert kinds == [("blob", 16)]
+
+
+def test_online_conversion_keeps_rows_written_during_the_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ID_MIGRATION_BATCH_SIZE", 1)
+    path = str(tmp_path / "v7.db")
+    create_v1(path)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for version in range(2, BINARY_IDS_VERSION):
+            MIGRATIONS[version](conn)
+        schema_version_table.create(conn)
+        conn.execute(schema_version_table.insert().values(id=1, version=7, applied_at=datetime.utcnow()))
+
+    with engine.begin() as conn:
+        tables = prepare(conn)
+    for table in tables:
+        with engine.begin() as conn:
+            copy_batch(conn, table, resume_point(conn, table))
+    # The v7 application keeps writing text ids meanwhile
+    late_id = str(uuid.uuid4())
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO bookings (id, tenant_id, customer_id, booking_date, status, total_price, version, "
+            "created_at, updated_at) VALUES (:id, 'default', :customer_id, '2024-03-01', 'pending', 5, 1, "
+            "'2024-02-01', '2024-02-01')"
+        ), {"id": late_id, "customer_id": CUSTOMER_ID})
+        conn.execute(text("UPDATE bookings SET status = 'confirmed' WHERE id = :id"), {"id": BOOKING_ID})
+    with engine.begin() as conn:
+        finish(conn)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, status, typeof(id) FROM bookings")).all()
+    engine.dispose()
+    assert {(str(uuid.UUID(bytes=row[0])), row[1]) for row in rows} == {(BOOKING_ID, "confirmed"), (late_id, "pending")}
+    assert {row[2] for row in rows} == {"blob"}
+
+    assert migrate(path) == f"migrated schema v{BINARY_IDS_VERSION} -> v{SCHEMA_VERSION}"
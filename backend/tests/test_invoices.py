@@ -0,0 +1,139 @@
+"""Invoices of completed bookings: background rendering, downloads, the monthly export and the backfill."""
+
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.invoice import Invoice
+from app.services import invoices
+from app.services.invoices import invoice_renderer
+
+from .conftest import PASSWORD, create_booking, register, set_status
+
+
+COMPLETE = ("confirmed", "in_progress", "ready_for_delivery", "completed")
+
+
+@pytest.fixture
+async def renderer():
+    await invoice_renderer.start()
+    yield invoice_renderer
+    await invoice_renderer.stop()
+
+
+async def invoice_count(db) -> int:
+    async with db() as session:
+        return (await session.execute(select(func.count()).select_from(Invoice))).scalar_one()
+
+
+async def test_no_invoice_before_the_booking_is_completed(client, customer, owner, booking):
+    await set_status(client, owner, booking["id"], "confirmed")
+    response = await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=customer)
+    assert response.status_code == 409
+
+
+async def test_completion_queues_the_invoice_for_the_renderer(client, customer, owner, booking, db, renderer):
+    await set_status(client, owner, booking["id"], *COMPLETE)
+    await renderer.wait()
+    assert await invoice_count(db) == 1
+
+    response = await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=customer)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert "Wash" in response.text
+    assert "10.50" in response.text
+    number = f"INV-{datetime.utcnow():%Y%m}-"
+    assert f'filename="{number}' in response.headers["content-disposition"]
+
+
+async def test_download_while_queued_asks_to_retry(client, customer, owner, booking):
+    await set_status(client, owner, booking["id"], *COMPLETE)  # renderer stopped: not queued
+    await invoice_renderer.start()
+    try:
+        response = await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=customer)
+        assert response.status_code == 202
+        assert response.headers["retry-after"] == "2"
+        await invoice_renderer.wait()
+    finally:
+        await invoice_renderer.stop()
+
+    response = await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=customer)
+    assert response.status_code == 200
+
+
+async def test_invoice_is_rendered_on_download_without_the_renderer(client, customer, owner, booking, db):
+    await set_status(client, owner, booking["id"], *COMPLETE)
+    assert await invoice_count(db) == 0
+
+    response = await client.get(
+        f"/api/v1/bookings/{booking['id']}/invoice", headers=customer, params={"format": "text"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "Total" in response.text
+    assert "10.50" in response.text
+    assert await invoice_count(db) == 1
+
+    again = await client.get(
+        f"/api/v1/bookings/{booking['id']}/invoice", headers={**customer, "If-None-Match": response.headers["etag"]},
+        params={"format": "text"}
+    )
+    assert again.status_code == 304
+
+
+async def test_html_invoice_escapes_customer_data(client, owner, service_id):
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={"email": "rider@example.com", "password": PASSWORD, "name": "<b>Rider</b>",
+              "phone": "1234567890", "role": "customer"}
+    )
+    rider = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    booking = await create_booking(client, rider, [service_id])
+    await set_status(client, owner, booking["id"], *COMPLETE)
+
+    response = await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=rider)
+    assert "&lt;b&gt;Rider&lt;/b&gt;" in response.text
+    assert "<b>Rider</b>" not in response.text
+
+
+async def test_customers_cannot_download_other_customers_invoices(client, owner, booking):
+    await set_status(client, owner, booking["id"], *COMPLETE)
+    other = await register(client, "other@example.com")
+    response = await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=other)
+    assert response.status_code == 403
+
+
+async def test_monthly_export_lists_the_invoices_and_is_cached(client, owner, booking):
+    await set_status(client, owner, booking["id"], *COMPLETE)
+    await client.get(f"/api/v1/bookings/{booking['id']}/invoice", headers=owner)
+    month = f"{datetime.utcnow():%Y-%m}"
+
+    response = await client.get("/api/v1/invoices/export", headers=owner, params={"month": month})
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        listing = archive.read(f"invoices-{month}.csv").decode()
+    assert sum(name.endswith(".html") for name in names) == 1
+    assert sum(name.endswith(".txt") for name in names) == 1
+    assert "customer@example.com" in listing
+
+    again = await client.get(
+        "/api/v1/invoices/export", headers={**owner, "If-None-Match": response.headers["etag"]}, params={"month": month}
+    )
+    assert again.status_code == 304
+
+
+async def test_backfill_issues_the_missing_invoices(client, owner, booking, db):
+    await set_status(client, owner, booking["id"], *COMPLETE)
+
+    assert await invoices.backfill() == 1
+    assert await invoices.backfill() == 0
+    assert await invoice_count(db) == 1
+
+
+def test_templates_are_built_once():
+    assert invoices.invoice_template("html") is invoices.invoice_template("html")
+    assert invoices.invoice_template("text") is not invoices.invoice_template("html")
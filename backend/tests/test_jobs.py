@@ -0,0 +1,90 @@
+"""Scheduled jobs: booking reminders, pending expiry and the job lease."""
+
+from datetime import date, timedelta
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import DEFAULT_SHARD
+from app.models.booking import Booking
+from app.services.email_service import EmailService
+from app.services.scheduler import Scheduler, scheduler
+
+from .conftest import create_booking, register, set_status
+
+
+def job(name: str):
+    return next(job for job in scheduler.jobs if job.name == name)
+
+
+async def test_reminders_go_out_once_per_booking(client, owner, customer, service_id, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BATCH_SIZE", 2)
+    sent = []
+
+    async def send_reminders(reminders):
+        sent.extend(reminders)
+        return len(reminders)
+
+    monkeypatch.setattr(EmailService, "send_booking_reminders", send_reminders)
+    tomorrow = [(await create_booking(client, customer, [service_id]))["id"] for _ in range(3)]
+    cancelled = await create_booking(client, customer, [service_id])
+    await set_status(client, owner, cancelled["id"], "cancelled")
+    await create_booking(client, customer, [service_id], booking_date=str(date.today() + timedelta(days=2)))
+
+    assert await scheduler.run_job(DEFAULT_SHARD, job("booking_reminders"), force=True) == 3
+    assert sorted(r["booking_id"] for r in sent) == sorted(tomorrow)
+    assert await scheduler.run_job(DEFAULT_SHARD, job("booking_reminders"), force=True) == 0
+    assert len(sent) == 3
+
+    # A reminder is not an edit: the booking keeps its version
+    detail = await client.get(f"/api/v1/bookings/{tomorrow[0]}", headers=customer)
+    assert detail.json()["version"] == 1
+
+
+async def test_expiry_cancels_past_pending_bookings(client, db, owner, customer, service_id, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BATCH_SIZE", 2)
+    stale = [(await create_booking(client, customer, [service_id]))["id"] for _ in range(3)]
+    confirmed = await create_booking(client, customer, [service_id])
+    await set_status(client, owner, confirmed["id"], "confirmed")
+    upcoming = await create_booking(client, customer, [service_id])
+    async with db() as session:
+        await session.execute(
+            update(Booking)
+            .where(Booking.id.in_(stale + [confirmed["id"]]))
+            .values(booking_date=date.today() - timedelta(days=3))
+        )
+        await session.commit()
+
+    assert await scheduler.run_job(DEFAULT_SHARD, job("pending_expiry"), force=True) == 3
+
+    async with db() as session:
+        statuses = dict((await session.execute(select(Booking.id, Booking.status))).all())
+    assert all(statuses[booking_id] == "cancelled" for booking_id in stale)
+    assert statuses[confirmed["id"]] == "confirmed"
+    assert statuses[upcoming["id"]] == "pending"
+    listed = await client.get("/api/v1/bookings", headers=owner, params={"status_filter": "cancelled"})
+    assert listed.json()["total"] == 3
+
+
+async def test_a_held_lease_keeps_other_workers_out(engine):
+    first, second = Scheduler(), Scheduler()
+    purge = job("idempotency_purge")
+
+    acquired, _ = await first._acquire(DEFAULT_SHARD, purge, force=True)
+    assert acquired
+    assert await second.run_job(DEFAULT_SHARD, purge, force=True) is None
+
+
+async def test_a_finished_job_waits_for_its_interval(engine):
+    purge = job("idempotency_purge")
+    assert await scheduler.run_job(DEFAULT_SHARD, purge) == 0
+    assert await scheduler.run_job(DEFAULT_SHARD, purge) is None
+    assert await Scheduler().run_job(DEFAULT_SHARD, purge) is None
+
+
+def test_purges_of_shared_tables_run_on_the_default_shard_only():
+    assert job("rate_limit_purge").runs_on(DEFAULT_SHARD)
+    assert not job("rate_limit_purge").runs_on("eu")
+    names = [j.name for j in scheduler.jobs_on("eu")]
+    assert "rate_limit_purge" not in names
+    assert {"booking_reminders", "pending_expiry", "idempotency_purge"} <= set(names)
@@ -0,0 +1,146 @@
+"""Schema migrations of existing databases up to SCHEMA_VERSION."""
+
+import os
+import sqlite3
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrations import SCHEMA_VERSION, TENANT_BACKFILLS, ensure_schema, get_stored_version
+from app.services.auth_service import AuthService
+
+
+SCHEMA_V1 = os.path.join(os.path.dirname(__file__), "data", "schema_v1.sql")
+
+CUSTOMER_ID = str(uuid.uuid4())
+SERVICE_ID = str(uuid.uuid4())
+BOOKING_ID = str(uuid.uuid4())
+ARCHIVED_ID = str(uuid.uuid4())
+
+
+def create_v1(path: str):
+    """A pre-versioning database with one live and one archived booking and an idempotency record."""
+    with open(SCHEMA_V1) as f, sqlite3.connect(path) as raw:
+        raw.executescript(f.read())
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, password_hash, name, phone, role, is_verified, created_at, updated_at) "
+            "VALUES (:id, 'rider@example.com', 'x', 'Rider', '1234567890', 'customer', 1, '2024-01-01', '2024-01-01')"
+        ), {"id": CUSTOMER_ID})
+        conn.execute(text(
+            "INSERT INTO services (id, name, price, estimated_time, is_active, created_at, updated_at) "
+            "VALUES (:id, 'Wash', 10.5, 30, 1, '2024-01-01', '2024-01-01')"
+        ), {"id": SERVICE_ID})
+        for table, links, booking_id, status in (
+            ("bookings", "booking_services", BOOKING_ID, "pending"),
+            ("bookings_archive", "booking_services_archive", ARCHIVED_ID, "completed"),
+        ):
+            conn.execute(text(
+                f"INSERT INTO {table} (id, customer_id, booking_date, status, total_price, created_at, updated_at) "
+                f"VALUES (:id, :customer_id, '2024-02-01', :status, 10.5, '2024-01-15', '2024-01-15')"
+            ), {"id": booking_id, "customer_id": CUSTOMER_ID, "status": status})
+            conn.execute(text(
+                f"INSERT INTO {links} (id, booking_id, service_id, service_price) VALUES (:id, :booking_id, :service_id, 10.5)"
+            ), {"id": str(uuid.uuid4()), "booking_id": booking_id, "service_id": SERVICE_ID})
+        conn.execute(text(
+            "INSERT INTO idempotency_keys (id, key, user_id, method, path, request_hash, status_code, "
+            "response_body, locked_until, created_at, expires_at) VALUES (:id, 'k', :user_id, 'POST', "
+            "'/api/v1/bookings', :hash, 201, '{}', '2024-01-01', '2024-01-01', '2999-01-01')"
+        ), {"id": str(uuid.uuid4()), "user_id": CUSTOMER_ID, "hash": "0" * 64})
+    engine.dispose()
+
+
+def migrate(path: str) -> str:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        outcome = ensure_schema(conn)
+    engine.dispose()
+    return outcome
+
+
+def tenants(path: str, table: str) -> list:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT DISTINCT tenant_id FROM {table}")).scalars().all()
+    engine.dispose()
+    return rows
+
+
+def test_v1_database_gets_tenant_id_on_every_tenant_owned_table(tmp_path):
+    path = str(tmp_path / "v1.db")
+    create_v1(path)
+
+    assert migrate(path) == f"migrated schema v1 -> v{SCHEMA_VERSION}"
+
+    for table in TENANT_BACKFILLS:
+        assert tenants(path, table) == ["default"], table
+
+
+async def test_migrated_database_serves_live_and_archived_bookings(tmp_path, shard_at):
+    import httpx
+    from main import app
+
+    path = str(tmp_path / "v1.db")
+    create_v1(path)
+    migrate(path)
+    shard_at(path)
+
+    token = AuthService.create_access_token(
+        SimpleNamespace(id=CUSTOMER_ID, email="rider@example.com", role="customer", tenant_id="default")
+    )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(
+            "/api/v1/bookings", headers={"Authorization": f"Bearer {token}"}, params={"include_archived": "true"}
+        )
+    assert response.status_code == 200, response.text
+    assert {b["id"] for b in response.json()["bookings"]} == {BOOKING_ID, ARCHIVED_ID}
+
+
+def test_tenant_columns_skipped_by_an_earlier_v2_are_added_and_backfilled(tmp_path):
+    """Databases migrated by the v2 step that only covered the original four tables."""
+    path = str(tmp_path / "v13.db")
+    create_v1(path)
+    migrate(path)
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for index in inspect(conn).get_indexes("bookings_archive"):
+            if "tenant_id" in index["column_names"]:
+                conn.exec_driver_sql(f"DROP INDEX {index['name']}")
+        for table in ("bookings_archive", "booking_services_archive", "idempotency_keys"):
+            conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN tenant_id")
+        conn.exec_driver_sql("UPDATE users SET tenant_id = 'acme'")
+        conn.exec_driver_sql("UPDATE schema_version SET version = 13")
+    engine.dispose()
+
+    assert migrate(path) == f"migrated schema v13 -> v{SCHEMA_VERSION}"
+
+    for table in ("bookings_archive", "booking_services_archive", "idempotency_keys"):
+        assert tenants(path, table) == ["acme"], table
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        assert get_stored_version(conn) == SCHEMA_VERSION
+        indexes = {index["name"] for index in inspect(conn).get_indexes("bookings_archive")}
+    engine.dispose()
+    assert "ix_bookings_archive_tenant_created" in indexes
+
+
+def test_new_database_is_created_at_the_current_version(tmp_path):
+    path = str(tmp_path / "new.db")
+    assert migrate(path) == f"created schema v{SCHEMA_VERSION}"
+    assert migrate(path) == f"schema v{SCHEMA_VERSION} up to date"
+
+
+def test_database_newer_than_the_code_is_refused(tmp_path):
+    path = str(tmp_path / "new.db")
+    migrate(path)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"UPDATE schema_version SET version = {SCHEMA_VERSION + 1}")
+    engine.dispose()
+
+    with pytest.raises(RuntimeError):
+        migrate(path)
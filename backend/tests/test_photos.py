@@ -0,0 +1,118 @@
+"""Booking photo uploads: the per-booking limit, failed uploads and the variants."""
+
+import asyncio
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.models.booking_photo import BookingPhoto, PhotoStatus
+from app.services import photos
+from app.models.types import new_id
+from app.services.photos import make_variants, photo_processor
+
+
+def image_bytes(format: str = "PNG", size=(64, 48)) -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+async def upload(client, headers: dict, booking_id: str, content: bytes = None, filename: str = "damage.png"):
+    content = image_bytes() if content is None else content
+    return await client.post(
+        f"/api/v1/bookings/{booking_id}/photos", headers=headers,
+        files={"file": (filename, content, "application/octet-stream")}
+    )
+
+
+async def photo_rows(db) -> list:
+    async with db() as session:
+        return (await session.execute(select(BookingPhoto.status))).scalars().all()
+
+
+async def test_upload_is_listed_and_downloadable(client, customer, owner, booking):
+    response = await upload(client, customer, booking["id"])
+    assert response.status_code == 201, response.text
+    photo = response.json()
+    assert photo["status"] == photo_processor.initial_status().value
+    assert photo["filename"] == "damage.png"
+    assert photo["content_type"] == "image/png"
+
+    listed = await client.get(f"/api/v1/bookings/{booking['id']}/photos", headers=owner)
+    assert [p["id"] for p in listed.json()] == [photo["id"]]
+    original = await client.get(
+        f"/api/v1/bookings/{booking['id']}/photos/{photo['id']}", headers=owner, params={"variant": "original"}
+    )
+    assert original.status_code == 200
+    assert original.content == image_bytes()
+
+
+async def test_concurrent_uploads_never_exceed_the_limit(client, customer, booking, db, monkeypatch):
+    monkeypatch.setattr(settings, "PHOTO_MAX_PER_BOOKING", 2)
+
+    responses = await asyncio.gather(*(upload(client, customer, booking["id"]) for _ in range(6)))
+
+    assert sorted(r.status_code for r in responses) == [201, 201, 409, 409, 409, 409]
+    assert len(await photo_rows(db)) == 2
+
+
+async def test_rejected_upload_frees_its_slot(client, customer, booking, db, monkeypatch):
+    monkeypatch.setattr(settings, "PHOTO_MAX_PER_BOOKING", 1)
+
+    response = await upload(client, customer, booking["id"], b"not an image", "notes.txt")
+    assert response.status_code == 415
+    assert await photo_rows(db) == []
+
+    monkeypatch.setattr(settings, "PHOTO_MAX_BYTES", 16)
+    response = await upload(client, customer, booking["id"])
+    assert response.status_code == 413
+    assert await photo_rows(db) == []
+
+    monkeypatch.setattr(settings, "PHOTO_MAX_BYTES", 1024 * 1024)
+    assert (await upload(client, customer, booking["id"])).status_code == 201
+
+
+async def test_claims_in_progress_are_not_listed_and_abandoned_ones_expire(
+    client, customer, owner, booking, db, monkeypatch
+):
+    monkeypatch.setattr(settings, "PHOTO_MAX_PER_BOOKING", 1)
+    async with db() as session:
+        session.info["tenant_id"] = "default"
+        assert await photos.claim_photo_slot(session, booking["id"], new_id(), booking["customer"]["id"])
+
+    listed = await client.get(f"/api/v1/bookings/{booking['id']}/photos", headers=owner)
+    assert listed.json() == []
+    assert (await upload(client, customer, booking["id"])).status_code == 409
+
+    async with db() as session:
+        await session.execute(update(BookingPhoto).values(created_at=datetime.utcnow() - timedelta(hours=1)))
+        await session.commit()
+    monkeypatch.setattr(photos, "pillow_installed", lambda: False)
+    await photo_processor.start()  # deletes the abandoned claim; no pool without Pillow
+
+    assert await photo_rows(db) == []
+    assert (await upload(client, customer, booking["id"])).status_code == 201
+
+
+@pytest.mark.parametrize("format", ["PNG", "JPEG"])
+def test_variants_are_resized_upright_jpegs(tmp_path, format):
+    from PIL import Image
+
+    original = tmp_path / "photo"
+    original.write_bytes(image_bytes(format, (400, 300)))
+    targets = [(str(tmp_path / "display"), 200), (str(tmp_path / "thumbnail"), 50)]
+
+    assert make_variants(str(original), targets, 80, settings.PHOTO_MAX_PIXELS) == (400, 300)
+    for path, longest in targets:
+        with Image.open(path) as variant:
+            assert variant.format == "JPEG"
+            assert max(variant.size) == longest
+
+
+def test_pillow_is_found_without_importing_it():
+    assert photos.pillow_installed()
+    assert photo_processor.initial_status() is PhotoStatus.PROCESSING
@@ -0,0 +1,47 @@
+"""Prebuilt tenant-filtered statements of the hot read routes."""
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT
+
+from app.config import settings
+
+from .conftest import create_booking, register
+
+
+async def test_prebuilt_statements_filter_on_the_callers_station(client, monkeypatch, service_id, booking):
+    monkeypatch.setattr(settings, "TENANT_SHARDS", {"acme": "default"})
+    owner = await register(client, "owner@example.com", "owner", tenant="acme")
+    rider = await register(client, "rider@example.com", tenant="acme")
+    response = await client.post(
+        "/api/v1/services", headers=owner, json={"name": "Tune", "price": "20.00", "estimated_time": 60}
+    )
+    own = await create_booking(client, rider, [response.json()["id"]])
+
+    for params in ({}, {"status_filter": "pending"}, {"date_from": own["booking_date"]}):
+        listed = (await client.get("/api/v1/bookings", headers=owner, params=params)).json()
+        assert [b["id"] for b in listed["bookings"]] == [own["id"]], params
+        assert listed["total"] == 1
+    assert (await client.get(f"/api/v1/bookings/{booking['id']}", headers=owner)).status_code == 404
+    assert (await client.get(f"/api/v1/bookings/{own['id']}", headers=owner)).status_code == 200
+    me = await client.get("/api/v1/auth/me", headers=rider)
+    assert me.json()["email"] == "rider@example.com"
+
+
+async def test_repeated_hot_reads_hit_the_compiled_cache(client, engine, owner, booking):
+    urls = ["/api/v1/bookings", f"/api/v1/bookings/{booking['id']}", "/api/v1/auth/me", "/api/v1/services"]
+    for url in urls:
+        assert (await client.get(url, headers=owner)).status_code == 200
+
+    misses = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if context.cache_hit is not CACHE_HIT:
+            misses.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        for url in urls:
+            assert (await client.get(url, headers=owner)).status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert misses == []
@@ -0,0 +1,40 @@
+"""On-demand request profiles."""
+
+import pstats
+
+from app.config import settings
+
+
+async def profiled_get(client, headers: dict, url: str):
+    return await client.get(url, headers={**headers, settings.PROFILE_HEADER: "1"})
+
+
+async def test_owner_profiles_a_request_and_reads_its_statements(client, owner, booking, tmp_path):
+    await profiled_get(client, owner, "/api/v1/bookings")  # compiles the statements
+    response = await profiled_get(client, owner, "/api/v1/bookings")
+    profile_id = response.headers[settings.PROFILE_HEADER]
+
+    profile = (await client.get(f"/api/v1/profiles/{profile_id}", headers=owner)).json()
+    assert profile["route"] == "GET /api/v1/bookings"
+    assert profile["status_code"] == 200
+    assert profile["trigger"] == "header"
+    assert profile["sql_count"] == len(profile["statements"]) > 0
+    assert {s["cache"] for s in profile["statements"]} == {"hit"}
+    assert profile_id in [p["id"] for p in (await client.get("/api/v1/profiles", headers=owner)).json()]
+
+    trace = await client.get(f"/api/v1/profiles/{profile_id}/trace", headers=owner)
+    path = tmp_path / "trace.prof"
+    path.write_bytes(trace.content)
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+async def test_first_run_of_a_statement_is_a_cache_miss(client, owner, booking):
+    response = await profiled_get(client, owner, f"/api/v1/bookings/{booking['id']}/timeline")
+    profile = (await client.get(f"/api/v1/profiles/{response.headers[settings.PROFILE_HEADER]}", headers=owner)).json()
+    assert "miss" in {s["cache"] for s in profile["statements"]}
+
+
+async def test_customers_cannot_ask_for_a_profile(client, customer, booking):
+    response = await profiled_get(client, customer, "/api/v1/bookings")
+    assert response.status_code == 200
+    assert settings.PROFILE_HEADER not in response.headers
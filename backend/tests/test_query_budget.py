@@ -0,0 +1,513 @@
+"""
+Query and allocation budgets of every route, recorded in
+tests/data/query_budgets.json:
+
+- statements: the SQL statements a request runs, by shape ("SELECT
+  bookings", "INSERT booking_status_events"), counted with an Engine
+  before_cursor_execute hook; background work is not
+- peak_kib: the peak Python allocation while it runs (tracemalloc)
+
+A request over either budget fails with a diff of its statement shapes
+against the recorded ones: an eager load turned per-row (an
+immediateload, a query in a loop over bookings) shows up as added
+"SELECT services" lines. A route without a case or a budget fails too, so
+new routes get one.
+
+The data is seeded once for the module in an in-memory database. Each
+case runs once to warm SQLAlchemy's statement caches and the lazy
+imports, then RUNS times; the peak is the lowest of the runs. To record
+the current runs as the budgets:
+    QUERY_BUDGET_UPDATE=1 python -m pytest tests/test_query_budget.py
+"""
+
+import asyncio
+import difflib
+import gc
+import io
+import json
+import math
+import os
+import re
+import tracemalloc
+from contextvars import ContextVar
+from datetime import date, timedelta
+from typing import List, Optional
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi.routing import APIRoute
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from app.config import settings
+from app.database import DEFAULT_SHARD, init_db, shard_router
+from app.models import User
+from app.services.backup import backup_service
+from app.services.invoices import invoice_renderer
+from app.services.photos import photo_processor
+from app.services.status_history import status_history
+
+from .conftest import PASSWORD
+
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "data", "query_budgets.json")
+UPDATE = os.environ.get("QUERY_BUDGET_UPDATE") == "1"
+# Seeded data; the budgets hold for exactly this much
+BOOKINGS = 20
+SERVICES = 3
+RUNS = 3
+# Allocation budget recorded by an update, over the measured peak (allocation varies a little run to run)
+ALLOC_HEADROOM = 1.25
+BOUNDARY = "budgetboundary"
+
+# Statement shapes of the request being measured; None outside a measurement
+recorded_statements: ContextVar[Optional[List[str]]] = ContextVar("recorded_statements", default=None)
+
+TABLE_PATTERNS = {
+    "SELECT": r"\bFROM\s+(\w+)",
+    "WITH": r"\bFROM\s+(\w+)",
+    "DELETE": r"\bFROM\s+(\w+)",
+    "INSERT": r"\bINTO\s+(\w+)",
+    "UPDATE": r"^UPDATE\s+(\w+)",
+}
+
+pytestmark = pytest.mark.asyncio(scope="module")
+
+
+def statement_shape(statement: str) -> str:
+    """Verb and main table of a SQL statement, e.g. "SELECT bookings"."""
+    words = statement.split()
+    if not words:
+        return ""
+    verb = words[0].upper()
+    match = re.search(TABLE_PATTERNS[verb], statement, re.IGNORECASE) if verb in TABLE_PATTERNS else None
+    return f"{verb} {match.group(1)}" if match else " ".join(words[:2])
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = recorded_statements.get()
+    if statements is not None:
+        statements.append(statement_shape(statement))
+
+
+def make_photo() -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (200, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def photo_upload(photo: bytes) -> dict:
+    """Request arguments of a multipart photo upload."""
+    body = (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="damage.jpg"\r\n'
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + photo + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return {"content": body, "headers": {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}}
+
+
+async def register(client, seeded: dict, role: str = "customer") -> dict:
+    """A new user; returns the email and the auth headers."""
+    seeded["users"] += 1
+    email = f"user{seeded['users']}@example.com"
+    response = await client.post("/api/v1/auth/register", json={
+        "email": email, "password": PASSWORD, "name": "User", "phone": "1234567890", "role": role
+    })
+    assert response.status_code == 201, response.text
+    return {"email": email, "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
+
+
+async def create_booking(client, seeded: dict, services: int = SERVICES, days: int = 1) -> str:
+    response = await client.post("/api/v1/bookings", headers=seeded["customer"], json={
+        "service_ids": seeded["service_ids"][:services], "booking_date": str(date.today() + timedelta(days=days))
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def move(client, seeded: dict, booking_id: str, *statuses: str):
+    for status in statuses:
+        response = await client.put(
+            f"/api/v1/bookings/{booking_id}/status", headers=seeded["owner"], json={"status": status}
+        )
+        assert response.status_code == 200, response.text
+
+
+async def seed(client) -> dict:
+    """Owner, customer, services and bookings (half of them queued), a completed booking with its invoice, a photo and a profile."""
+    seeded = {"users": 0}
+    seeded["owner"] = (await register(client, seeded, "owner"))["headers"]
+    customer = await register(client, seeded)
+    seeded["customer"], seeded["customer_email"] = customer["headers"], customer["email"]
+
+    seeded["service_ids"] = []
+    for n in range(SERVICES):
+        response = await client.post("/api/v1/services", headers=seeded["owner"], json={
+            "name": f"Service {n}", "price": "10.0", "estimated_time": 30
+        })
+        seeded["service_ids"].append(response.json()["id"])
+
+    seeded["booking_ids"] = []
+    for n in range(BOOKINGS):
+        booking_id = await create_booking(client, seeded, services=1 + n % SERVICES, days=1 + n % 30)
+        if n % 2:
+            await move(client, seeded, booking_id, "confirmed")
+        seeded["booking_ids"].append(booking_id)
+
+    seeded["completed_id"] = seeded["booking_ids"][0]
+    await move(client, seeded, seeded["completed_id"], "confirmed", "in_progress", "ready_for_delivery", "completed")
+    await invoice_renderer.wait()
+
+    seeded["photo"] = make_photo()
+    upload = photo_upload(seeded["photo"])
+    response = await client.post(
+        f"/api/v1/bookings/{seeded['booking_ids'][1]}/photos",
+        content=upload["content"], headers={**seeded["customer"], **upload["headers"]}
+    )
+    assert response.status_code == 201, response.text
+    seeded["photo_id"] = response.json()["id"]
+
+    response = await client.get("/api/v1/bookings", headers={**seeded["owner"], "X-Profile": "1"})
+    seeded["profile_id"] = response.headers["X-Profile"]
+    for _ in range(100):  # the profile is written after the response
+        if (await client.get(f"/api/v1/profiles/{seeded['profile_id']}", headers=seeded["owner"])).status_code == 200:
+            break
+        await asyncio.sleep(0.05)
+    return seeded
+
+
+# Cases by route: each prepares the data it needs (not measured) and returns the request's URL and arguments
+CASES = {}
+
+
+def case(route: str):
+    def register_case(prepare):
+        CASES[route] = prepare
+        return prepare
+    return register_case
+
+
+@case("POST /api/v1/auth/register")
+async def case_register(client, seeded):
+    seeded["users"] += 1
+    return "/api/v1/auth/register", {"json": {
+        "email": f"user{seeded['users']}@example.com", "password": PASSWORD, "name": "User", "phone": "1234567890"
+    }}
+
+
+@case("POST /api/v1/auth/login")
+async def case_login(client, seeded):
+    return "/api/v1/auth/login", {"json": {"email": seeded["customer_email"], "password": PASSWORD}}
+
+
+@case("POST /api/v1/auth/verify-email")
+async def case_verify_email(client, seeded):
+    user = await register(client, seeded)
+    async with shard_router.sessionmaker(DEFAULT_SHARD)() as db:
+        token = (await db.execute(select(User.verification_token).where(User.email == user["email"]))).scalar_one()
+    return "/api/v1/auth/verify-email", {"params": {"token": token}}
+
+
+@case("GET /api/v1/auth/me")
+async def case_me(client, seeded):
+    return "/api/v1/auth/me", {"headers": seeded["customer"]}
+
+
+@case("POST /api/v1/auth/resend-verification")
+async def case_resend_verification(client, seeded):
+    user = await register(client, seeded)  # registration verifies users for now; undo it
+    async with shard_router.sessionmaker(DEFAULT_SHARD)() as db:
+        await db.execute(update(User).where(User.email == user["email"]).values(is_verified=False))
+        await db.commit()
+    return "/api/v1/auth/resend-verification", {"headers": user["headers"]}
+
+
+@case("GET /api/v1/services")
+async def case_list_services(client, seeded):
+    return "/api/v1/services", {}
+
+
+@case("GET /api/v1/services/{service_id}")
+async def case_get_service(client, seeded):
+    return f"/api/v1/services/{seeded['service_ids'][0]}", {}
+
+
+@case("POST /api/v1/services")
+async def case_create_service(client, seeded):
+    return "/api/v1/services", {"headers": seeded["owner"], "json": {
+        "name": "Extra", "price": "5.0", "estimated_time": 15
+    }}
+
+
+@case("PUT /api/v1/services/{service_id}")
+async def case_update_service(client, seeded):
+    return f"/api/v1/services/{seeded['service_ids'][0]}", {"headers": seeded["owner"], "json": {"price": "12.0"}}
+
+
+@case("DELETE /api/v1/services/{service_id}")
+async def case_delete_service(client, seeded):
+    response = await client.post("/api/v1/services", headers=seeded["owner"], json={
+        "name": "Retired", "price": "5.0", "estimated_time": 15
+    })
+    return f"/api/v1/services/{response.json()['id']}", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/bookings")
+async def case_list_bookings(client, seeded):
+    return "/api/v1/bookings", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/bookings/changes")
+async def case_booking_changes(client, seeded):
+    return "/api/v1/bookings/changes", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/bookings/{booking_id}")
+async def case_get_booking(client, seeded):
+    return f"/api/v1/bookings/{seeded['booking_ids'][2]}", {"headers": seeded["customer"]}
+
+
+@case("GET /api/v1/bookings/{booking_id}/timeline")
+async def case_booking_timeline(client, seeded):
+    return f"/api/v1/bookings/{seeded['completed_id']}/timeline", {"headers": seeded["owner"]}
+
+
+@case("POST /api/v1/bookings")
+async def case_create_booking(client, seeded):
+    return "/api/v1/bookings", {"headers": seeded["customer"], "json": {
+        "service_ids": seeded["service_ids"], "booking_date": str(date.today() + timedelta(days=1))
+    }}
+
+
+@case("PUT /api/v1/bookings/status:batch")
+async def case_batch_status(client, seeded):
+    booking_ids = [await create_booking(client, seeded) for _ in range(5)]
+    return "/api/v1/bookings/status:batch", {"headers": seeded["owner"], "json": {
+        "booking_ids": booking_ids, "status": "confirmed"
+    }}
+
+
+@case("PUT /api/v1/bookings/{booking_id}/status")
+async def case_update_status(client, seeded):
+    booking_id = await create_booking(client, seeded)
+    return f"/api/v1/bookings/{booking_id}/status", {"headers": seeded["owner"], "json": {"status": "confirmed"}}
+
+
+@case("DELETE /api/v1/bookings/{booking_id}")
+async def case_cancel_booking(client, seeded):
+    booking_id = await create_booking(client, seeded)
+    return f"/api/v1/bookings/{booking_id}", {"headers": seeded["customer"]}
+
+
+@case("POST /api/v1/bookings/{booking_id}/photos")
+async def case_upload_photo(client, seeded):
+    booking_id = await create_booking(client, seeded)
+    upload = photo_upload(seeded["photo"])
+    return f"/api/v1/bookings/{booking_id}/photos", {
+        "content": upload["content"], "headers": {**seeded["customer"], **upload["headers"]}
+    }
+
+
+@case("GET /api/v1/bookings/{booking_id}/photos")
+async def case_list_photos(client, seeded):
+    return f"/api/v1/bookings/{seeded['booking_ids'][1]}/photos", {"headers": seeded["customer"]}
+
+
+@case("GET /api/v1/bookings/{booking_id}/photos/{photo_id}")
+async def case_get_photo(client, seeded):
+    return f"/api/v1/bookings/{seeded['booking_ids'][1]}/photos/{seeded['photo_id']}", {
+        "headers": seeded["customer"], "params": {"variant": "original"}
+    }
+
+
+@case("GET /api/v1/bookings/{booking_id}/invoice")
+async def case_get_invoice(client, seeded):
+    return f"/api/v1/bookings/{seeded['completed_id']}/invoice", {"headers": seeded["customer"]}
+
+
+@case("GET /api/v1/invoices/export")
+async def case_export_invoices(client, seeded):
+    return "/api/v1/invoices/export", {"headers": seeded["owner"], "params": {"month": date.today().strftime("%Y-%m")}}
+
+
+@case("GET /api/v1/workqueue/next")
+async def case_next_job(client, seeded):
+    return "/api/v1/workqueue/next", {"headers": seeded["owner"]}
+
+
+@case("POST /api/v1/workqueue/claim")
+async def case_claim_next_job(client, seeded):
+    await move(client, seeded, await create_booking(client, seeded), "confirmed")
+    return "/api/v1/workqueue/claim", {"headers": seeded["owner"]}
+
+
+@case("POST /api/v1/workqueue/{booking_id}/claim")
+async def case_claim_job(client, seeded):
+    booking_id = await create_booking(client, seeded)
+    await move(client, seeded, booking_id, "confirmed")
+    return f"/api/v1/workqueue/{booking_id}/claim", {"headers": seeded["owner"]}
+
+
+@case("POST /api/v1/workqueue/{booking_id}/release")
+async def case_release_job(client, seeded):
+    booking_id = await create_booking(client, seeded)
+    await move(client, seeded, booking_id, "confirmed")
+    response = await client.post(f"/api/v1/workqueue/{booking_id}/claim", headers=seeded["owner"])
+    assert response.status_code == 200, response.text
+    return f"/api/v1/workqueue/{booking_id}/release", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/backups")
+async def case_list_backups(client, seeded):
+    return "/api/v1/backups", {"headers": seeded["owner"]}
+
+
+@case("POST /api/v1/backups")
+async def case_start_backup(client, seeded):
+    return "/api/v1/backups", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/profiles")
+async def case_list_profiles(client, seeded):
+    return "/api/v1/profiles", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/profiles/{profile_id}")
+async def case_get_profile(client, seeded):
+    return f"/api/v1/profiles/{seeded['profile_id']}", {"headers": seeded["owner"]}
+
+
+@case("GET /api/v1/profiles/{profile_id}/trace")
+async def case_profile_trace(client, seeded):
+    return f"/api/v1/profiles/{seeded['profile_id']}/trace", {"headers": seeded["owner"]}
+
+
+@case("GET /")
+async def case_root(client, seeded):
+    return "/", {}
+
+
+@case("GET /health")
+async def case_health(client, seeded):
+    return "/health", {}
+
+
+@case("GET /metrics")
+async def case_metrics(client, seeded):
+    return "/metrics", {}
+
+
+def app_routes() -> List[str]:
+    """ "METHOD path" of every route of the app, the keys of the cases and budgets."""
+    return [
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in sorted(route.methods - {"HEAD"})
+    ]
+
+
+async def settle():
+    """Let the background work of earlier requests finish, so it is not measured."""
+    await status_history.flush()
+    await invoice_renderer.wait()
+    await photo_processor.wait()
+    while backup_service.running(DEFAULT_SHARD):
+        await asyncio.sleep(0.01)
+    gc.collect()
+
+
+async def measure(client, route: str, seeded: dict) -> dict:
+    """One request of a route's case: its status, statement shapes and peak allocation."""
+    method = route.split(" ", 1)[0]
+    url, arguments = await CASES[route](client, seeded)
+    await settle()
+
+    statements: List[str] = []
+    token = recorded_statements.set(statements)
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        response = await client.request(method, url, **arguments)
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        recorded_statements.reset(token)
+    return {"status": response.status_code, "detail": response.text[:200], "statements": list(statements), "peak": peak}
+
+
+def load_budgets() -> dict:
+    if not os.path.exists(BUDGETS_PATH):
+        return {}
+    with open(BUDGETS_PATH) as f:
+        return json.load(f)
+
+
+def save_budgets(budgets: dict):
+    with open(BUDGETS_PATH, "w") as f:
+        json.dump(budgets, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+@pytest_asyncio.fixture(scope="module")
+async def budget_client(tmp_path_factory):
+    """
+    A client on an in-memory default shard seeded for the cases, with
+    file directories of its own; the budgets are saved at the end of an update.
+    """
+    directory = tmp_path_factory.mktemp("query_budget")
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    budgets = load_budgets()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setitem(shard_router._engines, DEFAULT_SHARD, engine)
+        patch.setitem(shard_router._sessionmakers, DEFAULT_SHARD, async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+        ))
+        patch.setattr(settings, "ADMISSION_ENABLED", False)
+        for name in ("BACKUP_DIR", "PHOTO_DIR", "INVOICE_DIR", "PROFILE_DIR"):
+            patch.setattr(settings, name, str(directory / name.lower()))
+        patch.setattr(app.state, "ready", True, raising=False)
+        await init_db()
+        await invoice_renderer.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                seeded = await seed(client)
+                tracemalloc.start()
+                yield client, seeded, budgets
+        finally:
+            tracemalloc.stop()
+            await settle()
+            await invoice_renderer.stop()
+            await engine.dispose()
+    if UPDATE:
+        save_budgets({route: budget for route, budget in budgets.items() if route in CASES})
+
+
+@pytest.mark.parametrize("route", app_routes())
+async def test_route_stays_within_its_budget(budget_client, route):
+    client, seeded, budgets = budget_client
+    assert route in CASES, f"{route}: no case in tests/test_query_budget.py"
+
+    await measure(client, route, seeded)  # warm the statement caches and lazy imports
+    runs = [await measure(client, route, seeded) for _ in range(RUNS)]
+    failed = [run for run in runs if run["status"] >= 400]
+    assert not failed, f"status {failed[0]['status']}: {failed[0]['detail']}"
+    statements = max((run["statements"] for run in runs), key=len)
+    peak_kib = min(run["peak"] for run in runs) / 1024
+    if UPDATE:
+        budgets[route] = {"statements": statements, "peak_kib": math.ceil(peak_kib * ALLOC_HEADROOM)}
+
+    budget = budgets.get(route)
+    assert budget is not None, f"{route}: no budget (record one with QUERY_BUDGET_UPDATE=1)"
+    if len(statements) > len(budget["statements"]):
+        diff = difflib.unified_diff(budget["statements"], statements, "budget", "measured", lineterm="", n=1)
+        pytest.fail(f"{len(statements)} statements, budget {len(budget['statements'])}:\n" + "\n".join(diff))
+    assert peak_kib <= budget["peak_kib"], f"peak allocation {peak_kib:.0f} KiB, budget {budget['peak_kib']} KiB"
@@ -0,0 +1,113 @@
+"""Auth rate limits, the hashing admission slot and the rate limit window purge."""
+
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.rate_limit import RateLimitCounter
+from app.services.jobs import purge_rate_limit_windows_batch
+from app.services.rate_limiter import (
+    DatabaseRateLimitStore, HashAdmission, MemoryRateLimitStore, RateLimitStore, auth_rate_limiter
+)
+from app.services.scheduler import scheduler
+
+from .conftest import PASSWORD, register
+
+
+@pytest.fixture
+def rate_limits(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_EMAIL", 3)
+    monkeypatch.setattr(auth_rate_limiter, "store", MemoryRateLimitStore())
+
+
+async def test_login_over_the_email_limit_gets_429(client, customer, rate_limits):
+    credentials = {"email": "customer@example.com", "password": "Wr0ngPassword"}
+    for _ in range(3):
+        response = await client.post("/api/v1/auth/login", json=credentials)
+        assert response.status_code == 401
+
+    response = await client.post("/api/v1/auth/login", json={**credentials, "password": PASSWORD})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+async def test_register_over_the_ip_limit_gets_429(client, rate_limits, monkeypatch):
+    monkeypatch.setattr(settings, "REGISTER_RATE_LIMIT_PER_IP", 2)
+    await register(client, "one@example.com")
+    await register(client, "two@example.com")
+    response = await client.post("/api/v1/auth/register", json={
+        "email": "three@example.com", "password": PASSWORD, "name": "Three", "phone": "1234567890"
+    })
+    assert response.status_code == 429
+
+
+async def test_memory_store_slides_its_window():
+    store = MemoryRateLimitStore()
+    assert await store.hit("k", 1, 1) == 0
+    assert await store.hit("k", 1, 1) > 0
+
+
+async def test_memory_store_evicts_least_recently_used_keys():
+    store = MemoryRateLimitStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        await store.hit(key, 1, 60)
+    assert await store.hit("a", 1, 60) == 0  # evicted, so counted afresh
+
+
+async def test_database_store_counts_per_window(db):
+    store = DatabaseRateLimitStore()
+    assert await store.hit("login:ip:1.2.3.4", 2, 60) == 0
+    assert await store.hit("login:ip:1.2.3.4", 2, 60) == 0
+    assert 0 < await store.hit("login:ip:1.2.3.4", 2, 60) <= 60
+
+    async with db() as session:
+        count = (await session.execute(select(RateLimitCounter.count))).scalar_one()
+    assert count == 3
+
+
+def test_store_implementations_must_define_hit():
+    class Incomplete(RateLimitStore):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+async def test_hash_admission_sheds_when_every_slot_is_taken():
+    admission = HashAdmission(max_concurrent=1, queue_timeout=0.01)
+    async with admission.slot():
+        with pytest.raises(HTTPException) as exc_info:
+            async with admission.slot():
+                pass
+    assert exc_info.value.status_code == 503
+
+
+async def test_purge_deletes_ended_windows_only(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BATCH_SIZE", 2)
+    now = int(time.time())
+    async with db() as session:
+        session.add_all([RateLimitCounter(key=f"old:{n}", window_start=now - 3600, count=1) for n in range(3)])
+        session.add(RateLimitCounter(key="current", window_start=now, count=1))
+        await session.commit()
+
+        deleted, checkpoint = 0, None
+        while True:
+            count, checkpoint, _ = await purge_rate_limit_windows_batch(session, checkpoint)
+            deleted += count
+            if checkpoint is None:
+                break
+        await session.commit()
+        remaining = (await session.execute(select(RateLimitCounter.key))).scalars().all()
+
+    assert deleted == 3
+    assert remaining == ["current"]
+
+
+def test_purge_runs_on_the_shard_holding_the_windows_only():
+    job = next(job for job in scheduler.jobs if job.name == "rate_limit_purge")
+    assert job.runs_on("default")
+    assert not job.runs_on("eu")
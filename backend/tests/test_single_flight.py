@@ -0,0 +1,150 @@
+"""Single-flight reads: coalescing, per-request responses, errors and cancelled leaders."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel
+
+from app.services.metrics import metrics
+from app.services.single_flight import single_flight, single_flight_group
+
+
+class Item(BaseModel):
+    name: str
+
+
+@pytest.fixture
+def gate():
+    """Holds the handlers until released, so concurrent requests overlap."""
+    return asyncio.Event()
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+async def flight_client(gate, calls):
+    app = FastAPI()
+
+    @app.get("/items/{name}", response_model=Item)
+    @single_flight("test:item")
+    async def get_item(name: str):
+        calls.append(name)
+        await gate.wait()
+        if name == "missing":
+            raise HTTPException(status_code=404, detail="Item not found")
+        return {"name": name, "secret": "not in the response model"}
+
+    @app.get("/raw")
+    @single_flight("test:raw")
+    async def get_raw():
+        calls.append("raw")
+        await gate.wait()
+        return Response(content=b"raw body", media_type="text/plain", headers={"X-Source": "handler"})
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+async def test_concurrent_identical_reads_share_one_execution(flight_client, gate, calls):
+    executions = metrics.value("single_flight_executions_total", route="test:item")
+    coalesced = metrics.value("single_flight_coalesced_total", route="test:item")
+
+    requests = [asyncio.ensure_future(flight_client.get("/items/chain")) for _ in range(5)]
+    await until(lambda: len(calls) == 1 and single_flight_group.in_flight == 1)
+    await asyncio.sleep(0.05)
+    gate.set()
+    responses = await asyncio.gather(*requests)
+
+    assert calls == ["chain"]
+    assert metrics.value("single_flight_executions_total", route="test:item") == executions + 1
+    assert metrics.value("single_flight_coalesced_total", route="test:item") == coalesced + 4
+    assert single_flight_group.in_flight == 0
+    for response in responses:
+        # Every request's response is validated against the response model
+        assert response.status_code == 200
+        assert response.json() == {"name": "chain"}
+
+
+async def test_different_arguments_are_not_coalesced(flight_client, gate, calls):
+    gate.set()
+    await asyncio.gather(flight_client.get("/items/chain"), flight_client.get("/items/brake"))
+    assert sorted(calls) == ["brake", "chain"]
+
+
+async def test_followers_get_the_leaders_http_error(flight_client, gate, calls):
+    requests = [asyncio.ensure_future(flight_client.get("/items/missing")) for _ in range(3)]
+    await until(lambda: len(calls) == 1)
+    await asyncio.sleep(0.05)
+    gate.set()
+    responses = await asyncio.gather(*requests)
+
+    assert calls == ["missing"]
+    assert [r.status_code for r in responses] == [404, 404, 404]
+    assert {r.json()["detail"] for r in responses} == {"Item not found"}
+
+
+async def test_followers_get_their_own_copy_of_a_response(flight_client, gate, calls):
+    requests = [asyncio.ensure_future(flight_client.get("/raw")) for _ in range(3)]
+    await until(lambda: len(calls) == 1)
+    await asyncio.sleep(0.05)
+    gate.set()
+    responses = await asyncio.gather(*requests)
+
+    assert calls == ["raw"]
+    for response in responses:
+        assert response.content == b"raw body"
+        assert response.headers["x-source"] == "handler"
+        assert response.headers["content-type"].startswith("text/plain")
+
+
+async def test_follower_takes_over_from_a_cancelled_leader(gate, calls):
+    started = asyncio.Event()
+
+    async def handler():
+        calls.append(len(calls))
+        started.set()
+        await gate.wait()
+        return {"name": "chain"}
+
+    leader = asyncio.ensure_future(single_flight_group.do("test:cancel", "key", handler))
+    await started.wait()
+    follower = asyncio.ensure_future(single_flight_group.do("test:cancel", "key", handler))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.gather(leader, return_exceptions=True)
+    await until(lambda: len(calls) == 2)
+    gate.set()
+
+    assert await follower == {"name": "chain"}
+    assert leader.cancelled()
+
+
+async def test_cancelled_follower_leaves_the_execution_running(gate, calls):
+    async def handler():
+        calls.append("run")
+        await gate.wait()
+        return "done"
+
+    leader = asyncio.ensure_future(single_flight_group.do("test:cancel", "other", handler))
+    await until(lambda: calls)
+    follower = asyncio.ensure_future(single_flight_group.do("test:cancel", "other", handler))
+    await asyncio.sleep(0)
+
+    follower.cancel()
+    await asyncio.gather(follower, return_exceptions=True)
+    gate.set()
+
+    assert await leader == "done"
+    assert follower.cancelled()
+    assert calls == ["run"]
@@ -0,0 +1,35 @@
+"""Startup: lazy imports, warmup and the readiness check."""
+
+import os
+import subprocess
+import sys
+
+from main import app
+from app.warmup import warm_up
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use, not when a worker imports the app
+LAZY_MODULES = ["aiosmtplib", "jose", "passlib", "PIL", "jinja2"]
+
+
+def test_heavy_modules_are_not_imported_with_the_app():
+    script = f"import sys, main; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "DEBUG": "false"}
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == []
+
+
+async def test_health_reports_ready_after_warmup(client, monkeypatch):
+    monkeypatch.setattr(app.state, "ready", False, raising=False)
+    assert (await client.get("/health")).status_code == 503
+
+    await warm_up(app)
+    app.state.ready = True
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
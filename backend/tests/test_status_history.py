@@ -0,0 +1,97 @@
+"""Booking status history: queued events, the timeline and the seeded history."""
+
+import sqlite3
+from collections import deque
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.status_event import BookingStatusEvent
+from app.services.auth_service import AuthService
+from app.services.status_history import status_history
+
+from .conftest import set_status
+from .test_migrations import BOOKING_ID, CUSTOMER_ID, create_v1, migrate
+
+
+@pytest.fixture(autouse=True)
+def empty_queue(monkeypatch):
+    """Events queued by other tests stay out of this one."""
+    monkeypatch.setattr(status_history, "_queue", deque())
+
+
+async def timeline(client, headers: dict, booking_id: str) -> list:
+    response = await client.get(f"/api/v1/bookings/{booking_id}/timeline", headers=headers)
+    assert response.status_code == 200, response.text
+    return [(e["from_status"], e["to_status"], e["version"]) for e in response.json()["events"]]
+
+
+EXPECTED = [(None, "pending", 1), ("pending", "confirmed", 2), ("confirmed", "in_progress", 3)]
+
+
+async def test_timeline_shows_a_change_right_after_it_commits(client, db, owner, customer, booking):
+    await set_status(client, owner, booking["id"], "confirmed", "in_progress")
+    assert status_history.queued == 3  # nothing written yet
+
+    assert await timeline(client, customer, booking["id"]) == EXPECTED
+
+    assert await status_history.flush() == 3
+    assert await timeline(client, customer, booking["id"]) == EXPECTED
+    async with db() as session:
+        assert (await session.execute(select(func.count()).select_from(BookingStatusEvent))).scalar() == 3
+
+
+async def test_events_being_written_are_not_lost_or_repeated(client, owner, customer, booking, monkeypatch):
+    await set_status(client, owner, booking["id"], "confirmed", "in_progress")
+    seen = []
+    write = status_history._write
+
+    async def observed_write(batch):
+        seen.append(await timeline(client, customer, booking["id"]))  # taken off the queue, not committed
+        await write(batch)
+        seen.append(await timeline(client, customer, booking["id"]))  # committed, still marked as being written
+
+    monkeypatch.setattr(status_history, "_write", staticmethod(observed_write))
+    await status_history.flush()
+    assert seen == [EXPECTED, EXPECTED]
+
+
+async def test_rolled_back_change_leaves_no_event(client, owner, booking):
+    response = await client.put(f"/api/v1/bookings/{booking['id']}/status", headers=owner, json={"status": "completed"})
+    assert response.status_code == 409
+    assert status_history.queued == 1  # the booking's creation only
+
+
+async def test_transaction_mode_writes_with_the_change(client, db, owner, customer, booking, monkeypatch):
+    monkeypatch.setattr(settings, "STATUS_HISTORY_MODE", "transaction")
+    await set_status(client, owner, booking["id"], "confirmed")
+    async with db() as session:
+        versions = (await session.execute(select(BookingStatusEvent.version))).scalars().all()
+    assert versions == [2]  # the creation event is still queued
+
+
+async def test_seeded_history_continues_without_repeating_a_version(tmp_path, shard_at):
+    from main import app
+
+    path = str(tmp_path / "v1.db")
+    create_v1(path)
+    with sqlite3.connect(path) as raw:
+        raw.execute("UPDATE bookings SET status = 'confirmed' WHERE id = ?", (BOOKING_ID,))
+    migrate(path)
+    shard_at(path)
+
+    token = AuthService.create_access_token(
+        SimpleNamespace(id=CUSTOMER_ID, email="rider@example.com", role="customer", tenant_id="default")
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get(f"/api/v1/bookings/{BOOKING_ID}", headers=headers)).json()["version"] == 2
+        assert (await client.delete(f"/api/v1/bookings/{BOOKING_ID}", headers=headers)).status_code == 204
+        await status_history.flush()
+        events = await timeline(client, headers, BOOKING_ID)
+
+    assert [version for _, _, version in events] == [1, 2, 3]
+    assert events[-1] == ("confirmed", "cancelled", 3)
@@ -0,0 +1,113 @@
+"""Station tenancy: tenant resolution, row scoping and shard routing."""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.database import init_db, shard_router
+from app.models.service import Service
+
+from .conftest import TOMORROW, register
+
+
+@pytest.fixture
+async def stations(engine, monkeypatch):
+    """Tenant "acme" on the default shard, "beta" on a shard of its own; returns beta's engine."""
+    beta = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    monkeypatch.setattr(settings, "DATABASE_SHARDS", {"b": "sqlite+aiosqlite:///:memory:"})
+    monkeypatch.setattr(settings, "TENANT_SHARDS", {"acme": "default", "beta": "b"})
+    monkeypatch.setitem(shard_router._engines, "b", beta)
+    monkeypatch.setitem(shard_router._sessionmakers, "b", async_sessionmaker(
+        bind=beta, class_=AsyncSession, expire_on_commit=False
+    ))
+    await init_db()
+    yield beta
+    await beta.dispose()
+
+
+async def add_service(client, headers: dict, name: str) -> str:
+    response = await client.post(
+        "/api/v1/services", headers=headers, json={"name": name, "price": "5.00", "estimated_time": 15}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def catalog(client, tenant: str) -> list:
+    response = await client.get("/api/v1/services", headers={"X-Tenant-ID": tenant})
+    return [service["name"] for service in response.json()["services"]]
+
+
+async def test_unknown_station_is_rejected(client, stations):
+    response = await client.get("/api/v1/services", headers={"X-Tenant-ID": "nope"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown station"
+
+
+async def test_same_email_registers_at_each_station(client, stations):
+    await register(client, "rider@example.com")
+    await register(client, "rider@example.com", tenant="acme")
+    response = await client.post("/api/v1/auth/register", headers={"X-Tenant-ID": "acme"}, json={
+        "email": "rider@example.com", "password": "Passw0rdX", "name": "Rider", "phone": "1234567890"
+    })
+    assert response.status_code == 400
+
+
+async def test_catalogs_are_scoped_to_their_station(client, stations):
+    await add_service(client, await register(client, "o@example.com", "owner"), "Default wash")
+    await add_service(client, await register(client, "o@example.com", "owner", tenant="acme"), "Acme wash")
+    await add_service(client, await register(client, "o@example.com", "owner", tenant="beta"), "Beta wash")
+
+    assert await catalog(client, "default") == ["Default wash"]
+    assert await catalog(client, "acme") == ["Acme wash"]
+    assert await catalog(client, "beta") == ["Beta wash"]
+
+
+async def test_token_station_wins_over_the_header(client, stations):
+    acme_owner = await register(client, "o@example.com", "owner", tenant="acme")
+    await add_service(client, {**acme_owner, "X-Tenant-ID": "default"}, "Acme wash")
+    assert await catalog(client, "acme") == ["Acme wash"]
+    assert await catalog(client, "default") == []
+
+
+async def test_customer_cannot_book_another_stations_service(client, stations):
+    default_service = await add_service(client, await register(client, "o@example.com", "owner"), "Wash")
+    acme_customer = await register(client, "c@example.com", tenant="acme")
+    response = await client.post(
+        "/api/v1/bookings", headers=acme_customer, json={"service_ids": [default_service], "booking_date": TOMORROW}
+    )
+    assert response.status_code in (400, 404)
+
+
+async def test_owner_lists_only_their_stations_bookings(client, stations, owner, booking):
+    acme_owner = await register(client, "o@example.com", "owner", tenant="acme")
+    assert (await client.get("/api/v1/bookings", headers=owner)).json()["total"] == 1
+    assert (await client.get("/api/v1/bookings", headers=acme_owner)).json()["total"] == 0
+
+
+async def test_station_data_lands_on_its_shard(client, db, stations):
+    await add_service(client, await register(client, "o@example.com", "owner", tenant="beta"), "Beta wash")
+
+    async with db() as session:
+        assert (await session.execute(select(Service.name))).scalars().all() == []
+    async with async_sessionmaker(bind=stations)() as session:
+        rows = (await session.execute(select(Service.tenant_id, Service.name))).all()
+    assert [tuple(row) for row in rows] == [("beta", "Beta wash")]
+
+
+async def test_invalid_token_is_rejected(client, stations):
+    response = await client.get("/api/v1/auth/me", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+
+
+async def test_token_is_decoded_once_per_request(client, customer, monkeypatch):
+    from jose import jwt
+
+    calls = []
+    decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: calls.append(1) or decode(*args, **kwargs))
+    response = await client.get("/api/v1/auth/me", headers={**customer, settings.PROFILE_HEADER: "1"})
+    assert response.status_code == 200
+    assert len(calls) == 1
@@ -0,0 +1,93 @@
+"""Workshop queue: priority order, claims and releases."""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models.booking import Booking
+
+from .conftest import TOMORROW, create_booking, register, set_status
+
+
+async def queued(client, owner, customer, service_ids: list, booking_date: str = TOMORROW) -> str:
+    booking = await create_booking(client, customer, service_ids, booking_date=booking_date)
+    await set_status(client, owner, booking["id"], "confirmed")
+    return booking["id"]
+
+
+async def add_service(client, owner, minutes: int) -> str:
+    response = await client.post(
+        "/api/v1/services", headers=owner, json={"name": f"Job {minutes}", "price": "5.00", "estimated_time": minutes}
+    )
+    return response.json()["id"]
+
+
+async def test_queue_orders_by_date_then_arrival_and_skips_pending(client, owner, customer, service_id):
+    later = await queued(client, owner, customer, [service_id], str(date.today() + timedelta(days=3)))
+    await create_booking(client, customer, [service_id])  # pending: not in the queue
+    first = await queued(client, owner, customer, [service_id])
+    second = await queued(client, owner, customer, [service_id])
+
+    heads = []
+    for _ in range(3):
+        response = await client.post("/api/v1/workqueue/claim", headers=owner)
+        heads.append(response.json()["booking"]["id"])
+    assert heads == [first, second, later]
+    assert (await client.post("/api/v1/workqueue/claim", headers=owner)).status_code == 204
+
+
+async def test_next_peeks_without_claiming(client, owner, customer, service_id):
+    booking_id = await queued(client, owner, customer, [service_id])
+    for _ in range(2):
+        job = (await client.get("/api/v1/workqueue/next", headers=owner)).json()
+        assert job["booking"]["id"] == booking_id
+        assert job["claimed_by"] is None
+        assert job["estimated_minutes"] == 30
+
+
+async def test_concurrent_mechanics_get_different_jobs(client, owner, customer, service_id):
+    ids = {await queued(client, owner, customer, [service_id]) for _ in range(3)}
+    mechanics = [owner] + [await register(client, f"mechanic{n}@example.com", "owner") for n in range(2)]
+
+    responses = await asyncio.gather(*[client.post("/api/v1/workqueue/claim", headers=m) for m in mechanics])
+    assert {r.json()["booking"]["id"] for r in responses} == ids
+
+
+async def test_claims_and_releases(client, owner, customer, service_id):
+    mechanic = await register(client, "mechanic@example.com", "owner")
+    booking_id = await queued(client, owner, customer, [service_id])
+    url = f"/api/v1/workqueue/{booking_id}"
+
+    claimed = await client.post(f"{url}/claim", headers=owner)
+    assert claimed.status_code == 200
+    assert claimed.json()["booking"]["version"] == 2  # a claim is not an edit of the booking
+    assert (await client.post(f"{url}/claim", headers=mechanic)).json()["detail"] == "Booking is already claimed"
+    assert (await client.get("/api/v1/workqueue/next", headers=owner)).status_code == 204
+
+    assert (await client.post(f"{url}/release", headers=mechanic)).status_code == 409
+    assert (await client.post(f"{url}/release", headers=mechanic, params={"force": "true"})).status_code == 200
+    assert (await client.get("/api/v1/workqueue/next", headers=owner)).json()["booking"]["id"] == booking_id
+    assert (await client.post(f"{url}/release", headers=owner)).json()["detail"] == "Booking is not claimed"
+
+
+async def test_bookings_outside_the_queue_cannot_be_claimed(client, owner, booking):
+    response = await client.post(f"/api/v1/workqueue/{booking['id']}/claim", headers=owner)
+    assert response.status_code == 409
+    assert "'pending'" in response.json()["detail"]
+    missing = await client.post("/api/v1/workqueue/01900000-0000-7000-8000-000000000000/claim", headers=owner)
+    assert missing.status_code == 404
+
+
+async def test_shorter_job_first_among_same_time_arrivals(client, db, owner, customer):
+    long_job = await queued(client, owner, customer, [await add_service(client, owner, 120)])
+    short_job = await queued(client, owner, customer, [await add_service(client, owner, 15)])
+    async with db() as session:
+        await session.execute(
+            update(Booking).where(Booking.id.in_([long_job, short_job])).values(created_at=datetime(2024, 1, 1))
+        )
+        await session.commit()
+
+    job = (await client.get("/api/v1/workqueue/next", headers=owner)).json()
+    assert job["booking"]["id"] == short_job
+    assert job["estimated_minutes"] == 15
@@ -20,7 +20,8 @@ CREATE TYPE booking_status AS ENUM ('pending', 'confirmed', 'in_progress', 'read
 
 CREATE TABLE users (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    email VARCHAR(255) UNIQUE NOT NULL,
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default', -- station
+    email VARCHAR(255) NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
     name VARCHAR(100) NOT NULL,
     phone VARCHAR(20) NOT NULL,
@@ -28,12 +29,11 @@ CREATE TABLE users (
     is_verified BOOLEAN DEFAULT FALSE,
     verification_token VARCHAR(255),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_users_tenant_email UNIQUE (tenant_id, email) -- also serves login lookups
 );
 
--- Index for faster email lookups during login
-CREATE INDEX idx_users_email ON users(email);
-CREATE INDEX idx_users_role ON users(role);
+CREATE INDEX ix_users_tenant_role ON users(tenant_id, role);
 
 -- ============================================================
 -- SERVICES TABLE
@@ -41,6 +41,7 @@ CREATE INDEX idx_users_role ON users(role);
 
 CREATE TABLE services (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
     name VARCHAR(100) NOT NULL,
     description TEXT,
     price DECIMAL(10, 2) NOT NULL CHECK (price >= 0),
@@ -51,7 +52,7 @@ CREATE TABLE services (
 );
 
 -- Index for active services
-CREATE INDEX idx_services_active ON services(is_active);
+CREATE INDEX ix_services_tenant_active_created ON services(tenant_id, is_active, created_at);
 
 -- ============================================================
 -- BOOKINGS TABLE
@@ -59,20 +60,32 @@ CREATE INDEX idx_services_active ON services(is_active);
 
 CREATE TABLE bookings (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
     customer_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     booking_date DATE NOT NULL,
     status booking_status NOT NULL DEFAULT 'pending',
+    previous_status booking_status, -- status before the last transition
     total_price DECIMAL(10, 2) NOT NULL CHECK (total_price >= 0),
     notes TEXT,
+    version INTEGER NOT NULL DEFAULT 1, -- compare-and-swap stamp, bumped by every status change
+    change_seq BIGINT NOT NULL DEFAULT 0, -- tenant-wide delta sync sequence (GET /bookings/changes)
+    reminder_sent_at TIMESTAMP, -- set by the booking_reminders job
+    estimated_minutes INTEGER NOT NULL DEFAULT 0, -- sum of the booked services' estimated_time
+    claimed_by UUID, -- mechanic working on the booking (workshop queue)
+    claimed_at TIMESTAMP,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Indexes for booking queries
-CREATE INDEX idx_bookings_customer ON bookings(customer_id);
-CREATE INDEX idx_bookings_status ON bookings(status);
-CREATE INDEX idx_bookings_date ON bookings(booking_date);
-CREATE INDEX idx_bookings_created ON bookings(created_at DESC);
+CREATE INDEX ix_bookings_tenant_customer_created ON bookings(tenant_id, customer_id, created_at);
+CREATE INDEX ix_bookings_tenant_created ON bookings(tenant_id, created_at);
+CREATE INDEX ix_bookings_tenant_status_date ON bookings(tenant_id, status, booking_date);
+CREATE INDEX ix_bookings_status_updated ON bookings(status, updated_at); -- archival scan
+CREATE INDEX ix_bookings_status_date_id ON bookings(status, booking_date, id); -- reminder and expiry jobs
+CREATE INDEX ix_bookings_tenant_change_seq ON bookings(tenant_id, change_seq, id); -- delta sync
+CREATE INDEX ix_bookings_workqueue ON bookings(tenant_id, booking_date, created_at, estimated_minutes, id)
+    WHERE status IN ('confirmed', 'in_progress') AND claimed_by IS NULL; -- workshop queue (GET /workqueue/next)
 
 -- ============================================================
 -- BOOKING_SERVICES (Junction Table - Many-to-Many)
@@ -80,6 +93,7 @@ CREATE INDEX idx_bookings_created ON bookings(created_at DESC);
 
 CREATE TABLE booking_services (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
     booking_id UUID NOT NULL REFERENCES bookings(id) ON DELETE CASCADE,
     service_id UUID NOT NULL REFERENCES services(id) ON DELETE RESTRICT,
     service_price DECIMAL(10, 2) NOT NULL, -- Price at time of booking
@@ -91,6 +105,216 @@ CREATE TABLE booking_services (
 CREATE INDEX idx_booking_services_booking ON booking_services(booking_id);
 CREATE INDEX idx_booking_services_service ON booking_services(service_id);
 
+-- ============================================================
+-- ARCHIVE TABLES (completed/cancelled bookings moved out of the live tables)
+-- ============================================================
+
+CREATE TABLE bookings_archive (
+    id UUID PRIMARY KEY,
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    customer_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    booking_date DATE NOT NULL,
+    status booking_status NOT NULL,
+    previous_status booking_status,
+    total_price DECIMAL(10, 2) NOT NULL,
+    notes TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    change_seq BIGINT NOT NULL DEFAULT 0,
+    reminder_sent_at TIMESTAMP,
+    estimated_minutes INTEGER NOT NULL DEFAULT 0,
+    claimed_by UUID,
+    claimed_at TIMESTAMP,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_bookings_archive_tenant_customer_created ON bookings_archive(tenant_id, customer_id, created_at);
+CREATE INDEX ix_bookings_archive_tenant_created ON bookings_archive(tenant_id, created_at);
+
+CREATE TABLE booking_services_archive (
+    id UUID PRIMARY KEY,
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    booking_id UUID NOT NULL REFERENCES bookings_archive(id) ON DELETE CASCADE,
+    service_id UUID NOT NULL REFERENCES services(id) ON DELETE RESTRICT,
+    service_price DECIMAL(10, 2) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX ix_booking_services_archive_booking_id ON booking_services_archive(booking_id);
+
+-- ============================================================
+-- BOOKING_TOMBSTONES (bookings removed from the live table, for delta sync)
+-- ============================================================
+
+CREATE TABLE booking_tombstones (
+    booking_id UUID PRIMARY KEY,
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    customer_id UUID NOT NULL,
+    change_seq BIGINT NOT NULL,
+    reason VARCHAR(20) NOT NULL DEFAULT 'archived',
+    removed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_booking_tombstones_tenant_change_seq ON booking_tombstones(tenant_id, change_seq, booking_id);
+
+-- ============================================================
+-- BOOKING_STATUS_EVENTS (append-only status history, kept after archival)
+-- ============================================================
+
+CREATE TABLE booking_status_events (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    booking_id UUID NOT NULL, -- live or archived booking, no foreign key
+    from_status booking_status, -- NULL for the booking's creation
+    to_status booking_status NOT NULL,
+    version INTEGER NOT NULL, -- booking version after the change
+    changed_by UUID, -- NULL for scheduled jobs
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_booking_status_events_booking_changed ON booking_status_events(booking_id, changed_at); -- GET /bookings/{id}/timeline
+
+-- ============================================================
+-- BOOKING_PHOTOS (damage photos; files live in PHOTO_DIR)
+-- ============================================================
+
+CREATE TABLE booking_photos (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    booking_id UUID NOT NULL, -- live or archived booking, no foreign key
+    uploaded_by UUID NOT NULL,
+    filename VARCHAR(255) NOT NULL, -- as sent by the client
+    content_type VARCHAR(30) NOT NULL, -- detected from the file
+    size INTEGER NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    width INTEGER, -- known once processed
+    height INTEGER,
+    status VARCHAR(20) NOT NULL DEFAULT 'processing', -- uploading, processing, ready, failed, original_only
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_booking_photos_booking_created ON booking_photos(booking_id, created_at); -- GET /bookings/{id}/photos
+
+-- ============================================================
+-- INVOICES (of completed bookings; documents live in INVOICE_DIR)
+-- ============================================================
+
+CREATE TABLE invoices (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    booking_id UUID NOT NULL, -- live or archived booking, no foreign key
+    customer_id UUID NOT NULL,
+    number VARCHAR(40) NOT NULL,
+    issued_at TIMESTAMP NOT NULL, -- when the booking was completed
+    total DECIMAL(10, 2) NOT NULL,
+    html_sha256 VARCHAR(64) NOT NULL, -- content hash of the stored HTML document
+    text_sha256 VARCHAR(64) NOT NULL, -- content hash of the stored plain-text document
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_invoices_tenant_booking UNIQUE (tenant_id, booking_id)
+);
+
+CREATE INDEX ix_invoices_tenant_issued ON invoices(tenant_id, issued_at); -- GET /invoices/export
+
+-- ============================================================
+-- RATE_LIMIT_COUNTERS (shared auth rate limit windows)
+-- ============================================================
+
+CREATE TABLE rate_limit_counters (
+    key VARCHAR(255) NOT NULL,
+    window_start INTEGER NOT NULL, -- unix time aligned to the window
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key, window_start)
+);
+
+-- ============================================================
+-- IDEMPOTENCY_KEYS (stored responses for retried mutating requests)
+-- ============================================================
+
+CREATE TABLE idempotency_keys (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    key VARCHAR(255) NOT NULL,
+    user_id UUID NOT NULL,
+    method VARCHAR(10) NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code INTEGER, -- NULL while the first request is in flight
+    response_body TEXT,
+    locked_until TIMESTAMP NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    CONSTRAINT uq_idempotency_user_key UNIQUE (user_id, key)
+);
+
+CREATE INDEX ix_idempotency_expires ON idempotency_keys(expires_at);
+
+-- ============================================================
+-- CACHE_VERSIONS (version stamps of the cache invalidation bus)
+-- ============================================================
+
+CREATE TABLE cache_versions (
+    name VARCHAR(255) PRIMARY KEY, -- "<tenant>:<cache>"
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- ============================================================
+-- CHANGE_SEQUENCES (delta sync sequence of each tenant's bookings; see app/services/booking_changes.py)
+-- ============================================================
+
+CREATE TABLE change_sequences (
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    name VARCHAR(100) NOT NULL, -- "bookings"
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, name)
+);
+
+-- ============================================================
+-- COUNTERS (list totals maintained by every booking/service write)
+-- ============================================================
+
+CREATE TABLE counters (
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    name VARCHAR(255) NOT NULL, -- "bookings", "bookings:<status>", "bookings:customer:<id>[:<status>]", "services[:active]"
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, name)
+);
+
+CREATE TABLE booking_day_counts (
+    tenant_id VARCHAR(36) NOT NULL DEFAULT 'default',
+    booking_date DATE NOT NULL,
+    status VARCHAR(30) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, booking_date, status)
+);
+
+-- ============================================================
+-- JOB_LEASES (scheduled jobs: lease holder and checkpoint; see app/services/scheduler.py)
+-- ============================================================
+
+CREATE TABLE job_leases (
+    name VARCHAR(100) PRIMARY KEY,
+    owner VARCHAR(255), -- worker holding the lease, NULL when idle
+    leased_until TIMESTAMP,
+    checkpoint TEXT, -- resume position of an unfinished run
+    next_run_at TIMESTAMP NOT NULL,
+    last_started_at TIMESTAMP,
+    last_finished_at TIMESTAMP,
+    last_processed INTEGER NOT NULL DEFAULT 0
+);
+
+-- ============================================================
+-- SCHEMA_VERSION (checked at startup instead of create_all; see app/migrations.py)
+-- ============================================================
+
+CREATE TABLE schema_version (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+);
+
+INSERT INTO schema_version (id, version, applied_at) VALUES (1, 14, CURRENT_TIMESTAMP);
+
 -- ============================================================
 -- TRIGGER FUNCTION FOR updated_at
 -- ============================================================
@@ -176,3 +176,125 @@ class BookingListResponse {
     );
   }
 }
+
+/// One page of booking changes since a sync token
+class BookingChangesResponse {
+  final List<Booking> changed;
+  final List<String> removedIds;
+  final String nextToken;
+  final bool hasMore;
+
+  BookingChangesResponse({
+    required this.changed,
+    required this.removedIds,
+    required this.nextToken,
+    required this.hasMore,
+  });
+
+  factory BookingChangesResponse.fromJson(Map<String, dynamic> json) {
+    return BookingChangesResponse(
+      changed: (json['changed'] as List)
+          .map((b) => Booking.fromJson(b))
+          .toList(),
+      removedIds: (json['removed'] as List)
+          .map((t) => t['booking_id'] as String)
+          .toList(),
+      nextToken: json['next_token'],
+      hasMore: json['has_more'],
+    );
+  }
+}
+
+/// One status change of a booking
+class BookingStatusEvent {
+  final BookingStatus? fromStatus;
+  final BookingStatus toStatus;
+  final int version;
+  final DateTime changedAt;
+
+  BookingStatusEvent({
+    this.fromStatus,
+    required this.toStatus,
+    required this.version,
+    required this.changedAt,
+  });
+
+  factory BookingStatusEvent.fromJson(Map<String, dynamic> json) {
+    return BookingStatusEvent(
+      fromStatus: json['from_status'] != null
+          ? BookingStatus.fromString(json['from_status'])
+          : null,
+      toStatus: BookingStatus.fromString(json['to_status']),
+      version: json['version'],
+      changedAt: DateTime.parse(json['changed_at']),
+    );
+  }
+}
+
+/// A photo attached to a booking
+class BookingPhoto {
+  final String id;
+  final String bookingId;
+  final String filename;
+  final String contentType;
+  final int size;
+  final int? width;
+  final int? height;
+  final String status;
+  final DateTime createdAt;
+
+  BookingPhoto({
+    required this.id,
+    required this.bookingId,
+    required this.filename,
+    required this.contentType,
+    required this.size,
+    this.width,
+    this.height,
+    required this.status,
+    required this.createdAt,
+  });
+
+  /// Display and thumbnail variants can be loaded
+  bool get isReady => status == 'ready';
+
+  factory BookingPhoto.fromJson(Map<String, dynamic> json) {
+    return BookingPhoto(
+      id: json['id'],
+      bookingId: json['booking_id'],
+      filename: json['filename'],
+      contentType: json['content_type'],
+      size: json['size'],
+      width: json['width'],
+      height: json['height'],
+      status: json['status'],
+      createdAt: DateTime.parse(json['created_at']),
+    );
+  }
+}
+
+/// A booking in the workshop queue
+class WorkQueueJob {
+  final Booking booking;
+  final int estimatedMinutes;
+  final String? claimedBy;
+  final DateTime? claimedAt;
+
+  WorkQueueJob({
+    required this.booking,
+    required this.estimatedMinutes,
+    this.claimedBy,
+    this.claimedAt,
+  });
+
+  factory WorkQueueJob.fromJson(Map<String, dynamic> json) {
+    return WorkQueueJob(
+      booking: Booking.fromJson(json['booking']),
+      estimatedMinutes: json['estimated_minutes'],
+      claimedBy: json['claimed_by'],
+      claimedAt: json['claimed_at'] != null
+          ? DateTime.parse(json['claimed_at'])
+          : null,
+    );
+  }
+}
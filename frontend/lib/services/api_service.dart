@@ -43,12 +43,22 @@ class ApiService {
   }
 
   /// Make a POST request
-  Future<dynamic> post(String endpoint, {Map<String, dynamic>? body}) async {
+  /// Pass the same [idempotencyKey] when retrying so the server replays
+  /// the first response instead of repeating the operation.
+  Future<dynamic> post(
+    String endpoint, {
+    Map<String, dynamic>? body,
+    String? idempotencyKey,
+  }) async {
     final uri = Uri.parse('${AppConfig.apiBaseUrl}$endpoint');
+    final headers = _headers;
+    if (idempotencyKey != null) {
+      headers['Idempotency-Key'] = idempotencyKey;
+    }
     
     final response = await http.post(
       uri,
-      headers: _headers,
+      headers: headers,
       body: body != null ? jsonEncode(body) : null,
     ).timeout(AppConfig.connectionTimeout);
     
@@ -224,23 +234,98 @@ class ApiService {
     return BookingListResponse.fromJson(data);
   }
 
+  /// Get bookings changed or removed since a sync token.
+  /// Pass null for a full sync, then the returned nextToken on each refresh.
+  Future<BookingChangesResponse> getBookingChanges({
+    String? since,
+    int limit = 100,
+  }) async {
+    final params = <String, String>{'limit': limit.toString()};
+    if (since != null) params['since'] = since;
+    
+    final data = await get('/bookings/changes', queryParams: params);
+    return BookingChangesResponse.fromJson(data);
+  }
+
   /// Get single booking
   Future<Booking> getBooking(String id) async {
     final data = await get('/bookings/$id');
     return Booking.fromJson(data);
   }
 
+  /// Get the status history of a booking, oldest change first
+  Future<List<BookingStatusEvent>> getBookingTimeline(String id) async {
+    final data = await get('/bookings/$id/timeline');
+    return (data['events'] as List)
+        .map((e) => BookingStatusEvent.fromJson(e))
+        .toList();
+  }
+
+  /// Attach a photo (JPEG, PNG or WebP) to a booking
+  Future<BookingPhoto> uploadBookingPhoto({
+    required String bookingId,
+    required List<int> bytes,
+    required String filename,
+  }) async {
+    final uri = Uri.parse('${AppConfig.apiBaseUrl}/bookings/$bookingId/photos');
+    final request = http.MultipartRequest('POST', uri)
+      ..files.add(http.MultipartFile.fromBytes('file', bytes, filename: filename));
+    if (_token != null) {
+      request.headers['Authorization'] = 'Bearer $_token';
+    }
+    
+    final streamed = await request.send().timeout(AppConfig.connectionTimeout);
+    final data = _handleResponse(await http.Response.fromStream(streamed));
+    return BookingPhoto.fromJson(data);
+  }
+
+  /// Get the photos of a booking, oldest first
+  Future<List<BookingPhoto>> getBookingPhotos(String bookingId) async {
+    final data = await get('/bookings/$bookingId/photos');
+    return (data as List).map((p) => BookingPhoto.fromJson(p)).toList();
+  }
+
+  /// URL of a booking photo ('original', 'display' or 'thumbnail');
+  /// load it with [imageHeaders]
+  String bookingPhotoUrl(String bookingId, String photoId, {String variant = 'display'}) {
+    return '${AppConfig.apiBaseUrl}/bookings/$bookingId/photos/$photoId?variant=$variant';
+  }
+
+  /// Get the invoice of a completed booking ('html' or 'text');
+  /// null while it is still being prepared (retry after a few seconds)
+  Future<String?> getBookingInvoice(String bookingId, {String format = 'html'}) async {
+    final uri = Uri.parse('${AppConfig.apiBaseUrl}/bookings/$bookingId/invoice?format=$format');
+    final response = await http.get(uri, headers: imageHeaders)
+        .timeout(AppConfig.connectionTimeout);
+    if (response.statusCode == 202) return null;
+    if (response.statusCode != 200) _handleResponse(response);
+    return utf8.decode(response.bodyBytes);
+  }
+
+  /// URL of the zip of a month's invoices ('YYYY-MM', Owner only);
+  /// download it with [imageHeaders]
+  String invoiceExportUrl(String month) {
+    return '${AppConfig.apiBaseUrl}/invoices/export?month=$month';
+  }
+
+  /// Headers for loading protected images (Image.network)
+  Map<String, String> get imageHeaders {
+    return _token != null ? {'Authorization': 'Bearer $_token'} : {};
+  }
+
   /// Create a new booking (Customer only)
+  /// Reuse [idempotencyKey] across retries of the same booking request.
   Future<Booking> createBooking({
     required List<String> serviceIds,
     required DateTime bookingDate,
     String? notes,
+    String? idempotencyKey,
   }) async {
     final data = await post('/bookings', body: {
       'service_ids': serviceIds,
       'booking_date': bookingDate.toIso8601String().split('T')[0],
       'notes': notes,
-    });
+    }, idempotencyKey: idempotencyKey);
     return Booking.fromJson(data);
   }
 
@@ -259,6 +344,36 @@ class ApiService {
   Future<void> cancelBooking(String id) async {
     await delete('/bookings/$id');
   }
+
+  // ==================== WORKSHOP QUEUE ENDPOINTS ====================
+
+  /// Peek at the next job in the workshop queue (Owner only)
+  /// Returns null when no unclaimed job is waiting.
+  Future<WorkQueueJob?> getNextJob() async {
+    final data = await get('/workqueue/next');
+    return data == null ? null : WorkQueueJob.fromJson(data);
+  }
+
+  /// Claim the next job in the workshop queue (Owner only)
+  /// Returns null when no unclaimed job is waiting.
+  Future<WorkQueueJob?> claimNextJob() async {
+    final data = await post('/workqueue/claim');
+    return data == null ? null : WorkQueueJob.fromJson(data);
+  }
+
+  /// Claim a specific queued booking (Owner only)
+  Future<WorkQueueJob> claimJob(String bookingId) async {
+    final data = await post('/workqueue/$bookingId/claim');
+    return WorkQueueJob.fromJson(data);
+  }
+
+  /// Put a claimed booking back in the workshop queue (Owner only)
+  Future<WorkQueueJob> releaseJob(String bookingId, {bool force = false}) async {
+    final data = await post(
+      '/workqueue/$bookingId/release${force ? '?force=true' : ''}',
+    );
+    return WorkQueueJob.fromJson(data);
+  }
 }
 
 /// API Exception class